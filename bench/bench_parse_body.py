@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+
+#Copyright (C) 2012 Niklas Thorne.
+
+#This file is part of XMPPMote.
+#
+#XMPPMote is free software: you can redistribute it and/or modify
+#it under the terms of the GNU General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+#
+#XMPPMote is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU General Public License for more details.
+#
+#You should have received a copy of the GNU General Public License
+#along with XMPPMote.  If not, see <http://www.gnu.org/licenses/>.
+
+""" This module benchmarks RestrictedCommandHandler.parse_body.
+
+The per-message cost of parsing a command, a help request and an unknown
+command is measured for restricted command sets of increasing size; as the
+command set is indexed, the cost should stay flat as the set grows. """
+
+import os
+import sys
+import tempfile
+import timeit
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# the client module needs to be imported first, due to the circular dependency
+# between the client module and the commands module
+import bot.client
+from bot.commandhandlers import RestrictedCommandHandler
+from configuration.configurationparser import ConfigurationParser
+
+
+SET_SIZES = (10, 100, 1000)
+ITERATIONS = 20000
+
+
+class NoExecCommandHandler(RestrictedCommandHandler):
+    """ A RestrictedCommandHandler that does not execute any commands. """
+
+    def do_command(self, command, args = None, request = None):
+        return command
+
+
+def setup_configuration(size):
+    """ Parse a configuration file defining _size_ restricted commands. """
+
+    rcfile = tempfile.NamedTemporaryFile(mode = "a+", suffix = "rc")
+    rcfile.write("[general]\nhandler: restricted\n\n[commands]\n")
+    for i in range(size):
+        rcfile.write("command%d: cmd%d:-x:Command number %d\n" % (i, i, i))
+    rcfile.flush()
+
+    ConfigurationParser().parse(rcfile)
+
+    return rcfile
+
+
+def measure(handler, body):
+    """ Returns the mean time, in microseconds, of parsing _body_. """
+
+    seconds = timeit.timeit(lambda: handler.parse_body(body),
+                            number = ITERATIONS)
+
+    return seconds * 1e6 / ITERATIONS
+
+
+def main():
+    """ Run the benchmark for each command set size. """
+
+    handler = NoExecCommandHandler()
+
+    print "%8s %12s %12s %12s" % ("commands", "command/us", "help/us",
+                                  "unknown/us")
+    for size in SET_SIZES:
+        rcfile = setup_configuration(size)
+
+        print "%8d %12.2f %12.2f %12.2f" % (
+                size,
+                measure(handler, "cmd%d" % (size / 2)),
+                measure(handler, "help cmd%d" % (size / 2)),
+                measure(handler, "no such command"))
+
+        rcfile.close()
+
+
+if "__main__" == __name__:
+    main()
@@ -0,0 +1,242 @@
+#!/usr/bin/env python
+
+#Copyright (C) 2012 Niklas Thorne.
+
+#This file is part of XMPPMote.
+#
+#XMPPMote is free software: you can redistribute it and/or modify
+#it under the terms of the GNU General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+#
+#XMPPMote is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU General Public License for more details.
+#
+#You should have received a copy of the GNU General Public License
+#along with XMPPMote.  If not, see <http://www.gnu.org/licenses/>.
+
+""" This module benchmarks the throughput of the command pipeline.
+
+Message stanzas are pushed through CommandHandler.message, and on through
+RestrictedCommandHandler.parse_body and do_command, for a mix of commands, help
+requests and unknown commands. Commands are run by a stub spawner, and the
+responses are serialized by a loopback stream, so that only the bot's own cost
+is measured. The messages per second, the per-message latency percentiles, and
+the memory used are reported, and may be saved as a baseline, or compared with
+one, e.g.
+
+    $ python bench/bench_pipeline.py --save baseline.json
+    $ python bench/bench_pipeline.py --compare baseline.json
+
+Python 2 cannot count allocations, so the number of objects retained per message
+(i.e. left allocated after a collection) and the growth of the peak RSS are
+reported instead. """
+
+import argparse
+import gc
+import json
+import os
+import resource
+import sys
+import tempfile
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# the client module needs to be imported first, due to the circular dependency
+# between the client module and the commands module
+import bot.client
+from bench.loopback import LoopbackStream
+from bench.loopback import make_message
+from bench.loopback import stub_spawner
+from bot.commandhandlers import RestrictedCommandHandler
+from bot.latency import Latency
+from configuration.configurationparser import ConfigurationParser
+from lib.clock import monotonic
+
+
+MESSAGES = 5000
+
+# the number of runs of each scenario, of which the fastest one is reported, as
+# the slower ones were disturbed by something else
+REPEATS = 3
+
+# (name, message bodies) of each scenario, the bodies being sent in turn
+SCENARIOS = (
+    ("command", ["uptime", "df", "free"]),
+    ("help", ["help uptime", "help"]),
+    ("unknown", ["no such command"]),
+    ("mix", ["uptime", "help uptime", "df", "no such command", "free"]),
+)
+
+# the measures compared with a baseline, and whether greater is better
+MEASURES = (
+    ("messages_per_second", True),
+    ("p50_us", False),
+    ("p95_us", False),
+    ("p99_us", False),
+    ("retained_per_message", False),
+)
+
+# the relative change beyond which a measure has regressed, by default
+TOLERANCE = 0.20
+
+# the number of objects per message that may be retained beyond the baseline,
+# since a relative change of (nearly) nothing means nothing
+OBJECT_TOLERANCE = 0.5
+
+
+def setup_configuration():
+    """ Parse a configuration file defining the commands of the scenarios. """
+
+    rcfile = tempfile.NamedTemporaryFile(mode = "a+", suffix = "rc")
+    rcfile.write("[general]\nhandler: restricted\n\n[commands]\n"
+                 "uptime: uptime::Show the uptime\n"
+                 "df: df:-h:Show the disk usage\n"
+                 "free: free:-m:Show the memory usage\n")
+    rcfile.flush()
+
+    ConfigurationParser().parse(rcfile)
+
+    return rcfile
+
+
+def percentile(values, fraction):
+    """ Returns the value at _fraction_ of the sorted _values_. """
+
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def run(bodies, messages):
+    """ Push _messages_ message stanzas, carrying _bodies_ in turn, through
+    the pipeline. Returns a dict of the measures. """
+
+    handler = RestrictedCommandHandler()
+    stream = LoopbackStream()
+    stanzas = [make_message(number, bodies[number % len(bodies)])
+               for number in range(messages)]
+    latencies = []
+
+    gc.collect()
+    objects = len(gc.get_objects())
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    started = monotonic()
+    for stanza in stanzas:
+        start = monotonic()
+        stream.send(handler.message(stanza))
+        latencies.append(monotonic() - start)
+    elapsed = monotonic() - started
+
+    gc.collect()
+    latencies.sort()
+
+    return {
+        "messages_per_second":  messages / elapsed,
+        "p50_us":               percentile(latencies, 0.50) * 1e6,
+        "p95_us":               percentile(latencies, 0.95) * 1e6,
+        "p99_us":               percentile(latencies, 0.99) * 1e6,
+        "retained_per_message": float(len(gc.get_objects()) - objects) /
+                                messages,
+        "rss_growth_kib":       resource.getrusage(
+                                    resource.RUSAGE_SELF).ru_maxrss - rss,
+        "response_bytes":       stream.bytes
+    }
+
+
+def compare(results, baseline, tolerance):
+    """ Print the change of each measure of _results_ from _baseline_, and
+    return the number of measures that regressed beyond _tolerance_. """
+
+    regressions = 0
+
+    print
+    print "%-10s %-20s %12s %12s %8s" % ("scenario", "measure", "baseline",
+                                         "current", "change")
+    for (name, _) in SCENARIOS:
+        if name not in baseline:
+            continue
+
+        for (measure, greater_is_better) in MEASURES:
+            (before, after) = (baseline[name][measure], results[name][measure])
+            change = before and (after - before) / before or 0.0
+
+            if "retained_per_message" == measure:
+                regressed = after - before > OBJECT_TOLERANCE
+            else:
+                regressed = (-change if greater_is_better else change) > \
+                            tolerance
+            regressions += regressed
+
+            print "%-10s %-20s %12.2f %12.2f %+7.1f%%%s" % (
+                    name, measure, before, after, change * 100,
+                    regressed and " REGRESSED" or "")
+
+    return regressions
+
+
+def parse_arguments():
+    """ Parse the command line arguments. """
+
+    parser = argparse.ArgumentParser(
+            description = "Benchmark the command pipeline.")
+    parser.add_argument("--messages", type = int, default = MESSAGES,
+                        help = "messages per scenario (default %(default)s)")
+    parser.add_argument("--repeats", type = int, default = REPEATS,
+                        help = "runs per scenario, of which the fastest is "
+                               "reported (default %(default)s)")
+    parser.add_argument("--save", metavar = "FILE",
+                        help = "save the results as a baseline")
+    parser.add_argument("--compare", metavar = "FILE",
+                        help = "compare the results with a baseline")
+    parser.add_argument("--tolerance", type = float, default = TOLERANCE,
+                        help = "relative change allowed before a measure "
+                               "has regressed (default %(default)s)")
+
+    return parser.parse_args()
+
+
+def main():
+    """ Run each scenario, and save or compare the results. """
+
+    arguments = parse_arguments()
+    rcfile = setup_configuration()
+    results = {}
+
+    print "%-10s %10s %10s %10s %10s %12s %10s" % (
+            "scenario", "msgs/s", "p50/us", "p95/us", "p99/us", "retained/msg",
+            "rss/KiB")
+
+    with stub_spawner():
+        for (name, bodies) in SCENARIOS:
+            # the scenarios should not be told apart by earlier ones
+            Latency().reset()
+            run(bodies, min(arguments.messages, 100))
+
+            results[name] = max([run(bodies, arguments.messages)
+                                 for _ in range(arguments.repeats)],
+                                key = lambda result:
+                                    result["messages_per_second"])
+
+            print "%-10s %10.0f %10.1f %10.1f %10.1f %12.2f %10d" % (
+                    name, results[name]["messages_per_second"],
+                    results[name]["p50_us"], results[name]["p95_us"],
+                    results[name]["p99_us"],
+                    results[name]["retained_per_message"],
+                    results[name]["rss_growth_kib"])
+
+    rcfile.close()
+
+    if arguments.save:
+        with open(arguments.save, "w") as output:
+            json.dump(results, output, indent = 2, sort_keys = True)
+
+    if arguments.compare:
+        with open(arguments.compare) as baseline:
+            if compare(results, json.load(baseline), arguments.tolerance):
+                sys.exit(1)
+
+
+if "__main__" == __name__:
+    main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+
+#Copyright (C) 2012 Niklas Thorne.
+
+#This file is part of XMPPMote.
+#
+#XMPPMote is free software: you can redistribute it and/or modify
+#it under the terms of the GNU General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+#
+#XMPPMote is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU General Public License for more details.
+#
+#You should have received a copy of the GNU General Public License
+#along with XMPPMote.  If not, see <http://www.gnu.org/licenses/>.
+
+
+""" This module benchmarks the launch latency of commands.
+
+Commands are started directly by subprocess.Popen, which forks the daemon, and
+by the Spawner, whose helper process was forked before the daemon grew. The
+daemon is grown by allocating memory, and by starting idle threads, in order to
+resemble a daemon that has been running for a while. """
+
+import os
+import sys
+import threading
+import timeit
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lib import process
+from lib.spawner import Spawner
+
+import subprocess
+
+
+ITERATIONS = 200
+BALLAST_SIZES = (0, 64, 256, 1024)
+IDLE_THREADS = 16
+COMMAND = ["true"]
+
+
+def popen():
+    """ Start and reap a command using subprocess.Popen. """
+
+    subp = subprocess.Popen(COMMAND, stdout = subprocess.PIPE,
+                            preexec_fn = process.new_process_group)
+    subp.communicate()
+
+
+def spawn():
+    """ Start and reap a command using the Spawner. """
+
+    Spawner().spawn(COMMAND).communicate()
+
+
+def measure(function):
+    """ Returns the mean time, in microseconds, of calling _function_. """
+
+    seconds = timeit.timeit(function, number = ITERATIONS)
+
+    return seconds * 1e6 / ITERATIONS
+
+
+def main():
+    """ Run the benchmark for each daemon size. """
+
+    Spawner().start()
+
+    stop = threading.Event()
+    for _ in range(IDLE_THREADS):
+        thread = threading.Thread(target = stop.wait)
+        thread.daemon = True
+        thread.start()
+
+    ballast = []
+
+    print "%10s %12s %12s" % ("ballast/MB", "popen/us", "spawner/us")
+    for size in BALLAST_SIZES:
+        # touch the memory, so that it is mapped into the daemon
+        ballast.append(bytearray(size * 1024 * 1024 - sum(map(len, ballast))))
+
+        print "%10d %12.1f %12.1f" % (size, measure(popen), measure(spawn))
+
+    stop.set()
+    Spawner().stop()
+
+
+if "__main__" == __name__:
+    main()
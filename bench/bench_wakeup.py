@@ -0,0 +1,145 @@
+#!/usr/bin/env python
+
+#Copyright (C) 2012 Niklas Thorne.
+
+#This file is part of XMPPMote.
+#
+#XMPPMote is free software: you can redistribute it and/or modify
+#it under the terms of the GNU General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+#
+#XMPPMote is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU General Public License for more details.
+#
+#You should have received a copy of the GNU General Public License
+#along with XMPPMote.  If not, see <http://www.gnu.org/licenses/>.
+
+
+
+""" This module benchmarks the delivery latency of stanzas sent off-thread.
+
+Stanzas are sent by a thread other than the one running the client loop, as
+status changes and command replies are, and the time until the loop has written
+them to the stream is measured. The number of times that the loop wakes up by
+itself while there is nothing to do is counted as well. The stream is a stand-in
+that writes to one end of a socket pair, so no server is needed. """
+
+import os
+import socket
+import sys
+import threading
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# the client module needs to be imported first, due to the circular dependency
+# between the client module and the commands module
+import bot.client
+from bot.client import Client
+from lib.clock import monotonic
+
+
+ITERATIONS = 2000
+IDLE_SECONDS = 5
+LOOP_TIMEOUTS = (1, Client.IDLE_INTERVAL)
+
+
+class StandInStream(object):
+    """ Stands in for a stream, timestamping the stanzas written to it. """
+
+    def __init__(self, sock):
+        self.lock = threading.RLock()
+        self.socket = sock
+        self.written = threading.Condition()
+        self.write_times = []
+        self.idle_count = 0
+
+    def _send(self, stanza):
+        self._write_raw(stanza)
+
+    def _write_raw(self, data):
+        with self.written:
+            self.write_times.append(monotonic())
+            self.written.notify()
+
+    def _request_ack(self):
+        pass
+
+    def process(self):
+        self.socket.recv(512)
+
+    def idle(self):
+        self.idle_count += 1
+
+
+def percentile(values, fraction):
+    """ Returns the value at _fraction_ of the sorted _values_. """
+
+    values = sorted(values)
+
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def run(timeout):
+    """ Run the loop with _timeout_, returning the delivery latencies in
+    microseconds, and the number of idle wakeups per second. """
+
+    (sock, peer) = socket.socketpair()
+    stream = StandInStream(sock)
+
+    client = Client()
+    client.lock = threading.RLock()
+    client.stream = stream
+    client.session_established = True
+
+    thread = threading.Thread(target = client.loop, args = (timeout, ))
+    thread.start()
+
+    # send from this thread, rather than the loop thread
+    while not client._Client__loop_thread:
+        time.sleep(0.01)
+
+    latencies = []
+    for _ in range(ITERATIONS):
+        with stream.written:
+            count = len(stream.write_times)
+            start = monotonic()
+            client.send_stanza("<presence/>")
+
+            while len(stream.write_times) == count:
+                stream.written.wait()
+
+            latencies.append((stream.write_times[-1] - start) * 1e6)
+
+    stream.idle_count = 0
+    time.sleep(IDLE_SECONDS)
+    idle_rate = float(stream.idle_count) / IDLE_SECONDS
+
+    client.stream = None
+    peer.send("x")
+    thread.join()
+
+    sock.close()
+    peer.close()
+
+    return (latencies, idle_rate)
+
+
+def main():
+    """ Run the benchmark for each loop timeout. """
+
+    print "%10s %10s %10s %10s %14s" % ("timeout/s", "p50/us", "p99/us",
+                                        "max/us", "idle wakeups/s")
+    for timeout in LOOP_TIMEOUTS:
+        (latencies, idle_rate) = run(timeout)
+
+        print "%10d %10.1f %10.1f %10.1f %14.2f" % (
+                timeout, percentile(latencies, 0.5),
+                percentile(latencies, 0.99), max(latencies), idle_rate)
+
+
+if "__main__" == __name__:
+    main()
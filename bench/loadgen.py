@@ -0,0 +1,200 @@
+#!/usr/bin/env python
+
+#Copyright (C) 2012 Niklas Thorne.
+
+#This file is part of XMPPMote.
+#
+#XMPPMote is free software: you can redistribute it and/or modify
+#it under the terms of the GNU General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+#
+#XMPPMote is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU General Public License for more details.
+#
+#You should have received a copy of the GNU General Public License
+#along with XMPPMote.  If not, see <http://www.gnu.org/licenses/>.
+
+
+""" This module measures how many concurrent users a daemon can serve.
+
+A daemon is started and connected to the stand-in server, which then delivers
+messages from a growing number of simulated users, each sending commands drawn
+from a weighted mix at a fixed rate. For each number of users, the round trip
+time of the messages (from being delivered to the daemon until the reply
+reaches the server), the replies per second, and the share of messages that
+were rejected (e.g. throttled) or not replied to at all are reported, e.g.
+
+    $ python bench/loadgen.py --users 1,10,50 --rate 0.5 \\
+          --mix "uptime:3,df -h:1,help:1" --config xmppmoterc
+
+The daemon is configured as detailed in bench/localdaemon.py, and the commands
+are really run, so a configuration file allowing only harmless commands is to
+be used. """
+
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench.localdaemon import LocalDaemon
+from bench.replay import ONLINE_TIMEOUT
+from bench.replay import ReplyTimer
+from bench.replay import make_stanza
+from bench.replay import percentile
+from bench.standin import StandInServer
+from bot import recorder
+from lib.clock import monotonic
+
+
+USERS = "1,5,10,25,50"
+MIX = "uptime:3,pwd:1,help:1"
+
+# the rate at which each user sends commands, i.e. one every five seconds
+RATE = 0.2
+
+DURATION = 30
+
+
+def parse_mix(mix):
+    """ Returns the list of commands described by _mix_, a comma separated
+    list of command:weight pairs, each command repeated by its weight. """
+
+    commands = []
+    for pair in mix.split(","):
+        (command, _, weight) = pair.rpartition(":")
+        if not command:
+            (command, weight) = (weight, "1")
+
+        commands.extend([command.strip()] * int(weight))
+
+    return commands
+
+
+def simulate_user(server, to, sender, commands, rate, duration, timer):
+    """ Deliver messages from _sender_ to _to_ using _server_, _rate_ times
+    per second for _duration_ seconds, each carrying a command drawn from
+    _commands_, and pass them on to _timer_. The first message is sent at a
+    random time within the first interval, so that the users do not send in
+    step. """
+
+    rand = random.Random(sender)
+    interval = 1.0 / rate
+
+    started = monotonic()
+    due = started + rand.random() * interval
+
+    while due < started + duration:
+        delay = due - monotonic()
+        if 0 < delay:
+            time.sleep(delay)
+
+        element = make_stanza(to, (due, recorder.MESSAGE, "chat", sender,
+                                   rand.choice(commands)))
+        timer.sent(element)
+        server.deliver(to, element)
+
+        due += interval
+
+
+def run(server, daemon, users, commands, args, timer):
+    """ Simulate _users_ users sending _commands_ to _daemon_, as detailed by
+    _args_, passing their messages on to _timer_, and wait for the replies. """
+
+    threads = [threading.Thread(target = simulate_user,
+                                args = (server, daemon.jid,
+                                        "user%d-%d@example.com/load" %
+                                        (users, number),
+                                        commands, args.rate, args.duration,
+                                        timer))
+               for number in range(users)]
+
+    for thread in threads:
+        thread.daemon = True
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    timer.wait(args.timeout)
+
+
+def parse_arguments():
+    """ Parse the command line arguments. """
+
+    parser = argparse.ArgumentParser(
+            description = "Measure the daemon as the number of users grows.")
+    parser.add_argument("--users", default = USERS,
+                        help = "comma separated numbers of concurrent users "
+                               "(default %(default)s)")
+    parser.add_argument("--rate", type = float, default = RATE,
+                        help = "messages per second sent by each user "
+                               "(default %(default)s)")
+    parser.add_argument("--mix", default = MIX,
+                        help = "comma separated command:weight pairs "
+                               "(default %(default)s)")
+    parser.add_argument("--duration", type = float, default = DURATION,
+                        help = "seconds to send for, for each number of "
+                               "users (default %(default)s)")
+    parser.add_argument("--timeout", type = float, default = 30.0,
+                        help = "seconds to wait for the last replies "
+                               "(default %(default)s)")
+    parser.add_argument("--config", metavar = "FILE",
+                        help = "the configuration file of the daemon "
+                               "(default xmppmoterc.example)")
+
+    return parser.parse_args()
+
+
+def main():
+    """ Run the daemon, and load it with each number of users in turn. """
+
+    args = parse_arguments()
+    commands = parse_mix(args.mix)
+    timers = [ReplyTimer()]
+
+    def stanza_received(jid, element):
+        daemon.stanza_received(jid, element)
+        timers[-1].stanza_received(element)
+
+    server = StandInServer(on_stanza = stanza_received)
+    daemon = LocalDaemon(server, args.config)
+    server.start()
+    daemon.start()
+
+    print "%6s %8s %10s %9s %9s %9s %9s %9s" % (
+            "users", "sent", "replies/s", "p50/ms", "p95/ms", "p99/ms",
+            "rejected", "lost")
+
+    try:
+        if not daemon.wait_online(ONLINE_TIMEOUT):
+            print "the daemon did not come online"
+            sys.exit(1)
+
+        for users in [int(users) for users in args.users.split(",")]:
+            timer = ReplyTimer()
+            timers.append(timer)
+            run(server, daemon, users, commands, args, timer)
+
+            times = sorted(timer.times) or [0.0]
+            sent = len(timer.times) + timer.pending()
+
+            print "%6d %8d %10.1f %9.1f %9.1f %9.1f %8.1f%% %8.1f%%" % (
+                    users, sent, len(timer.times) / args.duration,
+                    percentile(times, 0.50) * 1e3,
+                    percentile(times, 0.95) * 1e3,
+                    percentile(times, 0.99) * 1e3,
+                    100.0 * timer.rejected / max(1, sent),
+                    100.0 * timer.pending() / max(1, sent))
+    finally:
+        daemon.stop()
+        server.stop()
+
+
+if "__main__" == __name__:
+    main()
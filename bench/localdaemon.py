@@ -0,0 +1,141 @@
+#!/usr/bin/env python
+
+#Copyright (C) 2012 Niklas Thorne.
+
+#This file is part of XMPPMote.
+#
+#XMPPMote is free software: you can redistribute it and/or modify
+#it under the terms of the GNU General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+#
+#XMPPMote is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU General Public License for more details.
+#
+#You should have received a copy of the GNU General Public License
+#along with XMPPMote.  If not, see <http://www.gnu.org/licenses/>.
+
+
+""" This module runs XMPPMote against the stand-in server, for benchmarks.
+
+The daemon is run in the foreground, in a directory of its own, using a copy of
+a configuration file (xmppmoterc.example by default) that is changed to connect
+to the stand-in server, so that the whole daemon, rather than parts of it, is
+measured. Sections that would make the daemon send stanzas of its own (status
+and updates), or record the traffic, are removed from the copy. """
+
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from ConfigParser import RawConfigParser
+
+from bench.standin import CLIENT_NS
+from bench.standin import qname
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_CONFIG = os.path.join(ROOT, "xmppmoterc.example")
+
+# sections removed from the copy of the configuration file
+REMOVED_SECTIONS = ("status", "updates", "recorder")
+
+STOP_TIMEOUT = 5
+
+
+class LocalDaemon(object):
+    """ This type runs the daemon, as _username_ (at the domain of the stand-in
+    server), connecting to the stand-in _server_. The configuration file
+    _config_ is used for anything but the connection. The stanzas received by
+    the server are to be passed on to stanza_received. """
+
+    def __init__(self, server, config = None, username = "bot"):
+        self.jid = "%s@%s" % (username, server.domain)
+
+        self.__server = server
+        self.__config = config or DEFAULT_CONFIG
+        self.__directory = None
+        self.__process = None
+        self.__online = threading.Event()
+
+    def start(self):
+        """ Start the daemon. """
+
+        self.__directory = tempfile.mkdtemp(prefix = "xmppmote-bench-")
+        self.__write_config(os.path.join(self.__directory, "xmppmoterc"))
+
+        with open(os.devnull, "w") as null:
+            self.__process = subprocess.Popen(
+                [sys.executable, os.path.join(ROOT, "xmppmoted.py"), "run"],
+                cwd = self.__directory, stdout = null, stderr = null)
+
+    def wait_online(self, timeout):
+        """ Returns True once the daemon has sent its initial presence, or
+        False if it has not done so within _timeout_ seconds, or has exited. """
+
+        step = 0.1
+        while 0 < timeout and not self.__online.is_set():
+            if None != self.__process.poll():
+                return False
+
+            self.__online.wait(step)
+            timeout -= step
+
+        return self.__online.is_set()
+
+    def stanza_received(self, jid, element):
+        """ Notes the initial presence of the daemon, should _element_, sent by
+        _jid_, be it. """
+
+        if jid and jid.split("/")[0] == self.jid and \
+           qname(CLIENT_NS, "presence") == element.tag and \
+           not element.get("to") and not element.get("type"):
+            self.__online.set()
+
+    def stop(self):
+        """ Stop the daemon, and remove its directory. """
+
+        if self.__process and None == self.__process.poll():
+            self.__process.terminate()
+
+            for _ in range(STOP_TIMEOUT * 10):
+                if None != self.__process.poll():
+                    break
+                time.sleep(0.1)
+            else:
+                self.__process.kill()
+                self.__process.wait()
+
+        if self.__directory:
+            shutil.rmtree(self.__directory, ignore_errors = True)
+            self.__directory = None
+
+    def __write_config(self, path):
+        """ Write the configuration file of the daemon to _path_. """
+
+        config = RawConfigParser()
+        config.read(self.__config)
+
+        for section in REMOVED_SECTIONS:
+            config.remove_section(section)
+
+        for section in ("general", "credentials", "connection"):
+            if not config.has_section(section):
+                config.add_section(section)
+
+        config.set("general", "pidfile",
+                   os.path.join(self.__directory, "xmppmote.pid"))
+        config.set("credentials", "username", self.jid)
+        config.set("credentials", "password", "secret")
+        config.set("connection", "server", "127.0.0.1")
+        config.set("connection", "port", str(self.__server.port))
+        config.set("connection", "auth_methods", "sasl:PLAIN")
+
+        with open(path, "w") as fil:
+            config.write(fil)
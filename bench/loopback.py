@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+
+#Copyright (C) 2012 Niklas Thorne.
+
+#This file is part of XMPPMote.
+#
+#XMPPMote is free software: you can redistribute it and/or modify
+#it under the terms of the GNU General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+#
+#XMPPMote is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU General Public License for more details.
+#
+#You should have received a copy of the GNU General Public License
+#along with XMPPMote.  If not, see <http://www.gnu.org/licenses/>.
+
+""" This module provides in-process stand-ins for benchmarking the command
+pipeline without a server or child processes.
+
+The LoopbackStream takes the place of the stream that responses are written to,
+make_message builds the message stanzas that a client would send, and
+stub_spawner makes commands "run" by returning canned output at once. """
+
+import contextlib
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lib import spawner
+from pyxmpp.all import JID
+from pyxmpp.all import Message
+
+
+BOT_JID = JID(u"bot@localhost/xmppmote")
+
+
+class LoopbackStream(object):
+    """ Stands in for a stream, serializing the stanzas sent to it as a stream
+    would, and counting them. """
+
+    def __init__(self):
+        self.stanzas = 0
+        self.bytes = 0
+
+    def send(self, stanza):
+        """ Serialize _stanza_, and count it. """
+
+        self.stanzas += 1
+        self.bytes += len(stanza.serialize())
+
+
+class StubProcess(object):
+    """ Stands in for a child process that wrote _output_ and exited with
+    _returncode_ at once. """
+
+    def __init__(self, output, returncode = 0):
+        (read_end, write_end) = os.pipe()
+        os.write(write_end, output)
+        os.close(write_end)
+
+        self.stdout = os.fdopen(read_end, "rb")
+        self.returncode = returncode
+        self.pid = -1
+
+    def poll(self):
+        return self.returncode
+
+    def wait(self):
+        return self.returncode
+
+
+@contextlib.contextmanager
+def stub_spawner(output_size = 64):
+    """ Makes spawner.popen return StubProcesses, whose _output_size_ bytes of
+    output name the command run, rather than running the command. """
+
+    def spawn(command):
+        """ Returns a StubProcess standing in for _command_. """
+
+        line = "output of %s\n" % " ".join(command)
+        return StubProcess((line * (output_size / len(line) + 1))
+                           [:output_size])
+
+    popen = spawner.popen
+    spawner.popen = spawn
+    try:
+        yield
+    finally:
+        spawner.popen = popen
+
+
+def make_message(number, body, clients = 10):
+    """ Returns the _number_th message stanza of a run, carrying _body_, from
+    one of _clients_ clients. """
+
+    return Message(to_jid = BOT_JID,
+                   from_jid = JID(u"user%d@localhost/bench" %
+                                  (number % clients)),
+                   stanza_type = "chat",
+                   body = body)
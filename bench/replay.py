@@ -0,0 +1,243 @@
+#!/usr/bin/env python
+
+#Copyright (C) 2012 Niklas Thorne.
+
+#This file is part of XMPPMote.
+#
+#XMPPMote is free software: you can redistribute it and/or modify
+#it under the terms of the GNU General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+#
+#XMPPMote is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU General Public License for more details.
+#
+#You should have received a copy of the GNU General Public License
+#along with XMPPMote.  If not, see <http://www.gnu.org/licenses/>.
+
+
+""" This module replays recorded traffic against a local daemon.
+
+The traffic recorded by the daemon (see the recorder section of
+xmppmoterc.example) is replayed by the stand-in server, which delivers each
+recorded message and presence to a daemon connected to it, at the times they
+were originally received (or faster, see --speed), so that production load
+patterns may be reproduced offline, e.g.
+
+    $ python bench/replay.py /var/lib/xmppmote/traffic.rec --speed 10
+
+The daemon is started by the replay, using a copy of a configuration file
+(xmppmoterc.example unless --config is given) that is changed to connect to the
+stand-in server. The time from delivering each message until the first reply
+to its sender is reported, along with how far the replay fell behind the
+recorded schedule. The commands are really run, so a configuration file
+allowing only harmless commands is to be used. """
+
+import argparse
+import collections
+import os
+import sys
+import threading
+import time
+import xml.etree.ElementTree as ElementTree
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench.localdaemon import LocalDaemon
+from bench.standin import CLIENT_NS
+from bench.standin import StandInServer
+from bench.standin import qname
+from bot import recorder
+from lib.clock import monotonic
+
+
+ONLINE_TIMEOUT = 30
+
+# the starts of the replies of a daemon that rejected a message
+REJECTIONS = (u"throttled", u"busy")
+
+
+def percentile(values, fraction):
+    """ Returns the value at _fraction_ of the sorted _values_. """
+
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def make_stanza(to, record):
+    """ Returns the stanza element, addressed to _to_, of the recorded
+    (time, kind, type, from, text) tuple _record_. """
+
+    (_, kind, stanza_type, sender, text) = record
+
+    element = ElementTree.Element(qname(CLIENT_NS, kind), {"to": to,
+                                                            "from": sender})
+    if stanza_type:
+        element.set("type", stanza_type)
+
+    if None != text:
+        name = recorder.MESSAGE == kind and "body" or "status"
+        ElementTree.SubElement(element, qname(CLIENT_NS, name)).text = text
+
+    return element
+
+
+class ReplyTimer(object):
+    """ This type times the replies of the daemon. Each sender's messages are
+    taken to be replied to in the order they were sent, and messages beyond the
+    first in reply to a single message (e.g. streamed output) are not timed.
+    Replies rejecting a message (e.g. as the sender was throttled) are counted.
+    """
+
+    def __init__(self):
+        self.times = []
+        self.rejected = 0
+        self.unmatched = 0
+
+        self.__lock = threading.Lock()
+        self.__sent = collections.defaultdict(collections.deque)
+        self.__replied = threading.Condition(self.__lock)
+
+    def sent(self, element):
+        """ Note the message _element_ as delivered to the daemon. """
+
+        with self.__lock:
+            self.__sent[element.get("from")].append(monotonic())
+
+    def stanza_received(self, element):
+        """ Time the stanza _element_, should it be a reply to a message. """
+
+        if qname(CLIENT_NS, "message") != element.tag:
+            return
+
+        with self.__lock:
+            pending = self.__sent.get(element.get("to"))
+            if pending:
+                self.times.append(monotonic() - pending.popleft())
+
+                body = element.findtext(qname(CLIENT_NS, "body")) or u""
+                self.rejected += body.startswith(REJECTIONS)
+                self.__replied.notify_all()
+            else:
+                self.unmatched += 1
+
+    def pending(self):
+        """ Returns the number of messages not yet replied to. """
+
+        with self.__lock:
+            return sum(len(times) for times in self.__sent.values())
+
+    def wait(self, timeout):
+        """ Wait for up to _timeout_ seconds for the replies to all messages.
+        """
+
+        deadline = monotonic() + timeout
+
+        with self.__lock:
+            while monotonic() < deadline and \
+                  any(times for times in self.__sent.values()):
+                self.__replied.wait(deadline - monotonic())
+
+
+def replay(server, to, records, speed, timer):
+    """ Deliver the recorded _records_ to _to_ using _server_, _speed_ times
+    faster than they were recorded (or as fast as possible if 0), passing the
+    messages on to _timer_. Returns how late each record was delivered, in
+    seconds. """
+
+    lags = []
+    started = monotonic()
+
+    for record in records:
+        due = started + (speed and (record[0] - records[0][0]) / speed)
+        delay = due - monotonic()
+        if 0 < delay:
+            time.sleep(delay)
+
+        element = make_stanza(to, record)
+        if recorder.MESSAGE == record[1]:
+            timer.sent(element)
+
+        lags.append(max(0.0, monotonic() - due))
+        server.deliver(to, element)
+
+    return lags
+
+
+def parse_arguments():
+    """ Parse the command line arguments. """
+
+    parser = argparse.ArgumentParser(
+            description = "Replay recorded traffic against a local daemon.")
+    parser.add_argument("recording", help = "the file recorded by the daemon")
+    parser.add_argument("--config", metavar = "FILE",
+                        help = "the configuration file of the daemon "
+                               "(default xmppmoterc.example)")
+    parser.add_argument("--speed", type = float, default = 1.0,
+                        help = "how many times faster than recorded to "
+                               "replay, or 0 for as fast as possible "
+                               "(default %(default)s)")
+    parser.add_argument("--timeout", type = float, default = 30.0,
+                        help = "seconds to wait for the last replies "
+                               "(default %(default)s)")
+
+    return parser.parse_args()
+
+
+def main():
+    """ Replay the recording, and report the reply times. """
+
+    args = parse_arguments()
+
+    with open(args.recording) as fil:
+        records = sorted(recorder.read_records(fil), key = lambda rec: rec[0])
+    if not records:
+        print "nothing to replay in %s" % args.recording
+        sys.exit(1)
+
+    timer = ReplyTimer()
+    daemon = None
+
+    def stanza_received(jid, element):
+        daemon.stanza_received(jid, element)
+        timer.stanza_received(element)
+
+    server = StandInServer(on_stanza = stanza_received)
+    daemon = LocalDaemon(server, args.config)
+    server.start()
+    daemon.start()
+
+    try:
+        if not daemon.wait_online(ONLINE_TIMEOUT):
+            print "the daemon did not come online"
+            sys.exit(1)
+
+        started = monotonic()
+        lags = replay(server, daemon.jid, records, args.speed, timer)
+        elapsed = monotonic() - started
+
+        timer.wait(args.timeout)
+    finally:
+        daemon.stop()
+        server.stop()
+
+    times = sorted(timer.times)
+    lags.sort()
+
+    print "%d records replayed in %.1f s, schedule lag p50 %.1f ms, " \
+          "max %.1f ms" % (len(records), elapsed,
+                           percentile(lags, 0.50) * 1e3, lags[-1] * 1e3)
+    print "%d messages replied to (%d rejected), %d not replied to, " \
+          "%d other replies" % (len(times), timer.rejected, timer.pending(),
+                                timer.unmatched)
+
+    if times:
+        print "reply time p50 %.1f ms, p95 %.1f ms, p99 %.1f ms, " \
+              "max %.1f ms" % (percentile(times, 0.50) * 1e3,
+                               percentile(times, 0.95) * 1e3,
+                               percentile(times, 0.99) * 1e3, times[-1] * 1e3)
+
+
+if "__main__" == __name__:
+    main()
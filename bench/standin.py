@@ -0,0 +1,446 @@
+#!/usr/bin/env python
+
+#Copyright (C) 2012 Niklas Thorne.
+
+#This file is part of XMPPMote.
+#
+#XMPPMote is free software: you can redistribute it and/or modify
+#it under the terms of the GNU General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+#
+#XMPPMote is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU General Public License for more details.
+#
+#You should have received a copy of the GNU General Public License
+#along with XMPPMote.  If not, see <http://www.gnu.org/licenses/>.
+
+
+
+""" This module provides a stand-in XMPP server, for benchmarks and tests.
+
+The stand-in server accepts any credentials (using SASL PLAIN), binds the
+requested resource, routes stanzas between its connected clients by their
+JIDs, and answers the session and roster requests made by the client, so that
+XMPPMote may be run against it without a real server. It also supports stream
+management (XEP-0198), including resumption, and may drop all connections at
+once in order to simulate a network failure. It does not resend its own
+unacknowledged stanzas when a session is resumed, and keeps no rosters. """
+
+import base64
+import itertools
+import socket
+import threading
+import xml.etree.ElementTree as ElementTree
+from xml.sax.saxutils import quoteattr
+
+
+CLIENT_NS = "jabber:client"
+STREAM_NS = "http://etherx.jabber.org/streams"
+SASL_NS = "urn:ietf:params:xml:ns:xmpp-sasl"
+BIND_NS = "urn:ietf:params:xml:ns:xmpp-bind"
+SESSION_NS = "urn:ietf:params:xml:ns:xmpp-session"
+ROSTER_NS = "jabber:iq:roster"
+SM_NS = "urn:xmpp:sm:3"
+
+STANZA_NAMES = ("message", "presence", "iq")
+
+
+def qname(namespace, name):
+    """ Returns the ElementTree name of _name_ in _namespace_. """
+
+    return "{%s}%s" % (namespace, name)
+
+
+def serialize(element):
+    """ Returns the stanza _element_ serialized using the client namespace as
+    the default one, rather than a prefix, as clients (pyxmpp among them) need
+    not understand prefixed stanzas. """
+
+    prefix = "{%s}" % CLIENT_NS
+
+    def unprefix(elem):
+        tag = elem.tag
+        if tag.startswith(prefix):
+            tag = tag[len(prefix):]
+
+        copy = ElementTree.Element(tag, elem.attrib)
+        (copy.text, copy.tail) = (elem.text, elem.tail)
+        copy.extend(unprefix(child) for child in elem)
+
+        return copy
+
+    root = unprefix(element)
+    root.set("xmlns", CLIENT_NS)
+
+    return ElementTree.tostring(root)
+
+
+def split_qname(tag):
+    """ Returns a (namespace, name) tuple of the ElementTree name _tag_. """
+
+    if tag.startswith("{"):
+        return tuple(tag[1:].split("}", 1))
+
+    return (None, tag)
+
+
+class StreamParser(object):
+    """ This type parses an XML stream, calling _on_open_ with the attributes
+    of the stream header, _on_element_ with each top level element once it has
+    been parsed in full, and _on_close_ once the stream has been closed. """
+
+    def __init__(self, on_open, on_element, on_close):
+        self.__on_open = on_open
+        self.__on_element = on_element
+        self.__on_close = on_close
+        self.__depth = 0
+        self.__builder = None
+        self.__parser = ElementTree.XMLParser(target = self)
+
+    def feed(self, data):
+        """ Parse _data_, read from the stream. """
+
+        self.__parser.feed(data)
+
+    def start(self, tag, attrib):
+        if 0 == self.__depth:
+            self.__on_open(attrib)
+        else:
+            if 1 == self.__depth:
+                self.__builder = ElementTree.TreeBuilder()
+            self.__builder.start(tag, attrib)
+
+        self.__depth += 1
+
+    def end(self, tag):
+        self.__depth -= 1
+
+        if 0 == self.__depth:
+            self.__on_close()
+            return
+
+        element = self.__builder.end(tag)
+        if 1 == self.__depth:
+            self.__on_element(element)
+
+    def data(self, data):
+        if 1 < self.__depth:
+            self.__builder.data(data)
+
+    def close(self):
+        pass
+
+
+class Session(object):
+    """ This type describes a managed session, which may be resumed. """
+
+    def __init__(self, session_id, jid):
+        self.session_id = session_id
+        self.jid = jid
+        self.inbound = 0
+
+
+class Connection(object):
+    """ This type serves a single client connection. """
+
+    def __init__(self, server, sock):
+        self.server = server
+        self.jid = None
+        self.session = None
+
+        self.__sock = sock
+        self.__write_lock = threading.Lock()
+        self.__authenticated = False
+        self.__parser = None
+
+    def serve(self):
+        """ Read and handle the client's stream until it is closed. """
+
+        self.__parser = StreamParser(self.__open, self.__handle,
+                                     self.__close_stream)
+
+        try:
+            while True:
+                data = self.__sock.recv(65536)
+                if not data:
+                    break
+
+                self.__parser.feed(data)
+        except (socket.error, SyntaxError):
+            pass
+        finally:
+            self.server.forget(self)
+            self.close()
+
+    def send(self, data):
+        """ Write _data_ to the client. """
+
+        with self.__write_lock:
+            try:
+                self.__sock.sendall(data)
+            except socket.error:
+                pass
+
+    def send_element(self, element):
+        """ Write the stanza _element_ to the client. """
+
+        self.send(serialize(element))
+
+    def close(self):
+        """ Close the connection at once, without closing the stream. """
+
+        try:
+            self.__sock.shutdown(socket.SHUT_RDWR)
+        except socket.error:
+            pass
+
+        self.__sock.close()
+
+    def __open(self, attrib):
+        """ Reply to the stream header of the client, offering the features
+        for the current state of the stream. """
+
+        if self.__authenticated:
+            features = ("<bind xmlns='%s'/><session xmlns='%s'/><sm xmlns='%s'/>"
+                        % (BIND_NS, SESSION_NS, SM_NS))
+        else:
+            features = ("<mechanisms xmlns='%s'><mechanism>PLAIN</mechanism>"
+                        "</mechanisms>" % SASL_NS)
+
+        self.send("<?xml version='1.0'?><stream:stream xmlns='%s' "
+                  "xmlns:stream='%s' id='%d' from=%s version='1.0'>"
+                  "<stream:features>%s</stream:features>" %
+                  (CLIENT_NS, STREAM_NS, id(self), quoteattr(self.server.domain),
+                   features))
+
+    def __close_stream(self):
+        """ Close the stream, once the client has closed its stream. """
+
+        self.send("</stream:stream>")
+        self.close()
+
+    def __handle(self, element):
+        """ Handle the top level _element_ of the client's stream. """
+
+        (namespace, name) = split_qname(element.tag)
+
+        if SASL_NS == namespace and "auth" == name:
+            self.__authenticate(element)
+        elif SM_NS == namespace:
+            self.__manage(name, element)
+        elif CLIENT_NS == namespace and name in STANZA_NAMES:
+            if self.session:
+                self.session.inbound += 1
+
+            self.server.received(self, element)
+            self.__route(name, element)
+
+    def __authenticate(self, element):
+        """ Accept the credentials in the PLAIN auth _element_, whatever they
+        are, and restart the stream. """
+
+        (_, user, _) = base64.b64decode(element.text or "").split("\0")
+        self.jid = "%s@%s" % (user, self.server.domain)
+        self.__authenticated = True
+
+        # the client starts a new stream, which needs a parser of its own
+        self.__parser = StreamParser(self.__open, self.__handle,
+                                     self.__close_stream)
+        self.send("<success xmlns='%s'/>" % SASL_NS)
+
+    def __manage(self, name, element):
+        """ Handle the stream management element _element_. """
+
+        if "enable" == name:
+            self.session = self.server.make_session(self.jid)
+            self.send("<enabled xmlns='%s' id=%s resume='true'/>" %
+                      (SM_NS, quoteattr(self.session.session_id)))
+        elif "r" == name:
+            self.send("<a xmlns='%s' h='%d'/>" % (SM_NS, self.session.inbound))
+        elif "resume" == name:
+            session = self.server.resume(self, element.get("previd"))
+            if not session:
+                self.send("<failed xmlns='%s'/>" % SM_NS)
+                return
+
+            self.session = session
+            self.jid = session.jid
+            self.send("<resumed xmlns='%s' previd=%s h='%d'/>" %
+                      (SM_NS, quoteattr(session.session_id), session.inbound))
+
+    def __route(self, name, element):
+        """ Deliver the stanza _element_ to its recipient, or answer it if it is
+        addressed to the server. """
+
+        element.set("from", self.jid)
+        to = element.get("to")
+
+        if to and to != self.server.domain:
+            self.server.deliver(to, element)
+        elif "iq" == name and element.get("type") in ("get", "set"):
+            self.__answer(element)
+
+    def __answer(self, element):
+        """ Answer the iq _element_ addressed to the server. """
+
+        query = len(element) and element[0]
+        result = ElementTree.Element(qname(CLIENT_NS, "iq"),
+                                     type = "result", id = element.get("id"))
+
+        if None != query and qname(BIND_NS, "bind") == query.tag:
+            resource = query.findtext(qname(BIND_NS, "resource")) or "standin"
+            self.jid = "%s/%s" % (self.jid.split("/")[0], resource)
+            self.server.bind(self)
+
+            bind = ElementTree.SubElement(result, qname(BIND_NS, "bind"))
+            ElementTree.SubElement(bind, qname(BIND_NS, "jid")).text = self.jid
+        elif None != query and qname(ROSTER_NS, "query") == query.tag:
+            ElementTree.SubElement(result, qname(ROSTER_NS, "query"))
+        elif None == query or qname(SESSION_NS, "session") != query.tag:
+            result.set("type", "error")
+            error = ElementTree.SubElement(result, qname(CLIENT_NS, "error"),
+                                           type = "cancel")
+            ElementTree.SubElement(error, qname(
+                "urn:ietf:params:xml:ns:xmpp-stanzas", "service-unavailable"))
+
+        result.set("to", self.jid)
+        self.send_element(result)
+
+
+class StandInServer(object):
+    """ This type listens for client connections on _port_ (an unused port is
+    picked if 0) of the loopback interface, serving each connection on a thread
+    of its own. The stanzas received are passed to _on_stanza_, if given, along
+    with the JID of their sender. """
+
+    def __init__(self, port = 0, domain = "localhost", on_stanza = None):
+        self.domain = domain
+
+        self.__on_stanza = on_stanza
+        self.__lock = threading.Lock()
+        self.__connections = []
+        self.__routes = {}
+        self.__sessions = {}
+        self.__ids = itertools.count()
+
+        self.__listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.__listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.__listener.bind(("127.0.0.1", port))
+        self.__listener.listen(128)
+
+        self.port = self.__listener.getsockname()[1]
+        self.__thread = None
+
+    def start(self):
+        """ Start accepting connections. """
+
+        self.__thread = threading.Thread(target = self.__accept)
+        self.__thread.daemon = True
+        self.__thread.start()
+
+    def stop(self):
+        """ Stop accepting connections, and close all connections. """
+
+        self.__listener.close()
+        self.drop_connections()
+
+    def drop_connections(self):
+        """ Close all connections at once, as a network failure would. The
+        managed sessions may still be resumed. """
+
+        with self.__lock:
+            connections = list(self.__connections)
+
+        for connection in connections:
+            connection.close()
+
+    def make_session(self, jid):
+        """ Returns a new managed Session for _jid_. """
+
+        session = Session("standin-%d" % next(self.__ids), jid)
+
+        with self.__lock:
+            self.__sessions[session.session_id] = session
+
+        return session
+
+    def resume(self, connection, session_id):
+        """ Returns the Session of _session_id_, now carried by _connection_,
+        or None if there is no such session. """
+
+        with self.__lock:
+            session = self.__sessions.get(session_id)
+            if session:
+                self.__routes[session.jid] = connection
+
+        return session
+
+    def bind(self, connection):
+        """ Route stanzas addressed to the JID of _connection_ to it. """
+
+        with self.__lock:
+            self.__routes[connection.jid] = connection
+
+    def forget(self, connection):
+        """ Stop routing stanzas to _connection_, which has been closed. """
+
+        with self.__lock:
+            self.__connections.remove(connection)
+            for (jid, routed) in self.__routes.items():
+                if routed is connection:
+                    del self.__routes[jid]
+
+    def deliver(self, to, element):
+        """ Send the stanza _element_ to the client whose full JID is _to_, or
+        to any client of the bare JID _to_. Stanzas for clients that are not
+        connected are dropped. """
+
+        with self.__lock:
+            connection = self.__routes.get(to)
+            if not connection:
+                for (jid, routed) in self.__routes.items():
+                    if jid.split("/")[0] == to:
+                        connection = routed
+                        break
+
+        if connection:
+            connection.send_element(element)
+
+    def received(self, connection, element):
+        """ Pass the stanza _element_, received on _connection_, on to the
+        on_stanza callback. """
+
+        if self.__on_stanza:
+            self.__on_stanza(connection.jid, element)
+
+    def __accept(self):
+        """ Accept connections until the listening socket is closed. """
+
+        while True:
+            try:
+                (sock, _) = self.__listener.accept()
+            except socket.error:
+                return
+
+            connection = Connection(self, sock)
+            with self.__lock:
+                self.__connections.append(connection)
+
+            thread = threading.Thread(target = connection.serve)
+            thread.daemon = True
+            thread.start()
+
+
+if "__main__" == __name__:
+    import sys
+    import time
+
+    server = StandInServer(int(sys.argv[1]) if 1 < len(sys.argv) else 5222)
+    server.start()
+
+    print "stand-in server listening on port %d" % server.port
+    while True:
+        time.sleep(3600)
@@ -18,18 +18,37 @@
 """ This module contains a JabberClient subclass.
 
 The Client type implements the initialization required for the network
-connection, as well as the appropriate event logging. """
+connection, as well as the appropriate event logging.
+
+Outbound stanzas are queued, and written to the stream by the thread running
+the client loop, several stanzas per write, so that threads other than the loop
+thread never contend on the stream. The loop thread sleeps until there is
+stream input, or until it is woken up through a pipe by a thread queueing a
+stanza.
+
+The stream is managed (see the streammanagement module), so that the session
+survives the connection being lost. Stanzas queued while there is no session
+are kept, and sent once the session has been resumed or started anew. """
 
 from pyxmpp.all import JID
 from pyxmpp.jabber.client import JabberClient
 from versionhandler import VersionHandler
 from pyxmpp.all import Presence
 
+import collections
+import errno
 import os
+import select
 import sys
+import threading
 
 sys.path.append(os.path.abspath('..'))
+from bot import latency
+from bot.rosterindex import RosterIndex
+from bot.streammanagement import ManagedStream
+from bot.streammanagement import StreamManager
 from lib import borg
+from lib.clock import monotonic
 
 
 # NOTE: Order of inheritance is important here, since method resolution order is
@@ -38,17 +57,47 @@ class Client(borg.make_borg(), JabberClient, object):
     """ This type subclasses the JabberClient type, in order to provde
         protocol-level setup. """
 
-    def __init__(self, jid = None, password = None):
+    # the default number of queued outbound stanzas at which threads sending
+    # further stanzas are blocked, until the loop thread has caught up
+    QUEUE_SIZE = 256
+
+    # the default number of seconds between the housekeeping done by the loop
+    IDLE_INTERVAL = 30
+
+    # the largest number of roster changes that are logged one by one, rather
+    # than just counted
+    MAX_LOGGED_CHANGES = 20
+
+    def __init__(self, jid = None, password = None, queue_size = None,
+                 server = None, port = 5222,
+                 auth_methods = ("sasl:DIGEST-MD5", "digest")):
         super(Client, self).__init__()
 
+        if not hasattr(self, "_Client__queue"):
+            self.__queue = collections.deque()
+            self.__queue_size = self.QUEUE_SIZE
+            self.__queue_changed = threading.Condition()
+            self.__flush_lock = threading.Lock()
+            self.__loop_thread = None
+            self.__wakeup = None
+            self.__woken = False
+            self.__closed = False
+            self.__stream_manager = StreamManager()
+            self.__roster_index = RosterIndex()
+
+        if queue_size:
+            self.__queue_size = queue_size
+
         if None != jid and None != password:
             # if bare JID is provided add a resource
             if not jid.resource:
                 jid = JID(jid.node, jid.domain, "XMPPMote")
 
-            JabberClient.__init__(self, jid, password,
-                disco_name = "XMPPMote", disco_type = "bot",
-                tls_settings = None)
+            JabberClient.__init__(self, jid, password, server, port,
+                auth_methods, None, disco_name = "XMPPMote",
+                disco_type = "bot")
+
+            self.stream_class = ManagedStream
 
             self.interface_providers = [
                 VersionHandler(),
@@ -59,6 +108,33 @@ class Client(borg.make_borg(), JabberClient, object):
         """ Called upon stream state changes. """
         self.__logger.info("%s %r" % (state, arg))
 
+    def stream_created(self, stream):
+        """ Called upon stream creation; hands the session state over to the
+        new stream, so that it may resume the session. """
+
+        stream.manager = self.__stream_manager
+
+    def request_session(self):
+        """ Overloaded in order to skip requesting a session, if the session
+        has been resumed. """
+
+        if self.__stream_manager.resuming:
+            self.session_established = True
+            self._session_started()
+        else:
+            JabberClient.request_session(self)
+
+    def session_started(self):
+        """ Overloaded in order to skip fetching the roster and sending the
+        initial presence if the session has been resumed, and to enable stream
+        management otherwise. """
+
+        if self.__stream_manager.resuming:
+            self.__stream_manager.resuming = False
+        else:
+            JabberClient.session_started(self)
+            self.get_stream().enable()
+
     def log_roster_item(self, item):
         """ Log a roster item on the logging interface. """
         if item.name:
@@ -70,22 +146,129 @@ class Client(borg.make_borg(), JabberClient, object):
             u",".join(item.groups)) )
 
     def roster_updated(self, item=None):
-        """ This method is called upon roster updates. """
+        """ This method is called upon roster updates. Only the changes as
+        compared with the previous roster are logged, and should there be too
+        many of them, only their number is. """
         if not item:
-            self.__logger.info(u"My roster:")
-            for item in self.roster.get_items():
-                self.log_roster_item(item)
+            (added, removed, changed) = self.__roster_index.replace(
+                self.roster.get_items())
+
+            self.__logger.info(u"Roster: %d items, %d added, %d removed, "
+                               u"%d changed" % (len(self.__roster_index),
+                               len(added), len(removed), len(changed)))
+
+            if len(added) + len(removed) + len(changed) > \
+               self.MAX_LOGGED_CHANGES:
+                return
+
+            for (change, jids) in [(u"added", added), (u"changed", changed)]:
+                for jid in jids:
+                    self.__logger.info(u"Roster item %s:" % change)
+                    self.log_roster_item(self.roster.get_item_by_jid(JID(jid)))
+            for jid in removed:
+                self.__logger.info(u"Roster item removed: %s" % jid)
         else:
-            self.__logger.info(u"Roster item updated:")
-            self.log_roster_item(item)
+            change = self.__roster_index.update(item)
+            if change:
+                self.__logger.info(u"Roster item %s:" % change)
+                self.log_roster_item(item)
+
+    def roster_index(self):
+        """ Returns the RosterIndex, which is kept up to date with the roster.
+        """
+
+        return self.__roster_index
+
+    def loop(self, timeout = IDLE_INTERVAL):
+        """ Overloaded in order to write the queued outbound stanzas to the
+        stream as soon as they are queued, and to handle stream input as soon as
+        it arrives. Housekeeping is done every _timeout_ seconds. """
+
+        wakeup = os.pipe()
+
+        with self.__queue_changed:
+            self.__loop_thread = threading.current_thread()
+            self.__wakeup = wakeup[1]
+            self.__woken = False
+
+        try:
+            last_idle = monotonic()
+
+            while True:
+                stream = self.get_stream()
+                if not stream:
+                    break
+
+                self.flush()
+
+                remaining = max(0, last_idle + timeout - monotonic())
+                if not self.__wait(stream, wakeup[0], remaining):
+                    self.idle()
+                    last_idle = monotonic()
+        finally:
+            with self.__queue_changed:
+                self.__loop_thread = None
+                self.__wakeup = None
+                self.__queue_changed.notify_all()
+
+            os.close(wakeup[0])
+            os.close(wakeup[1])
+
+            self.flush()
+
+    def __wait(self, stream, wakeup, timeout):
+        """ Wait for at most _timeout_ seconds for input on _stream_, or for the
+        loop to be woken up through the _wakeup_ pipe, and handle it. Returns
+        False if the wait timed out. """
+
+        sock = stream.socket
+        fds = sock and [wakeup, sock] or [wakeup]
+
+        try:
+            (readable, _, errored) = select.select(fds, [], fds[1:], timeout)
+        except select.error, err:
+            if errno.EINTR != err.args[0]:
+                raise
+            return True
+
+        if wakeup in readable:
+            with self.__queue_changed:
+                os.read(wakeup, 512)
+                self.__woken = False
+
+        if sock in readable or sock in errored:
+            stream.process()
+
+        return bool(readable or errored)
+
+    def connect(self, register = False):
+        """ Overloaded in order to keep track of whether the client has been
+        disconnected on purpose. """
+
+        self.__closed = False
+        self.session_established = False
+        JabberClient.connect(self, register)
 
     def disconnect(self):
         """ Overloaded in order to catch attempts to disconnect when the client
-        has not even been initialised. """
+        has not even been initialised. Any queued stanzas are sent first. """
 
         if hasattr(self, 'lock'):
+            self.__closed = True
+            self.flush()
             JabberClient.disconnect(self)
 
+    def is_closed(self):
+        """ Returns True if the client has been disconnected on purpose, rather
+        than having lost its connection. """
+
+        return self.__closed
+
+    def queue_depth(self):
+        """ Returns the number of stanzas waiting to be sent. """
+
+        return len(self.__queue)
+
     def change_status(self, msg = u"awaiting command", available = True):
         """ Helper function to change the bot availability status. """
         if available:
@@ -99,8 +282,88 @@ class Client(borg.make_borg(), JabberClient, object):
                 status = msg
             )
 
-        if hasattr(self, "lock"):
-            self.get_stream().send(presence_stanza)
+        self.send_stanza(presence_stanza)
+
+    def send_stanza(self, stanza, trace = None):
+        """ Send _stanza_, unless the client has not been initialised or has
+        been disconnected. While the client loop is running, _stanza_ is queued
+        for the loop thread to send, blocking the calling thread for as long as
+        the queue is full. Otherwise, or if called by the loop thread itself,
+        _stanza_ is sent at once. The Trace _trace_, if given, is finished once
+        _stanza_ has been written. """
+
+        if not hasattr(self, "lock"):
+            return
+
+        current = threading.current_thread()
+
+        with self.__queue_changed:
+            while self.__loop_thread not in (None, current) and \
+                  len(self.__queue) >= self.__queue_size:
+                self.__queue_changed.wait()
+
+            self.__queue.append((stanza, trace))
+            if trace:
+                trace.mark(latency.QUEUED)
+            queued = self.__loop_thread not in (None, current)
+
+            if queued and not self.__woken:
+                os.write(self.__wakeup, "x")
+                self.__woken = True
+
+        if not queued:
+            self.flush()
+
+    def flush(self):
+        """ Send all queued stanzas, in as few socket writes as possible. The
+        stanzas are kept until a session has been established, the oldest ones
+        being dropped should more than the queue size pile up. """
+
+        with self.__flush_lock:
+            stream = self.get_stream()
+            ready = stream and self.session_established
+
+            with self.__queue_changed:
+                entries = ready and list(self.__queue) or []
+
+                if ready:
+                    self.__queue.clear()
+                else:
+                    while len(self.__queue) > self.__queue_size:
+                        self.__queue.popleft()
+
+                self.__queue_changed.notify_all()
+
+            if entries:
+                self.__send_batch(stream, [stanza for (stanza, _) in entries])
+
+            for (_, trace) in entries:
+                if trace:
+                    trace.mark(latency.WRITTEN)
+                    trace.finish()
+
+    @staticmethod
+    def __send_batch(stream, stanzas):
+        """ Write _stanzas_ to _stream_ in a single socket write, by gathering
+        the data that the stream would write for each stanza, followed by a
+        request for the server to acknowledge them. """
+
+        chunks = []
+
+        stream.lock.acquire()
+        try:
+            stream._write_raw = chunks.append
+            try:
+                for stanza in stanzas:
+                    stream._send(stanza)
+                stream._request_ack()
+            finally:
+                del stream._write_raw
+
+            if chunks:
+                stream._write_raw("".join(chunks))
+        finally:
+            stream.lock.release()
 
 # this import needs to be here, since we've got a circular dependency between
 # the client module and the commands module
@@ -21,20 +21,41 @@ These command handlers are responsible for handling the commands
 received from a remote cllient, by means of eg. executing the
 command, or comparing it to a list of allowed commands. """
 
-from pyxmpp.all import Message
 from pyxmpp.interface import implements
 from pyxmpp.interfaces import IMessageHandlersProvider
 from pyxmpp.interfaces import IPresenceHandlersProvider
 
 import logging
-import re
-import subprocess
 import sys
 import os
 sys.path.append(os.path.abspath('..'))
 
 import configuration.commands
+import configuration.profiling
+from bot import latency
+from bot import stats
 from bot.client import Client
+from bot.jobexecutor import ExecutorBusy
+from bot.jobexecutor import JobExecutor
+from bot import jobtable
+from bot.jobtable import JobTable
+from bot.output import BoundedOutput
+from bot.output import BufferedOutput
+from bot.output import Pager
+from bot.output import StreamingOutput
+from bot.output import pump
+from bot import recorder
+from bot.recorder import Recorder
+from bot.request import Request
+from bot.resultcache import ResultCache
+from bot.stats import Stats
+from bot.throttle import Throttle
+from lib import process
+from lib import spawner
+from lib.clock import monotonic
+from lib.profiler import Profiler
+from lib.singleflight import SingleFlight
+
 
 class CommandHandler(object):
     """Provides the actual command functionality.
@@ -75,6 +96,11 @@ class CommandHandler(object):
         note that all message types but 'error' will be passed to the handler
         for 'normal' message unless some dedicated handler process them.
 
+        If the JobExecutor is running, the message body is handled by one of
+        its worker threads, which sends the response once done. Messages that
+        the Throttle does not allow are responded to at once, as are builtin
+        commands, which are neither throttled nor queued.
+
         :returns: `True` to indicate, that the stanza should not be processed
         any further."""
         subject = stanza.get_subject()
@@ -82,32 +108,121 @@ class CommandHandler(object):
         typ = stanza.get_type()
 
         self.log_message(stanza, subject, body, typ)
-        
+        Recorder().record(recorder.MESSAGE, stanza)
+        Stats().increment("messages")
+
         if stanza.get_type() == "headline":
             # 'headline' messages should never be replied to
             return True
         if subject:
             subject = u"Re: " + subject
 
-        if body:
-            response = self.parse_body(body)
-    
-            if not response:
-                response = "unknown command"
-        else:
-            response = None
+        request = Request(stanza.get_from(), stanza.get_to(), typ, subject)
+
+        if not body:
+            return self.respond(request, body)
+
+        if self.is_builtin(body):
+            return self.__respond_inline(request, body)
+
+        throttle = Throttle()
+        if not throttle.acquire(request):
+            Stats().increment("throttled")
+            return request.make_response(u"throttled, please slow down")
+
+        executor = JobExecutor()
+        if executor.is_running():
+            try:
+                executor.submit(self.reply, request, body)
+            except ExecutorBusy:
+                throttle.release(request)
+                Stats().increment("busy")
+                return request.make_response(u"busy, please try again later")
+
+            return True
+
+        try:
+            return self.__respond_inline(request, body)
+        finally:
+            if not request.detached:
+                throttle.release(request)
+
+    def __respond_inline(self, request, body):
+        """ Parse _body_ on the calling thread, and return the response Message
+        to _request_. """
+
+        response = self.respond(request, body)
+
+        # the response is written by the stream once returned
+        request.trace.mark(latency.QUEUED)
+        request.trace.finish()
+
+        return response
+
+    def is_builtin(self, body):
+        """ Returns True if _body_ is a builtin command. """
+
+        words = body.split(None, 1)
+        return bool(words) and words[0] in dict(self.get_builtin_commands())
+
+    def get_builtin_commands(self):
+        """Return list of (command, handler) tuples.
+
+        The handler is called with the command arguments and the Request,
+        rather than parsing the message body, when a message body starts with
+        the matching command."""
+        return [
+                ("more", self.more),
+                ("page", self.page),
+                ("stats", self.stats),
+                ("profile", self.profile),
+                ("jobs", self.jobs),
+                ("cancel", self.cancel),
+                ("result", self.result),
+                ]
+
+    def respond(self, request, body):
+        """ Parse _body_, and return the response Message to _request_. The
+        stages reached meanwhile are recorded in the trace of _request_. Should
+        the command be malformed in the configuration, the response says so.
+        """
+
+        latency.bind(request.trace)
+        try:
+            if body:
+                response = self.parse_builtin(body, request)
+                if None == response:
+                    response = self.parse_body(body, request)
+
+                if not response:
+                    response = "unknown command"
+            else:
+                response = None
+        except configuration.commands.MalformedCommand, exc:
+            logger = logging.getLogger()
+            logger.error(u"malformed command configuration: %s" % exc)
+            response = u"configuration error: %s" % exc
+        finally:
+            latency.bind(None)
                 
-        msg = Message(
-                to_jid = stanza.get_from(),
-                from_jid = stanza.get_to(),
-                stanza_type = typ,
-                subject = subject,
-                body = response)
-        return msg
+        return request.make_response(response)
+
+    def reply(self, request, body):
+        """ Parse _body_, and send the response Message to _request_ via the
+        Client. """
+
+        try:
+            client = Client()
+            client.send_stanza(self.respond(request, body), request.trace)
+        finally:
+            if not request.detached:
+                Throttle().release(request)
 
     @staticmethod
     def presence(stanza):
         """Handle 'available' (without 'type') and 'unavailable' <presence/>."""
+        Recorder().record(recorder.PRESENCE, stanza)
+
         msg = u"%s has become " % (stanza.get_from())
         typ = stanza.get_type()
         if typ == "unavailable":
@@ -131,15 +246,139 @@ class CommandHandler(object):
         them."""
 
         self.log_presence_control(stanza)
+        Recorder().record(recorder.PRESENCE, stanza)
 
         return stanza.make_accept_response()
 
-    def parse_body(self, body):
-        """ Override this for altered command parsing. """
+    def parse_builtin(self, body, request):
+        """ Handle _body_ if it is a builtin command, returning the response.
+        None is returned if _body_ is not a builtin command. """
+
+        words = body.split(None, 1)
+        handler = words and dict(self.get_builtin_commands()).get(words[0])
+
+        if not handler:
+            return None
+
+        latency.mark(latency.PARSED, words[0])
+
+        return handler(words[1:] and words[1].split(), request)
+
+    def parse_body(self, body, request = None):
+        """ Override this for altered command parsing. _request_ is the Request
+        that _body_ was received in, if any. """
 
         return body
 
-    def do_command(self, command, args = None):
+    @staticmethod
+    def more(args, request):
+        """ Builtin command that returns the next page of the output of the
+        requester's latest command, whose output did not fit its response. """
+
+        if args:
+            return u"usage: more"
+
+        return Pager().get_page(request.requester())
+
+    @staticmethod
+    def page(args, request):
+        """ Builtin command that returns a given page of the output of the
+        requester's latest command, whose output did not fit its response. """
+
+        if 1 != len(args) or not args[0].isdigit():
+            return u"usage: page <number>"
+
+        return Pager().get_page(request.requester(), int(args[0]))
+
+    @staticmethod
+    def stats(args, request):
+        """ Builtin command that returns the counters of the daemon. """
+
+        if args:
+            return u"usage: stats"
+
+        return stats.format_text(stats.collect())
+
+    @staticmethod
+    def profile(args, request):
+        """ Builtin command that starts or stops the sampling Profiler. Only the
+        admins listed in the profiler section may use it. """
+
+        if request.requester().lower() not in \
+           configuration.profiling.get_admins():
+            return u"not allowed"
+
+        if args not in (["start"], ["stop"]):
+            return u"usage: profile start|stop"
+
+        profiler = Profiler()
+
+        if "start" == args[0]:
+            if not profiler.start():
+                return u"already profiling"
+            return u"profiling"
+
+        path = profiler.stop()
+        if not path:
+            return u"not profiling"
+
+        return u"writing profile to %s" % path
+
+    @staticmethod
+    def jobs(args, request):
+        """ Builtin command that lists the running and latest finished jobs of
+        the requester. """
+
+        if args:
+            return u"usage: jobs"
+
+        jobs = JobTable().jobs(request.requester())
+        if not jobs:
+            return u"no jobs"
+
+        return u"\n".join(job.describe() for job in jobs)
+
+    @staticmethod
+    def cancel(args, request):
+        """ Builtin command that cancels a running job of the requester,
+        terminating its process. A job sharing the output of an identical
+        command has no process of its own, so that command keeps running. """
+
+        if 1 != len(args):
+            return u"usage: cancel <job>"
+
+        job = JobTable().get(args[0], request.requester())
+        if not job:
+            return u"no such job: %s" % args[0]
+
+        if not JobTable().cancel(job):
+            return u"job %s is not running" % job.job_id
+
+        if job.shared:
+            return u"cancelled job %s, but the identical command whose " \
+                   u"output it shares keeps running" % job.job_id
+
+        return u"cancelled job %s" % job.job_id
+
+    @staticmethod
+    def result(args, request):
+        """ Builtin command that returns the response of a finished job of the
+        requester. """
+
+        if 1 != len(args):
+            return u"usage: result <job>"
+
+        job = JobTable().get(args[0], request.requester())
+        if not job:
+            return u"no such job: %s" % args[0]
+
+        if jobtable.RUNNING == job.state:
+            return u"job %s is still running" % job.job_id
+
+        return job.result or u"job %s %s without a response" % (job.job_id,
+                                                                job.state)
+
+    def do_command(self, command, args = None, request = None):
         """ Override this one for altered command handling. """
         pass
 
@@ -184,24 +423,164 @@ class RestrictedCommandHandler(CommandHandler):
         list returned by the restricted_set function in the commands module,
         and if the command exists within that set, it is executed as a
         system command. """
-    def parse_body(self, body):
-        """ Overridden in order to provide for help requests. """
+
+    # coalesces concurrent executions of identical commands
+    __flights = SingleFlight()
+
+    # separates the commands of a message naming several, e.g. "uptime; df -h"
+    SEPARATOR = ";"
+
+    # the largest number of commands in a single message
+    MAX_COMMANDS = 8
+
+    # ends a command that is to be executed in the background, e.g. "df &"
+    BACKGROUND = "&"
+
+    def parse_body(self, body, request = None):
+        """ Overridden in order to provide for help requests, for commands
+        executed in the background, and for messages naming several commands
+        separated by SEPARATOR. """
         response = None
         if body:
-            for (command, args, hlp) in configuration.commands.restricted_set():
-                if re.match("^help((\s+" + command + "\s*)|(\s*))$", body):
-                    if response:
-                        response = "%s\n%s - %s" % (response, command, hlp)
-                    else:
-                        response = "%s - %s" % (command, hlp)
-                if command == body:
-                    response = self.do_command(command, args)
+            index = configuration.commands.command_index()
+
+            response = index.get_help(body)
+
+            found = index.get_command(body)
+            background = body.endswith(self.BACKGROUND) and \
+                         index.get_command(body[:-1].rstrip())
+            if found:
+                (command, args) = found
+                latency.mark(latency.PARSED, command)
+                response = self.do_command(command, args, request)
+            elif background:
+                response = self.__do_background(background, request)
+            elif self.SEPARATOR in body:
+                response = self.__do_commands(body, index, request)
+
+        return response
+
+    @staticmethod
+    def __start_job(command, args, request):
+        """ Returns a new Job executing _command_ with _args_ for the requester
+        of _request_. """
+
+        return JobTable().start(u" ".join([command] + list(args or [])),
+                                request and request.requester())
+
+    def __execute_job(self, job, command, args, request = None):
+        """ Execute _command_ with _args_ as _job_, and return its response. """
+
+        response = None
+
+        jobtable.bind(job)
+        try:
+            response = self.do_command(command, args, request)
+        finally:
+            jobtable.bind(None)
+            JobTable().finish(job, response)
 
         return response
 
-    def do_command(self, command, args = None):
+    def __do_background(self, found, request):
+        """ Execute the (command, args) tuple _found_ in the background, on the
+        JobExecutor, and tell the requester of _request_ once it has finished.
+        The Throttle slot of _request_ is held until then. Its output is not
+        streamed, rather it is kept as the result of its job, any output that
+        did not fit in the result being kept for the requester to page through.
+        If the JobExecutor is not running, the command is executed at once. """
+
+        (command, args) = found
+        latency.mark(latency.PARSED, command)
+        job = self.__start_job(command, args, request)
+        job.background = True
+
+        def describe():
+            return u"job %s %s, send \"result %s\" for its output" % (
+                    job.job_id, job.state, job.job_id)
+
+        executor = JobExecutor()
+        if not executor.is_running():
+            self.__execute_job(job, command, args, request)
+            return describe()
+
+        def execute():
+            try:
+                self.__execute_job(job, command, args, request)
+            finally:
+                if request:
+                    Throttle().release(request)
+
+            if request:
+                request.reply(describe())
+
+        if request:
+            request.detached = True
+
+        try:
+            executor.submit(execute)
+        except ExecutorBusy:
+            if request:
+                request.detached = False
+
+            busy = u"busy, please try again later"
+            JobTable().cancel(job)
+            JobTable().finish(job, busy)
+            Stats().increment("busy")
+            return busy
+
+        return u"started job %s" % job.job_id
+
+    def __do_commands(self, body, index, request):
+        """ Execute the commands named by _body_ concurrently, on the
+        JobExecutor, provided that they are all in _index_, and return their
+        responses (each giving the exit status of its command) in the order
+        they were named. Output that is streamed is sent to _request_ as it is
+        produced, and output that is paged may be paged through for the latest
+        command to spill. """
+
+        bodies = filter(None, [part.strip()
+                               for part in body.split(self.SEPARATOR)])
+        if len(bodies) > self.MAX_COMMANDS:
+            return u"at most %d commands at once" % self.MAX_COMMANDS
+
+        found = []
+        for part in bodies:
+            command = index.get_command(part)
+            if not command:
+                return u"unknown command: %s" % part
+            found.append(command)
+
+        latency.mark(latency.PARSED, u"multiple")
+
+        def execute(command, args):
+            return self.__execute_job(self.__start_job(command, args, request),
+                                      command, args, request)
+
+        responses = JobExecutor().call_all([(execute, found_command)
+                                            for found_command in found])
+
+        for (number, response) in enumerate(responses):
+            if isinstance(response, Exception):
+                command = found[number][0]
+                logger = logging.getLogger()
+                logger.error(u"command %s raised %s" % (command,
+                                                       repr(response)))
+                responses[number] = u"%s: failed (%s)" % (command,
+                                                         repr(response))
+
+        return "\n".join(responses)
+
+    def do_command(self, command, args = None, request = None):
         """ Overridden in order to provide the restricted command set
-            feature. """
+            feature. If streaming is enabled for the command, its output is
+            sent to _request_ as it is produced. Unless the calling thread is
+            executing a job already, the command is registered as a job of its
+            own in the JobTable. """
+        if not jobtable.current():
+            return self.__execute_job(self.__start_job(command, args, request),
+                                      command, args, request)
+
         if "bye" == command:
             client = Client()
             client.change_status(u"terminating session", False)
@@ -212,19 +591,88 @@ class RestrictedCommandHandler(CommandHandler):
         cmd = [command]
         if args:
             cmd.extend(args)
+
+        settings = configuration.commands.command_settings(command)
+        if request and settings["stream"] and not jobtable.is_background():
+            sink = StreamingOutput(request.reply, settings["chunk_size"],
+                                   settings["chunk_interval"])
+            return self.__execute(cmd, sink, settings)[0]
+
+        if settings["cache"]:
+            cached = ResultCache().get(tuple(cmd), settings["cache_ttl"])
+            if cached:
+                (body, age) = cached
+                return "%s\n[cached result, %d seconds old]" % (body, age)
+
+        # an identical command that is already running is not executed again,
+        # rather its response is shared by all of its requesters; the job is
+        # noted as shared until found to execute the command itself
+        sink = BoundedOutput(settings["head_size"], settings["tail_size"],
+                             settings["spill_size"])
+        jobtable.share(True)
+        ((body, spill), _) = self.__flights.do(tuple(cmd), self.__execute, cmd,
+                                               sink, settings)
+
+        # keep any output that did not fit in the response for paging, giving
+        # each requester a file object of its own
+        if spill and request:
+            spill = os.fdopen(os.dup(spill.fileno()), "rb")
+            Pager().store(request.requester(), spill, settings["page_size"])
+
+        return body
+
+    def __execute(self, cmd, sink, settings):
+        """ Execute _cmd_ as detailed by its _settings_, passing its output to
+        _sink_, and return a tuple of the response and the file holding any
+        output that did not fit in the response. """
+
+        jobtable.share(False)
+
+        cacheable = settings["cache"] and not settings["stream"]
         try:
-            body = self.make_syscall(cmd)
+            body = self.make_syscall(cmd, sink, settings["timeout"])
         except OSError as ex:
             body = "%s: %s (%d)" % (type(ex), ex.strerror, ex.errno)
+            cacheable = False
 
-        return body
+        spill = sink.detach_spill()
+        if cacheable and not spill:
+            ResultCache().put(tuple(cmd), body)
+
+        return (body, spill)
 
     @staticmethod
-    def make_syscall(command):
-        """ Execute command in a subprocess. """
-        subp = subprocess.Popen(command, stdout=subprocess.PIPE)
-        stdoutdata = subp.communicate()[0]
-        return "%s (%d):\n%s" % (command, subp.returncode, stdoutdata)
+    def make_syscall(command, sink = None, timeout = None):
+        """ Execute command in a subprocess, passing its output to _sink_ as it
+        is read (all of the output is kept if no sink is given). Should the
+        command run for longer than _timeout_ seconds, its process group is
+        killed. """
+        if not sink:
+            sink = BufferedOutput()
+
+        start = monotonic()
+        deadline = start + timeout if timeout else None
+
+        subp = spawner.popen(command)
+        jobtable.attach(subp)
+        latency.mark(latency.SPAWNED)
+        Stats().increment("commands")
+        finished = False
+        try:
+            finished = pump(subp.stdout, sink, deadline) and \
+                       process.wait_until(subp, deadline)
+        finally:
+            subp.stdout.close()
+            if not finished:
+                process.kill_group(subp, process.KILL_GRACE)
+            subp.wait()
+            latency.mark(latency.EXITED)
+
+        if not finished:
+            return "%s timed out after %g seconds (%.1f seconds elapsed):\n%s" \
+                   % (command, timeout, monotonic() - start, sink.getvalue())
+
+        return "%s (%d):\n%s" % (command, subp.returncode, sink.getvalue())
 
 
 class UnsafeCommandHandler(RestrictedCommandHandler):
@@ -232,14 +680,15 @@ class UnsafeCommandHandler(RestrictedCommandHandler):
 
         Any command passed to this type is passed for execution in a subprocess,
         so use this type with care. """
-    def parse_body(self, body): 
+    def parse_body(self, body, request = None): 
         response = None
 
         if body:
             args = body.split()
             command = args.pop(0)
+            latency.mark(latency.PARSED, command)
 
-            response = self.do_command(command, args)
+            response = self.do_command(command, args, request)
 
         return response
 
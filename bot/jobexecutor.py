@@ -0,0 +1,170 @@
+#Copyright (C) 2012 Niklas Thorne.
+
+#This file is part of XMPPMote.
+#
+#XMPPMote is free software: you can redistribute it and/or modify
+#it under the terms of the GNU General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+#
+#XMPPMote is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU General Public License for more details.
+#
+#You should have received a copy of the GNU General Public License
+#along with XMPPMote.  If not, see <http://www.gnu.org/licenses/>.
+
+""" This module contains the JobExecutor type.
+
+The JobExecutor runs jobs (i.e. command executions) on a bounded pool of worker
+threads, so that the thread running the XMPP loop never has to wait for a
+command to finish. """
+
+import os
+import sys
+
+sys.path.append(os.path.abspath('..'))
+from lib import borg
+
+import Queue
+import logging
+import threading
+import traceback
+
+
+class ExecutorBusy(Exception):
+    """ This exception is raised whenever a job is submitted to a JobExecutor
+    whose job queue is full. """
+    pass
+
+
+class Call(object):
+    """ This type describes a call of _function_ with _args_, made by
+    JobExecutor.call_all, which is run by whichever thread claims it first. The
+    result of a call that raises is the exception raised. """
+
+    def __init__(self, function, args):
+        self.function = function
+        self.args = args
+        self.result = None
+        self.__claimed = threading.Lock()
+        self.__done = threading.Event()
+
+    def run(self):
+        """ Make the call, unless another thread has claimed it already. """
+
+        if not self.__claimed.acquire(False):
+            return
+
+        try:
+            self.result = self.function(*self.args)
+        except Exception, exc:
+            self.result = exc
+        finally:
+            self.__done.set()
+
+    def wait(self):
+        """ Wait for the call to have been made. """
+
+        self.__done.wait()
+
+
+class JobExecutor(borg.make_borg()):
+    """ This type implements a pool of worker threads, fed by a bounded job
+    queue. Being a Borg, any JobExecutor instance refers to the pool that was
+    configured upon daemon startup. """
+
+    def __init__(self, workers = None, queue_size = None):
+        super(JobExecutor, self).__init__()
+
+        if None != workers and None != queue_size:
+            self.__workers = workers
+            self.__queue = Queue.Queue(queue_size)
+            self.__threads = []
+
+    def start(self):
+        """ Start the worker threads. """
+
+        for _ in range(self.__workers - len(self.__threads)):
+            thread = threading.Thread(target = self.__work)
+            thread.daemon = True
+            thread.start()
+
+            self.__threads.append(thread)
+
+    def stop(self):
+        """ Stop the worker threads once they have finished any jobs queued
+        before this call. """
+
+        if not self.is_running():
+            return
+
+        for _ in self.__threads:
+            self.__queue.put((None, None))
+
+        self.__threads = []
+
+    def is_running(self):
+        """ Returns True if there are worker threads accepting jobs. """
+
+        return bool(getattr(self, "_JobExecutor__threads", None))
+
+    def submit(self, job, *args):
+        """ Queue _job_ to be called with _args_ by a worker thread. Raises
+        ExecutorBusy if the job queue is full, rather than blocking the
+        caller. """
+
+        try:
+            self.__queue.put_nowait((job, args))
+        except Queue.Full:
+            raise ExecutorBusy
+
+    def call_all(self, calls):
+        """ Make the calls given by _calls_, a list of (function, args) tuples,
+        concurrently, and return their results in the same order (see Call).
+        All but the first call are submitted to the worker threads, while there
+        is room in the job queue. Any call that no worker thread has started
+        is made by the calling thread, so that a worker thread calling this
+        never waits for the very queue it would otherwise be taking jobs off.
+        """
+
+        calls = [Call(function, args) for (function, args) in calls]
+
+        if self.is_running():
+            for call in calls[1:]:
+                try:
+                    self.submit(call.run)
+                except ExecutorBusy:
+                    break
+
+        for call in calls:
+            call.run()
+
+        for call in calls:
+            call.wait()
+
+        return [call.result for call in calls]
+
+    def queue_depth(self):
+        """ Returns the number of jobs waiting for a worker thread. """
+
+        return self.__queue.qsize()
+
+    def __work(self):
+        """ Worker thread main function; executes queued jobs until a stop
+        sentinel is received. """
+
+        while True:
+            job, args = self.__queue.get()
+            if None == job:
+                break
+
+            try:
+                job(*args)
+            except Exception, exc:
+                logger = logging.getLogger()
+                logger.error(u"job %r raised %s" % (job, repr(exc)))
+
+                for line in filter(None, traceback.format_exc().split("\n")):
+                    logger.error(line)
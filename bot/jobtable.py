@@ -0,0 +1,227 @@
+#Copyright (C) 2012 Niklas Thorne.
+
+#This file is part of XMPPMote.
+#
+#XMPPMote is free software: you can redistribute it and/or modify
+#it under the terms of the GNU General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+#
+#XMPPMote is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU General Public License for more details.
+#
+#You should have received a copy of the GNU General Public License
+#along with XMPPMote.  If not, see <http://www.gnu.org/licenses/>.
+
+""" This module contains the JobTable type.
+
+Each command executed is registered in the JobTable as a Job, so that its
+requester may list it, fetch its result once it has finished (e.g. when it was
+run in the background), or cancel it while it is running. Only the latest
+finished jobs are kept. """
+
+import os
+import sys
+
+sys.path.append(os.path.abspath('..'))
+from lib import borg
+from lib import process
+from lib.clock import monotonic
+from lib.scheduler import Scheduler
+
+import collections
+import itertools
+import signal
+import threading
+import time
+
+
+# the states of a Job
+RUNNING = "running"
+DONE = "done"
+CANCELLED = "cancelled"
+
+# holds the Job of the command executed by each thread
+__local = threading.local()
+
+
+def bind(job):
+    """ Make _job_ the Job of the command executed by the calling thread, or
+    unbind it if _job_ is None. """
+
+    __local.job = job
+
+
+def current():
+    """ Returns the Job bound to the calling thread, if any. """
+
+    return getattr(__local, "job", None)
+
+
+def attach(subp):
+    """ Note _subp_ as the process of the Job bound to the calling thread, if
+    any, so that cancelling the job kills the process. """
+
+    job = current()
+    if job:
+        JobTable().attach(job, subp)
+
+
+def share(shared):
+    """ Note whether the Job bound to the calling thread, if any, is _shared_,
+    i.e. waits for the output of an identical command executed by another
+    job, rather than executing a process of its own. """
+
+    job = current()
+    if job:
+        job.shared = shared
+
+
+def is_background():
+    """ Returns whether the Job bound to the calling thread, if any, executes
+    in the background, i.e. keeps its output as its result rather than
+    streaming it to its requester. """
+
+    job = current()
+    return bool(job and job.background)
+
+
+class Job(object):
+    """ This type describes the execution of _command_ (a string) for
+    _requester_ (a bare JID, or None if unknown). """
+
+    __slots__ = ("job_id", "command", "requester", "started", "elapsed",
+                 "state", "result", "process", "shared", "background")
+
+    def __init__(self, job_id, command, requester):
+        self.job_id = job_id
+        self.command = command
+        self.requester = requester
+        self.started = time.time()
+        # the monotonic time started at while running, and the seconds taken
+        # once finished
+        self.elapsed = monotonic()
+        self.state = RUNNING
+        self.result = None
+        self.process = None
+        self.shared = False
+        self.background = False
+
+    def describe(self):
+        """ Returns a line describing the job. """
+
+        elapsed = self.elapsed
+        if RUNNING == self.state:
+            elapsed = monotonic() - elapsed
+
+        return u"%s %-9s %s %6.1fs %s" % (
+                self.job_id, self.state,
+                time.strftime("%H:%M:%S", time.localtime(self.started)),
+                elapsed, self.command)
+
+
+class JobTable(borg.make_borg()):
+    """ This type keeps the running jobs, and the MAX_FINISHED latest finished
+    ones, by their IDs. """
+
+    MAX_FINISHED = 32
+
+    def __init__(self):
+        super(JobTable, self).__init__()
+
+        if not hasattr(self, "_JobTable__lock"):
+            self.__lock = threading.Lock()
+            self.__running = {}
+            self.__finished = collections.OrderedDict()
+            self.__ids = itertools.count(1)
+
+    def start(self, command, requester):
+        """ Register and return a running Job executing _command_ for
+        _requester_. """
+
+        with self.__lock:
+            job = Job("%x" % next(self.__ids), command, requester)
+            self.__running[job.job_id] = job
+
+        return job
+
+    def attach(self, job, subp):
+        """ Note _subp_ as the process of _job_, terminating it at once should
+        the job have been cancelled already. """
+
+        with self.__lock:
+            job.process = subp
+            cancelled = CANCELLED == job.state
+
+        if cancelled:
+            self.__terminate(subp)
+
+    def finish(self, job, result):
+        """ Note that _job_ has finished with _result_, forgetting the oldest
+        finished job should there be too many. """
+
+        with self.__lock:
+            job.result = result
+            job.process = None
+            job.elapsed = monotonic() - job.elapsed
+            if RUNNING == job.state:
+                job.state = DONE
+
+            self.__running.pop(job.job_id, None)
+            self.__finished[job.job_id] = job
+
+            while len(self.__finished) > self.MAX_FINISHED:
+                self.__finished.popitem(last = False)
+
+    def cancel(self, job):
+        """ Cancel _job_, terminating its process if it has one. Returns False
+        if the job was not running. """
+
+        with self.__lock:
+            if RUNNING != job.state:
+                return False
+
+            job.state = CANCELLED
+            subp = job.process
+
+        if subp:
+            self.__terminate(subp)
+
+        return True
+
+    def get(self, job_id, requester):
+        """ Returns the Job of _job_id_, if it was started for _requester_. """
+
+        with self.__lock:
+            job = self.__running.get(job_id) or self.__finished.get(job_id)
+
+        if job and job.requester == requester:
+            return job
+
+        return None
+
+    def jobs(self, requester):
+        """ Returns the Jobs of _requester_, oldest first. """
+
+        with self.__lock:
+            jobs = self.__running.values() + self.__finished.values()
+
+        return sorted([job for job in jobs if job.requester == requester],
+                      key = lambda job: int(job.job_id, 16))
+
+    @staticmethod
+    def __terminate(subp):
+        """ Send SIGTERM to the process group led by _subp_, and SIGKILL on the
+        scheduler thread once KILL_GRACE seconds have passed, unless the
+        process has been reaped by then. The process is reaped by the thread
+        executing it, once its output has been closed, so its returncode is
+        checked rather than polling it, which would race with that thread. """
+
+        def kill():
+            if None == subp.returncode:
+                process.signal_group(subp, signal.SIGKILL)
+
+        if process.signal_group(subp, signal.SIGTERM):
+            Scheduler().call_later(process.KILL_GRACE, kill)
@@ -0,0 +1,159 @@
+#Copyright (C) 2012 Niklas Thorne.
+
+#This file is part of XMPPMote.
+#
+#XMPPMote is free software: you can redistribute it and/or modify
+#it under the terms of the GNU General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+#
+#XMPPMote is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU General Public License for more details.
+#
+#You should have received a copy of the GNU General Public License
+#along with XMPPMote.  If not, see <http://www.gnu.org/licenses/>.
+
+""" This module contains the Trace and Latency types.
+
+A Trace records when a command reaches each stage of its handling, from the
+message being received to the reply being written to the stream. Once finished,
+the time spent reaching each stage is counted by the Latency, in histograms of
+fixed size for each command. """
+
+import os
+import sys
+
+sys.path.append(os.path.abspath('..'))
+from lib import borg
+from lib.clock import monotonic
+from lib.histogram import Histogram
+
+import threading
+
+
+# the stages of handling a command, in order
+RECEIVED = "received"
+PARSED = "parsed"
+SPAWNED = "spawned"
+EXITED = "exited"
+QUEUED = "queued"
+WRITTEN = "written"
+
+STAGES = (RECEIVED, PARSED, SPAWNED, EXITED, QUEUED, WRITTEN)
+
+# the time from the first stage reached to the last one
+TOTAL = "total"
+
+# the name under which the commands beyond Latency.MAX_COMMANDS are counted
+OTHER = "(other)"
+
+# holds the Trace of the command handled by each thread
+__local = threading.local()
+
+
+def bind(trace):
+    """ Make _trace_ the Trace of the command handled by the calling thread, or
+    unbind it if _trace_ is None. """
+
+    __local.trace = trace
+
+
+def mark(stage, command = None):
+    """ Record that the command handled by the calling thread, if any, has
+    reached _stage_, naming the command if _command_ is given. """
+
+    trace = getattr(__local, "trace", None)
+    if trace:
+        if command:
+            trace.command = command
+        trace.mark(stage)
+
+
+class Trace(object):
+    """ This type records the times at which the stages are reached while
+    handling _command_, which may be given once it is known. """
+
+    def __init__(self, command = None):
+        self.command = command
+        self.__times = {RECEIVED: monotonic()}
+
+    def mark(self, stage):
+        """ Record that _stage_ has been reached. """
+
+        self.__times[stage] = monotonic()
+
+    def intervals(self):
+        """ Returns a list of (stage, seconds) tuples, giving the time from the
+        previous stage reached to each stage reached, followed by the total
+        time. Stages that were not reached (e.g. since no process was spawned)
+        are left out. """
+
+        reached = [(stage, self.__times[stage]) for stage in STAGES
+                   if stage in self.__times]
+
+        result = [(stage, time - previous) for ((_, previous), (stage, time))
+                  in zip(reached, reached[1:])]
+        result.append((TOTAL, reached[-1][1] - reached[0][1]))
+
+        return result
+
+    def finish(self):
+        """ Count the intervals of the trace in the Latency, if the command is
+        known. """
+
+        if self.command:
+            Latency().record(self)
+
+
+class Latency(borg.make_borg()):
+    """ This type keeps histograms of the time spent reaching each stage, for
+    each command. """
+
+    # the number of commands that are counted separately
+    MAX_COMMANDS = 32
+
+    # the percentiles reported by summary
+    PERCENTILES = (50, 95, 99)
+
+    def __init__(self):
+        super(Latency, self).__init__()
+
+        if not hasattr(self, "_Latency__lock"):
+            self.__lock = threading.Lock()
+            self.__histograms = {}
+
+    def record(self, trace):
+        """ Count the intervals of the finished _trace_. """
+
+        with self.__lock:
+            command = trace.command
+            if command not in self.__histograms and \
+               len(self.__histograms) >= self.MAX_COMMANDS:
+                command = OTHER
+
+            histograms = self.__histograms.setdefault(command, {})
+            for (stage, seconds) in trace.intervals():
+                if stage not in histograms:
+                    histograms[stage] = Histogram()
+                histograms[stage].record(seconds)
+
+    def summary(self):
+        """ Returns a dictionary mapping each command counted to a dictionary,
+        which maps each stage reached to a (count, sum, p50, p95, p99) tuple,
+        where the sum and the percentiles are in seconds. """
+
+        with self.__lock:
+            return dict((command, dict(
+                            (stage, (histogram.count(), histogram.total()) +
+                             tuple(histogram.percentile(percent)
+                                   for percent in self.PERCENTILES))
+                            for (stage, histogram) in histograms.items()))
+                        for (command, histograms) in self.__histograms.items())
+
+    def reset(self):
+        """ Forget all that has been counted. """
+
+        with self.__lock:
+            self.__histograms = {}
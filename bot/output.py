@@ -0,0 +1,349 @@
+#Copyright (C) 2012 Niklas Thorne.
+
+#This file is part of XMPPMote.
+#
+#XMPPMote is free software: you can redistribute it and/or modify
+#it under the terms of the GNU General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+#
+#XMPPMote is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU General Public License for more details.
+#
+#You should have received a copy of the GNU General Public License
+#along with XMPPMote.  If not, see <http://www.gnu.org/licenses/>.
+
+""" This module contains the command output handling.
+
+The output of a command is read incrementally by the pump function, and passed
+to an output sink, which decides what to keep of it, and what to send to the
+chat counterpart. """
+
+import os
+import sys
+
+sys.path.append(os.path.abspath('..'))
+from lib import borg
+from lib.clock import monotonic
+
+import collections
+import errno
+import select
+import tempfile
+import threading
+
+
+# the number of bytes read from a command at a time
+READ_SIZE = 4096
+
+
+class BufferedOutput(object):
+    """ This output sink keeps all of the command output, so that it can be
+    sent as a single response once the command has finished. """
+
+    def __init__(self):
+        self.__chunks = []
+
+    def timeout(self):
+        """ Returns the number of seconds that the sink may wait for more
+        output before poll should be called, or None to wait indefinitely. """
+
+        return None
+
+    def write(self, data):
+        """ Add _data_ to the output. """
+
+        self.__chunks.append(data)
+
+    def poll(self):
+        """ Called when no output has arrived within the timeout. """
+        pass
+
+    def close(self):
+        """ Called once the command has closed its output. """
+        pass
+
+    def getvalue(self):
+        """ Returns the output to be included in the final response. """
+
+        return "".join(self.__chunks)
+
+    def detach_spill(self):
+        """ Returns a file object holding all of the output, if the output did
+        not fit in the value, and hands over the responsibility of closing it to
+        the caller. Returns None otherwise. """
+
+        return None
+
+
+class StreamingOutput(BufferedOutput):
+    """ This output sink passes the command output on to the _send_ function in
+    chunks, as soon as either _chunk_size_ bytes have been gathered, or
+    _interval_ seconds have passed since the output was last sent. At most
+    _chunk_size_ bytes are held at a time, no matter the amount of output. """
+
+    def __init__(self, send, chunk_size, interval):
+        super(StreamingOutput, self).__init__()
+
+        self.__send = send
+        self.__chunk_size = max(1, chunk_size)
+        self.__interval = interval
+
+        self.__buffer = ""
+        self.__sent = monotonic()
+        self.__bytes = 0
+        self.__messages = 0
+
+    def timeout(self):
+        if not self.__buffer:
+            return None
+
+        return max(0, self.__sent + self.__interval - monotonic())
+
+    def write(self, data):
+        self.__buffer += data
+        self.__bytes += len(data)
+
+        while len(self.__buffer) >= self.__chunk_size:
+            self.__flush(self.__split_point())
+
+        if self.__buffer and 0 == self.timeout():
+            self.__flush(len(self.__buffer))
+
+    def poll(self):
+        if self.__buffer and 0 == self.timeout():
+            self.__flush(len(self.__buffer))
+
+    def close(self):
+        if self.__buffer:
+            self.__flush(len(self.__buffer))
+
+    def getvalue(self):
+        return "[streamed %d bytes in %d messages]" % (self.__bytes,
+                                                       self.__messages)
+
+    def __split_point(self):
+        """ Returns where to split the buffer into a chunk, preferring the end
+        of the last complete line, and never splitting a UTF-8 sequence. """
+
+        newline = self.__buffer.rfind("\n", 0, self.__chunk_size)
+        if -1 != newline:
+            return newline + 1
+
+        split = self.__chunk_size
+
+        # locate the first byte of the last character before the split
+        lead = split - 1
+        while 0 < lead and 0x80 == ord(self.__buffer[lead]) & 0xc0:
+            lead -= 1
+
+        byte = ord(self.__buffer[lead])
+        if 0xf0 <= byte:
+            length = 4
+        elif 0xe0 <= byte:
+            length = 3
+        elif 0xc0 <= byte:
+            length = 2
+        else:
+            length = 1
+
+        if lead + length <= split or 0 == lead:
+            return split
+
+        return lead
+
+    def __flush(self, size):
+        """ Send the first _size_ bytes of the buffer. """
+
+        chunk, self.__buffer = self.__buffer[:size], self.__buffer[size:]
+
+        self.__send(chunk)
+        self.__messages += 1
+        self.__sent = monotonic()
+
+
+class BoundedOutput(BufferedOutput):
+    """ This output sink keeps the first _head_size_ bytes, and the last
+    _tail_size_ bytes, of the command output. Should there be more output than
+    that, the first _spill_size_ bytes of it are spilled to an (unlinked)
+    temporary file, so that they can be paged through later on. """
+
+    def __init__(self, head_size, tail_size, spill_size):
+        super(BoundedOutput, self).__init__()
+
+        self.__head_size = max(0, head_size)
+        self.__tail_size = max(0, tail_size)
+        self.__spill_size = max(0, spill_size)
+
+        self.__head = ""
+        self.__tail = ""
+        self.__bytes = 0
+        self.__spill = None
+        self.__spilled = 0
+
+    def write(self, data):
+        self.__bytes += len(data)
+
+        if len(self.__head) < self.__head_size:
+            room = self.__head_size - len(self.__head)
+            self.__head += data[:room]
+            data = data[room:]
+
+        if self.__spill:
+            self.__write_spill(data)
+        elif len(self.__tail) + len(data) > self.__tail_size:
+            # from now on, output will be dropped, so keep it on disk
+            self.__spill = tempfile.TemporaryFile()
+            self.__write_spill(self.__head)
+            self.__write_spill(self.__tail)
+            self.__write_spill(data)
+
+        self.__tail = (self.__tail + data)[-self.__tail_size:] \
+                      if self.__tail_size else ""
+
+    def dropped(self):
+        """ Returns the number of bytes that are not part of the value. """
+
+        return self.__bytes - len(self.__head) - len(self.__tail)
+
+    def unspilled(self):
+        """ Returns the number of bytes that did not fit in the spill file. """
+
+        return self.__bytes - self.__spilled
+
+    def getvalue(self):
+        if not self.dropped():
+            return self.__head + self.__tail
+
+        if self.unspilled():
+            return "%s\n[... %d bytes dropped, send \"more\" to page through " \
+                   "the first %d bytes of the output ...]\n%s" % (
+                           self.__head, self.dropped(), self.__spilled,
+                           self.__tail)
+
+        return "%s\n[... %d bytes dropped, send \"more\" to page through the " \
+               "full output ...]\n%s" % (self.__head, self.dropped(),
+                                          self.__tail)
+
+    def detach_spill(self):
+        spill, self.__spill = self.__spill, None
+        return spill
+
+    def __write_spill(self, data):
+        """ Write as much of _data_ to the spill file as fits in it. """
+
+        data = data[:self.__spill_size - self.__spilled]
+        if data:
+            self.__spill.write(data)
+            self.__spilled += len(data)
+
+
+class Pager(borg.make_borg()):
+    """ This type keeps the full output of the latest command, whose output
+    did not fit in its response, of each requester, so that the requester can
+    page through it. Output is kept for at most MAX_REQUESTERS requesters. """
+
+    MAX_REQUESTERS = 32
+
+    def __init__(self):
+        super(Pager, self).__init__()
+
+        if not hasattr(self, "_Pager__outputs"):
+            self.__lock = threading.Lock()
+            self.__outputs = collections.OrderedDict()
+
+    def store(self, requester, spill, page_size):
+        """ Keep the output held by the file object _spill_, to be paged in
+        pages of _page_size_ bytes, replacing any previous output kept for
+        _requester_. """
+
+        with self.__lock:
+            self.__discard(requester)
+
+            self.__outputs[requester] = [spill, max(1, page_size), 0]
+
+            while len(self.__outputs) > self.MAX_REQUESTERS:
+                self.__discard(next(iter(self.__outputs)))
+
+    def get_page(self, requester, number = None):
+        """ Returns page _number_ (counting from 1) of the output kept for
+        _requester_, or the page following the one last returned if no
+        _number_ is given. """
+
+        with self.__lock:
+            if requester not in self.__outputs:
+                return u"no output to page through"
+
+            output = self.__outputs[requester]
+            (spill, page_size, current) = output
+
+            spill.seek(0, os.SEEK_END)
+            pages = max(1, (spill.tell() + page_size - 1) / page_size)
+
+            if None == number:
+                number = current + 1
+
+            if not 1 <= number <= pages:
+                return u"no such page (there are %d pages)" % pages
+
+            spill.seek((number - 1) * page_size)
+            output[2] = number
+
+            return "page %d/%d:\n%s" % (number, pages, spill.read(page_size))
+
+    def __discard(self, requester):
+        """ Close and forget the output kept for _requester_, if any. """
+
+        output = self.__outputs.pop(requester, None)
+        if output:
+            output[0].close()
+
+
+def pump(stdout, sink, deadline = None):
+    """ Read the file object _stdout_ until it is closed, passing anything read
+    on to _sink_. Should _deadline_ (as given by monotonic) pass before then,
+    reading stops, and False is returned. True is returned otherwise. """
+
+    fdesc = stdout.fileno()
+    finished = True
+
+    while True:
+        timeout = sink.timeout()
+        if None != deadline:
+            remaining = deadline - monotonic()
+            if 0 >= remaining:
+                finished = False
+                break
+
+            if None == timeout or remaining < timeout:
+                timeout = remaining
+
+        if None != timeout:
+            try:
+                readable = select.select([fdesc], [], [], timeout)[0]
+            except select.error, err:
+                if errno.EINTR != err.args[0]:
+                    raise
+                continue
+
+            if not readable:
+                sink.poll()
+                continue
+
+        try:
+            data = os.read(fdesc, READ_SIZE)
+        except OSError, err:
+            if errno.EINTR != err.errno:
+                raise
+            continue
+
+        if not data:
+            break
+
+        sink.write(data)
+
+    sink.close()
+
+    return finished
@@ -0,0 +1,107 @@
+#Copyright (C) 2012 Niklas Thorne.
+
+#This file is part of XMPPMote.
+#
+#XMPPMote is free software: you can redistribute it and/or modify
+#it under the terms of the GNU General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+#
+#XMPPMote is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU General Public License for more details.
+#
+#You should have received a copy of the GNU General Public License
+#along with XMPPMote.  If not, see <http://www.gnu.org/licenses/>.
+
+""" This module contains the Recorder type.
+
+The Recorder appends the stanzas received by the command handler to a file, one
+compact JSON array per line, so that the traffic may be replayed later (see
+bench/replay.py) in order to reproduce load patterns offline. """
+
+import os
+import sys
+
+sys.path.append(os.path.abspath('..'))
+from lib import borg
+
+import json
+import threading
+import time
+
+
+MESSAGE = "message"
+PRESENCE = "presence"
+
+
+class Recorder(borg.make_borg()):
+    """ This type records stanzas as (time, kind, type, from, text) arrays,
+    where text is the body of a message, or the status of a presence. Until a
+    file is opened, nothing is recorded. """
+
+    def __init__(self):
+        super(Recorder, self).__init__()
+
+        if not hasattr(self, "_Recorder__lock"):
+            self.__lock = threading.Lock()
+            self.__file = None
+
+    def open(self, path):
+        """ Start appending the stanzas recorded to the file _path_. """
+
+        # line buffered, so that a killed daemon loses no more than a line
+        fil = open(path, "a", 1)
+
+        with self.__lock:
+            if self.__file:
+                self.__file.close()
+            self.__file = fil
+
+    def close(self):
+        """ Stop recording. """
+
+        with self.__lock:
+            if self.__file:
+                self.__file.close()
+                self.__file = None
+
+    def is_recording(self):
+        """ Returns True if stanzas are recorded. """
+
+        return None != self.__file
+
+    def record(self, kind, stanza):
+        """ Record _stanza_, of _kind_ (MESSAGE or PRESENCE). """
+
+        if not self.__file:
+            return
+
+        if MESSAGE == kind:
+            text = stanza.get_body()
+        else:
+            text = stanza.get_status()
+
+        line = json.dumps([round(time.time(), 3), kind, stanza.get_type(),
+                           unicode(stanza.get_from()), text],
+                          separators = (",", ":"))
+
+        with self.__lock:
+            if self.__file:
+                self.__file.write(line + "\n")
+
+
+def read_records(fil):
+    """ Yields the (time, kind, type, from, text) tuples recorded in the file
+    object _fil_, skipping malformed lines (e.g. one cut short as the daemon was
+    killed). """
+
+    for line in fil:
+        try:
+            record = json.loads(line)
+        except ValueError:
+            continue
+
+        if isinstance(record, list) and 5 == len(record):
+            yield tuple(record)
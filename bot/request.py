@@ -0,0 +1,70 @@
+#Copyright (C) 2012 Niklas Thorne.
+
+#This file is part of XMPPMote.
+#
+#XMPPMote is free software: you can redistribute it and/or modify
+#it under the terms of the GNU General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+#
+#XMPPMote is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU General Public License for more details.
+#
+#You should have received a copy of the GNU General Public License
+#along with XMPPMote.  If not, see <http://www.gnu.org/licenses/>.
+
+""" This module contains the Request type.
+
+A Request holds what is needed in order to reply to a received message once the
+stanza itself has been released, e.g. from a JobExecutor worker thread. """
+
+from pyxmpp.all import Message
+
+import os
+import sys
+
+sys.path.append(os.path.abspath('..'))
+from bot.client import Client
+from bot.latency import Trace
+
+
+class Request(object):
+    """ This type describes a received message, and is used for addressing the
+    response(s) to that message. """
+
+    # records the stages reached while handling the request
+    trace = None
+
+    # set once a job executed in the background has taken over the Throttle
+    # slot of the request, which the job then releases once finished
+    detached = False
+
+    def __init__(self, to_jid, from_jid, typ, subject):
+        self.to_jid = to_jid
+        self.from_jid = from_jid
+        self.typ = typ
+        self.subject = subject
+        self.trace = Trace()
+
+    def requester(self):
+        """ Returns the bare JID of the requester, as a string. """
+
+        return self.to_jid.bare().as_unicode()
+
+    def make_response(self, body):
+        """ Construct a Message stanza that responds to this request. """
+
+        return Message(
+                to_jid = self.to_jid,
+                from_jid = self.from_jid,
+                stanza_type = self.typ,
+                subject = self.subject,
+                body = body)
+
+    def reply(self, body):
+        """ Send a response to this request via the Client. """
+
+        client = Client()
+        client.send_stanza(self.make_response(body))
@@ -0,0 +1,108 @@
+#Copyright (C) 2012 Niklas Thorne.
+
+#This file is part of XMPPMote.
+#
+#XMPPMote is free software: you can redistribute it and/or modify
+#it under the terms of the GNU General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+#
+#XMPPMote is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU General Public License for more details.
+#
+#You should have received a copy of the GNU General Public License
+#along with XMPPMote.  If not, see <http://www.gnu.org/licenses/>.
+
+""" This module contains the ResultCache type.
+
+The ResultCache keeps the responses of recently executed commands, so that
+repeated requests for cacheable commands (see the cache setting in the commands
+section of the configuration) need not execute the command again. """
+
+import os
+import sys
+
+sys.path.append(os.path.abspath('..'))
+from lib import borg
+from lib.clock import monotonic
+
+import collections
+import threading
+
+
+class ResultCache(borg.make_borg()):
+    """ This type keeps command responses in least recently used order, evicting
+    the least recently used responses once the responses kept add up to more
+    than MAX_BYTES bytes. """
+
+    MAX_BYTES = 1024 * 1024
+
+    def __init__(self):
+        super(ResultCache, self).__init__()
+
+        if not hasattr(self, "_ResultCache__results"):
+            self.__lock = threading.Lock()
+            self.__results = collections.OrderedDict()
+            self.__bytes = 0
+            self.__hits = 0
+            self.__misses = 0
+
+    def get(self, command, ttl):
+        """ Returns a (response, age) tuple of the response of _command_, if it
+        was stored less than _ttl_ seconds ago, or None otherwise. """
+
+        now = monotonic()
+
+        with self.__lock:
+            result = self.__discard(command)
+
+            if result and now - result[1] < ttl:
+                # reinsert the result, making it the most recently used one
+                self.__results[command] = result
+                self.__bytes += len(result[0])
+                self.__hits += 1
+
+                return (result[0], now - result[1])
+
+            self.__misses += 1
+
+        return None
+
+    def put(self, command, response):
+        """ Keep _response_ as the response of _command_. """
+
+        if len(response) > self.MAX_BYTES:
+            return
+
+        with self.__lock:
+            self.__discard(command)
+
+            self.__results[command] = (response, monotonic())
+            self.__bytes += len(response)
+
+            while self.__bytes > self.MAX_BYTES:
+                self.__discard(next(iter(self.__results)))
+
+    def counters(self):
+        """ Returns a dict holding the number of cache hits and misses, and the
+        number of responses and bytes kept. """
+
+        with self.__lock:
+            return {
+                "hits":     self.__hits,
+                "misses":   self.__misses,
+                "entries":  len(self.__results),
+                "bytes":    self.__bytes
+            }
+
+    def __discard(self, command):
+        """ Forget the response kept for _command_, returning its (response,
+        time) tuple, or None if there was no response kept. """
+
+        result = self.__results.pop(command, None)
+        if result:
+            self.__bytes -= len(result[0])
+
+        return result
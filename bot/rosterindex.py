@@ -0,0 +1,115 @@
+#Copyright (C) 2012 Niklas Thorne.
+
+#This file is part of XMPPMote.
+#
+#XMPPMote is free software: you can redistribute it and/or modify
+#it under the terms of the GNU General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+#
+#XMPPMote is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU General Public License for more details.
+#
+#You should have received a copy of the GNU General Public License
+#along with XMPPMote.  If not, see <http://www.gnu.org/licenses/>.
+
+
+""" This module contains the RosterIndex type.
+
+The RosterIndex keeps a snapshot of the roster, indexed by JID and by group,
+which is kept up to date as roster items are pushed, so that a roster that is
+received anew may be compared with the previous one, rather than logged in
+full. """
+
+
+class RosterIndex(object):
+    """ This type maps each JID in the roster to a (name, subscription, groups,
+    ask) tuple of its item, and each group to the set of JIDs in it. JIDs are
+    kept as unicode strings. """
+
+    def __init__(self):
+        self.__items = {}
+        self.__groups = {}
+
+    def __len__(self):
+        return len(self.__items)
+
+    def __contains__(self, jid):
+        return unicode(jid) in self.__items
+
+    def get(self, jid):
+        """ Returns the (name, subscription, groups, ask) tuple of _jid_, or
+        None if _jid_ is not in the roster. """
+
+        return self.__items.get(unicode(jid))
+
+    def get_group(self, group):
+        """ Returns the set of JIDs in _group_. """
+
+        return frozenset(self.__groups.get(group, ()))
+
+    def replace(self, items):
+        """ Make the roster items _items_ the roster, returning a tuple of the
+        lists of JIDs that were added, removed and changed, as compared with
+        the previous roster. """
+
+        previous = self.__items
+        self.__items = {}
+        self.__groups = {}
+
+        (added, changed) = ([], [])
+        for item in items:
+            (jid, entry) = self.__add(item)
+
+            if jid not in previous:
+                added.append(jid)
+            elif previous[jid] != entry:
+                changed.append(jid)
+
+        removed = [jid for jid in previous if jid not in self.__items]
+
+        return (sorted(added), sorted(removed), sorted(changed))
+
+    def update(self, item):
+        """ Apply the pushed roster _item_, returning "added", "removed" or
+        "changed", or None if the item did not change. """
+
+        jid = unicode(item.jid)
+        previous = self.__remove(jid)
+
+        if "remove" == item.subscription:
+            return previous and "removed" or None
+
+        (_, entry) = self.__add(item)
+
+        if not previous:
+            return "added"
+
+        return previous != entry and "changed" or None
+
+    def __add(self, item):
+        """ Index _item_, returning a tuple of its JID and its entry. """
+
+        jid = unicode(item.jid)
+        entry = (item.name, item.subscription, frozenset(item.groups), item.ask)
+
+        self.__items[jid] = entry
+        for group in entry[2]:
+            self.__groups.setdefault(group, set()).add(jid)
+
+        return (jid, entry)
+
+    def __remove(self, jid):
+        """ Remove _jid_ from the index, returning its entry, if any. """
+
+        entry = self.__items.pop(jid, None)
+
+        for group in entry and entry[2] or ():
+            jids = self.__groups[group]
+            jids.discard(jid)
+            if not jids:
+                del self.__groups[group]
+
+        return entry
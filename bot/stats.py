@@ -0,0 +1,324 @@
+#Copyright (C) 2012 Niklas Thorne.
+
+#This file is part of XMPPMote.
+#
+#XMPPMote is free software: you can redistribute it and/or modify
+#it under the terms of the GNU General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+#
+#XMPPMote is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU General Public License for more details.
+#
+#You should have received a copy of the GNU General Public License
+#along with XMPPMote.  If not, see <http://www.gnu.org/licenses/>.
+
+""" This module contains the Stats type, and the functions collecting and
+formatting the daemon's counters.
+
+The counters are read from the types keeping them (e.g. the ResultCache and the
+Supervisor) without involving the thread running the client loop, so that they
+may be collected often. They are shown by the stats builtin command, and may be
+written to a file in the Prometheus text format, for the node exporter. """
+
+import os
+import sys
+
+sys.path.append(os.path.abspath('..'))
+from bot.client import Client
+from bot.jobexecutor import JobExecutor
+from bot.latency import Latency
+from bot.latency import TOTAL
+from bot.resultcache import ResultCache
+from bot.supervisor import Supervisor
+from lib import borg
+from lib.clock import monotonic
+from lib.queuehandler import QueueHandler
+from lib.scheduler import Scheduler
+
+import array
+import logging
+import tempfile
+import threading
+
+
+# (key, name, type, help) of each value collected, in the order exported
+METRICS = [
+    ("uptime_seconds", "xmppmote_uptime_seconds", "gauge",
+     "Seconds since the daemon started."),
+    ("messages", "xmppmote_messages_total", "counter",
+     "Messages received."),
+    ("messages_per_second", "xmppmote_messages_per_second", "gauge",
+     "Messages received per second, over the last minute."),
+    ("commands", "xmppmote_commands_total", "counter",
+     "Commands executed."),
+    ("throttled", "xmppmote_throttled_total", "counter",
+     "Messages refused by the throttle."),
+    ("busy", "xmppmote_busy_total", "counter",
+     "Messages refused since the job queue was full."),
+    ("cache_hits", "xmppmote_cache_hits_total", "counter",
+     "Responses found in the result cache."),
+    ("cache_misses", "xmppmote_cache_misses_total", "counter",
+     "Responses not found in the result cache."),
+    ("cache_entries", "xmppmote_cache_entries", "gauge",
+     "Responses kept in the result cache."),
+    ("cache_bytes", "xmppmote_cache_bytes", "gauge",
+     "Bytes of responses kept in the result cache."),
+    ("job_queue_depth", "xmppmote_job_queue_depth", "gauge",
+     "Jobs waiting for a worker thread."),
+    ("send_queue_depth", "xmppmote_send_queue_depth", "gauge",
+     "Stanzas waiting to be written to the stream."),
+    ("log_queue_depth", "xmppmote_log_queue_depth", "gauge",
+     "Log records waiting to be written to syslog."),
+    ("log_records_dropped", "xmppmote_log_records_dropped_total", "counter",
+     "Log records dropped since the log queue was full."),
+    ("threads", "xmppmote_threads", "gauge",
+     "Threads running."),
+    ("rss_bytes", "xmppmote_resident_memory_bytes", "gauge",
+     "Resident memory size."),
+    ("connected", "xmppmote_connected", "gauge",
+     "Whether the client is connected."),
+    ("reconnects", "xmppmote_reconnects_total", "counter",
+     "Reconnects after the connection was lost."),
+    ("failed_attempts", "xmppmote_connect_failures_total", "counter",
+     "Failed connection attempts."),
+    ("total_reconnect_seconds", "xmppmote_reconnect_seconds_total", "counter",
+     "Seconds spent reconnecting."),
+]
+
+LATENCY_METRIC = "xmppmote_latency_seconds"
+
+# the time at which the daemon started, i.e. this module was imported
+STARTED = monotonic()
+
+
+class Stats(borg.make_borg()):
+    """ This type keeps the counters of events that are not counted elsewhere,
+    along with the number of them during each of the last WINDOW seconds. """
+
+    # the number of seconds that rates are measured over
+    WINDOW = 60
+
+    def __init__(self):
+        super(Stats, self).__init__()
+
+        if not hasattr(self, "_Stats__lock"):
+            self.__lock = threading.Lock()
+            self.__counters = {}
+
+    def increment(self, name):
+        """ Count an event of the kind _name_. """
+
+        second = int(monotonic())
+        slot = second % self.WINDOW
+
+        with self.__lock:
+            counter = self.__counters.get(name)
+            if not counter:
+                counter = [0, array.array("l", [-1] * self.WINDOW),
+                           array.array("L", [0] * self.WINDOW)]
+                self.__counters[name] = counter
+
+            (_, seconds, counts) = counter
+
+            counter[0] += 1
+            if seconds[slot] != second:
+                seconds[slot] = second
+                counts[slot] = 0
+            counts[slot] += 1
+
+    def count(self, name):
+        """ Returns the number of events of the kind _name_ counted. """
+
+        with self.__lock:
+            counter = self.__counters.get(name)
+            return counter and counter[0] or 0
+
+    def rate(self, name):
+        """ Returns the number of events of the kind _name_ per second, over
+        the last WINDOW seconds. """
+
+        now = int(monotonic())
+
+        with self.__lock:
+            counter = self.__counters.get(name)
+            if not counter:
+                return 0.0
+
+            (_, seconds, counts) = counter
+            return sum(count for (second, count) in zip(seconds, counts)
+                       if now - second < self.WINDOW) / float(self.WINDOW)
+
+
+def collect():
+    """ Returns a dict holding the current value of each of the METRICS, along
+    with the Latency summary, keyed "latency". Values that cannot be determined
+    are left out. """
+
+    stats = Stats()
+
+    values = {
+        "uptime_seconds":       monotonic() - STARTED,
+        "messages":             stats.count("messages"),
+        "messages_per_second":  stats.rate("messages"),
+        "commands":             stats.count("commands"),
+        "throttled":            stats.count("throttled"),
+        "busy":                 stats.count("busy"),
+        "send_queue_depth":     Client().queue_depth(),
+        "threads":              threading.active_count(),
+        "latency":              Latency().summary()
+    }
+
+    for (key, value) in ResultCache().counters().items():
+        values["cache_" + key] = value
+
+    values.update(Supervisor().metrics())
+    values["connected"] = int(values["connected"])
+
+    executor = JobExecutor()
+    if executor.is_running():
+        values["job_queue_depth"] = executor.queue_depth()
+
+    for handler in logging.getLogger().handlers:
+        if isinstance(handler, QueueHandler):
+            values["log_queue_depth"] = handler.depth()
+            values["log_records_dropped"] = handler.dropped()
+
+    rss = __get_rss()
+    if None != rss:
+        values["rss_bytes"] = rss
+
+    return values
+
+
+def __get_rss():
+    """ Returns the resident memory size of the daemon in bytes, or None if it
+    cannot be determined. """
+
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (IOError, IndexError, ValueError, OSError):
+        return None
+
+
+def format_text(values):
+    """ Returns the collected _values_ as a chat message. """
+
+    def percent(part, whole):
+        """ Returns _part_ as a percentage of _whole_. """
+        return whole and 100.0 * part / whole or 0.0
+
+    lookups = values.get("cache_hits", 0) + values.get("cache_misses", 0)
+
+    lines = [
+        u"uptime: %d s" % values["uptime_seconds"],
+        u"messages: %d (%.2f/s), commands: %d, throttled: %d, busy: %d" %
+        (values["messages"], values["messages_per_second"], values["commands"],
+         values["throttled"], values["busy"]),
+        u"cache: %.0f%% hit rate (%d/%d), %d entries, %d bytes" %
+        (percent(values.get("cache_hits", 0), lookups),
+         values.get("cache_hits", 0), lookups, values.get("cache_entries", 0),
+         values.get("cache_bytes", 0)),
+        u"queues: %d jobs, %d stanzas, %d log records (%d dropped)" %
+        (values.get("job_queue_depth", 0), values["send_queue_depth"],
+         values.get("log_queue_depth", 0),
+         values.get("log_records_dropped", 0)),
+        u"threads: %d, rss: %.1f MiB" %
+        (values["threads"], values.get("rss_bytes", 0) / 1048576.0),
+        u"connected: %s, reconnects: %d, failed attempts: %d" %
+        ("yes" if values["connected"] else "no", values["reconnects"],
+         values["failed_attempts"])
+    ]
+
+    for (command, stages) in sorted(values["latency"].items()):
+        (count, _, p50, p95, p99) = stages[TOTAL]
+        lines.append(u"%s: %d runs, p50 %.3f s, p95 %.3f s, p99 %.3f s" %
+                     (command, count, p50, p95, p99))
+
+    return u"\n".join(lines)
+
+
+def format_prometheus(values):
+    """ Returns the collected _values_ in the Prometheus text format. """
+
+    lines = []
+
+    for (key, name, typ, text) in METRICS:
+        if key in values:
+            lines.append("# HELP %s %s" % (name, text))
+            lines.append("# TYPE %s %s" % (name, typ))
+            lines.append("%s %s" % (name, repr(float(values[key]))))
+
+    lines.append("# HELP %s Seconds spent reaching each stage of handling a "
+                 "command." % LATENCY_METRIC)
+    lines.append("# TYPE %s summary" % LATENCY_METRIC)
+
+    for (command, stages) in sorted(values["latency"].items()):
+        for (stage, (count, total, p50, p95, p99)) in sorted(stages.items()):
+            labels = 'command="%s",stage="%s"' % (__escape(command), stage)
+
+            for (quantile, value) in [("0.5", p50), ("0.95", p95),
+                                      ("0.99", p99)]:
+                lines.append('%s{%s,quantile="%s"} %s' %
+                             (LATENCY_METRIC, labels, quantile, repr(value)))
+            lines.append("%s_sum{%s} %s" % (LATENCY_METRIC, labels,
+                                            repr(total)))
+            lines.append("%s_count{%s} %d" % (LATENCY_METRIC, labels, count))
+
+    return "\n".join(lines) + "\n"
+
+
+def __escape(value):
+    """ Returns _value_ escaped for use as a Prometheus label value. """
+
+    value = value.replace("\\", "\\\\").replace("\"", "\\\"")
+    return value.replace("\n", "\\n").encode("utf-8")
+
+
+class TextfileExporter(object):
+    """ This type writes the collected values to the file _path_ every
+    _interval_ seconds, in the Prometheus text format, for the textfile
+    collector of the node exporter. The file is replaced rather than written
+    in place, so that it is never read half written. """
+
+    def __init__(self, path, interval):
+        self.__path = path
+        self.__interval = interval
+        self.__job = None
+
+    def start(self):
+        """ Start writing the file, on the Scheduler thread. """
+
+        if not self.__job:
+            self.__job = Scheduler().schedule(self.__interval, self.write,
+                                              True, 0)
+
+    def stop(self):
+        """ Stop writing the file. """
+
+        if self.__job:
+            Scheduler().cancel(self.__job)
+            self.__job = None
+
+    def write(self):
+        """ Write the collected values to the file. """
+
+        # the values are written to a new file of its own, which then replaces
+        # any file (or symbolic link) at the path, readable by the exporter
+        temporary = None
+        try:
+            (fdesc, temporary) = tempfile.mkstemp(
+                    prefix = os.path.basename(self.__path) + ".",
+                    dir = os.path.dirname(os.path.abspath(self.__path)))
+            os.fchmod(fdesc, 0644)
+            with os.fdopen(fdesc, "w") as output:
+                output.write(format_prometheus(collect()))
+            os.rename(temporary, self.__path)
+        except (IOError, OSError), exc:
+            logger = logging.getLogger()
+            logger.error(u"writing %s failed: %s" % (self.__path, repr(exc)))
+            if temporary and os.path.exists(temporary):
+                os.remove(temporary)
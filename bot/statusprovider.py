@@ -30,17 +30,47 @@ sys.path.append(os.path.abspath(".."))
 from configuration.configurationparser import ConfigurationParser
 from ConfigParser import NoOptionError
 from bot.client import Client
+from bot.output import BufferedOutput
+from bot.output import pump
+from lib import process
+from lib import spawner
+from lib.clock import monotonic
+from lib.scheduler import Scheduler
 
-import threading
-import subprocess
 import logging
 
+# the number of seconds that the status command may run for, at most, as it
+# holds up the scheduler thread meanwhile
+STATUS_TIMEOUT = 5
+
+
+def read_output(subproc, timeout):
+    """ Returns the output of _subproc_ once it has exited, or None should it
+    run for longer than _timeout_ seconds, in which case its process group is
+    killed. The process is reaped before returning. """
+
+    sink = BufferedOutput()
+    deadline = monotonic() + timeout
+    finished = False
+    try:
+        finished = pump(subproc.stdout, sink, deadline) and \
+                   process.wait_until(subproc, deadline)
+    finally:
+        subproc.stdout.close()
+        if not finished:
+            process.kill_group(subproc, process.KILL_GRACE)
+        subproc.wait()
+
+    return finished and sink.getvalue() or None
+
+
 class StatusProvider(object):
     """ This type provides configurable status updates to the XMPPMote bot. """
 
     def __init__(self):
         self.__command = None
         self.__interval = None
+        self.__job = None
 
         self.__previous_result = None
 
@@ -62,27 +92,43 @@ class StatusProvider(object):
 
 
     def start(self):
-        """ This method is responsible for setting a timer that, when having
-        expired after the configured interval, executes the timeout method. """
+        """ This method is responsible for registering the timeout method with
+        the Scheduler, to be executed at the configured interval. """
 
         if self.__command and self.__interval:
-            timer = threading.Timer(self.__interval, self.timeout)
-            timer.start()
+            self.__job = Scheduler().schedule(self.__interval, self.timeout)
+
+    def stop(self):
+        """ Stop executing the configured command. """
+
+        if self.__job:
+            Scheduler().cancel(self.__job)
+            self.__job = None
 
     def timeout(self):
-        """ This method is responsible for executing the configured command. """
+        """ This method is responsible for executing the configured command. As
+        it runs on the scheduler thread, the command is killed should it run
+        for longer than STATUS_TIMEOUT seconds, or the configured interval if
+        that is shorter. """
+
+        timeout = min(self.__interval, STATUS_TIMEOUT)
 
         try:
-            subproc = subprocess.Popen(self.__command, stdout = subprocess.PIPE)
-            stdout = subproc.communicate()[0]
+            subproc = spawner.popen(self.__command)
+            stdout = read_output(subproc, timeout)
         except OSError:
             logger = logging.getLogger()
             logger.error("%s: error executing status command.")
             return
 
+        if None == stdout:
+            logger = logging.getLogger()
+            logger.error(u"%s: status command timed out after %d sec" %
+                         (self.__command, timeout))
+            return
+
         if self.__previous_result != stdout:
             client = Client()
             client.change_status(stdout)
-            self.start()
 
             self.__previous_result = stdout
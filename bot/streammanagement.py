@@ -0,0 +1,265 @@
+#Copyright (C) 2012 Niklas Thorne.
+
+#This file is part of XMPPMote.
+#
+#XMPPMote is free software: you can redistribute it and/or modify
+#it under the terms of the GNU General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+#
+#XMPPMote is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU General Public License for more details.
+#
+#You should have received a copy of the GNU General Public License
+#along with XMPPMote.  If not, see <http://www.gnu.org/licenses/>.
+
+
+""" This module implements stream management (XEP-0198) for the Client.
+
+Stanzas sent on a managed stream are kept until the server has acknowledged
+them, and the session outlives its stream, so that after losing the connection
+the client may resume the session in a single round trip, rather than logging
+in again, and have the stanzas that the server did not acknowledge sent again
+rather than lost. """
+
+from pyxmpp import xmlextra
+from pyxmpp.jabber.clientstream import LegacyClientStream
+
+import collections
+import libxml2
+import logging
+from xml.sax.saxutils import quoteattr
+
+
+SM_NS = "urn:xmpp:sm:3"
+
+# the stanza counts wrap around at 2^32, as detailed by XEP-0198
+COUNT_MODULUS = 2 ** 32
+
+STANZA_NAMES = ("message", "presence", "iq")
+
+
+class StreamManager(object):
+    """ This type keeps the state of a managed session, which outlives the
+    streams that the session is carried by. It is only to be accessed with the
+    lock of the stream carrying the session held. """
+
+    # the number of unacknowledged stanzas kept for resending; any older ones
+    # are dropped
+    MAX_UNACKED = 1024
+
+    def __init__(self):
+        self.pending = []
+        self.reset()
+
+    def reset(self):
+        """ Forget the session. Any stanzas that have not been acknowledged are
+        kept in pending, to be sent again once a new session has started. """
+
+        self.pending.extend(getattr(self, "unacked", []))
+        del self.pending[:-self.MAX_UNACKED]
+
+        # stanzas sent are counted once <enable/> has been sent, and stanzas
+        # received once the server has answered with <enabled/>
+        self.requested = False
+        self.enabled = False
+        self.resuming = False
+        self.session_id = None
+        self.jid = None
+        self.inbound = 0
+        self.outbound = 0
+        self.unacked = collections.deque()
+
+    def sent(self, data):
+        """ Record that the stanza serialized as _data_ has been sent. """
+
+        if not self.requested and not self.enabled:
+            return
+
+        self.outbound = (self.outbound + 1) % COUNT_MODULUS
+        self.unacked.append(data)
+
+        if len(self.unacked) > self.MAX_UNACKED:
+            self.unacked.popleft()
+
+    def received(self):
+        """ Record that a stanza has been received and handled. """
+
+        if self.enabled:
+            self.inbound = (self.inbound + 1) % COUNT_MODULUS
+
+    def acked(self, handled):
+        """ Forget the stanzas acknowledged by the server, which has handled
+        _handled_ stanzas in total. """
+
+        first = (self.outbound - len(self.unacked)) % COUNT_MODULUS
+        count = (handled - first) % COUNT_MODULUS
+
+        for _ in range(min(count, len(self.unacked))):
+            self.unacked.popleft()
+
+
+class ManagedStream(LegacyClientStream):
+    """ This type extends the client stream with stream management. Once the
+    session has started, enable is to be called in order to have the session
+    managed; the stream then resumes the session, if any, the next time that it
+    is connected, instead of binding a resource. The stream state changes to
+    "authorized" once the session has been resumed, just as it does once a
+    resource has been bound. """
+
+    def __init__(self, *args, **kwargs):
+        LegacyClientStream.__init__(self, *args, **kwargs)
+
+        self.manager = StreamManager()
+        self.__logger = logging.getLogger()
+
+    def enable(self):
+        """ Ask the server to manage the session, if it supports that, and
+        send any stanzas left unacknowledged by an earlier session that could
+        not be resumed. """
+
+        self.lock.acquire()
+        try:
+            if self.manager.requested:
+                return
+
+            if self.__offers_management():
+                self.manager.requested = True
+                self._write_raw("<enable xmlns='%s' resume='true'/>" % SM_NS)
+
+            (pending, self.manager.pending) = (self.manager.pending, [])
+            for data in pending:
+                self.manager.sent(data)
+                self._write_raw(data)
+        finally:
+            self.lock.release()
+
+    def _request_ack(self):
+        """ Ask the server to acknowledge the stanzas sent so far, if there
+        are any stanzas that it has not acknowledged. Assumes that self.lock is
+        acquired. """
+
+        if self.manager.enabled and self.manager.unacked:
+            self._write_raw("<r xmlns='%s'/>" % SM_NS)
+
+    def _got_features(self):
+        """ Overridden in order to resume the session, if there is one to
+        resume, rather than binding a resource. Otherwise, the session is
+        forgotten, keeping any unacknowledged stanzas to be sent once the new
+        session has started. """
+
+        if self.authenticated:
+            if self.manager.session_id and self.__offers_management():
+                self.manager.resuming = True
+                self._write_raw("<resume xmlns='%s' previd=%s h='%d'/>" %
+                                (SM_NS, quoteattr(self.manager.session_id),
+                                 self.manager.inbound))
+                return
+
+            self.manager.reset()
+
+        LegacyClientStream._got_features(self)
+
+    def _process_node(self, xmlnode):
+        """ Overridden in order to handle stream management elements, and to
+        count the stanzas received. """
+
+        try:
+            ns = xmlnode.ns()
+        except libxml2.treeError:
+            ns = None
+
+        uri = ns and ns.getContent()
+        if SM_NS == uri:
+            self.__process_management_node(xmlnode)
+            return
+
+        if self.default_ns_uri == uri and xmlnode.name in STANZA_NAMES:
+            self.manager.received()
+
+        LegacyClientStream._process_node(self, xmlnode)
+
+    def _write_node(self, xmlnode):
+        """ Overridden in order to keep the stanzas sent until they have been
+        acknowledged. The stanza is serialized just as by StreamBase. """
+
+        if self.eof or not self.socket or not self.doc_out:
+            LegacyClientStream._write_node(self, xmlnode)
+            return
+
+        name = xmlnode.name
+        xmlnode = xmlnode.docCopyNode(self.doc_out, 1)
+        self.doc_out.addChild(xmlnode)
+        try:
+            ns = xmlnode.ns()
+        except libxml2.treeError:
+            ns = None
+        if ns and ns.content == xmlextra.COMMON_NS:
+            xmlextra.replace_ns(xmlnode, ns, self.default_ns)
+        data = xmlextra.safe_serialize(xmlnode)
+        xmlnode.unlinkNode()
+        xmlnode.freeNode()
+
+        # keep the stanza before writing it, so that it is resent should the
+        # write fail
+        if name in STANZA_NAMES:
+            self.manager.sent(data)
+
+        self._write_raw(data)
+
+    def _idle(self):
+        """ Overridden in order to ask for acknowledgement of any stanzas that
+        have not been acknowledged yet. """
+
+        LegacyClientStream._idle(self)
+
+        if self.socket and not self.eof:
+            self._request_ack()
+
+    def __offers_management(self):
+        """ Returns True if the server offers stream management. """
+
+        node = self.features and self.features.children
+        while node:
+            if "element" == node.type and "sm" == node.name and node.ns() \
+               and SM_NS == node.ns().getContent():
+                return True
+            node = node.next
+
+        return False
+
+    def __process_management_node(self, xmlnode):
+        """ Handle the stream management element _xmlnode_. """
+
+        manager = self.manager
+        name = xmlnode.name
+
+        if "r" == name:
+            self._write_raw("<a xmlns='%s' h='%d'/>" % (SM_NS, manager.inbound))
+        elif "a" == name:
+            manager.acked(int(xmlnode.prop("h")))
+        elif "enabled" == name:
+            manager.enabled = True
+            if xmlnode.prop("resume") in ("true", "1"):
+                manager.session_id = xmlnode.prop("id")
+            manager.jid = self.me
+            self.__logger.info(u"stream management enabled")
+        elif "resumed" == name:
+            manager.acked(int(xmlnode.prop("h")))
+            self.me = manager.jid
+
+            for data in manager.unacked:
+                self._write_raw(data)
+
+            self.__logger.info(u"session resumed, %d stanzas resent" %
+                               len(manager.unacked))
+            self.state_change("authorized", self.me)
+        elif "failed" == name:
+            resuming = manager.resuming
+            manager.reset()
+
+            if resuming:
+                self.__logger.info(u"session could not be resumed")
+                LegacyClientStream._got_features(self)
@@ -0,0 +1,151 @@
+#Copyright (C) 2012 Niklas Thorne.
+
+#This file is part of XMPPMote.
+#
+#XMPPMote is free software: you can redistribute it and/or modify
+#it under the terms of the GNU General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+#
+#XMPPMote is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU General Public License for more details.
+#
+#You should have received a copy of the GNU General Public License
+#along with XMPPMote.  If not, see <http://www.gnu.org/licenses/>.
+
+
+""" This module contains the Supervisor type.
+
+The Supervisor keeps the client connected, reconnecting it whenever the stream
+dies, so that a server restart does not require the daemon to be restarted. The
+job executor and scheduler keep running while the client reconnects. """
+
+import os
+import sys
+
+sys.path.append(os.path.abspath('..'))
+from lib import borg
+from lib.backoff import Backoff
+from lib.clock import monotonic
+
+import logging
+import threading
+import traceback
+
+
+class Supervisor(borg.make_borg()):
+    """ This type runs the client loop, and reconnects the client using
+    exponential backoff with full jitter, so that a fleet of clients that lost
+    their connections at once do not all reconnect at once. """
+
+    # the initial and largest ceiling, in seconds, of the reconnect delay
+    BASE_DELAY = 1.0
+    MAX_DELAY = 300.0
+
+    # the number of seconds that a connection has to stay up for, before the
+    # reconnect delay starts over from BASE_DELAY
+    STABLE_INTERVAL = 60.0
+
+    def __init__(self):
+        super(Supervisor, self).__init__()
+
+        if not hasattr(self, "_Supervisor__lock"):
+            self.__lock = threading.Lock()
+            self.__stopped = threading.Event()
+            self.__connected = False
+            self.__reconnects = 0
+            self.__failed_attempts = 0
+            self.__last_reconnect = 0.0
+            self.__max_reconnect = 0.0
+            self.__total_reconnect = 0.0
+
+    def run(self, client):
+        """ Connect _client_ and run its loop, reconnecting whenever the
+        connection is lost, until _client_ is disconnected on purpose, or stop
+        is called. """
+
+        logger = logging.getLogger()
+        backoff = Backoff(self.BASE_DELAY, self.MAX_DELAY)
+        lost = None
+
+        self.__stopped.clear()
+
+        while not self.__stopped.is_set():
+            try:
+                client.connect()
+            except Exception, exc:
+                logger.warning(u"connecting failed: %s" % repr(exc))
+
+                with self.__lock:
+                    self.__failed_attempts += 1
+
+                self.__stopped.wait(backoff.next())
+                continue
+
+            connected = monotonic()
+            self.__set_connected(lost and connected - lost)
+            lost = None
+
+            try:
+                client.loop()
+            except Exception, exc:
+                logger.error(u"connection lost: %s" % repr(exc))
+
+                for line in filter(None, traceback.format_exc().split("\n")):
+                    logger.error(line)
+
+            with self.__lock:
+                self.__connected = False
+
+            if client.is_closed():
+                break
+
+            lost = monotonic()
+            if lost - connected >= self.STABLE_INTERVAL:
+                backoff.reset()
+
+            delay = backoff.next()
+            logger.warning(u"disconnected, reconnecting in %.1f seconds" %
+                           delay)
+            self.__stopped.wait(delay)
+
+    def stop(self):
+        """ Stop reconnecting. The client loop itself is not stopped. """
+
+        self.__stopped.set()
+
+    def metrics(self):
+        """ Returns a dict holding whether the client is connected, the number
+        of reconnects and of failed connection attempts, and the latest,
+        largest and total number of seconds from losing a connection until it
+        was reconnected. """
+
+        with self.__lock:
+            return {
+                "connected":                self.__connected,
+                "reconnects":               self.__reconnects,
+                "failed_attempts":          self.__failed_attempts,
+                "last_reconnect_seconds":   self.__last_reconnect,
+                "max_reconnect_seconds":    self.__max_reconnect,
+                "total_reconnect_seconds":  self.__total_reconnect
+            }
+
+    def __set_connected(self, outage):
+        """ Record that the client has connected, after an _outage_ of that many
+        seconds, or None if this is the first connection. """
+
+        with self.__lock:
+            self.__connected = True
+
+            if None == outage:
+                return
+
+            self.__reconnects += 1
+            self.__last_reconnect = outage
+            self.__max_reconnect = max(self.__max_reconnect, outage)
+            self.__total_reconnect += outage
+
+        logger = logging.getLogger()
+        logger.info(u"reconnected after %.1f seconds" % outage)
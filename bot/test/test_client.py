@@ -32,10 +32,43 @@ from pyxmpp.all import JID
 from versionhandler import VersionHandler
 
 from client import Client
+from rosterindex import RosterIndex
+from bot import latency
+from bot.latency import Trace
+from pyxmpp.roster import RosterItem
 from configuration import commands
 
+import socket
+import threading
 import unittest
 
+
+class FakeStream(object):
+    """ Stands in for a stream, recording the data written to it. """
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.socket = None
+        self.writes = []
+        self.written = threading.Event()
+
+    def _send(self, stanza):
+        self._write_raw(stanza)
+
+    def _write_raw(self, data):
+        self.writes.append(data)
+        self.written.set()
+
+    def _request_ack(self):
+        pass
+
+    def process(self):
+        self.socket.recv(512)
+
+    def idle(self):
+        pass
+
+
 class ClientTest(mox.MoxTestBase):
     """ Testing the trickier parts of the Client module """
 
@@ -51,9 +84,9 @@ class ClientTest(mox.MoxTestBase):
         self.mox.StubOutWithMock(JabberClient, "__init__")
         self.mox.StubOutWithMock(commands, "get_command_handler")
         self.mox.StubOutWithMock(VersionHandler, "__init__")
-        JabberClient.__init__(mox.IgnoreArg(), jid, self.__pwd,
-                disco_name = "XMPPMote", disco_type = "bot",
-                tls_settings = None)
+        JabberClient.__init__(mox.IgnoreArg(), jid, self.__pwd, None, 5222,
+                ("sasl:DIGEST-MD5", "digest"), None,
+                disco_name = "XMPPMote", disco_type = "bot")
         VersionHandler.__init__()
         commands.get_command_handler().AndReturn("foobar")
         self.mox.ReplayAll()
@@ -77,6 +110,204 @@ class ClientTest(mox.MoxTestBase):
         self.assertEquals(21, fst_instance.value)
         self.assertEquals(fst_instance.value, snd_instance.value)
 
+    def test_roster_updated(self):
+        """ Only the changes to the roster should be logged, and only counted
+        should there be too many of them. """
+
+        mock_logger = self.mox.CreateMockAnything()
+        mock_roster = self.mox.CreateMockAnything()
+
+        self.mox.stubs.Set(Client, "MAX_LOGGED_CHANGES", 1)
+
+        cli = Client()
+        cli._Client__roster_index = RosterIndex()
+        cli._Client__logger = mock_logger
+        cli.roster = mock_roster
+
+        items = [RosterItem(u"a@b", "both"), RosterItem(u"c@d", "to")]
+
+        mock_roster.get_items().AndReturn(items)
+        mock_logger.info(u"Roster: 2 items, 2 added, 0 removed, 0 changed")
+
+        mock_roster.get_items().AndReturn(items[:1])
+        mock_logger.info(u"Roster: 1 items, 0 added, 1 removed, 0 changed")
+        mock_logger.info(u"Roster item removed: c@d")
+
+        self.mox.ReplayAll()
+
+        cli.roster_updated()
+        cli.roster_updated()
+
+        del cli.roster
+        del cli._Client__logger
+
+
+class SendStanzaTest(mox.MoxTestBase):
+    """ Provides test cases for the outbound stanza queue of the Client. """
+
+    def setUp(self):
+        super(SendStanzaTest, self).setUp()
+
+        self.stream = FakeStream()
+        self.cli = Client(queue_size = 2)
+        self.cli.lock = threading.RLock()
+        self.cli.session_established = True
+
+        self.wakeup = None
+
+        self.mox.StubOutWithMock(Client, "get_stream")
+        Client.get_stream().MultipleTimes().AndReturn(self.stream)
+
+    def tearDown(self):
+        if self.wakeup:
+            os.close(self.wakeup[0])
+            os.close(self.wakeup[1])
+
+        self.cli._Client__loop_thread = None
+        self.cli._Client__wakeup = None
+        self.cli._Client__woken = False
+        self.cli._Client__queue.clear()
+        del self.cli.lock
+        del self.cli.session_established
+        super(SendStanzaTest, self).tearDown()
+
+    def __fake_loop(self):
+        """ Make the client believe that another thread is running its loop.
+        """
+
+        self.wakeup = os.pipe()
+        self.cli._Client__loop_thread = threading.Thread()
+        self.cli._Client__wakeup = self.wakeup[1]
+
+    def test_send_without_loop(self):
+        """ Stanzas should be sent at once if the loop is not running. """
+
+        self.mox.ReplayAll()
+
+        self.cli.send_stanza("<a/>")
+        self.cli.send_stanza("<b/>")
+
+        self.assertEquals(["<a/>", "<b/>"], self.stream.writes)
+
+    def test_send_traced(self):
+        """ The trace of a stanza should be finished once it has been written.
+        """
+
+        mock_trace = self.mox.CreateMock(Trace)
+        mock_trace.mark(latency.QUEUED)
+        mock_trace.mark(latency.WRITTEN)
+        mock_trace.finish()
+
+        self.mox.ReplayAll()
+
+        self.cli.send_stanza("<a/>", mock_trace)
+
+        self.assertEquals(["<a/>"], self.stream.writes)
+
+    def test_send_without_session(self):
+        """ Stanzas should be kept until a session has been established, the
+        oldest ones being dropped once the queue is full. """
+
+        self.mox.ReplayAll()
+
+        self.cli.session_established = False
+        for stanza in ["<a/>", "<b/>", "<c/>"]:
+            self.cli.send_stanza(stanza)
+
+        self.assertEquals([], self.stream.writes)
+
+        self.cli.session_established = True
+        self.cli.flush()
+
+        self.assertEquals(["<b/><c/>"], self.stream.writes)
+
+    def test_send_batched(self):
+        """ Stanzas sent by other threads while the loop is running should be
+        queued, and then sent in a single write. The loop should be woken up
+        once. """
+
+        self.mox.ReplayAll()
+
+        self.__fake_loop()
+        self.cli.send_stanza("<a/>")
+        self.cli.send_stanza("<b/>")
+
+        self.assertEquals([], self.stream.writes)
+        self.assertEquals("x", os.read(self.wakeup[0], 512))
+
+        self.cli.flush()
+
+        self.assertEquals(["<a/><b/>"], self.stream.writes)
+
+    def test_backpressure(self):
+        """ Threads sending stanzas while the queue is full should be blocked
+        until the queue has been flushed. """
+
+        self.mox.ReplayAll()
+
+        self.__fake_loop()
+        self.cli.send_stanza("<a/>")
+        self.cli.send_stanza("<b/>")
+
+        sender = threading.Thread(target = self.cli.send_stanza,
+                                  args = ("<c/>", ))
+        sender.start()
+        sender.join(0.1)
+        self.assertTrue(sender.is_alive())
+
+        self.cli.flush()
+        sender.join(5)
+        self.assertFalse(sender.is_alive())
+
+        self.cli.flush()
+
+        self.assertEquals(["<a/><b/>", "<c/>"], self.stream.writes)
+
+
+class LoopTest(unittest.TestCase):
+    """ Provides test cases for the Client loop. """
+
+    def setUp(self):
+        (self.sock, self.peer) = socket.socketpair()
+
+        self.stream = FakeStream()
+        self.stream.socket = self.sock
+
+        self.cli = Client()
+        self.cli.lock = threading.RLock()
+        self.cli.stream = self.stream
+        self.cli.session_established = True
+
+        self.thread = threading.Thread(target = self.cli.loop)
+        self.thread.start()
+
+    def tearDown(self):
+        # the loop returns once it finds that there is no stream
+        self.cli.stream = None
+        self.peer.send("x")
+        self.thread.join(5)
+
+        self.assertFalse(self.thread.is_alive())
+
+        del self.cli.lock
+        del self.cli.stream
+        del self.cli.session_established
+        self.sock.close()
+        self.peer.close()
+
+    def test_wakeup(self):
+        """ A stanza queued by another thread should be sent at once, rather
+        than once the loop wakes up by itself. """
+
+        # wait for the loop to get going
+        while not self.cli._Client__loop_thread:
+            self.thread.join(0.01)
+
+        self.cli.send_stanza("<a/>")
+
+        self.assertTrue(self.stream.written.wait(1))
+        self.assertEquals(["<a/>"], self.stream.writes)
+
 
 if "__main__" == __name__:
     unittest.main()
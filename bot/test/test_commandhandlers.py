@@ -25,15 +25,35 @@ import os
 sys.path.append(os.path.abspath(".."))
 sys.path.append(os.path.abspath("../.."))
 
+import logging
 import mox
+import tempfile
+import threading
+import time
 import unittest
 
 from commandhandlers import CommandHandler
 from commandhandlers import RestrictedCommandHandler
 from commandhandlers import UnsafeCommandHandler
 from pyxmpp.all import Message
+from bot import jobtable
+from bot import stats
+from bot.client import Client
+from bot.jobexecutor import ExecutorBusy
+from bot.jobexecutor import JobExecutor
+from bot.jobtable import JobTable
+from bot.request import Request
+from bot.resultcache import ResultCache
+from bot.throttle import Throttle
+from bot.output import BoundedOutput
+from bot.output import Pager
+from bot.output import StreamingOutput
+from lib.profiler import Profiler
 
 import configuration.commands
+import configuration.profiling
+from configuration.commands import CommandIndex
+from configuration.commands import DEFAULT_SETTINGS
 import client
 
 
@@ -110,6 +130,8 @@ class CommandHandlerTest(mox.MoxTestBase):
 
         self.mox.StubOutWithMock(CommandHandler, "__init__")
         self.mox.StubOutWithMock(CommandHandler, "parse_body")
+        self.mox.StubOutWithMock(CommandHandler, "parse_builtin")
+        self.mox.StubOutWithMock(CommandHandler, "is_builtin")
         self.mox.StubOutWithMock(CommandHandler, "log_message")
 
         self.mox.StubOutWithMock(Message, "__init__")
@@ -125,7 +147,11 @@ class CommandHandlerTest(mox.MoxTestBase):
 
         mock_stanza.get_type().AndReturn("body")
 
-        CommandHandler.parse_body(mock_body).AndReturn("response")
+        CommandHandler.is_builtin(mock_body).AndReturn(False)
+
+        CommandHandler.parse_builtin(mock_body,
+                                     mox.IsA(Request)).AndReturn(None)
+        CommandHandler.parse_body(mock_body, mox.IsA(Request)).AndReturn("response")
 
         mock_stanza.get_from().AndReturn("from")
         mock_stanza.get_to().AndReturn("to")
@@ -152,6 +178,8 @@ class CommandHandlerTest(mox.MoxTestBase):
 
         self.mox.StubOutWithMock(CommandHandler, "__init__")
         self.mox.StubOutWithMock(CommandHandler, "parse_body")
+        self.mox.StubOutWithMock(CommandHandler, "parse_builtin")
+        self.mox.StubOutWithMock(CommandHandler, "is_builtin")
         self.mox.StubOutWithMock(CommandHandler, "log_message")
 
         self.mox.StubOutWithMock(Message, "__init__")
@@ -167,7 +195,11 @@ class CommandHandlerTest(mox.MoxTestBase):
 
         mock_stanza.get_type().AndReturn("body")
 
-        CommandHandler.parse_body(mock_body).AndReturn("response")
+        CommandHandler.is_builtin(mock_body).AndReturn(False)
+
+        CommandHandler.parse_builtin(mock_body,
+                                     mox.IsA(Request)).AndReturn(None)
+        CommandHandler.parse_body(mock_body, mox.IsA(Request)).AndReturn("response")
 
         mock_stanza.get_from().AndReturn("from")
         mock_stanza.get_to().AndReturn("to")
@@ -191,6 +223,8 @@ class CommandHandlerTest(mox.MoxTestBase):
         mock_client = self.mox.CreateMockAnything()
         self.mox.StubOutWithMock(CommandHandler, "__init__")
         self.mox.StubOutWithMock(CommandHandler, "parse_body")
+        self.mox.StubOutWithMock(CommandHandler, "parse_builtin")
+        self.mox.StubOutWithMock(CommandHandler, "is_builtin")
         self.mox.StubOutWithMock(CommandHandler, "log_message")
 
         self.mox.StubOutWithMock(Message, "__init__")
@@ -206,7 +240,11 @@ class CommandHandlerTest(mox.MoxTestBase):
 
         mock_stanza.get_type().AndReturn("body")
 
-        CommandHandler.parse_body(mock_body).AndReturn(None)
+        CommandHandler.is_builtin(mock_body).AndReturn(False)
+
+        CommandHandler.parse_builtin(mock_body,
+                                     mox.IsA(Request)).AndReturn(None)
+        CommandHandler.parse_body(mock_body, mox.IsA(Request)).AndReturn(None)
 
         mock_stanza.get_from().AndReturn("from")
         mock_stanza.get_to().AndReturn("to")
@@ -260,6 +298,319 @@ class CommandHandlerTest(mox.MoxTestBase):
         cmdhandler = CommandHandler(mock_client)
         self.assertNotEqual(None, cmdhandler.message(mock_stanza))
 
+    def test_message_executor_running(self):
+        """ If the JobExecutor is running, the message body should be handled
+        by a worker thread, and the stanza should be considered handled. """
+        mock_stanza = self.mox.CreateMockAnything()
+
+        self.mox.StubOutWithMock(CommandHandler, "log_message")
+        self.mox.StubOutWithMock(CommandHandler, "parse_body")
+        self.mox.StubOutWithMock(JobExecutor, "is_running")
+        self.mox.StubOutWithMock(JobExecutor, "submit")
+
+        mock_stanza.get_subject()
+        mock_stanza.get_body().AndReturn("body")
+        mock_stanza.get_type().AndReturn("chat")
+
+        CommandHandler.log_message(mock_stanza, None, "body", "chat")
+
+        mock_stanza.get_type().AndReturn("chat")
+        mock_stanza.get_from().AndReturn("from")
+        mock_stanza.get_to().AndReturn("to")
+
+        JobExecutor.is_running().AndReturn(True)
+        JobExecutor.submit(mox.IgnoreArg(), mox.IsA(Request), "body")
+
+        self.mox.ReplayAll()
+
+        cmdhandler = CommandHandler()
+        self.assertEqual(True, cmdhandler.message(mock_stanza))
+
+    def test_message_executor_busy(self):
+        """ If the JobExecutor queue is full, a busy response should be
+        returned at once. """
+        mock_stanza = self.mox.CreateMockAnything()
+
+        self.mox.StubOutWithMock(CommandHandler, "log_message")
+        self.mox.StubOutWithMock(CommandHandler, "parse_body")
+        self.mox.StubOutWithMock(JobExecutor, "is_running")
+        self.mox.StubOutWithMock(JobExecutor, "submit")
+        self.mox.StubOutWithMock(Message, "__init__")
+        self.mox.StubOutWithMock(Message, "__del__")
+
+        mock_stanza.get_subject()
+        mock_stanza.get_body().AndReturn("body")
+        mock_stanza.get_type().AndReturn("chat")
+
+        CommandHandler.log_message(mock_stanza, None, "body", "chat")
+
+        mock_stanza.get_type().AndReturn("chat")
+        mock_stanza.get_from().AndReturn("from")
+        mock_stanza.get_to().AndReturn("to")
+
+        JobExecutor.is_running().AndReturn(True)
+        JobExecutor.submit(mox.IgnoreArg(), mox.IsA(Request),
+                           "body").AndRaise(ExecutorBusy)
+
+        Message.__init__(
+                to_jid = "from",
+                from_jid = "to",
+                stanza_type = "chat",
+                subject = None,
+                body = u"busy, please try again later")
+
+        self.mox.ReplayAll()
+
+        cmdhandler = CommandHandler()
+        self.assertNotEqual(True, cmdhandler.message(mock_stanza))
+
+    def test_message_builtin(self):
+        """ A builtin command should be responded to at once, without being
+        throttled or queued. """
+        mock_stanza = self.mox.CreateMockAnything()
+
+        self.mox.StubOutWithMock(CommandHandler, "log_message")
+        self.mox.StubOutWithMock(CommandHandler, "stats")
+        self.mox.StubOutWithMock(Throttle, "acquire")
+        self.mox.StubOutWithMock(JobExecutor, "submit")
+        self.mox.StubOutWithMock(Message, "__init__")
+        self.mox.StubOutWithMock(Message, "__del__")
+
+        mock_stanza.get_subject()
+        mock_stanza.get_body().AndReturn("stats")
+        mock_stanza.get_type().AndReturn("chat")
+
+        CommandHandler.log_message(mock_stanza, None, "stats", "chat")
+
+        mock_stanza.get_type().AndReturn("chat")
+        mock_stanza.get_from().AndReturn("from")
+        mock_stanza.get_to().AndReturn("to")
+
+        CommandHandler.stats([], mox.IsA(Request)).AndReturn(u"messages 1")
+
+        Message.__init__(
+                to_jid = "from",
+                from_jid = "to",
+                stanza_type = "chat",
+                subject = None,
+                body = u"messages 1")
+
+        self.mox.ReplayAll()
+
+        cmdhandler = CommandHandler()
+        self.assertNotEqual(True, cmdhandler.message(mock_stanza))
+
+    def test_message_throttled(self):
+        """ A message that the Throttle does not allow should be responded to
+        at once, without being handled. """
+        mock_stanza = self.mox.CreateMockAnything()
+
+        self.mox.StubOutWithMock(CommandHandler, "log_message")
+        self.mox.StubOutWithMock(CommandHandler, "parse_body")
+        self.mox.StubOutWithMock(Throttle, "acquire")
+        self.mox.StubOutWithMock(JobExecutor, "submit")
+        self.mox.StubOutWithMock(Message, "__init__")
+        self.mox.StubOutWithMock(Message, "__del__")
+
+        mock_stanza.get_subject()
+        mock_stanza.get_body().AndReturn("body")
+        mock_stanza.get_type().AndReturn("chat")
+
+        CommandHandler.log_message(mock_stanza, None, "body", "chat")
+
+        mock_stanza.get_type().AndReturn("chat")
+        mock_stanza.get_from().AndReturn("from")
+        mock_stanza.get_to().AndReturn("to")
+
+        Throttle.acquire(mox.IsA(Request)).AndReturn(False)
+
+        Message.__init__(
+                to_jid = "from",
+                from_jid = "to",
+                stanza_type = "chat",
+                subject = None,
+                body = u"throttled, please slow down")
+
+        self.mox.ReplayAll()
+
+        cmdhandler = CommandHandler()
+        self.assertNotEqual(True, cmdhandler.message(mock_stanza))
+
+    def test_reply(self):
+        """ The response to a message handled by a worker thread should be
+        sent via the Client. """
+        mock_request = self.mox.CreateMock(Request)
+
+        self.mox.StubOutWithMock(CommandHandler, "parse_body")
+        self.mox.StubOutWithMock(CommandHandler, "parse_builtin")
+        self.mox.StubOutWithMock(Client, "send_stanza")
+
+        CommandHandler.parse_builtin("body", mock_request).AndReturn(None)
+        CommandHandler.parse_body("body", mock_request).AndReturn("response")
+        mock_request.make_response("response").AndReturn("stanza")
+        Client.send_stanza("stanza", None)
+
+        self.mox.ReplayAll()
+
+        cmdhandler = CommandHandler()
+        cmdhandler.reply(mock_request, "body")
+
+    def test_reply_malformed_command(self):
+        """ A command that is malformed in the configuration should be
+        responded to with the error. """
+        mock_request = self.mox.CreateMock(Request)
+
+        self.mox.StubOutWithMock(CommandHandler, "parse_body")
+        self.mox.StubOutWithMock(CommandHandler, "parse_builtin")
+        self.mox.StubOutWithMock(Client, "send_stanza")
+
+        CommandHandler.parse_builtin("body", mock_request).AndReturn(None)
+        CommandHandler.parse_body("body", mock_request).AndRaise(
+                configuration.commands.MalformedCommand("foo: bar"))
+        mock_request.make_response(u"configuration error: foo: bar"
+                ).AndReturn("stanza")
+        Client.send_stanza("stanza", None)
+
+        self.mox.ReplayAll()
+
+        cmdhandler = CommandHandler()
+        logging.disable(logging.ERROR)
+        try:
+            cmdhandler.reply(mock_request, "body")
+        finally:
+            logging.disable(logging.NOTSET)
+
+    def test_parse_builtin(self):
+        """ The more and page builtins should page through the output kept for
+        the requester, and other bodies should be left to parse_body. """
+        mock_request = self.mox.CreateMock(Request)
+
+        self.mox.StubOutWithMock(Pager, "get_page")
+
+        mock_request.requester().AndReturn(u"user@example.com")
+        Pager.get_page(u"user@example.com").AndReturn("page 2/3")
+        mock_request.requester().AndReturn(u"user@example.com")
+        Pager.get_page(u"user@example.com", 3).AndReturn("page 3/3")
+
+        self.mox.ReplayAll()
+
+        cmdhandler = CommandHandler()
+        self.assertEquals("page 2/3",
+                          cmdhandler.parse_builtin("more", mock_request))
+        self.assertEquals("page 3/3",
+                          cmdhandler.parse_builtin("page 3", mock_request))
+        self.assertEquals(u"usage: page <number>",
+                          cmdhandler.parse_builtin("page x", mock_request))
+        self.assertEquals(u"usage: more",
+                          cmdhandler.parse_builtin("more 3", mock_request))
+        self.assertEquals(None,
+                          cmdhandler.parse_builtin("moreover", mock_request))
+
+    def test_stats(self):
+        """ The stats builtin should return the collected counters. """
+        mock_request = self.mox.CreateMock(Request)
+
+        self.mox.StubOutWithMock(stats, "collect")
+        self.mox.StubOutWithMock(stats, "format_text")
+
+        stats.collect().AndReturn("values")
+        stats.format_text("values").AndReturn(u"counters")
+
+        self.mox.ReplayAll()
+
+        cmdhandler = CommandHandler()
+        self.assertEquals(u"counters",
+                          cmdhandler.parse_builtin("stats", mock_request))
+        self.assertEquals(u"usage: stats",
+                          cmdhandler.parse_builtin("stats x", mock_request))
+
+    def test_profile(self):
+        """ The profile builtin should start and stop the Profiler, but only
+        for the admins. """
+        mock_request = self.mox.CreateMock(Request)
+
+        self.mox.StubOutWithMock(configuration.profiling, "get_admins")
+        self.mox.StubOutWithMock(Profiler, "start")
+        self.mox.StubOutWithMock(Profiler, "stop")
+
+        admins = frozenset([u"admin@example.com"])
+
+        mock_request.requester().AndReturn(u"user@example.com")
+        configuration.profiling.get_admins().AndReturn(admins)
+        mock_request.requester().AndReturn(u"Admin@example.com")
+        configuration.profiling.get_admins().AndReturn(admins)
+        mock_request.requester().AndReturn(u"admin@example.com")
+        configuration.profiling.get_admins().AndReturn(admins)
+        Profiler.start().AndReturn(True)
+        mock_request.requester().AndReturn(u"admin@example.com")
+        configuration.profiling.get_admins().AndReturn(admins)
+        Profiler.stop().AndReturn("/tmp/foo")
+
+        self.mox.ReplayAll()
+
+        cmdhandler = CommandHandler()
+        self.assertEquals(u"not allowed",
+                          cmdhandler.parse_builtin("profile start",
+                                                   mock_request))
+        self.assertEquals(u"usage: profile start|stop",
+                          cmdhandler.parse_builtin("profile", mock_request))
+        self.assertEquals(u"profiling",
+                          cmdhandler.parse_builtin("profile start",
+                                                   mock_request))
+        self.assertEquals(u"writing profile to /tmp/foo",
+                          cmdhandler.parse_builtin("profile stop",
+                                                   mock_request))
+
+    def test_jobs(self):
+        """ The jobs, result and cancel builtins should only handle the jobs of
+        the requester. """
+        mock_request = self.mox.CreateMock(Request)
+        mock_request.requester().MultipleTimes().AndReturn(u"jobs@example.com")
+
+        self.mox.StubOutWithMock(JobTable, "cancel")
+
+        running = JobTable().start(u"sleep 10", u"jobs@example.com")
+        done = JobTable().start(u"uptime", u"jobs@example.com")
+        JobTable().finish(done, u"up")
+        other = JobTable().start(u"df", u"other@example.com")
+        shared = JobTable().start(u"df", u"jobs@example.com")
+        shared.shared = True
+
+        JobTable.cancel(running).AndReturn(True)
+        JobTable.cancel(done).AndReturn(False)
+        JobTable.cancel(shared).AndReturn(True)
+
+        self.mox.ReplayAll()
+
+        cmdhandler = CommandHandler()
+
+        listing = cmdhandler.parse_builtin("jobs", mock_request).split("\n")
+        self.assertEquals(3, len(listing))
+        self.assertTrue(listing[0].startswith(running.job_id + " running"))
+        self.assertTrue(listing[1].startswith(done.job_id + " done"))
+        self.assertTrue(listing[1].endswith(u"s uptime"))
+
+        self.assertEquals(u"up", cmdhandler.parse_builtin(
+            "result " + done.job_id, mock_request))
+        self.assertEquals(u"job %s is still running" % running.job_id,
+                          cmdhandler.parse_builtin("result " + running.job_id,
+                                                   mock_request))
+        self.assertEquals(u"no such job: %s" % other.job_id,
+                          cmdhandler.parse_builtin("result " + other.job_id,
+                                                   mock_request))
+        self.assertEquals(u"cancelled job %s" % running.job_id,
+                          cmdhandler.parse_builtin("cancel " + running.job_id,
+                                                   mock_request))
+        self.assertEquals(u"job %s is not running" % done.job_id,
+                          cmdhandler.parse_builtin("cancel " + done.job_id,
+                                                   mock_request))
+        self.assertEquals(u"cancelled job %s, but the identical command whose "
+                          u"output it shares keeps running" % shared.job_id,
+                          cmdhandler.parse_builtin("cancel " + shared.job_id,
+                                                   mock_request))
+        self.assertEquals(u"usage: cancel <job>",
+                          cmdhandler.parse_builtin("cancel", mock_request))
+
     def test_presence_control(self):
         """ Test the handling of presence stanzas. """
         mock_stanza = self.mox.CreateMockAnything()
@@ -355,11 +706,13 @@ class RestrictedCommandHandlerTest(mox.MoxTestBase):
 
         self.mox.StubOutWithMock(RestrictedCommandHandler, "__init__")
         self.mox.StubOutWithMock(RestrictedCommandHandler, "do_command")
-        self.mox.StubOutWithMock(configuration.commands, "restricted_set")
+        self.mox.StubOutWithMock(configuration.commands, "command_index")
 
         RestrictedCommandHandler.__init__()
-        configuration.commands.restricted_set().AndReturn(command_set)
-        RestrictedCommandHandler.do_command(command, args).AndReturn(response)
+        configuration.commands.command_index().AndReturn(
+                CommandIndex(command_set))
+        RestrictedCommandHandler.do_command(command, args,
+                                            None).AndReturn(response)
 
         self.mox.ReplayAll()
 
@@ -378,11 +731,13 @@ class RestrictedCommandHandlerTest(mox.MoxTestBase):
 
         self.mox.StubOutWithMock(RestrictedCommandHandler, "__init__")
         self.mox.StubOutWithMock(RestrictedCommandHandler, "do_command")
-        self.mox.StubOutWithMock(configuration.commands, "restricted_set")
+        self.mox.StubOutWithMock(configuration.commands, "command_index")
 
         RestrictedCommandHandler.__init__()
-        configuration.commands.restricted_set().AndReturn(command_set)
-        RestrictedCommandHandler.do_command(command, args).AndReturn(response)
+        configuration.commands.command_index().AndReturn(
+                CommandIndex(command_set))
+        RestrictedCommandHandler.do_command(command, args,
+                                            None).AndReturn(response)
 
         self.mox.ReplayAll()
 
@@ -398,10 +753,11 @@ class RestrictedCommandHandlerTest(mox.MoxTestBase):
         command_set = [(command, args, hlp)]
 
         self.mox.StubOutWithMock(RestrictedCommandHandler, "__init__")
-        self.mox.StubOutWithMock(configuration.commands, "restricted_set")
+        self.mox.StubOutWithMock(configuration.commands, "command_index")
 
         RestrictedCommandHandler.__init__()
-        configuration.commands.restricted_set().AndReturn(command_set)
+        configuration.commands.command_index().AndReturn(
+                CommandIndex(command_set))
 
         self.mox.ReplayAll()
 
@@ -418,13 +774,17 @@ class RestrictedCommandHandlerTest(mox.MoxTestBase):
         command_set = [(command, args, hlp)]
 
         self.mox.StubOutWithMock(RestrictedCommandHandler, "__init__")
-        self.mox.StubOutWithMock(configuration.commands, "restricted_set")
+        self.mox.StubOutWithMock(configuration.commands, "command_index")
 
         RestrictedCommandHandler.__init__()
-        configuration.commands.restricted_set().AndReturn(command_set)
-        configuration.commands.restricted_set().AndReturn(command_set)
-        configuration.commands.restricted_set().AndReturn(command_set)
-        configuration.commands.restricted_set().AndReturn(command_set)
+        configuration.commands.command_index().AndReturn(
+                CommandIndex(command_set))
+        configuration.commands.command_index().AndReturn(
+                CommandIndex(command_set))
+        configuration.commands.command_index().AndReturn(
+                CommandIndex(command_set))
+        configuration.commands.command_index().AndReturn(
+                CommandIndex(command_set))
 
         self.mox.ReplayAll()
 
@@ -447,16 +807,198 @@ class RestrictedCommandHandlerTest(mox.MoxTestBase):
         command_set = [(command, args, hlp)]
 
         self.mox.StubOutWithMock(RestrictedCommandHandler, "__init__")
-        self.mox.StubOutWithMock(configuration.commands, "restricted_set")
+        self.mox.StubOutWithMock(configuration.commands, "command_index")
 
         RestrictedCommandHandler.__init__()
-        configuration.commands.restricted_set().AndReturn(command_set)
+        configuration.commands.command_index().AndReturn(
+                CommandIndex(command_set))
 
         self.mox.ReplayAll()
 
         restricted_handler = RestrictedCommandHandler()
         self.assertEquals(None, restricted_handler.parse_body("help spam"))
 
+    def test_parse_body_help_all_commands(self):
+        """ A help request without command should list every command. """
+        command_set = [("foo", None, "foo help"), ("bar", None, "bar help")]
+
+        self.mox.StubOutWithMock(RestrictedCommandHandler, "__init__")
+        self.mox.StubOutWithMock(configuration.commands, "command_index")
+
+        RestrictedCommandHandler.__init__()
+        configuration.commands.command_index().AndReturn(
+                CommandIndex(command_set))
+        configuration.commands.command_index().AndReturn(
+                CommandIndex(command_set))
+
+        self.mox.ReplayAll()
+
+        restricted_handler = RestrictedCommandHandler()
+        self.assertEquals("foo - foo help\nbar - bar help",
+                restricted_handler.parse_body("help"))
+        self.assertEquals(None, restricted_handler.parse_body("helpfoo"))
+
+    def test_parse_body_multiple_commands(self):
+        """ The commands of a message naming several should all be executed,
+        and their responses joined in the order they were named. """
+        command_set = [("foo", None, "foo help"), ("bar", None, "bar help")]
+
+        self.mox.StubOutWithMock(RestrictedCommandHandler, "__init__")
+        self.mox.StubOutWithMock(RestrictedCommandHandler, "do_command")
+        self.mox.StubOutWithMock(configuration.commands, "command_index")
+
+        RestrictedCommandHandler.__init__()
+        configuration.commands.command_index().AndReturn(
+                CommandIndex(command_set))
+        RestrictedCommandHandler.do_command("bar", None, None).InAnyOrder(
+                ).AndReturn("['bar'] (1):\nbaz")
+        RestrictedCommandHandler.do_command("foo", None, None).InAnyOrder(
+                ).AndReturn("['foo'] (0):\nspam")
+
+        self.mox.ReplayAll()
+
+        restricted_handler = RestrictedCommandHandler()
+        self.assertEquals("['bar'] (1):\nbaz\n['foo'] (0):\nspam",
+                          restricted_handler.parse_body("bar; foo ;"))
+
+    def test_parse_body_multiple_commands_failing(self):
+        """ The commands of a message naming several should be passed the
+        request, and a command that raises should be responded to with an
+        error. """
+        command_set = [("foo", None, "foo help"), ("bar", None, "bar help")]
+        mock_request = self.mox.CreateMock(Request)
+
+        self.mox.StubOutWithMock(RestrictedCommandHandler, "__init__")
+        self.mox.StubOutWithMock(RestrictedCommandHandler, "do_command")
+        self.mox.StubOutWithMock(configuration.commands, "command_index")
+
+        RestrictedCommandHandler.__init__()
+        configuration.commands.command_index().AndReturn(
+                CommandIndex(command_set))
+        mock_request.requester().MultipleTimes().AndReturn(
+                u"multiple@example.com")
+        RestrictedCommandHandler.do_command("foo", None, mock_request
+                ).InAnyOrder().AndReturn("['foo'] (0):\nspam")
+        RestrictedCommandHandler.do_command("bar", None, mock_request
+                ).InAnyOrder().AndRaise(RuntimeError("dang nabit"))
+
+        self.mox.ReplayAll()
+
+        restricted_handler = RestrictedCommandHandler()
+        logging.disable(logging.ERROR)
+        try:
+            self.assertEquals(
+                    "['foo'] (0):\nspam\n"
+                    "bar: failed (RuntimeError('dang nabit',))",
+                    restricted_handler.parse_body("foo; bar", mock_request))
+        finally:
+            logging.disable(logging.NOTSET)
+
+    def test_parse_body_multiple_disallowed_command(self):
+        """ None of the commands of a message naming several should be executed
+        if any of them is not allowed. """
+        command_set = [("foo", None, "foo help")]
+
+        self.mox.StubOutWithMock(RestrictedCommandHandler, "__init__")
+        self.mox.StubOutWithMock(configuration.commands, "command_index")
+
+        RestrictedCommandHandler.__init__()
+        configuration.commands.command_index().AndReturn(
+                CommandIndex(command_set))
+        configuration.commands.command_index().AndReturn(
+                CommandIndex(command_set))
+
+        self.mox.stubs.Set(RestrictedCommandHandler, "MAX_COMMANDS", 2)
+
+        self.mox.ReplayAll()
+
+        restricted_handler = RestrictedCommandHandler()
+        self.assertEquals("unknown command: rm -rf /",
+                          restricted_handler.parse_body("foo; rm -rf /"))
+        self.assertEquals("at most 2 commands at once",
+                          restricted_handler.parse_body("foo; foo; foo"))
+
+    def test_parse_body_background(self):
+        """ A command ending with an ampersand should be executed in the
+        background by the JobExecutor, its response being kept as the result
+        of its job, and the Throttle slot of the request being held until the
+        job has finished. """
+        command_set = [("foo", None, "foo help")]
+        mock_request = self.mox.CreateMock(Request)
+
+        self.mox.StubOutWithMock(RestrictedCommandHandler, "__init__")
+        self.mox.StubOutWithMock(RestrictedCommandHandler, "do_command")
+        self.mox.StubOutWithMock(configuration.commands, "command_index")
+        self.mox.StubOutWithMock(JobExecutor, "is_running")
+        self.mox.StubOutWithMock(JobExecutor, "submit")
+        self.mox.StubOutWithMock(Throttle, "release")
+
+        RestrictedCommandHandler.__init__()
+        configuration.commands.command_index().AndReturn(
+                CommandIndex(command_set))
+        mock_request.requester().AndReturn(u"background@example.com")
+        JobExecutor.is_running().AndReturn(True)
+        JobExecutor.submit(mox.IgnoreArg()).WithSideEffects(
+                lambda execute: execute())
+        RestrictedCommandHandler.do_command("foo", None,
+                                            mock_request).AndReturn(
+                "['foo'] (0):\nspam")
+        Throttle.release(mock_request)
+        mock_request.reply(mox.StrContains(" done, send \"result "))
+
+        self.mox.ReplayAll()
+
+        restricted_handler = RestrictedCommandHandler()
+        response = restricted_handler.parse_body("foo &", mock_request)
+        self.assertTrue(response.startswith(u"started job "))
+        self.assertTrue(mock_request.detached)
+
+        job = JobTable().get(response.split()[-1], u"background@example.com")
+        self.assertEquals("['foo'] (0):\nspam", job.result)
+
+    def test_parse_body_background_busy(self):
+        """ A command to be executed in the background should not be executed
+        if the JobExecutor is busy, and should be executed at once if the
+        JobExecutor is not running. """
+        command_set = [("foo", None, "foo help")]
+        mock_request = self.mox.CreateMock(Request)
+
+        self.mox.StubOutWithMock(RestrictedCommandHandler, "__init__")
+        self.mox.StubOutWithMock(RestrictedCommandHandler, "do_command")
+        self.mox.StubOutWithMock(configuration.commands, "command_index")
+        self.mox.StubOutWithMock(JobExecutor, "is_running")
+        self.mox.StubOutWithMock(JobExecutor, "submit")
+
+        RestrictedCommandHandler.__init__()
+        configuration.commands.command_index().AndReturn(
+                CommandIndex(command_set))
+        mock_request.requester().AndReturn(u"busy@example.com")
+        JobExecutor.is_running().AndReturn(True)
+        JobExecutor.submit(mox.IgnoreArg()).AndRaise(ExecutorBusy)
+
+        configuration.commands.command_index().AndReturn(
+                CommandIndex(command_set))
+        mock_request.requester().AndReturn(u"busy@example.com")
+        JobExecutor.is_running().AndReturn(False)
+        RestrictedCommandHandler.do_command("foo", None,
+                                            mock_request).AndReturn(
+                "['foo'] (0):\nspam")
+
+        self.mox.ReplayAll()
+
+        restricted_handler = RestrictedCommandHandler()
+        self.assertEquals(u"busy, please try again later",
+                          restricted_handler.parse_body("foo &", mock_request))
+        self.assertFalse(mock_request.detached)
+
+        response = restricted_handler.parse_body("foo &", mock_request)
+        self.assertTrue(response.endswith(u" for its output"))
+        self.assertFalse(mock_request.detached)
+
+        jobs = JobTable().jobs(u"busy@example.com")
+        self.assertEquals([jobtable.CANCELLED, jobtable.DONE],
+                          [job.state for job in jobs])
+
     def test_parse_body_empty_body(self):
         """ Ensure proper behavior on a None command. """
         self.mox.StubOutWithMock(RestrictedCommandHandler, "__init__")
@@ -488,8 +1030,13 @@ class RestrictedCommandHandlerTest(mox.MoxTestBase):
         response = "foobar"
 
         self.mox.StubOutWithMock(RestrictedCommandHandler, "make_syscall")
+        self.mox.StubOutWithMock(configuration.commands, "command_settings")
 
-        RestrictedCommandHandler.make_syscall(method_args).AndReturn(response)
+        configuration.commands.command_settings(command).AndReturn(
+                configuration.commands.DEFAULT_SETTINGS)
+        RestrictedCommandHandler.make_syscall(
+                method_args, mox.IsA(BoundedOutput),
+                DEFAULT_SETTINGS["timeout"]).AndReturn(response)
 
         self.mox.ReplayAll()
 
@@ -508,8 +1055,13 @@ class RestrictedCommandHandlerTest(mox.MoxTestBase):
         response = "foobar"
 
         self.mox.StubOutWithMock(RestrictedCommandHandler, "make_syscall")
+        self.mox.StubOutWithMock(configuration.commands, "command_settings")
 
-        RestrictedCommandHandler.make_syscall(method_args).AndReturn(response)
+        configuration.commands.command_settings(command).AndReturn(
+                configuration.commands.DEFAULT_SETTINGS)
+        RestrictedCommandHandler.make_syscall(
+                method_args, mox.IsA(BoundedOutput),
+                DEFAULT_SETTINGS["timeout"]).AndReturn(response)
 
         self.mox.ReplayAll()
 
@@ -527,8 +1079,13 @@ class RestrictedCommandHandlerTest(mox.MoxTestBase):
         method_args.extend(args)
 
         self.mox.StubOutWithMock(RestrictedCommandHandler, "make_syscall")
+        self.mox.StubOutWithMock(configuration.commands, "command_settings")
 
-        RestrictedCommandHandler.make_syscall(method_args).AndRaise(
+        configuration.commands.command_settings(command).AndReturn(
+                configuration.commands.DEFAULT_SETTINGS)
+        RestrictedCommandHandler.make_syscall(
+                method_args, mox.IsA(BoundedOutput),
+                DEFAULT_SETTINGS["timeout"]).AndRaise(
                 OSError(2, None, 'File not found'))
 
         self.mox.ReplayAll()
@@ -538,6 +1095,202 @@ class RestrictedCommandHandlerTest(mox.MoxTestBase):
                 type(restricted_handler.do_command(command, args)))
 
 
+    def test_do_command_streaming(self):
+        """ If streaming is enabled for a command, its output should be sent
+        to the requester as it is read. """
+        command = "ls"
+        args = ("-al", )
+
+        settings = dict(configuration.commands.DEFAULT_SETTINGS)
+        settings["stream"] = True
+
+        mock_request = self.mox.CreateMock(Request)
+
+        self.mox.StubOutWithMock(RestrictedCommandHandler, "make_syscall")
+        self.mox.StubOutWithMock(configuration.commands, "command_settings")
+
+        mock_request.requester().AndReturn(u"user@example.com")
+        configuration.commands.command_settings(command).AndReturn(settings)
+        RestrictedCommandHandler.make_syscall(
+                [command, "-al"],
+                mox.IsA(StreamingOutput),
+                settings["timeout"]).AndReturn("response")
+
+        self.mox.ReplayAll()
+
+        restricted_handler = RestrictedCommandHandler()
+        self.assertEquals("response",
+                restricted_handler.do_command(command, args, mock_request))
+
+    def test_do_command_background_not_streaming(self):
+        """ The output of a command executed in the background should not be
+        streamed, even if streaming is enabled for the command. """
+        command = "ls"
+
+        settings = dict(configuration.commands.DEFAULT_SETTINGS)
+        settings["stream"] = True
+
+        mock_request = self.mox.CreateMock(Request)
+
+        self.mox.StubOutWithMock(RestrictedCommandHandler, "make_syscall")
+        self.mox.StubOutWithMock(configuration.commands, "command_settings")
+
+        configuration.commands.command_settings(command).AndReturn(settings)
+        RestrictedCommandHandler.make_syscall(
+                [command], mox.IsA(BoundedOutput),
+                settings["timeout"]).AndReturn("response")
+
+        self.mox.ReplayAll()
+
+        job = JobTable().start(command, u"user@example.com")
+        job.background = True
+
+        jobtable.bind(job)
+        try:
+            restricted_handler = RestrictedCommandHandler()
+            self.assertEquals("response",
+                    restricted_handler.do_command(command, None, mock_request))
+        finally:
+            jobtable.bind(None)
+
+    def test_do_command_spilled_output(self):
+        """ Output that does not fit in the response should be kept for the
+        requester to page through. """
+        command = "ls"
+
+        mock_request = self.mox.CreateMock(Request)
+
+        self.mox.StubOutWithMock(RestrictedCommandHandler, "make_syscall")
+        self.mox.StubOutWithMock(configuration.commands, "command_settings")
+        self.mox.StubOutWithMock(BoundedOutput, "detach_spill")
+        self.mox.StubOutWithMock(Pager, "store")
+
+        mock_request.requester().AndReturn(u"user@example.com")
+        configuration.commands.command_settings(command).AndReturn(
+                configuration.commands.DEFAULT_SETTINGS)
+        RestrictedCommandHandler.make_syscall(
+                [command], mox.IsA(BoundedOutput),
+                DEFAULT_SETTINGS["timeout"]).AndReturn("response")
+        BoundedOutput.detach_spill().AndReturn(tempfile.TemporaryFile())
+        mock_request.requester().AndReturn(u"user@example.com")
+        Pager.store(u"user@example.com", mox.IsA(file),
+                    configuration.commands.DEFAULT_SETTINGS["page_size"])
+
+        self.mox.ReplayAll()
+
+        restricted_handler = RestrictedCommandHandler()
+        self.assertEquals("response",
+                restricted_handler.do_command(command, None, mock_request))
+
+    def test_do_command_coalesced(self):
+        """ Requesters of a command that is already running should share its
+        response, rather than running it again. """
+        command = "df"
+
+        self.mox.StubOutWithMock(RestrictedCommandHandler, "make_syscall")
+        self.mox.StubOutWithMock(configuration.commands, "command_settings")
+
+        configuration.commands.command_settings(command).AndReturn(
+                configuration.commands.DEFAULT_SETTINGS)
+        configuration.commands.command_settings(command).AndReturn(
+                configuration.commands.DEFAULT_SETTINGS)
+
+        running = threading.Event()
+        release = threading.Event()
+
+        def make_syscall(cmd, sink, timeout):
+            running.set()
+            release.wait()
+            return "response"
+
+        RestrictedCommandHandler.make_syscall(
+                [command], mox.IsA(BoundedOutput),
+                DEFAULT_SETTINGS["timeout"]).WithSideEffects(
+                        make_syscall).AndReturn("response")
+
+        self.mox.ReplayAll()
+
+        restricted_handler = RestrictedCommandHandler()
+        responses = []
+
+        first = threading.Thread(target = lambda: responses.append(
+                restricted_handler.do_command(command)))
+        first.start()
+        running.wait()
+
+        flights = RestrictedCommandHandler._RestrictedCommandHandler__flights
+        second = threading.Thread(target = lambda: responses.append(
+                restricted_handler.do_command(command)))
+        second.start()
+
+        while not flights._SingleFlight__flights[(command, )].waiters:
+            time.sleep(0.01)
+
+        # the job of the second requester shares the process of the first
+        running_jobs = [job for job in JobTable().jobs(None)
+                        if jobtable.RUNNING == job.state and
+                        command == job.command]
+        self.assertEquals([False, True],
+                          [job.shared for job in running_jobs])
+
+        release.set()
+        first.join()
+        second.join()
+
+        self.assertEquals(["response", "response"], responses)
+
+    def test_do_command_cached(self):
+        """ The response of a cacheable command should be kept, and used for
+        any repeated request until it is cache_ttl seconds old. """
+        command = "uptime"
+
+        settings = dict(configuration.commands.DEFAULT_SETTINGS)
+        settings["cache"] = True
+
+        self.mox.StubOutWithMock(RestrictedCommandHandler, "make_syscall")
+        self.mox.StubOutWithMock(configuration.commands, "command_settings")
+        self.mox.StubOutWithMock(ResultCache, "get")
+        self.mox.StubOutWithMock(ResultCache, "put")
+
+        configuration.commands.command_settings(command).AndReturn(settings)
+        ResultCache.get((command, ), settings["cache_ttl"])
+        RestrictedCommandHandler.make_syscall(
+                [command], mox.IsA(BoundedOutput),
+                DEFAULT_SETTINGS["timeout"]).AndReturn("response")
+        ResultCache.put((command, ), "response")
+
+        configuration.commands.command_settings(command).AndReturn(settings)
+        ResultCache.get((command, ),
+                        settings["cache_ttl"]).AndReturn(("response", 3.5))
+
+        self.mox.ReplayAll()
+
+        restricted_handler = RestrictedCommandHandler()
+        self.assertEquals("response", restricted_handler.do_command(command))
+        self.assertEquals("response\n[cached result, 3 seconds old]",
+                          restricted_handler.do_command(command))
+
+    def test_make_syscall(self):
+        """ The output of the executed command should be returned along with
+        its exit status. """
+
+        self.assertEquals("['echo', 'foo'] (0):\nfoo\n",
+                RestrictedCommandHandler.make_syscall(["echo", "foo"]))
+        self.assertEquals("['false'] (1):\n",
+                RestrictedCommandHandler.make_syscall(["false"]))
+
+    def test_make_syscall_timeout(self):
+        """ A command that runs for longer than its timeout should be killed,
+        and the response should tell so. """
+
+        response = RestrictedCommandHandler.make_syscall(
+                ["sh", "-c", "echo foo; sleep 10"], None, 0.2)
+
+        self.assertTrue(response.startswith("['sh', '-c', 'echo foo; "
+                "sleep 10'] timed out after 0.2 seconds ("), response)
+        self.assertTrue(response.endswith(" seconds elapsed):\nfoo\n"))
+
+
 class UnsafeCommandHandlerTest(mox.MoxTestBase):
     """ Provides test cases for the UnsafeCommandHandler type. """
     def test_parse_body(self):
@@ -551,7 +1304,7 @@ class UnsafeCommandHandlerTest(mox.MoxTestBase):
 
         self.mox.StubOutWithMock(UnsafeCommandHandler, "do_command")
 
-        UnsafeCommandHandler.do_command(command, args).AndReturn(response)
+        UnsafeCommandHandler.do_command(command, args, None).AndReturn(response)
 
         self.mox.ReplayAll()
 
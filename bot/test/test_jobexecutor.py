@@ -0,0 +1,173 @@
+#!/usr/bin/env python
+
+#Copyright (C) 2012 Niklas Thorne.
+
+#This file is part of XMPPMote.
+#
+#XMPPMote is free software: you can redistribute it and/or modify
+#it under the terms of the GNU General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+#
+#XMPPMote is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU General Public License for more details.
+#
+#You should have received a copy of the GNU General Public License
+#along with XMPPMote.  If not, see <http://www.gnu.org/licenses/>.
+
+""" This module tests the jobexecutor module. """
+
+import sys
+import os
+
+sys.path.append(os.path.abspath(".."))
+sys.path.append(os.path.abspath("../.."))
+
+import mox
+import unittest
+
+from bot.jobexecutor import JobExecutor
+from bot.jobexecutor import ExecutorBusy
+
+import threading
+
+
+class JobExecutorTest(mox.MoxTestBase):
+    """ Provides test cases for the JobExecutor type. """
+
+    def tearDown(self):
+        JobExecutor().stop()
+        super(JobExecutorTest, self).tearDown()
+
+    def test_is_borg(self):
+        """ Make sure that JobExecutor instances share their state. """
+
+        executor = JobExecutor(1, 1)
+
+        self.assertTrue(executor.__dict__ is JobExecutor().__dict__)
+
+    def test_not_running_until_started(self):
+        """ A configured JobExecutor should not accept jobs until started, and
+        should stop accepting them when stopped. """
+
+        executor = JobExecutor(2, 2)
+        self.assertFalse(executor.is_running())
+
+        executor.start()
+        self.assertTrue(JobExecutor().is_running())
+
+        executor.stop()
+        self.assertFalse(JobExecutor().is_running())
+
+    def test_submitted_jobs_run_concurrently(self):
+        """ Submitted jobs should be executed with their arguments, and a job
+        that blocks should not prevent the other workers from executing. """
+
+        release = threading.Event()
+        done = threading.Event()
+        results = []
+
+        def blocking_job():
+            release.wait(5)
+
+        def job(value):
+            results.append(value)
+            done.set()
+
+        executor = JobExecutor(2, 4)
+        executor.start()
+
+        executor.submit(blocking_job)
+        executor.submit(job, 42)
+
+        done.wait(5)
+        release.set()
+
+        self.assertEquals([42], results)
+
+    def test_full_queue(self):
+        """ If the job queue is full, submit should raise ExecutorBusy rather
+        than blocking. """
+
+        release = threading.Event()
+        started = threading.Event()
+
+        def blocking_job():
+            started.set()
+            release.wait(5)
+
+        executor = JobExecutor(1, 1)
+        executor.start()
+
+        executor.submit(blocking_job)
+        started.wait(5)
+        executor.submit(blocking_job)
+
+        self.assertEquals(1, executor.queue_depth())
+        self.assertRaises(ExecutorBusy, executor.submit, blocking_job)
+
+        release.set()
+
+    def test_failing_job(self):
+        """ A job that raises should not bring down its worker thread. """
+
+        done = threading.Event()
+
+        def failing_job():
+            raise RuntimeError("dang nabit")
+
+        executor = JobExecutor(1, 2)
+        executor.start()
+
+        executor.submit(failing_job)
+        executor.submit(done.set)
+
+        self.assertTrue(done.wait(5))
+
+    def test_call_all(self):
+        """ The results of the calls should be returned in order, whether they
+        were made by worker threads or by the caller, including the exception
+        of a call that raises. """
+
+        def fail():
+            raise RuntimeError("dang nabit")
+
+        calls = [(lambda value: value, (number, )) for number in range(4)]
+        calls.append((fail, ()))
+
+        results = JobExecutor(1, 1).call_all(calls)
+        self.assertEquals(range(4), results[:4])
+        self.assertTrue(isinstance(results[4], RuntimeError))
+
+        executor = JobExecutor()
+        executor.start()
+
+        results = executor.call_all(calls)
+        self.assertEquals(range(4), results[:4])
+        self.assertTrue(isinstance(results[4], RuntimeError))
+
+    def test_call_all_from_worker(self):
+        """ A worker thread calling call_all should not wait for the calls that
+        it submitted to a queue that no other worker is taking jobs off. """
+
+        done = threading.Event()
+        results = []
+
+        def job():
+            results.extend(JobExecutor().call_all(
+                    [(lambda value: value, (number, ))
+                     for number in range(3)]))
+            done.set()
+
+        executor = JobExecutor(1, 2)
+        executor.start()
+        executor.submit(job)
+
+        self.assertTrue(done.wait(5))
+        self.assertEquals(range(3), results)
+
+
+if "__main__" == __name__:
+    unittest.main()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python
+
+#Copyright (C) 2012 Niklas Thorne.
+
+#This file is part of XMPPMote.
+#
+#XMPPMote is free software: you can redistribute it and/or modify
+#it under the terms of the GNU General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+#
+#XMPPMote is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU General Public License for more details.
+#
+#You should have received a copy of the GNU General Public License
+#along with XMPPMote.  If not, see <http://www.gnu.org/licenses/>.
+
+""" This module tests the jobtable module. """
+
+import sys
+import os
+
+sys.path.append(os.path.abspath(".."))
+sys.path.append(os.path.abspath("../.."))
+
+import mox
+import signal
+import subprocess
+import unittest
+
+from bot import jobtable
+from bot.jobtable import JobTable
+from lib import process
+
+
+class JobTableTest(mox.MoxTestBase):
+    """ Provides test cases for the JobTable type. """
+
+    def test_retention(self):
+        """ Jobs should be kept while running, and only the latest finished
+        ones once finished. """
+
+        self.mox.stubs.Set(JobTable, "MAX_FINISHED", 2)
+
+        table = JobTable()
+        jobs = [table.start(u"uptime", u"retention@example.com")
+                for _ in range(4)]
+
+        self.assertEquals(jobs, table.jobs(u"retention@example.com"))
+        self.assertEquals([], table.jobs(u"stranger@example.com"))
+
+        for job in jobs[1:]:
+            table.finish(job, u"up")
+
+        self.assertEquals([jobs[0], jobs[2], jobs[3]],
+                          table.jobs(u"retention@example.com"))
+        self.assertEquals(jobtable.RUNNING, jobs[0].state)
+        self.assertEquals(jobtable.DONE, jobs[3].state)
+        self.assertEquals(u"up", table.get(jobs[3].job_id,
+                                           u"retention@example.com").result)
+        self.assertEquals(None, table.get(jobs[1].job_id,
+                                          u"retention@example.com"))
+        self.assertEquals(None, table.get(jobs[3].job_id,
+                                          u"stranger@example.com"))
+
+    def test_cancel(self):
+        """ Cancelling a job should terminate its process, whether it was
+        started before or after the job was cancelled. """
+
+        self.mox.stubs.Set(process, "KILL_GRACE", 0.01)
+
+        table = JobTable()
+
+        for attach_first in [True, False]:
+            job = table.start(u"sleep 10", u"cancel@example.com")
+            subp = subprocess.Popen(["sleep", "10"], preexec_fn = os.setsid)
+
+            if attach_first:
+                jobtable.bind(job)
+                jobtable.attach(subp)
+                jobtable.bind(None)
+
+            self.assertTrue(table.cancel(job))
+
+            if not attach_first:
+                table.attach(job, subp)
+
+            self.assertEquals(-signal.SIGTERM, subp.wait())
+
+            table.finish(job, u"terminated")
+            self.assertEquals(jobtable.CANCELLED, job.state)
+            self.assertFalse(table.cancel(job))
+
+    def test_cancel_kills(self):
+        """ The process of a cancelled job should be killed, should it not
+        terminate within the grace period. """
+
+        self.mox.stubs.Set(process, "KILL_GRACE", 0.01)
+
+        table = JobTable()
+        job = table.start(u"sleep 10", u"kill@example.com")
+        subp = subprocess.Popen(["sh", "-c", "trap '' TERM; echo; sleep 10"],
+                                stdout = subprocess.PIPE,
+                                preexec_fn = os.setsid)
+        table.attach(job, subp)
+
+        # wait until SIGTERM is ignored
+        subp.stdout.readline()
+
+        self.assertTrue(table.cancel(job))
+        self.assertEquals(-signal.SIGKILL, subp.wait())
+        table.finish(job, u"killed")
+
+
+if "__main__" == __name__:
+    unittest.main()
@@ -0,0 +1,128 @@
+#!/usr/bin/env python
+
+#Copyright (C) 2012 Niklas Thorne.
+
+#This file is part of XMPPMote.
+#
+#XMPPMote is free software: you can redistribute it and/or modify
+#it under the terms of the GNU General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+#
+#XMPPMote is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU General Public License for more details.
+#
+#You should have received a copy of the GNU General Public License
+#along with XMPPMote.  If not, see <http://www.gnu.org/licenses/>.
+
+""" This module tests the latency module. """
+
+import sys
+import os
+
+sys.path.append(os.path.abspath(".."))
+sys.path.append(os.path.abspath("../.."))
+
+import mox
+import unittest
+
+from bot import latency
+from bot.latency import Latency
+from bot.latency import Trace
+
+
+class TraceTest(mox.MoxTestBase):
+    """ Provides test cases for the Trace type. """
+
+    def test_intervals(self):
+        """ The time to reach each stage should be measured from the previous
+        stage reached, skipping the stages not reached. """
+
+        self.mox.StubOutWithMock(latency, "monotonic")
+        latency.monotonic().AndReturn(10.0)
+        latency.monotonic().AndReturn(10.5)
+        latency.monotonic().AndReturn(12.0)
+        latency.monotonic().AndReturn(12.25)
+
+        self.mox.ReplayAll()
+
+        trace = Trace()
+        trace.mark(latency.PARSED)
+        trace.mark(latency.QUEUED)
+        trace.mark(latency.WRITTEN)
+
+        self.assertEquals([(latency.PARSED, 0.5), (latency.QUEUED, 1.5),
+                           (latency.WRITTEN, 0.25), (latency.TOTAL, 2.25)],
+                          trace.intervals())
+
+    def test_bound(self):
+        """ Stages should be marked on the trace bound to the calling thread,
+        if any. """
+
+        trace = Trace()
+
+        latency.mark(latency.PARSED, "foo")
+        self.assertEquals(None, trace.command)
+
+        latency.bind(trace)
+        latency.mark(latency.PARSED, "foo")
+        latency.mark(latency.SPAWNED)
+        latency.bind(None)
+        latency.mark(latency.EXITED)
+
+        self.assertEquals("foo", trace.command)
+        self.assertEquals([latency.PARSED, latency.SPAWNED, latency.TOTAL],
+                          [stage for (stage, _) in trace.intervals()])
+
+
+class LatencyTest(mox.MoxTestBase):
+    """ Provides test cases for the Latency type. """
+
+    def setUp(self):
+        super(LatencyTest, self).setUp()
+        Latency().reset()
+
+    def tearDown(self):
+        Latency().reset()
+        super(LatencyTest, self).tearDown()
+
+    def test_summary(self):
+        """ Finished traces of known commands should be counted by command and
+        stage. """
+
+        for command in ["foo", "foo", None]:
+            trace = Trace(command)
+            trace.mark(latency.WRITTEN)
+            trace.finish()
+
+        summary = Latency().summary()
+
+        self.assertEquals(["foo"], summary.keys())
+        self.assertEquals(set([latency.WRITTEN, latency.TOTAL]),
+                          set(summary["foo"].keys()))
+        self.assertEquals(2, summary["foo"][latency.TOTAL][0])
+        self.assertEquals(5, len(summary["foo"][latency.TOTAL]))
+        self.assertTrue(0 <= summary["foo"][latency.TOTAL][1])
+
+    def test_max_commands(self):
+        """ Commands beyond the maximum should be counted together. """
+
+        self.mox.stubs.Set(Latency, "MAX_COMMANDS", 2)
+
+        for command in ["foo", "bar", "baz", "qux", "foo"]:
+            trace = Trace(command)
+            trace.mark(latency.WRITTEN)
+            trace.finish()
+
+        summary = Latency().summary()
+
+        self.assertEquals(set(["foo", "bar", latency.OTHER]),
+                          set(summary.keys()))
+        self.assertEquals(2, summary["foo"][latency.TOTAL][0])
+        self.assertEquals(2, summary[latency.OTHER][latency.TOTAL][0])
+
+
+if "__main__" == __name__:
+    unittest.main()
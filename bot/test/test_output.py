@@ -0,0 +1,237 @@
+#!/usr/bin/env python
+
+#Copyright (C) 2012 Niklas Thorne.
+
+#This file is part of XMPPMote.
+#
+#XMPPMote is free software: you can redistribute it and/or modify
+#it under the terms of the GNU General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+#
+#XMPPMote is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU General Public License for more details.
+#
+#You should have received a copy of the GNU General Public License
+#along with XMPPMote.  If not, see <http://www.gnu.org/licenses/>.
+
+""" This module tests the output module. """
+
+import sys
+import os
+
+sys.path.append(os.path.abspath(".."))
+sys.path.append(os.path.abspath("../.."))
+
+import mox
+import unittest
+
+from bot import output
+from bot.output import BoundedOutput
+from bot.output import BufferedOutput
+from bot.output import Pager
+from bot.output import StreamingOutput
+
+
+class BufferedOutputTest(mox.MoxTestBase):
+    """ Provides test cases for the BufferedOutput type. """
+
+    def test_getvalue(self):
+        """ All of the output should be kept. """
+
+        sink = BufferedOutput()
+        sink.write("foo")
+        sink.write("bar")
+        sink.close()
+
+        self.assertEquals(None, sink.timeout())
+        self.assertEquals("foobar", sink.getvalue())
+
+
+class StreamingOutputTest(mox.MoxTestBase):
+    """ Provides test cases for the StreamingOutput type. """
+
+    def setUp(self):
+        super(StreamingOutputTest, self).setUp()
+        self.sent = []
+
+    def test_chunk_size(self):
+        """ Output should be sent in chunks of at most chunk_size bytes,
+        preferrably split at line endings. """
+
+        sink = StreamingOutput(self.sent.append, 8, 60)
+        sink.write("foo\nbar")
+        self.assertEquals([], self.sent)
+
+        sink.write("baz\n")
+        self.assertEquals(["foo\n"], self.sent)
+
+        sink.write("0123456789")
+        self.assertEquals(["foo\n", "barbaz\n", "01234567"], self.sent)
+
+        sink.close()
+        self.assertEquals(["foo\n", "barbaz\n", "01234567", "89"], self.sent)
+        self.assertEquals("[streamed 21 bytes in 4 messages]",
+                          sink.getvalue())
+
+    def test_utf8_sequences_are_not_split(self):
+        """ A multibyte UTF-8 character should never be split over two
+        chunks. """
+
+        sink = StreamingOutput(self.sent.append, 4, 60)
+        sink.write("ab\xc3\xa5\xc3\xa4")
+
+        self.assertEquals(["ab\xc3\xa5"], self.sent)
+
+        sink = StreamingOutput(self.sent.append, 4, 60)
+        sink.write("abc\xe2\x82\xac")
+
+        self.assertEquals(["ab\xc3\xa5", "abc"], self.sent)
+
+    def test_interval(self):
+        """ Buffered output should be sent once the interval has elapsed,
+        even if no further output arrives. """
+
+        self.mox.StubOutWithMock(output, "monotonic")
+
+        output.monotonic().AndReturn(10)
+        output.monotonic().AndReturn(11)
+        output.monotonic().AndReturn(11)
+        output.monotonic().AndReturn(12.5)
+        output.monotonic().AndReturn(12.5)
+
+        self.mox.ReplayAll()
+
+        sink = StreamingOutput(self.sent.append, 1024, 2)
+        sink.write("foo")
+        self.assertEquals(1, sink.timeout())
+
+        sink.poll()
+        self.assertEquals(["foo"], self.sent)
+        self.assertEquals(None, sink.timeout())
+
+
+class BoundedOutputTest(mox.MoxTestBase):
+    """ Provides test cases for the BoundedOutput type. """
+
+    def test_output_fits(self):
+        """ Output that fits in the head and tail should be kept as is, and
+        nothing should be spilled. """
+
+        sink = BoundedOutput(4, 4, 64)
+        sink.write("foo")
+        sink.write("barba")
+
+        self.assertEquals(0, sink.dropped())
+        self.assertEquals("foobarba", sink.getvalue())
+        self.assertEquals(None, sink.detach_spill())
+
+    def test_output_dropped(self):
+        """ Only the head and tail of the output should be kept in memory, and
+        all of the output should be spilled to a file. """
+
+        sink = BoundedOutput(4, 4, 64)
+        for chunk in ["0123", "4567", "89ab", "cdef"]:
+            sink.write(chunk)
+
+        self.assertEquals(8, sink.dropped())
+        self.assertTrue(sink.getvalue().startswith("0123\n[... 8 bytes"))
+        self.assertTrue(sink.getvalue().endswith("]\ncdef"))
+
+        spill = sink.detach_spill()
+        self.assertEquals(None, sink.detach_spill())
+
+        spill.seek(0)
+        self.assertEquals("0123456789abcdef", spill.read())
+        spill.close()
+
+    def test_spill_bounded(self):
+        """ Only the first spill_size bytes of the output should be spilled,
+        and the rest should be dropped. """
+
+        sink = BoundedOutput(4, 4, 10)
+        for chunk in ["0123", "4567", "89ab", "cdef"]:
+            sink.write(chunk)
+
+        self.assertEquals(8, sink.dropped())
+        self.assertEquals(6, sink.unspilled())
+        self.assertTrue("page through the first 10 bytes" in sink.getvalue())
+        self.assertTrue(sink.getvalue().endswith("]\ncdef"))
+
+        spill = sink.detach_spill()
+        spill.seek(0)
+        self.assertEquals("0123456789", spill.read())
+        spill.close()
+
+
+class PagerTest(mox.MoxTestBase):
+    """ Provides test cases for the Pager type. """
+
+    def __make_spill(self, data):
+        """ Returns a spilled output holding _data_. """
+
+        sink = BoundedOutput(0, 0, 64)
+        sink.write(data)
+        return sink.detach_spill()
+
+    def test_get_page(self):
+        """ Pages should be returned in order, or by number. """
+
+        pager = Pager()
+        pager.store("user", self.__make_spill("foobarbaz"), 4)
+
+        self.assertEquals("page 1/3:\nfoob", pager.get_page("user"))
+        self.assertEquals("page 2/3:\narba", pager.get_page("user"))
+        self.assertEquals("page 3/3:\nz", pager.get_page("user"))
+        self.assertEquals(u"no such page (there are 3 pages)",
+                          pager.get_page("user"))
+        self.assertEquals("page 2/3:\narba", pager.get_page("user", 2))
+        self.assertEquals(u"no such page (there are 3 pages)",
+                          pager.get_page("user", 0))
+        self.assertEquals(u"no output to page through",
+                          pager.get_page("someone else"))
+
+    def test_store_replaces_and_evicts(self):
+        """ Storing output should replace the output previously kept for the
+        requester, and evict the output of the least recent requester once
+        there are too many requesters. """
+
+        pager = Pager()
+        first = self.__make_spill("foo")
+        pager.store("user", first, 4)
+        pager.store("user", self.__make_spill("bar"), 4)
+
+        self.assertTrue(first.closed)
+        self.assertEquals("page 1/1:\nbar", pager.get_page("user"))
+
+        for number in range(Pager.MAX_REQUESTERS):
+            pager.store("user%d" % number, self.__make_spill("baz"), 4)
+
+        self.assertEquals(u"no output to page through", pager.get_page("user"))
+        self.assertEquals("page 1/1:\nbaz", pager.get_page("user0"))
+
+
+class PumpTest(mox.MoxTestBase):
+    """ Provides test cases for the pump function. """
+
+    def test_pump(self):
+        """ Everything written to the file should reach the sink, which should
+        be closed once the file has been closed. """
+
+        (readfd, writefd) = os.pipe()
+        os.write(writefd, "foo" * output.READ_SIZE)
+        os.close(writefd)
+
+        stdout = os.fdopen(readfd)
+        sink = BufferedOutput()
+
+        output.pump(stdout, sink)
+        stdout.close()
+
+        self.assertEquals("foo" * output.READ_SIZE, sink.getvalue())
+
+
+if "__main__" == __name__:
+    unittest.main()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+
+#Copyright (C) 2012 Niklas Thorne.
+
+#This file is part of XMPPMote.
+#
+#XMPPMote is free software: you can redistribute it and/or modify
+#it under the terms of the GNU General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+#
+#XMPPMote is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU General Public License for more details.
+#
+#You should have received a copy of the GNU General Public License
+#along with XMPPMote.  If not, see <http://www.gnu.org/licenses/>.
+
+""" This module tests the recorder module. """
+
+import sys
+import os
+
+sys.path.append(os.path.abspath(".."))
+sys.path.append(os.path.abspath("../.."))
+
+import mox
+import shutil
+import tempfile
+import time
+import unittest
+
+from StringIO import StringIO
+
+from bot import recorder
+from bot.recorder import Recorder
+from pyxmpp.all import JID
+from pyxmpp.all import Message
+from pyxmpp.all import Presence
+
+
+class RecorderTest(mox.MoxTestBase):
+    """ Provides test cases for the Recorder type. """
+
+    def setUp(self):
+        super(RecorderTest, self).setUp()
+        self.__directory = tempfile.mkdtemp()
+        self.__path = os.path.join(self.__directory, "recording")
+
+    def tearDown(self):
+        Recorder().close()
+        shutil.rmtree(self.__directory)
+        super(RecorderTest, self).tearDown()
+
+    def test_record(self):
+        """ Messages and presences should be recorded, and read back in the
+        order they were received. """
+
+        self.mox.StubOutWithMock(time, "time")
+        time.time().AndReturn(1000.0004)
+        time.time().AndReturn(1001.5)
+
+        self.mox.ReplayAll()
+
+        Recorder().open(self.__path)
+        self.assertTrue(Recorder().is_recording())
+
+        Recorder().record(recorder.MESSAGE,
+                          Message(from_jid = JID("foo@bar/baz"),
+                                  stanza_type = "chat", body = u"uptime"))
+        Recorder().record(recorder.PRESENCE,
+                          Presence(from_jid = JID("foo@bar/baz"),
+                                   stanza_type = "subscribe"))
+        Recorder().close()
+
+        with open(self.__path) as fil:
+            self.assertEquals(
+                [(1000.0, "message", "chat", "foo@bar/baz", "uptime"),
+                 (1001.5, "presence", "subscribe", "foo@bar/baz", None)],
+                list(recorder.read_records(fil)))
+
+    def test_not_recording(self):
+        """ Nothing should be recorded until a file is opened. """
+
+        stanza = self.mox.CreateMockAnything()
+
+        self.mox.ReplayAll()
+
+        self.assertFalse(Recorder().is_recording())
+        Recorder().record(recorder.MESSAGE, stanza)
+
+    def test_read_malformed(self):
+        """ Malformed lines, e.g. one cut short, should be skipped. """
+
+        fil = StringIO('[1.0,"message","chat","foo@bar","df"]\n'
+                       '[2.0,"message","chat"]\n'
+                       '[3.0,"message","chat","foo@b')
+
+        self.assertEquals([(1.0, "message", "chat", "foo@bar", "df")],
+                          list(recorder.read_records(fil)))
+
+
+if "__main__" == __name__:
+    unittest.main()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+
+#Copyright (C) 2012 Niklas Thorne.
+
+#This file is part of XMPPMote.
+#
+#XMPPMote is free software: you can redistribute it and/or modify
+#it under the terms of the GNU General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+#
+#XMPPMote is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU General Public License for more details.
+#
+#You should have received a copy of the GNU General Public License
+#along with XMPPMote.  If not, see <http://www.gnu.org/licenses/>.
+
+""" This module tests the request module. """
+
+import sys
+import os
+
+sys.path.append(os.path.abspath(".."))
+sys.path.append(os.path.abspath("../.."))
+
+import mox
+import unittest
+
+from pyxmpp.all import JID
+from pyxmpp.all import Message
+from bot.client import Client
+from bot.request import Request
+
+
+class RequestTest(mox.MoxTestBase):
+    """ Provides test cases for the Request type. """
+
+    def test_make_response(self):
+        """ The response should be addressed back to the requester. """
+
+        self.mox.StubOutWithMock(Message, "__init__")
+        self.mox.StubOutWithMock(Message, "__del__")
+
+        Message.__init__(
+                to_jid = "from",
+                from_jid = "to",
+                stanza_type = "chat",
+                subject = u"Re: subject",
+                body = "response")
+
+        self.mox.ReplayAll()
+
+        request = Request("from", "to", "chat", u"Re: subject")
+        request.make_response("response")
+
+    def test_requester(self):
+        """ The requester should be identified by its bare JID. """
+
+        request = Request(JID(u"user@example.com/home"), None, "chat", None)
+        self.assertEquals(u"user@example.com", request.requester())
+
+    def test_reply(self):
+        """ A reply should be sent via the Client. """
+
+        self.mox.StubOutWithMock(Request, "make_response")
+        self.mox.StubOutWithMock(Client, "send_stanza")
+
+        Request.make_response("response").AndReturn("stanza")
+        Client.send_stanza("stanza")
+
+        self.mox.ReplayAll()
+
+        request = Request("from", "to", "chat", None)
+        request.reply("response")
+
+
+if "__main__" == __name__:
+    unittest.main()
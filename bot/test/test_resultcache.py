@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+
+#Copyright (C) 2012 Niklas Thorne.
+
+#This file is part of XMPPMote.
+#
+#XMPPMote is free software: you can redistribute it and/or modify
+#it under the terms of the GNU General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+#
+#XMPPMote is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU General Public License for more details.
+#
+#You should have received a copy of the GNU General Public License
+#along with XMPPMote.  If not, see <http://www.gnu.org/licenses/>.
+
+""" This module tests the resultcache module. """
+
+import sys
+import os
+
+sys.path.append(os.path.abspath(".."))
+sys.path.append(os.path.abspath("../.."))
+
+import mox
+import unittest
+
+from bot import resultcache
+from bot.resultcache import ResultCache
+
+
+class ResultCacheTest(mox.MoxTestBase):
+    """ Provides test cases for the ResultCache type. """
+
+    def test_ttl(self):
+        """ A response should only be returned until it is _ttl_ seconds old,
+        and hits and misses should be counted. """
+
+        self.mox.StubOutWithMock(resultcache, "monotonic")
+
+        resultcache.monotonic().AndReturn(100)
+        resultcache.monotonic().AndReturn(105)
+        resultcache.monotonic().AndReturn(110)
+
+        self.mox.ReplayAll()
+
+        cache = ResultCache()
+        before = cache.counters()
+
+        cache.put(("uptime", ), "up 3 days")
+        self.assertEquals(("up 3 days", 5), cache.get(("uptime", ), 10))
+        self.assertEquals(None, cache.get(("uptime", ), 10))
+
+        after = cache.counters()
+        self.assertEquals(before["hits"] + 1, after["hits"])
+        self.assertEquals(before["misses"] + 1, after["misses"])
+
+    def test_eviction(self):
+        """ The least recently used responses should be evicted once the
+        responses kept add up to more than MAX_BYTES. """
+
+        self.mox.stubs.Set(ResultCache, "MAX_BYTES", 8)
+
+        cache = ResultCache()
+        cache.put(("foo", ), "1234")
+        cache.put(("bar", ), "5678")
+        self.assertNotEquals(None, cache.get(("foo", ), 60))
+
+        cache.put(("baz", ), "9")
+        self.assertEquals(None, cache.get(("bar", ), 60))
+        self.assertNotEquals(None, cache.get(("foo", ), 60))
+
+        cache.put(("huge", ), "123456789")
+        self.assertEquals(None, cache.get(("huge", ), 60))
+        self.assertEquals(5, cache.counters()["bytes"])
+
+
+if "__main__" == __name__:
+    unittest.main()
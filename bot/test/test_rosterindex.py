@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+
+#Copyright (C) 2012 Niklas Thorne.
+
+#This file is part of XMPPMote.
+#
+#XMPPMote is free software: you can redistribute it and/or modify
+#it under the terms of the GNU General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+#
+#XMPPMote is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU General Public License for more details.
+#
+#You should have received a copy of the GNU General Public License
+#along with XMPPMote.  If not, see <http://www.gnu.org/licenses/>.
+
+""" This module tests the rosterindex module. """
+
+import sys
+import os
+
+sys.path.append(os.path.abspath(".."))
+sys.path.append(os.path.abspath("../.."))
+
+import unittest
+
+from pyxmpp.roster import RosterItem
+
+from bot.rosterindex import RosterIndex
+
+
+class RosterIndexTest(unittest.TestCase):
+    """ Provides test cases for the RosterIndex type. """
+
+    def test_replace(self):
+        """ Replacing the roster should report the JIDs that were added,
+        removed and changed. """
+
+        index = RosterIndex()
+
+        self.assertEquals(([u"a@b", u"c@d"], [], []), index.replace([
+            RosterItem(u"a@b", "both", u"A", [u"friends"]),
+            RosterItem(u"c@d", "to")]))
+
+        self.assertEquals(([u"e@f"], [u"c@d"], [u"a@b"]), index.replace([
+            RosterItem(u"a@b", "both", u"A", [u"work"]),
+            RosterItem(u"e@f", "from")]))
+
+        self.assertEquals(([], [], []), index.replace([
+            RosterItem(u"a@b", "both", u"A", [u"work"]),
+            RosterItem(u"e@f", "from")]))
+
+        self.assertEquals(2, len(index))
+        self.assertTrue(u"a@b" in index)
+        self.assertEquals(frozenset([u"a@b"]), index.get_group(u"work"))
+        self.assertEquals(frozenset(), index.get_group(u"friends"))
+
+    def test_update(self):
+        """ Pushed items should be reported as added, changed or removed, and
+        the group index kept up to date. """
+
+        index = RosterIndex()
+
+        self.assertEquals("added",
+                          index.update(RosterItem(u"a@b", "to", None, [u"x"])))
+        self.assertEquals(None,
+                          index.update(RosterItem(u"a@b", "to", None, [u"x"])))
+        self.assertEquals("changed",
+                          index.update(RosterItem(u"a@b", "both", None, [u"y"])))
+        self.assertEquals(frozenset(), index.get_group(u"x"))
+        self.assertEquals(frozenset([u"a@b"]), index.get_group(u"y"))
+        self.assertEquals((None, "both", frozenset([u"y"]), None),
+                          index.get(u"a@b"))
+
+        self.assertEquals("removed",
+                          index.update(RosterItem(u"a@b", "remove")))
+        self.assertEquals(None, index.update(RosterItem(u"a@b", "remove")))
+        self.assertEquals(None, index.get(u"a@b"))
+        self.assertEquals(frozenset(), index.get_group(u"y"))
+
+
+if "__main__" == __name__:
+    unittest.main()
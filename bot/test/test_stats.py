@@ -0,0 +1,196 @@
+#!/usr/bin/env python
+
+#Copyright (C) 2012 Niklas Thorne.
+
+#This file is part of XMPPMote.
+#
+#XMPPMote is free software: you can redistribute it and/or modify
+#it under the terms of the GNU General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+#
+#XMPPMote is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU General Public License for more details.
+#
+#You should have received a copy of the GNU General Public License
+#along with XMPPMote.  If not, see <http://www.gnu.org/licenses/>.
+
+""" This module tests the stats module. """
+
+import sys
+import os
+
+sys.path.append(os.path.abspath(".."))
+sys.path.append(os.path.abspath("../.."))
+
+import mox
+import shutil
+import tempfile
+import unittest
+
+from bot.client import Client
+from bot import stats
+from bot.latency import Latency
+from bot.latency import Trace
+from bot.resultcache import ResultCache
+from bot.stats import Stats
+from bot.stats import TextfileExporter
+from bot.supervisor import Supervisor
+
+
+class StatsTest(mox.MoxTestBase):
+    """ Provides test cases for the Stats type. """
+
+    def test_rate(self):
+        """ Events should be counted, and their rate measured over the last
+        WINDOW seconds. """
+
+        self.mox.stubs.Set(Stats, "WINDOW", 4)
+        self.mox.StubOutWithMock(stats, "monotonic")
+
+        for now in [100.5, 101.0, 101.5, 103.9]:
+            stats.monotonic().AndReturn(now)
+        stats.monotonic().AndReturn(104.0)
+        stats.monotonic().AndReturn(105.0)
+
+        self.mox.ReplayAll()
+
+        counted = Stats()
+        for _ in range(4):
+            counted.increment("test_rate")
+
+        self.assertEquals(4, counted.count("test_rate"))
+        self.assertEquals(0, counted.count("test_rate_unknown"))
+
+        # the event at 100.5 is too old, then so are those at 101
+        self.assertEquals(3 / 4.0, counted.rate("test_rate"))
+        self.assertEquals(1 / 4.0, counted.rate("test_rate"))
+
+
+class FormatTest(mox.MoxTestBase):
+    """ Provides test cases for the collecting and formatting of the values.
+    """
+
+    def setUp(self):
+        super(FormatTest, self).setUp()
+        Latency().reset()
+
+    def tearDown(self):
+        Latency().reset()
+        super(FormatTest, self).tearDown()
+
+    def __collect(self):
+        """ Collect the values, given known counters. """
+
+        self.mox.StubOutWithMock(ResultCache, "counters")
+        self.mox.StubOutWithMock(Supervisor, "metrics")
+        self.mox.StubOutWithMock(Client, "queue_depth")
+
+        ResultCache.counters().AndReturn({"hits": 3, "misses": 1,
+                                          "entries": 2, "bytes": 100})
+        Supervisor.metrics().AndReturn({
+            "connected": True, "reconnects": 2, "failed_attempts": 5,
+            "last_reconnect_seconds": 1.0, "max_reconnect_seconds": 2.0,
+            "total_reconnect_seconds": 3.0})
+        Client.queue_depth().AndReturn(7)
+
+        self.mox.ReplayAll()
+
+        trace = Trace(u"up\"time")
+        trace.finish()
+
+        return stats.collect()
+
+    def test_collect(self):
+        """ The values should be collected from the types keeping them. """
+
+        values = self.__collect()
+
+        for (key, _, _, _) in stats.METRICS:
+            if key not in ["job_queue_depth", "log_queue_depth",
+                           "log_records_dropped"]:
+                self.assertTrue(key in values, key)
+
+        self.assertEquals(3, values["cache_hits"])
+        self.assertEquals(1, values["connected"])
+        self.assertEquals(7, values["send_queue_depth"])
+        self.assertEquals([u"up\"time"], values["latency"].keys())
+
+    def test_format_text(self):
+        """ The values should be summarised for chat. """
+
+        text = stats.format_text(self.__collect())
+
+        self.assertTrue(u"cache: 75% hit rate (3/4)" in text, text)
+        self.assertTrue(u"connected: yes, reconnects: 2" in text, text)
+        self.assertTrue(u"up\"time: 1 runs" in text, text)
+
+    def test_format_prometheus(self):
+        """ The values should be formatted as detailed by the Prometheus text
+        format, escaping label values. """
+
+        lines = stats.format_prometheus(self.__collect()).split("\n")
+
+        self.assertTrue("# TYPE xmppmote_cache_hits_total counter" in lines)
+        self.assertTrue("xmppmote_cache_hits_total 3.0" in lines)
+        self.assertTrue("xmppmote_send_queue_depth 7.0" in lines)
+        self.assertTrue('xmppmote_latency_seconds_count{command="up\\"time",'
+                        'stage="total"} 1' in lines)
+        self.assertTrue([line for line in lines if line.startswith(
+                'xmppmote_latency_seconds_sum{command="up\\"time",'
+                'stage="total"} ')])
+        self.assertEquals("", lines[-1])
+
+
+class TextfileExporterTest(mox.MoxTestBase):
+    """ Provides test cases for the TextfileExporter type. """
+
+    def setUp(self):
+        super(TextfileExporterTest, self).setUp()
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+        super(TextfileExporterTest, self).tearDown()
+
+    def test_write(self):
+        """ The formatted values should replace the file. """
+
+        path = os.path.join(self.directory, "xmppmote.prom")
+
+        self.mox.StubOutWithMock(stats, "collect")
+        self.mox.StubOutWithMock(stats, "format_prometheus")
+        stats.collect().AndReturn("values")
+        stats.format_prometheus("values").AndReturn("metrics\n")
+
+        self.mox.ReplayAll()
+
+        TextfileExporter(path, 15).write()
+
+        self.assertEquals(["xmppmote.prom"], os.listdir(self.directory))
+        self.assertEquals("metrics\n", open(path).read())
+
+    def test_write_failed(self):
+        """ Should the file not be replaced, no temporary file should be left
+        behind. """
+
+        path = os.path.join(self.directory, "xmppmote.prom")
+        os.mkdir(path)
+        open(os.path.join(path, "keep"), "w").close()
+
+        self.mox.StubOutWithMock(stats, "collect")
+        self.mox.StubOutWithMock(stats, "format_prometheus")
+        stats.collect().AndReturn("values")
+        stats.format_prometheus("values").AndReturn("metrics\n")
+
+        self.mox.ReplayAll()
+
+        TextfileExporter(path, 15).write()
+
+        self.assertEquals(["xmppmote.prom"], os.listdir(self.directory))
+
+
+if "__main__" == __name__:
+    unittest.main()
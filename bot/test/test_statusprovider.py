@@ -26,15 +26,17 @@ sys.path.append(os.path.abspath(".."))
 sys.path.append(os.path.abspath("../.."))
 
 import mox
+import subprocess
 import unittest
 
 from ConfigParser import SafeConfigParser
 from ConfigParser import NoOptionError
+import statusprovider
 from statusprovider import StatusProvider
 from bot.client import Client
+from lib import spawner
+from lib.scheduler import Scheduler
 from configuration.configurationparser import ConfigurationParser
-import threading
-import subprocess
 import logging
 
 class StatusProviderTest(mox.MoxTestBase):
@@ -52,36 +54,32 @@ class StatusProviderTest(mox.MoxTestBase):
     def test_existing_status_config_section(self):
         """ If we have an existing, properly configured status section,
         StatusProvider will, after having been started, execute the configured
-        command after the configured timeout has elapsed, by starting a
-        threading.Timer. """
+        command after the configured timeout has elapsed, by registering with
+        the Scheduler. """
 
         self.__setup_parser()
 
-        mock_timer = self.mox.CreateMockAnything()
+        mock_job = self.mox.CreateMockAnything()
+        mock_process = self.mox.CreateMockAnything()
 
         self.mox.StubOutWithMock(SafeConfigParser, "has_section")
         self.mox.StubOutWithMock(SafeConfigParser, "get")
-        self.mox.StubOutWithMock(threading, "Timer")
-        self.mox.StubOutWithMock(threading.Thread, "start")
-        self.mox.StubOutWithMock(subprocess.Popen, "__init__")
-        self.mox.StubOutWithMock(subprocess.Popen, "communicate")
+        self.mox.StubOutWithMock(Scheduler, "schedule")
+        self.mox.StubOutWithMock(spawner, "popen")
+        self.mox.StubOutWithMock(statusprovider, "read_output")
         self.mox.StubOutWithMock(Client, "change_status")
 
         SafeConfigParser.has_section("status").AndReturn(True)
         SafeConfigParser.get("status", "command").AndReturn("foobar")
         SafeConfigParser.get("status", "interval").AndReturn(3)
 
-        threading.Timer(3, mox.IgnoreArg()).AndReturn(mock_timer)
-        mock_timer.start()
+        Scheduler.schedule(3, mox.IgnoreArg()).AndReturn(mock_job)
 
-        subprocess.Popen.__init__("foobar", stdout = subprocess.PIPE)
-        subprocess.Popen.communicate().AndReturn(("result", ""))
+        spawner.popen("foobar").AndReturn(mock_process)
+        statusprovider.read_output(mock_process, 3).AndReturn("result")
 
         Client.change_status("result")
 
-        threading.Timer(3, mox.IgnoreArg()).AndReturn(mock_timer)
-        mock_timer.start()
-
         self.mox.ReplayAll()
 
         provider = StatusProvider()
@@ -89,9 +87,40 @@ class StatusProviderTest(mox.MoxTestBase):
         # We'll have to emulate a timeout here..
         provider.timeout()
 
+    def test_status_command_timeout(self):
+        """ The status command should be killed after STATUS_TIMEOUT seconds,
+        rather than being let to hold up the scheduler for the interval. """
+
+        self.__setup_parser()
+
+        mock_job = self.mox.CreateMockAnything()
+        mock_process = self.mox.CreateMockAnything()
+
+        self.mox.StubOutWithMock(SafeConfigParser, "has_section")
+        self.mox.StubOutWithMock(SafeConfigParser, "get")
+        self.mox.StubOutWithMock(Scheduler, "schedule")
+        self.mox.StubOutWithMock(spawner, "popen")
+        self.mox.StubOutWithMock(statusprovider, "read_output")
+
+        SafeConfigParser.has_section("status").AndReturn(True)
+        SafeConfigParser.get("status", "command").AndReturn("foobar")
+        SafeConfigParser.get("status", "interval").AndReturn(60)
+
+        Scheduler.schedule(60, mox.IgnoreArg()).AndReturn(mock_job)
+
+        spawner.popen("foobar").AndReturn(mock_process)
+        statusprovider.read_output(mock_process,
+                                   statusprovider.STATUS_TIMEOUT).AndReturn(None)
+
+        self.mox.ReplayAll()
+
+        provider = StatusProvider()
+        provider.start()
+        provider.timeout()
+
     def test_nonexisting_status_config_section(self):
-        """ If there is no status section in the configuration file, no timer
-        will be started, and no status updates will be performed. """
+        """ If there is no status section in the configuration file, no job
+        will be scheduled, and no status updates will be performed. """
 
         self.__setup_parser()
 
@@ -152,25 +181,24 @@ class StatusProviderTest(mox.MoxTestBase):
         self.__setup_parser()
 
         mock_logger = self.mox.CreateMockAnything()
-        mock_timer = self.mox.CreateMockAnything()
+        mock_job = self.mox.CreateMockAnything()
+        mock_process = self.mox.CreateMockAnything()
 
         self.mox.StubOutWithMock(SafeConfigParser, "has_section")
         self.mox.StubOutWithMock(SafeConfigParser, "get")
-        self.mox.StubOutWithMock(threading, "Timer")
-        self.mox.StubOutWithMock(threading.Thread, "start")
-        self.mox.StubOutWithMock(subprocess.Popen, "__init__")
-        self.mox.StubOutWithMock(subprocess.Popen, "communicate")
+        self.mox.StubOutWithMock(Scheduler, "schedule")
+        self.mox.StubOutWithMock(spawner, "popen")
+        self.mox.StubOutWithMock(statusprovider, "read_output")
         self.mox.StubOutWithMock(logging, "getLogger")
 
         SafeConfigParser.has_section("status").AndReturn(True)
         SafeConfigParser.get("status", "command").AndReturn("foobar")
         SafeConfigParser.get("status", "interval").AndReturn(3)
 
-        threading.Timer(3, mox.IgnoreArg()).AndReturn(mock_timer)
-        mock_timer.start()
+        Scheduler.schedule(3, mox.IgnoreArg()).AndReturn(mock_job)
 
-        subprocess.Popen.__init__("foobar", stdout = subprocess.PIPE)
-        subprocess.Popen.communicate().AndRaise(OSError)
+        spawner.popen("foobar").AndReturn(mock_process)
+        statusprovider.read_output(mock_process, 3).AndRaise(OSError)
 
         logging.getLogger().AndReturn(mock_logger)
         mock_logger.info(mox.IgnoreArg())
@@ -192,43 +220,37 @@ class StatusProviderTest(mox.MoxTestBase):
 
         self.__setup_parser()
 
-        mock_timer = self.mox.CreateMockAnything()
+        mock_job = self.mox.CreateMockAnything()
+        mock_process = self.mox.CreateMockAnything()
 
         self.mox.StubOutWithMock(SafeConfigParser, "has_section")
         self.mox.StubOutWithMock(SafeConfigParser, "get")
-        self.mox.StubOutWithMock(threading, "Timer")
-        self.mox.StubOutWithMock(threading.Thread, "start")
-        self.mox.StubOutWithMock(subprocess.Popen, "__init__")
-        self.mox.StubOutWithMock(subprocess.Popen, "communicate")
+        self.mox.StubOutWithMock(Scheduler, "schedule")
+        self.mox.StubOutWithMock(spawner, "popen")
+        self.mox.StubOutWithMock(statusprovider, "read_output")
         self.mox.StubOutWithMock(Client, "change_status")
 
         SafeConfigParser.has_section("status").AndReturn(True)
         SafeConfigParser.get("status", "command").AndReturn("foobar")
         SafeConfigParser.get("status", "interval").AndReturn(3)
 
-        threading.Timer(3, mox.IgnoreArg()).AndReturn(mock_timer)
-        mock_timer.start()
+        Scheduler.schedule(3, mox.IgnoreArg()).AndReturn(mock_job)
 
-        subprocess.Popen.__init__("foobar", stdout = subprocess.PIPE)
-        subprocess.Popen.communicate().AndReturn(("result", ""))
+        spawner.popen("foobar").AndReturn(mock_process)
+        statusprovider.read_output(mock_process, 3).AndReturn("result")
 
         Client.change_status("result")
 
-        threading.Timer(3, mox.IgnoreArg()).AndReturn(mock_timer)
-        mock_timer.start()
-
-        subprocess.Popen.__init__("foobar", stdout = subprocess.PIPE)
-        subprocess.Popen.communicate().AndReturn(("result", ""))
+        spawner.popen("foobar").AndReturn(mock_process)
+        statusprovider.read_output(mock_process, 3).AndReturn("result")
 
         # This time we expect no status change, since this is the same result as
         # returned previously..
         #Client.change_status("result")
 
-        threading.Timer(3, mox.IgnoreArg()).AndReturn(mock_timer)
-        mock_timer.start()
-
-        subprocess.Popen.__init__("foobar", stdout = subprocess.PIPE)
-        subprocess.Popen.communicate().AndReturn(("another result", ""))
+        spawner.popen("foobar").AndReturn(mock_process)
+        statusprovider.read_output(mock_process, 3).AndReturn(
+                "another result")
 
         Client.change_status("another result")
 
@@ -241,6 +263,19 @@ class StatusProviderTest(mox.MoxTestBase):
         provider.timeout()
         provider.timeout()
 
+    def test_read_output(self):
+        """ The output of a status command should be returned once it has
+        exited, while a command running for too long should be killed. """
+
+        subproc = subprocess.Popen(["echo", "result"], stdout = subprocess.PIPE,
+                                   preexec_fn = os.setsid)
+        self.assertEquals("result\n", statusprovider.read_output(subproc, 5))
+
+        subproc = subprocess.Popen(["sleep", "10"], stdout = subprocess.PIPE,
+                                   preexec_fn = os.setsid)
+        self.assertEquals(None, statusprovider.read_output(subproc, 0.1))
+        self.assertNotEqual(0, subproc.returncode)
+
 
 if "__main__" == __name__:
     unittest.main()
@@ -0,0 +1,212 @@
+#!/usr/bin/env python
+
+#Copyright (C) 2012 Niklas Thorne.
+
+#This file is part of XMPPMote.
+#
+#XMPPMote is free software: you can redistribute it and/or modify
+#it under the terms of the GNU General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+#
+#XMPPMote is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU General Public License for more details.
+#
+#You should have received a copy of the GNU General Public License
+#along with XMPPMote.  If not, see <http://www.gnu.org/licenses/>.
+
+""" This module tests the streammanagement module. """
+
+import sys
+import os
+
+sys.path.append(os.path.abspath(".."))
+sys.path.append(os.path.abspath("../.."))
+
+import mox
+import time
+import unittest
+
+from pyxmpp.all import JID
+from pyxmpp.all import Message
+
+from bench.standin import StandInServer
+from bot.streammanagement import COUNT_MODULUS
+from bot.streammanagement import ManagedStream
+from bot.streammanagement import StreamManager
+
+
+class StreamManagerTest(mox.MoxTestBase):
+    """ Provides test cases for the StreamManager type. """
+
+    def test_not_enabled(self):
+        """ Nothing should be counted or kept before management is enabled. """
+
+        manager = StreamManager()
+        manager.sent("<a/>")
+        manager.received()
+
+        self.assertEquals((0, 0), (manager.outbound, manager.inbound))
+        self.assertEquals(0, len(manager.unacked))
+
+    def test_acked(self):
+        """ Acknowledged stanzas should be forgotten, also once the count has
+        wrapped around. """
+
+        manager = StreamManager()
+        manager.enabled = True
+        manager.outbound = COUNT_MODULUS - 2
+
+        for data in ["<a/>", "<b/>", "<c/>", "<d/>"]:
+            manager.sent(data)
+
+        self.assertEquals(2, manager.outbound)
+
+        manager.acked(COUNT_MODULUS - 1)
+        self.assertEquals(["<b/>", "<c/>", "<d/>"], list(manager.unacked))
+
+        manager.acked(1)
+        self.assertEquals(["<d/>"], list(manager.unacked))
+
+        manager.acked(2)
+        self.assertEquals([], list(manager.unacked))
+
+    def test_max_unacked(self):
+        """ Only the latest MAX_UNACKED stanzas should be kept. """
+
+        self.mox.stubs.Set(StreamManager, "MAX_UNACKED", 2)
+
+        manager = StreamManager()
+        manager.enabled = True
+        for data in ["<a/>", "<b/>", "<c/>"]:
+            manager.sent(data)
+
+        self.assertEquals(["<b/>", "<c/>"], list(manager.unacked))
+
+    def test_reset(self):
+        """ Stanzas left unacknowledged should be kept as pending once the
+        session is forgotten. """
+
+        manager = StreamManager()
+        manager.enabled = True
+        manager.session_id = "foo"
+        manager.sent("<a/>")
+
+        manager.reset()
+
+        self.assertEquals(["<a/>"], manager.pending)
+        self.assertEquals(None, manager.session_id)
+        self.assertFalse(manager.enabled)
+
+
+class ManagedStreamTest(unittest.TestCase):
+    """ Provides test cases for the ManagedStream type, using the stand-in
+    server. """
+
+    def setUp(self):
+        self.received = []
+        self.server = StandInServer(on_stanza = self.__on_stanza)
+        self.server.start()
+
+        self.manager = StreamManager()
+        self.states = []
+
+    def tearDown(self):
+        self.server.stop()
+
+    def __on_stanza(self, jid, element):
+        body = element.findtext("{jabber:client}body")
+        if body:
+            self.received.append(body)
+
+    def __connect(self):
+        """ Returns a new stream, connected to the stand-in server, once it has
+        been authorized. """
+
+        stream = ManagedStream(jid = JID("bot@localhost/test"),
+                               password = "secret", server = "127.0.0.1",
+                               port = self.server.port,
+                               auth_methods = ["sasl:PLAIN"])
+        stream.manager = self.manager
+        stream.state_change = lambda state, arg: self.states.append(state)
+        stream.connect()
+
+        self.__run(stream, lambda: "authorized" in self.states)
+        del self.states[:]
+
+        return stream
+
+    @staticmethod
+    def __run(stream, condition):
+        """ Handle the input on _stream_ until _condition_ holds. """
+
+        deadline = time.time() + 5
+        while not condition() and time.time() < deadline:
+            stream.loop_iter(0.05)
+
+        assert condition()
+
+    def test_resume(self):
+        """ A session should be resumed, rather than a resource bound, and any
+        stanza that was not acknowledged should be sent again. """
+
+        stream = self.__connect()
+        stream.enable()
+        self.__run(stream, lambda: self.manager.session_id)
+
+        stream.send(Message(to_jid = JID("user@localhost"), body = u"one"))
+        stream.lock.acquire()
+        stream._request_ack()
+        stream.lock.release()
+        self.__run(stream, lambda: not self.manager.unacked)
+
+        # the stream has not noticed that its connection is gone, when sending
+        self.server.drop_connections()
+        time.sleep(0.1)
+        stream.send(Message(to_jid = JID("user@localhost"), body = u"two"))
+        self.assertEquals(1, len(self.manager.unacked))
+
+        stream = self.__connect()
+        self.assertTrue(self.manager.resuming)
+        self.__run(stream, lambda: ["one", "two"] == self.received)
+
+        stream.close()
+
+    def test_new_session(self):
+        """ Should there be no session to resume, the session should be managed
+        anew once the new stream has started, and any stanza that was not
+        acknowledged should be sent again. """
+
+        stream = self.__connect()
+        stream.enable()
+
+        # the server is only asked to manage the session at this point
+        self.assertTrue(self.manager.requested)
+        self.assertFalse(self.manager.enabled)
+        self.__run(stream, lambda: self.manager.enabled)
+
+        # as if the server had not allowed the session to be resumed
+        self.manager.session_id = None
+
+        self.server.drop_connections()
+        time.sleep(0.1)
+        stream.send(Message(to_jid = JID("user@localhost"), body = u"one"))
+        self.assertEquals(1, len(self.manager.unacked))
+
+        stream = self.__connect()
+        self.assertFalse(self.manager.resuming)
+        self.assertFalse(self.manager.enabled)
+        self.assertEquals(1, len(self.manager.pending))
+
+        stream.enable()
+        self.__run(stream, lambda: ["one"] == self.received)
+        self.__run(stream, lambda: self.manager.enabled)
+        self.assertEquals([], self.manager.pending)
+
+        stream.close()
+
+
+if "__main__" == __name__:
+    unittest.main()
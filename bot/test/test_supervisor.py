@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+
+#Copyright (C) 2012 Niklas Thorne.
+
+#This file is part of XMPPMote.
+#
+#XMPPMote is free software: you can redistribute it and/or modify
+#it under the terms of the GNU General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+#
+#XMPPMote is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU General Public License for more details.
+#
+#You should have received a copy of the GNU General Public License
+#along with XMPPMote.  If not, see <http://www.gnu.org/licenses/>.
+
+""" This module tests the supervisor module. """
+
+import sys
+import os
+
+sys.path.append(os.path.abspath(".."))
+sys.path.append(os.path.abspath("../.."))
+
+import mox
+import socket
+import unittest
+
+from bot import supervisor
+from bot.supervisor import Supervisor
+
+
+class SupervisorTest(mox.MoxTestBase):
+    """ Provides test cases for the Supervisor type. """
+
+    def setUp(self):
+        super(SupervisorTest, self).setUp()
+
+        self.mox.stubs.Set(Supervisor, "BASE_DELAY", 0)
+        self.client = self.mox.CreateMockAnything()
+
+    def test_retry_connect(self):
+        """ Failed connection attempts should be retried, and the client loop
+        should be run once connected. """
+
+        before = Supervisor().metrics()
+
+        self.client.connect().AndRaise(socket.error("refused"))
+        self.client.connect().AndRaise(socket.error("refused"))
+        self.client.connect()
+        self.client.loop()
+        self.client.is_closed().AndReturn(True)
+
+        self.mox.ReplayAll()
+
+        Supervisor().run(self.client)
+
+        after = Supervisor().metrics()
+        self.assertEquals(2, after["failed_attempts"] -
+                             before["failed_attempts"])
+        self.assertEquals(before["reconnects"], after["reconnects"])
+        self.assertFalse(after["connected"])
+
+    def test_reconnect(self):
+        """ The client should be reconnected when its loop ends without it
+        having been disconnected on purpose, and the time taken to reconnect
+        should be recorded. """
+
+        self.mox.StubOutWithMock(supervisor, "monotonic")
+
+        before = Supervisor().metrics()
+
+        self.client.connect()
+        supervisor.monotonic().AndReturn(10.0)
+        self.client.loop().AndRaise(socket.error("reset"))
+        self.client.is_closed().AndReturn(False)
+        supervisor.monotonic().AndReturn(20.0)
+
+        self.client.connect()
+        supervisor.monotonic().AndReturn(23.5)
+        self.client.loop()
+        self.client.is_closed().AndReturn(True)
+
+        self.mox.ReplayAll()
+
+        Supervisor().run(self.client)
+
+        after = Supervisor().metrics()
+        self.assertEquals(1, after["reconnects"] - before["reconnects"])
+        self.assertEquals(3.5, after["last_reconnect_seconds"])
+        self.assertTrue(3.5 <= after["max_reconnect_seconds"])
+
+    def test_stop(self):
+        """ No reconnection should be attempted once stopped. """
+
+        self.client.connect()
+        self.client.loop().WithSideEffects(Supervisor().stop)
+        self.client.is_closed().AndReturn(False)
+
+        self.mox.ReplayAll()
+
+        Supervisor().run(self.client)
+
+
+if "__main__" == __name__:
+    unittest.main()
@@ -0,0 +1,144 @@
+#!/usr/bin/env python
+
+#Copyright (C) 2012 Niklas Thorne.
+
+#This file is part of XMPPMote.
+#
+#XMPPMote is free software: you can redistribute it and/or modify
+#it under the terms of the GNU General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+#
+#XMPPMote is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU General Public License for more details.
+#
+#You should have received a copy of the GNU General Public License
+#along with XMPPMote.  If not, see <http://www.gnu.org/licenses/>.
+""" This module tests the throttle module. """
+
+import sys
+import os
+
+sys.path.append(os.path.abspath(".."))
+sys.path.append(os.path.abspath("../.."))
+
+import mox
+import unittest
+
+from bot.throttle import Limit
+from bot.throttle import Throttle
+from lib import tokenbucket
+
+
+class FakeRequest(object):
+    """ A request made by _requester_. """
+
+    def __init__(self, requester):
+        self.__requester = requester
+
+    def requester(self):
+        return self.__requester
+
+
+class ThrottleTest(mox.MoxTestBase):
+    """ Provides test cases for the Throttle type. """
+
+    def tearDown(self):
+        Throttle().configure(None, None)
+        super(ThrottleTest, self).tearDown()
+
+    def test_unconfigured(self):
+        """ Nothing should be throttled until limits are given. """
+
+        throttle = Throttle()
+        throttle.configure(None, None)
+
+        for _ in range(100):
+            self.assertTrue(throttle.acquire(None))
+
+    def test_requester_jobs(self):
+        """ A requester should not be allowed more than its number of jobs at
+        once, without affecting other requesters. """
+
+        throttle = Throttle(Limit(0, 1, 2), Limit(0, 1, 0))
+        alice = FakeRequest(u"alice@example.com")
+        bob = FakeRequest(u"bob@example.com")
+
+        self.assertTrue(throttle.acquire(alice))
+        self.assertTrue(throttle.acquire(alice))
+        self.assertFalse(throttle.acquire(alice))
+        self.assertTrue(throttle.acquire(bob))
+
+        throttle.release(alice)
+        self.assertTrue(throttle.acquire(alice))
+
+    def test_overall_jobs(self):
+        """ No more than the overall number of jobs should be allowed at
+        once. """
+
+        throttle = Throttle(Limit(0, 1, 0), Limit(0, 1, 1))
+        alice = FakeRequest(u"alice@example.com")
+        bob = FakeRequest(u"bob@example.com")
+
+        self.assertTrue(throttle.acquire(alice))
+        self.assertFalse(throttle.acquire(bob))
+
+        throttle.release(alice)
+        self.assertTrue(throttle.acquire(bob))
+
+    def test_rates(self):
+        """ Once a requester has used up its burst, it should be throttled,
+        as should everyone once the overall burst is used up. """
+
+        throttle = Throttle(Limit(0.001, 2, 0), Limit(0.001, 3, 0))
+        alice = FakeRequest(u"alice@example.com")
+        bob = FakeRequest(u"bob@example.com")
+
+        self.assertTrue(throttle.acquire(alice))
+        self.assertTrue(throttle.acquire(alice))
+        self.assertFalse(throttle.acquire(alice))
+
+        self.assertTrue(throttle.acquire(bob))
+        self.assertFalse(throttle.acquire(bob))
+
+    def test_overall_rate_refunds(self):
+        """ A requester throttled by the overall rate should not lose its own
+        token for the request. """
+
+        now = [10.0]
+        self.mox.stubs.Set(tokenbucket, "monotonic", lambda: now[0])
+
+        throttle = Throttle(Limit(0.001, 2, 0), Limit(1, 1, 0))
+        alice = FakeRequest(u"alice@example.com")
+        bob = FakeRequest(u"bob@example.com")
+
+        self.assertTrue(throttle.acquire(bob))
+        self.assertFalse(throttle.acquire(alice))
+        self.assertFalse(throttle.acquire(alice))
+
+        # alice still has her full burst once the overall rate allows
+        for _ in range(2):
+            now[0] += 1
+            self.assertTrue(throttle.acquire(alice))
+
+        now[0] += 1
+        self.assertFalse(throttle.acquire(alice))
+
+    def test_buckets_are_bounded(self):
+        """ Rate limiting state should only be kept for MAX_REQUESTERS
+        requesters. """
+
+        self.mox.stubs.Set(Throttle, "MAX_REQUESTERS", 2)
+
+        throttle = Throttle(Limit(0.001, 1, 0), Limit(0, 1, 0))
+        for name in ["alice", "bob", "carol"]:
+            self.assertTrue(throttle.acquire(FakeRequest(name)))
+
+        self.assertEquals(2, len(throttle._Throttle__buckets))
+        self.assertFalse(throttle.acquire(FakeRequest("carol")))
+
+
+if "__main__" == __name__:
+    unittest.main()
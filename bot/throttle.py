@@ -0,0 +1,156 @@
+#Copyright (C) 2012 Niklas Thorne.
+
+#This file is part of XMPPMote.
+#
+#XMPPMote is free software: you can redistribute it and/or modify
+#it under the terms of the GNU General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+#
+#XMPPMote is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU General Public License for more details.
+#
+#You should have received a copy of the GNU General Public License
+#along with XMPPMote.  If not, see <http://www.gnu.org/licenses/>.
+
+""" This module contains the Throttle type.
+
+The Throttle limits the rate at which requests are accepted, and the number of
+requests that are handled at once, both for each requester and overall, so that
+a single requester cannot starve the others. """
+
+import os
+import sys
+
+sys.path.append(os.path.abspath('..'))
+from lib import borg
+from lib.tokenbucket import TokenBucket
+
+import collections
+import threading
+
+
+class Limit(object):
+    """ This type describes a limit of _rate_ requests per second, allowing
+    bursts of _burst_ requests, and of _jobs_ requests being handled at once. A
+    rate or number of jobs of 0 is not limited. """
+
+    def __init__(self, rate, burst, jobs):
+        self.rate = rate
+        self.burst = burst
+        self.jobs = jobs
+
+    def make_bucket(self):
+        """ Returns a TokenBucket enforcing the rate limit, or None if the rate
+        is not limited. """
+
+        if 0 >= self.rate:
+            return None
+
+        return TokenBucket(self.rate, self.burst)
+
+
+class Throttle(borg.make_borg()):
+    """ This type decides whether requests are to be handled, as detailed by
+    the _requester_ Limit, applied to each requester, and the _overall_ Limit,
+    applied to all requests. Until limits are given, nothing is throttled. """
+
+    # the number of requesters for which rate limiting state is kept
+    MAX_REQUESTERS = 1024
+
+    def __init__(self, requester = None, overall = None):
+        super(Throttle, self).__init__()
+
+        if not hasattr(self, "_Throttle__lock"):
+            self.__lock = threading.Lock()
+            self.__requester = None
+            self.__overall = None
+
+        if None != requester and None != overall:
+            self.configure(requester, overall)
+
+    def configure(self, requester, overall):
+        """ Apply the _requester_ and _overall_ Limits to any further requests.
+        Passing None for both stops throttling. """
+
+        with self.__lock:
+            self.__requester = requester
+            self.__overall = overall
+
+            self.__buckets = collections.OrderedDict()
+            self.__bucket = overall and overall.make_bucket()
+            self.__jobs = {}
+            self.__total_jobs = 0
+
+    def acquire(self, request):
+        """ Returns True if _request_ may be handled, in which case release
+        must be called once it has been handled, or False if it is to be
+        throttled. Requests are told apart by request.requester(). """
+
+        with self.__lock:
+            if not self.__requester:
+                return True
+
+            requester = request.requester()
+            jobs = self.__jobs.get(requester, 0)
+
+            if self.__requester.jobs and jobs >= self.__requester.jobs:
+                return False
+            if self.__overall.jobs and \
+               self.__total_jobs >= self.__overall.jobs:
+                return False
+
+            bucket = self.__get_bucket(requester)
+            if bucket and not bucket.consume():
+                return False
+            if self.__bucket and not self.__bucket.consume():
+                # the requester is not to blame, so its token is put back
+                if bucket:
+                    bucket.refund()
+                return False
+
+            self.__jobs[requester] = jobs + 1
+            self.__total_jobs += 1
+
+        return True
+
+    def release(self, request):
+        """ Called once _request_, which acquire allowed, has been handled. """
+
+        with self.__lock:
+            if not self.__requester:
+                return
+
+            requester = request.requester()
+            jobs = self.__jobs.pop(requester, 0) - 1
+
+            if 0 < jobs:
+                self.__jobs[requester] = jobs
+
+            self.__total_jobs = max(0, self.__total_jobs - 1)
+
+    def __get_bucket(self, requester):
+        """ Returns the TokenBucket of _requester_, making it the most recently
+        used one. Once there are too many buckets, full buckets are forgotten
+        (their requesters would be allowed a full burst anyway), and then the
+        least recently used ones. """
+
+        bucket = self.__buckets.pop(requester, None)
+        if not bucket:
+            bucket = self.__requester.make_bucket()
+            if not bucket:
+                return None
+
+        self.__buckets[requester] = bucket
+
+        if len(self.__buckets) > self.MAX_REQUESTERS:
+            for (key, value) in self.__buckets.items():
+                if key != requester and value.is_full():
+                    del self.__buckets[key]
+
+            while len(self.__buckets) > self.MAX_REQUESTERS:
+                self.__buckets.popitem(last = False)
+
+        return bucket
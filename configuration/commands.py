@@ -25,6 +25,7 @@ set to be used by that command handler. """
 
 import sys
 import os
+import re
 
 sys.path.append(os.path.abspath('..'))
 
@@ -36,6 +37,32 @@ from ConfigParser import NoSectionError
 from ConfigParser import NoOptionError
 
 
+# the option in the commands section that holds the default command settings
+DEFAULTS_OPTION = "defaults"
+
+# a single name=value pair of a comma separated list of settings
+SETTING_REGEX = re.compile(r"^\s*\w+\s*=")
+
+# the settings that may be given for a command, along with their default values
+DEFAULT_SETTINGS = {
+    "stream":           False,
+    "chunk_size":       4096,
+    "chunk_interval":   2.0,
+    "head_size":        4096,
+    "tail_size":        4096,
+    "page_size":        8192,
+    "spill_size":       1048576,
+    "cache":            False,
+    "cache_ttl":        30.0,
+    "timeout":          60.0,
+}
+
+BOOLEAN_VALUES = {
+    "1": True, "yes": True, "true": True, "on": True,
+    "0": False, "no": False, "false": False, "off": False
+}
+
+
 class UnknownHandler(Exception):
     """ This exception is raised whenever XMPPMote cannot locate a known command
     handler in the configuration file. """
@@ -48,13 +75,135 @@ class MalformedCommand(Exception):
     pass
 
 
+class CommandIndex(object):
+    """ This type indexes a restricted command set, so that a message body can
+    be looked up in constant time, rather than by matching it against each
+    command in the set. """
+
+    def __init__(self, command_set):
+        self.__commands = {}
+        self.__help = {}
+
+        lines = []
+        for (command, args, hlp) in command_set:
+            line = "%s - %s" % (command, hlp)
+            lines.append(line)
+
+            if command in self.__help:
+                self.__help[command] = "%s\n%s" % (self.__help[command], line)
+            else:
+                self.__help[command] = line
+
+            self.__commands[command] = (command, args)
+
+        self.__help_all = "\n".join(lines) or None
+
+    def __len__(self):
+        return len(self.__commands)
+
+    def get_command(self, body):
+        """ Returns the (command, args) tuple of the command that _body_ names,
+        or None if there is no such command in the set. """
+
+        return self.__commands.get(body)
+
+    def get_help(self, body):
+        """ Returns the help text requested by _body_, i.e. the help of every
+        command if _body_ is "help", or the help of a single command if _body_
+        is "help <command>". None is returned if _body_ is not a help request
+        for a command in the set. """
+
+        if not body.startswith("help"):
+            return None
+
+        rest = body[4:]
+        if rest and not rest[0].isspace():
+            return None
+
+        command = rest.strip()
+        if not command:
+            return self.__help_all
+
+        return self.__help.get(command)
+
+
 def get_command_handler():
-    """ Returns the command handler that is to parse incoming commands. """
+    """ Returns the command handler that is to parse incoming commands. The
+    handler is constructed upon first call, and is then only constructed anew
+    if the configuration has changed. """
+
+    return __cached("command_handler", __make_command_handler)
+
+def restricted_set():
+    """ Returns the restricted command set to be allowed (if the
+        RestrictedCommandHandler is to be used). The command set is defined
+        as a tuple of tuples of (cmd, args, help), where cmd is the command
+        to execute in a shell, args is the command arguments, and hlp
+        is the help to display upon receiving the help command. The command
+        set is only read anew if the configuration has changed. """
+
+    return __cached("restricted_set", __read_restricted_set)
+
+
+def command_settings(command):
+    """ Returns a dict holding the settings of _command_, as given by the
+    optional last field of its definition, e.g.
+
+        command1: dmesg::Show kernel messages:stream=yes
+
+    and by the defaults option of the commands section, e.g.
+
+        defaults: stream=no, chunk_size=4096
+
+    Commands without settings of their own (e.g. any command when using the
+    passthru handler) get the default settings. The returned dict must not be
+    modified. MalformedCommand is raised should the settings of _command_ be
+    malformed, leaving any other command unaffected. """
+
+    (defaults, settings) = __cached("command_settings", __read_settings)
+
+    result = settings.get(command, defaults)
+    if isinstance(result, MalformedCommand):
+        raise result
+
+    return result
+
+
+def command_index():
+    """ Returns a CommandIndex of the restricted command set. The index is
+    built upon first call, and is then only rebuilt if the configuration has
+    changed since it was built. """
+
+    return __cached("command_index", lambda: CommandIndex(restricted_set()))
+
+
+# values derived from the configuration by the functions above, as (generation,
+# value) tuples keyed by function
+__cache = {}
+
+
+def __cached(key, make):
+    """ Returns the value cached under _key_, calling _make_ in order to
+    (re)construct the value if it was derived from an older configuration
+    generation. """
+
+    generation = ConfigurationParser().generation()
+
+    entry = __cache.get(key)
+    if not entry or entry[0] != generation:
+        entry = (generation, make())
+        __cache[key] = entry
+
+    return entry[1]
+
+
+def __make_command_handler():
+    """ Construct the command handler detailed by the configuration. """
 
     config = ConfigurationParser()
     handlers = {
-        "restricted":   RestrictedCommandHandler(),
-        "passthru":     UnsafeCommandHandler()
+        "restricted":   RestrictedCommandHandler,
+        "passthru":     UnsafeCommandHandler
     }
 
     try:
@@ -69,23 +218,111 @@ def get_command_handler():
     if not result:
         raise UnknownHandler("unknown handler (valid are restricted/passthru")
 
+    return result()
+
+
+def __read_restricted_set():
+    """ Read the restricted command set from the configuration. """
+
+    result = ()
+
+    config = ConfigurationParser()
+    if config.has_section("commands"):
+        options = config.items("commands")
+
+        result = tuple(map(__transform_set,
+                           [__split_definition(value)[0]
+                            for (key, value) in options
+                            if not __is_defaults(key, value)]))
+
     return result
 
-def restricted_set():
-    """ Returns the restricted command set to be allowed (if the
-        RestrictedCommandHandler is to be used). The command set is defined
-        as a List of tuples of (cmd, args, help), where cmd is the command
-        to execute in a shell, args is the command arguments, and hlp
-        is the help to display upon receiving the help command. """
 
-    result = []
+def __read_settings():
+    """ Read the default command settings, and the settings of each command,
+    from the configuration. The settings of a command whose settings are
+    malformed are the MalformedCommand raised when parsing them. """
+
+    defaults = dict(DEFAULT_SETTINGS)
+    settings = {}
 
     config = ConfigurationParser()
     if config.has_section("commands"):
         options = config.items("commands")
 
-        result = map(__transform_set, 
-                     [tuple(value.split(':')) for (_, value) in options])
+        for (key, value) in options:
+            if __is_defaults(key, value):
+                defaults = __parse_settings(value, defaults)
+
+        for (key, value) in options:
+            (fields, text) = __split_definition(value)
+            if not __is_defaults(key, value) and None != text:
+                try:
+                    settings[fields[0]] = __parse_settings(text, defaults)
+                except MalformedCommand, exc:
+                    settings[fields[0]] = MalformedCommand("%s: %s" %
+                                                           (key, exc))
+
+    return (defaults, settings)
+
+
+def __is_settings(text):
+    """ Returns whether _text_ is a comma separated list of name=value pairs,
+    and nothing else. """
+
+    return all([SETTING_REGEX.match(item)
+                for item in text.split(',') if item.strip()])
+
+
+def __is_defaults(key, value):
+    """ Returns whether the option _key_, holding _value_, sets the default
+    command settings. A defaults option that is not a list of settings is
+    taken to be a command definition, as it was before settings existed. """
+
+    return DEFAULTS_OPTION == key and __is_settings(value)
+
+
+def __split_definition(value):
+    """ Splits the command definition _value_ into a tuple of its (cmd, args,
+    help) fields, and its settings, which are None unless the definition ends
+    with a field of name=value pairs. Any other ':' after the args is part of
+    the help. """
+
+    fields = value.split(':')
+
+    text = None
+    if 3 < len(fields) and __is_settings(fields[-1]):
+        text = fields.pop()
+
+    if 2 < len(fields):
+        fields[2:] = [':'.join(fields[2:])]
+
+    return (tuple(fields), text)
+
+
+def __parse_settings(text, defaults):
+    """ Returns a copy of the _defaults_ dict, updated with the comma separated
+    name=value pairs in _text_. Values are converted to the type of the
+    corresponding default value. """
+
+    result = dict(defaults)
+
+    for setting in filter(None, [item.strip() for item in text.split(',')]):
+        (name, _, value) = [item.strip() for item in setting.partition('=')]
+
+        if name not in DEFAULT_SETTINGS:
+            raise MalformedCommand("unknown command setting: %s" % name)
+
+        try:
+            default = DEFAULT_SETTINGS[name]
+            if isinstance(default, bool):
+                value = BOOLEAN_VALUES[value.lower()]
+            else:
+                value = type(default)(value)
+        except (KeyError, ValueError):
+            raise MalformedCommand("malformed command setting: %s" % setting)
+
+        result[name] = value
 
     return result
     
@@ -111,6 +348,6 @@ def __transform_set(tupl):
         raise MalformedCommand
 
     if snd:
-        snd = [snd]
+        snd = (snd, )
 
     return (fst, snd, thrd)
@@ -29,6 +29,15 @@ sys.path.append(os.path.abspath(".."))
 from lib import borg
 
 from ConfigParser import SafeConfigParser
+from ConfigParser import NoSectionError
+from ConfigParser import NoOptionError
+
+import logging
+import time
+
+
+# minimum number of seconds between checks for changes to the configuration file
+STAT_INTERVAL = 1.0
 
 
 class FileNotFoundException(Exception):
@@ -41,6 +50,14 @@ class ConfigurationParser(borg.make_borg()):
     presenting the XMPPMote configuration file's key-value pairs to the
     application. """
 
+    # incremented whenever the configuration may have changed
+    __generation = 0
+
+    # (inode, mtime, size) of the configuration file as last read or written,
+    # and the time at which that was last checked
+    __signature = None
+    __checked = 0
+
     def __init__(self):
         super(ConfigurationParser, self).__init__()
 
@@ -55,6 +72,43 @@ class ConfigurationParser(borg.make_borg()):
 
         self.__parser.read(rcfile.name)
         self.__fp = rcfile
+        self.__path = os.path.abspath(rcfile.name)
+        self.__signature = self.__stat()
+        self.__generation += 1
+
+    def generation(self):
+        """ Returns a number that changes whenever the configuration might have
+        changed, for callers that cache values derived from the configuration.
+
+        If the configuration file has been modified or replaced since it was
+        read, it is read anew. """
+
+        now = time.time()
+        if self.__signature and now - self.__checked >= STAT_INTERVAL:
+            self.__checked = now
+
+            signature = self.__stat()
+            if signature and signature != self.__signature:
+                self.__reread(signature)
+
+        return self.__generation
+
+    def get_default(self, section, option, default = None):
+        """ Return the value of _option_ in _section_, converted to the type of
+        _default_, or _default_ itself if the option is missing or malformed. """
+
+        try:
+            if isinstance(default, bool):
+                return self.__parser.getboolean(section, option)
+
+            value = self.__parser.get(section, option)
+
+            if isinstance(default, (int, float)):
+                value = type(default)(value)
+        except (NoSectionError, NoOptionError, ValueError):
+            value = default
+
+        return value
 
     def __getattr__(self, attrib):
         """ This implements the proxy pattern, effectively delegating any
@@ -80,6 +134,42 @@ class ConfigurationParser(borg.make_borg()):
     def __save_state(self):
         """ Tiny helper function for saving the configuration state to disk. """
 
+        self.__generation += 1
+
         self.__fp.truncate(0)
         self.__parser.write(self.__fp)
         self.__fp.flush()
+
+        self.__signature = self.__stat()
+
+    def __stat(self):
+        """ Returns the (inode, mtime, size) signature of the configuration
+        file, or None if it cannot be determined. """
+
+        try:
+            stat = os.stat(self.__path)
+        except OSError:
+            return None
+
+        return (stat.st_ino, stat.st_mtime, stat.st_size)
+
+    def __reread(self, signature):
+        """ Read the configuration file anew, since it has been changed (as
+        detailed by _signature_) by someone else. """
+
+        logger = logging.getLogger()
+        logger.info(u"%s has changed, re-reading configuration" % self.__path)
+
+        # the file may have been replaced rather than modified, in which case
+        # our file object refers to the old file
+        if signature[0] != self.__signature[0]:
+            mode = self.__fp.mode
+            self.__fp.close()
+            self.__fp = open(self.__path, mode)
+
+        parser = SafeConfigParser()
+        parser.read(self.__path)
+
+        self.__parser = parser
+        self.__signature = signature
+        self.__generation += 1
@@ -0,0 +1,45 @@
+#!/usr/bin/env python
+
+#Copyright (C) 2012 Niklas Thorne.
+
+#This file is part of XMPPMote.
+#
+#XMPPMote is free software: you can redistribute it and/or modify
+#it under the terms of the GNU General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+#
+#XMPPMote is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU General Public License for more details.
+#
+
+""" This module contains functions used to determine how to connect to the XMPP
+server from the configuration data. """
+
+from configurationparser import ConfigurationParser
+
+
+DEFAULT_PORT = 5222
+DEFAULT_AUTH_METHODS = ("sasl:DIGEST-MD5", "digest")
+
+
+def get_connection():
+    """ Returns a (server, port, auth_methods) tuple, as detailed by the
+    connection section. server is the configured server, or None should no
+    server be configured, in which case the server is looked up by the domain
+    of the JID. The port and the auth_methods default to DEFAULT_PORT and
+    DEFAULT_AUTH_METHODS. """
+
+    config = ConfigurationParser()
+
+    server = config.get_default("connection", "server") or None
+    port = config.get_default("connection", "port", DEFAULT_PORT)
+
+    auth_methods = tuple(filter(None, [method.strip() for method in
+                                       config.get_default("connection",
+                                                          "auth_methods",
+                                                          "").split(",")]))
+
+    return (server, port, auth_methods or DEFAULT_AUTH_METHODS)
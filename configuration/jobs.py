@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+
+#Copyright (C) 2012 Niklas Thorne.
+
+#This file is part of XMPPMote.
+#
+#XMPPMote is free software: you can redistribute it and/or modify
+#it under the terms of the GNU General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+#
+#XMPPMote is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU General Public License for more details.
+#
+#You should have received a copy of the GNU General Public License
+#along with XMPPMote.  If not, see <http://www.gnu.org/licenses/>.
+
+""" This module contains functions used to construct the command execution
+machinery from the configuration data. """
+
+import sys
+import os
+
+sys.path.append(os.path.abspath(".."))
+
+from bot.client import Client
+from bot.jobexecutor import JobExecutor
+from bot.throttle import Limit
+from bot.throttle import Throttle
+
+from configurationparser import ConfigurationParser
+
+
+DEFAULT_WORKERS = 4
+DEFAULT_QUEUE_SIZE = 64
+DEFAULT_SEND_QUEUE_SIZE = Client.QUEUE_SIZE
+
+# (rate, burst, jobs) limits applied to each requester, and to all requests
+DEFAULT_REQUESTER_LIMIT = (0.5, 5, 2)
+DEFAULT_OVERALL_LIMIT = (5.0, 20, 16)
+
+
+def get_job_executor():
+    """ Construct and return a JobExecutor from the configuration data. """
+
+    config = ConfigurationParser()
+
+    workers = config.get_default("jobs", "workers", DEFAULT_WORKERS)
+    queue_size = config.get_default("jobs", "queue_size", DEFAULT_QUEUE_SIZE)
+
+    return JobExecutor(max(1, workers), max(1, queue_size))
+
+
+def get_send_queue_size():
+    """ Returns the number of outbound stanzas that may be queued, as detailed
+    by the configuration data. """
+
+    config = ConfigurationParser()
+
+    return max(1, config.get_default("jobs", "send_queue_size",
+                                     DEFAULT_SEND_QUEUE_SIZE))
+
+
+def get_throttle():
+    """ Construct and return a Throttle from the configuration data. """
+
+    config = ConfigurationParser()
+
+    def get_limit(prefix, defaults):
+        """ Returns the Limit detailed by the options named by _prefix_. """
+
+        (rate, burst, jobs) = defaults
+
+        return Limit(
+            max(0.0, config.get_default("throttle", prefix + "rate", rate)),
+            max(1, config.get_default("throttle", prefix + "burst", burst)),
+            max(0, config.get_default("throttle", prefix + "jobs", jobs)))
+
+    return Throttle(get_limit("", DEFAULT_REQUESTER_LIMIT),
+                    get_limit("global_", DEFAULT_OVERALL_LIMIT))
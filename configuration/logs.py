@@ -0,0 +1,60 @@
+#!/usr/bin/env python
+
+#Copyright (C) 2012 Niklas Thorne.
+
+#This file is part of XMPPMote.
+#
+#XMPPMote is free software: you can redistribute it and/or modify
+#it under the terms of the GNU General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+#
+#XMPPMote is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU General Public License for more details.
+#
+
+""" This module contains functions used to construct the logging machinery from
+the configuration data. """
+
+import sys
+import os
+
+sys.path.append(os.path.abspath(".."))
+
+from lib import queuehandler
+from lib.queuehandler import QueueHandler
+
+from configurationparser import ConfigurationParser
+
+
+DEFAULT_QUEUED = True
+DEFAULT_QUEUE_SIZE = 1024
+DEFAULT_OVERFLOW = queuehandler.DROP_OLD
+DEFAULT_BATCH_SIZE = 64
+
+
+def get_log_handler(target):
+    """ Returns the handler that log records are to be given, as detailed by
+    the configuration data. That is either _target_ itself, or a started
+    QueueHandler passing the records on to _target_ from a thread of its own.
+    """
+
+    config = ConfigurationParser()
+
+    if not config.get_default("logging", "queued", DEFAULT_QUEUED):
+        return target
+
+    overflow = config.get_default("logging", "overflow", DEFAULT_OVERFLOW)
+    if overflow not in queuehandler.OVERFLOW_POLICIES:
+        overflow = DEFAULT_OVERFLOW
+
+    handler = QueueHandler(
+        target,
+        max(1, config.get_default("logging", "queue_size", DEFAULT_QUEUE_SIZE)),
+        overflow,
+        max(1, config.get_default("logging", "batch_size", DEFAULT_BATCH_SIZE)))
+    handler.start()
+
+    return handler
@@ -0,0 +1,46 @@
+#!/usr/bin/env python
+
+#Copyright (C) 2012 Niklas Thorne.
+
+#This file is part of XMPPMote.
+#
+#XMPPMote is free software: you can redistribute it and/or modify
+#it under the terms of the GNU General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+#
+#XMPPMote is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU General Public License for more details.
+#
+
+""" This module contains functions used to construct the exporting of the
+daemon's counters from the configuration data. """
+
+import sys
+import os
+
+sys.path.append(os.path.abspath(".."))
+
+from bot.stats import TextfileExporter
+
+from configurationparser import ConfigurationParser
+
+
+DEFAULT_INTERVAL = 15
+
+
+def get_exporter():
+    """ Construct and return a TextfileExporter from the configuration data, or
+    None if no file is configured. """
+
+    config = ConfigurationParser()
+
+    path = config.get_default("stats", "textfile")
+    if not path:
+        return None
+
+    interval = config.get_default("stats", "interval", DEFAULT_INTERVAL)
+
+    return TextfileExporter(path, max(1, interval))
@@ -0,0 +1,51 @@
+#!/usr/bin/env python
+
+#Copyright (C) 2012 Niklas Thorne.
+
+#This file is part of XMPPMote.
+#
+#XMPPMote is free software: you can redistribute it and/or modify
+#it under the terms of the GNU General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+#
+#XMPPMote is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU General Public License for more details.
+#
+
+""" This module contains functions used to construct the sampling profiler from
+the configuration data. """
+
+import sys
+import os
+
+sys.path.append(os.path.abspath(".."))
+
+from lib.profiler import Profiler
+
+from configurationparser import ConfigurationParser
+
+
+def get_profiler():
+    """ Construct and return the Profiler from the configuration data. """
+
+    config = ConfigurationParser()
+
+    rate = config.get_default("profiler", "rate", Profiler.DEFAULT_RATE)
+    path = config.get_default("profiler", "output", Profiler.DEFAULT_PATH)
+
+    return Profiler(min(1000, max(1, rate)), path)
+
+
+def get_admins():
+    """ Returns the set of bare JIDs that may start and stop the profiler, as
+    detailed by the configuration data. """
+
+    config = ConfigurationParser()
+
+    admins = config.get_default("profiler", "admins", "")
+
+    return frozenset(filter(None, [jid.strip().lower()
+                                   for jid in admins.split(",")]))
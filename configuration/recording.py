@@ -0,0 +1,51 @@
+#!/usr/bin/env python
+
+#Copyright (C) 2012 Niklas Thorne.
+
+#This file is part of XMPPMote.
+#
+#XMPPMote is free software: you can redistribute it and/or modify
+#it under the terms of the GNU General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+#
+#XMPPMote is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU General Public License for more details.
+#
+
+""" This module contains functions used to construct the traffic recording from
+the configuration data. """
+
+import sys
+import os
+
+sys.path.append(os.path.abspath(".."))
+
+from bot.recorder import Recorder
+
+from configurationparser import ConfigurationParser
+
+import logging
+
+
+def get_recorder():
+    """ Returns the Recorder, recording to the file detailed by the
+    configuration data, or None if no file is configured. """
+
+    config = ConfigurationParser()
+
+    path = config.get_default("recorder", "file")
+    if not path:
+        return None
+
+    recorder = Recorder()
+    try:
+        recorder.open(path)
+    except IOError, exc:
+        logger = logging.getLogger()
+        logger.error(u"not recording traffic: %s" % repr(exc))
+        return None
+
+    return recorder
@@ -35,6 +35,8 @@ from configuration.commands import get_command_handler
 from configuration.commands import UnknownHandler
 from configuration.commands import restricted_set
 from configuration.commands import MalformedCommand
+from configuration.commands import CommandIndex
+from configuration import commands
 
 from configuration.configurationparser import ConfigurationParser
 from bot import commandhandlers
@@ -68,6 +70,11 @@ class GetCommandHandlerTest(mox.MoxTestBase):
         self.assertEquals(type(get_command_handler()),
                           type(expected_type))
 
+        # the handler is cached until the configuration changes
+        self.assertTrue(get_command_handler() is get_command_handler())
+
+        config.parse(mock_file)
+
         expected_type = commandhandlers.UnsafeCommandHandler()
         self.assertEquals(type(get_command_handler()),
                           type(expected_type))
@@ -117,7 +124,7 @@ class GetRestrictedSetTest(mox.MoxTestBase):
     """ Provides test cases for the restricted_set function. """
 
     def test_getting_defined_restricted_set(self):
-        """ Make sure that properly formed commands are parsed into a list of
+        """ Make sure that properly formed commands are parsed into a tuple of
         command tuples. """
 
         mock_file = self.mox.CreateMockAnything()
@@ -140,18 +147,18 @@ class GetRestrictedSetTest(mox.MoxTestBase):
 
         self.mox.ReplayAll()
 
-        self.assertEquals(restricted_set(), [
+        self.assertEquals(restricted_set(), (
             ("ls", None, "List files"),
-            ("df", ["-h"], "Disk space usage (human readable)"),
-            ("du", ["-sh ."], ""),
+            ("df", ("-h", ), "Disk space usage (human readable)"),
+            ("du", ("-sh .", ), ""),
             ("pwd", None, "")
-        ])
+        ))
 
 
 
     def test_restricted_set_missing_section(self):
         """ If there is no commands section in the configuration file, an empty
-        list should be returned. """
+        tuple should be returned. """
 
         mock_file = self.mox.CreateMockAnything()
         mock_file.closed = False
@@ -167,7 +174,7 @@ class GetRestrictedSetTest(mox.MoxTestBase):
 
         self.mox.ReplayAll()
 
-        self.assertEquals(restricted_set(), [])
+        self.assertEquals(restricted_set(), ())
 
 
     def test_restricted_set_undefined_set(self):
@@ -189,7 +196,7 @@ class GetRestrictedSetTest(mox.MoxTestBase):
 
         self.mox.ReplayAll()
 
-        self.assertEquals(restricted_set(), [])
+        self.assertEquals(restricted_set(), ())
 
 
     def test_getting_malformed_restricted_set(self):
@@ -213,6 +220,209 @@ class GetRestrictedSetTest(mox.MoxTestBase):
 
         self.assertRaises(MalformedCommand, restricted_set)
 
+    def test_restricted_set_is_cached(self):
+        """ The restricted set should only be read anew once the configuration
+        has been changed. """
+
+        mock_file = self.mox.CreateMockAnything()
+        mock_file.closed = False
+        mock_file.name = "foobar"
+
+        self.mox.StubOutWithMock(SafeConfigParser, "has_section")
+        self.mox.StubOutWithMock(SafeConfigParser, "items")
+        self.mox.StubOutWithMock(SafeConfigParser, "set")
+        self.mox.StubOutWithMock(SafeConfigParser, "write")
+
+        config = ConfigurationParser()
+        config.parse(mock_file)
+
+        config.has_section("commands").AndReturn(True)
+        config.items("commands").AndReturn([("foo", "ls::List files")])
+
+        SafeConfigParser.set("commands", "bar", "pwd")
+        mock_file.truncate(0)
+        SafeConfigParser.write(mock_file)
+        mock_file.flush()
+
+        config.has_section("commands").AndReturn(True)
+        config.items("commands").AndReturn([("foo", "ls::List files"),
+                                            ("bar", "pwd")])
+
+        self.mox.ReplayAll()
+
+        self.assertEquals(1, len(restricted_set()))
+        self.assertTrue(restricted_set() is restricted_set())
+
+        config.set("commands", "bar", "pwd")
+
+        self.assertEquals(2, len(restricted_set()))
+
+
+class CommandSettingsTest(mox.MoxTestBase):
+    """ Provides test cases for the command_settings function. """
+
+    def __setup_commands(self, commands):
+        """ Parse a mocked configuration, holding _commands_ in its commands
+        section. """
+
+        mock_file = self.mox.CreateMockAnything()
+        mock_file.closed = False
+        mock_file.name = "foobar"
+
+        self.mox.StubOutWithMock(SafeConfigParser, "has_section")
+        self.mox.StubOutWithMock(SafeConfigParser, "items")
+
+        config = ConfigurationParser()
+        config.parse(mock_file)
+
+        # once for the restricted set, and once for the settings
+        config.has_section("commands").MultipleTimes().AndReturn(True)
+        config.items("commands").MultipleTimes().AndReturn(commands)
+
+    def test_settings(self):
+        """ Commands should get their own settings on top of the configured
+        defaults, which in turn override the built-in defaults. """
+
+        self.__setup_commands([
+            ("defaults", "chunk_size=1024"),
+            ("foo", "ls::List files"),
+            ("bar", "tail:-f /var/log/syslog::stream=yes, chunk_interval=0.5")
+        ])
+
+        self.mox.ReplayAll()
+
+        self.assertEquals(
+            dict(commands.DEFAULT_SETTINGS, stream = True, chunk_size = 1024,
+                 chunk_interval = 0.5),
+            commands.command_settings("tail"))
+        self.assertEquals(
+            dict(commands.DEFAULT_SETTINGS, chunk_size = 1024),
+            commands.command_settings("ls"))
+        self.assertEquals(commands.command_settings("ls"),
+                          commands.command_settings("not in the set"))
+
+    def test_defaults_are_not_a_command(self):
+        """ The defaults option should not be part of the restricted set. """
+
+        self.__setup_commands([
+            ("defaults", "stream=yes"),
+            ("foo", "ls::List files")
+        ])
+
+        self.mox.ReplayAll()
+
+        self.assertEquals((("ls", None, "List files"), ), restricted_set())
+
+    def test_malformed_settings(self):
+        """ A setting with a malformed value should raise MalformedCommand. """
+
+        self.__setup_commands([("foo", "ls::List files:stream=maybe")])
+        self.mox.ReplayAll()
+
+        self.assertRaises(MalformedCommand, commands.command_settings, "ls")
+
+    def test_help_with_colon(self):
+        """ Help containing a colon should be kept as is, rather than being
+        taken for settings, unless it ends with name=value pairs. """
+
+        self.__setup_commands([("foo", "ls::List files: all of them"),
+                               ("bar", "df::Usage: df:stream=yes")])
+        self.mox.ReplayAll()
+
+        self.assertEquals((("ls", None, "List files: all of them"),
+                           ("df", None, "Usage: df")), restricted_set())
+        self.assertEquals(commands.DEFAULT_SETTINGS,
+                          commands.command_settings("ls"))
+        self.assertTrue(commands.command_settings("df")["stream"])
+
+    def test_defaults_command(self):
+        """ A defaults option that is not a list of settings should be taken
+        to be a command definition, as it was before settings existed. """
+
+        self.__setup_commands([("defaults", "uptime::Show uptime"),
+                               ("foo", "ls::List files")])
+        self.mox.ReplayAll()
+
+        self.assertEquals((("uptime", None, "Show uptime"),
+                           ("ls", None, "List files")), restricted_set())
+        self.assertEquals(commands.DEFAULT_SETTINGS,
+                          commands.command_settings("ls"))
+
+    def test_unknown_setting(self):
+        """ A setting that is not known should raise MalformedCommand. """
+
+        self.__setup_commands([("defaults", "colour=blue")])
+        self.mox.ReplayAll()
+
+        self.assertRaises(MalformedCommand, commands.command_settings, "ls")
+
+
+class CommandIndexTest(mox.MoxTestBase):
+    """ Provides test cases for the CommandIndex type and the command_index
+    function. """
+
+    __command_set = [
+        ("ls", None, "List files"),
+        ("df", ["-h"], "Disk space usage"),
+        ("ls", ["-al"], "List all files")
+    ]
+
+    def test_get_command(self):
+        """ Commands should be looked up by exact match, and the last
+        definition of a command should take precedence. """
+
+        index = CommandIndex(self.__command_set)
+
+        self.assertEquals(2, len(index))
+        self.assertEquals(("df", ["-h"]), index.get_command("df"))
+        self.assertEquals(("ls", ["-al"]), index.get_command("ls"))
+        self.assertEquals(None, index.get_command("df -h"))
+        self.assertEquals(None, index.get_command("pwd"))
+
+    def test_get_help(self):
+        """ Help should be available for all commands, or for a single
+        command, in the order that the commands were defined. """
+
+        index = CommandIndex(self.__command_set)
+
+        self.assertEquals("ls - List files\ndf - Disk space usage\n"
+                          "ls - List all files", index.get_help("help"))
+        self.assertEquals("df - Disk space usage", index.get_help("help df"))
+        self.assertEquals("ls - List files\nls - List all files",
+                          index.get_help("help\tls "))
+        self.assertEquals(None, index.get_help("help pwd"))
+        self.assertEquals(None, index.get_help("helpdf"))
+        self.assertEquals(None, index.get_help("df"))
+
+    def test_get_help_empty_set(self):
+        """ There is no help to give for an empty command set. """
+
+        self.assertEquals(None, CommandIndex([]).get_help("help"))
+
+    def test_command_index_is_cached(self):
+        """ The index should only be rebuilt once the configuration has
+        changed. """
+
+        mock_file = self.mox.CreateMockAnything()
+        mock_file.closed = False
+        mock_file.name = "foobar"
+
+        self.mox.StubOutWithMock(commands, "restricted_set")
+
+        commands.restricted_set().AndReturn(self.__command_set)
+        commands.restricted_set().AndReturn([])
+
+        self.mox.ReplayAll()
+
+        config = ConfigurationParser()
+        config.parse(mock_file)
+
+        index = commands.command_index()
+        self.assertTrue(index is commands.command_index())
+
+        config.parse(mock_file)
+        self.assertEquals(0, len(commands.command_index()))
+
 
 if "__main__" == __name__:
     unittest.main()
@@ -26,12 +26,16 @@ sys.path.append(os.path.abspath("../.."))
 
 
 import mox
+import tempfile
 import unittest
 
+import configurationparser
 from configurationparser import ConfigurationParser
 from configurationparser import FileNotFoundException
 
 from ConfigParser import SafeConfigParser
+from ConfigParser import NoSectionError
+from ConfigParser import NoOptionError
 
 
 class ConfigurationParserTest(mox.MoxTestBase):
@@ -167,6 +171,116 @@ class ConfigurationParserTest(mox.MoxTestBase):
         config.parse(mock_file)
         config.remove_section("credentials")
 
+    def test_generation(self):
+        """ The generation should change upon parsing, and upon any state
+        modifying call. """
+
+        mock_file = self.mox.CreateMockAnything()
+        mock_file.closed = False
+        mock_file.name = "foobar"
+
+        self.mox.StubOutWithMock(SafeConfigParser, "read")
+        self.mox.StubOutWithMock(SafeConfigParser, "set")
+        self.mox.StubOutWithMock(SafeConfigParser, "get")
+        self.mox.StubOutWithMock(SafeConfigParser, "write")
+
+        SafeConfigParser.read(mock_file.name)
+        SafeConfigParser.get("credentials", "username")
+        SafeConfigParser.set("credentials", "username", "foo")
+        mock_file.truncate(0)
+        SafeConfigParser.write(mock_file)
+        mock_file.flush()
+
+        self.mox.ReplayAll()
+
+        config = ConfigurationParser()
+        generation = config.generation()
+
+        config.parse(mock_file)
+        self.assertNotEqual(generation, config.generation())
+
+        generation = config.generation()
+        config.get("credentials", "username")
+        self.assertEqual(generation, config.generation())
+
+        config.set("credentials", "username", "foo")
+        self.assertNotEqual(generation, config.generation())
+
+    def test_changed_file(self):
+        """ If the configuration file is modified or replaced by someone else,
+        it should be read anew, and the generation should change. """
+
+        stat_interval = configurationparser.STAT_INTERVAL
+        configurationparser.STAT_INTERVAL = 0
+
+        rcfile = tempfile.NamedTemporaryFile(mode = "a+", delete = False)
+        rcfile.write("[general]\nhandler: restricted\n")
+        rcfile.flush()
+
+        try:
+            config = ConfigurationParser()
+            config.parse(rcfile)
+
+            generation = config.generation()
+            self.assertEquals(generation, config.generation())
+
+            rcfile.write("pidfile: /tmp/foobar.pid\n")
+            rcfile.flush()
+
+            self.assertNotEqual(generation, config.generation())
+            self.assertEquals("/tmp/foobar.pid",
+                              config.get("general", "pidfile"))
+
+            # replace the file, as done by eg. many editors
+            generation = config.generation()
+            replacement = open(rcfile.name + ".new", "w")
+            replacement.write("[general]\nhandler: passthru\n")
+            replacement.close()
+            os.rename(rcfile.name + ".new", rcfile.name)
+
+            self.assertNotEqual(generation, config.generation())
+            self.assertEquals("passthru", config.get("general", "handler"))
+        finally:
+            configurationparser.STAT_INTERVAL = stat_interval
+            rcfile.close()
+            os.remove(rcfile.name)
+
+    def test_get_default(self):
+        """ get_default should convert the option value to the type of the
+        default value, and fall back on the default value if the option is
+        missing or malformed. """
+
+        mock_file = self.mox.CreateMockAnything()
+        mock_file.closed = False
+        mock_file.name = "foobar"
+
+        self.mox.StubOutWithMock(SafeConfigParser, "read")
+        self.mox.StubOutWithMock(SafeConfigParser, "get")
+        self.mox.StubOutWithMock(SafeConfigParser, "getboolean")
+
+        SafeConfigParser.read(mock_file.name)
+        SafeConfigParser.get("foo", "bar").AndReturn("42")
+        SafeConfigParser.get("foo", "bar").AndReturn("4.2")
+        SafeConfigParser.get("foo", "bar").AndReturn("spam")
+        SafeConfigParser.getboolean("foo", "bar").AndReturn(True)
+        SafeConfigParser.get("foo", "bar").AndReturn("eggs")
+        SafeConfigParser.get("foo", "bar").AndRaise(NoSectionError("foo"))
+        SafeConfigParser.get("foo", "bar").AndRaise(
+            NoOptionError("foo", "bar"))
+
+        self.mox.ReplayAll()
+
+        config = ConfigurationParser()
+        config.parse(mock_file)
+
+        self.assertEquals(42, config.get_default("foo", "bar", 1))
+        self.assertEquals(4.2, config.get_default("foo", "bar", 1.0))
+        self.assertEquals("spam", config.get_default("foo", "bar", "ham"))
+        self.assertEquals(True, config.get_default("foo", "bar", False))
+        self.assertEquals(1, config.get_default("foo", "bar", 1))
+        self.assertEquals(1, config.get_default("foo", "bar", 1))
+        self.assertEquals(None, config.get_default("foo", "bar"))
+
 
 if "__main__" == __name__:
     unittest.main()
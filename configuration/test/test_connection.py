@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+
+#Copyright (C) 2012 Niklas Thorne.
+
+#This file is part of XMPPMote.
+#
+#XMPPMote is free software: you can redistribute it and/or modify
+#it under the terms of the GNU General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+#
+#XMPPMote is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU General Public License for more details.
+#
+#You should have received a copy of the GNU General Public License
+""" This module provides unit tests for the connection module. """
+
+import sys
+import os
+
+sys.path.append(os.path.abspath("../.."))
+
+import mox
+import unittest
+
+from ConfigParser import SafeConfigParser
+from ConfigParser import NoSectionError
+
+from configuration import connection
+from configuration.configurationparser import ConfigurationParser
+
+
+class GetConnectionTest(mox.MoxTestBase):
+    """ Provides test cases for the get_connection function. """
+
+    def setUp(self):
+        super(GetConnectionTest, self).setUp()
+
+        mock_file = self.mox.CreateMockAnything()
+        mock_file.closed = False
+        mock_file.name = "foobar"
+
+        config = ConfigurationParser()
+        config.parse(mock_file)
+
+    def test_configured_connection(self):
+        """ The connection should be made as detailed by the connection
+        section. """
+
+        self.mox.StubOutWithMock(SafeConfigParser, "get")
+
+        SafeConfigParser.get("connection", "server").AndReturn("127.0.0.1")
+        SafeConfigParser.get("connection", "port").AndReturn("5223")
+        SafeConfigParser.get("connection", "auth_methods").AndReturn(
+            "sasl:PLAIN, digest")
+
+        self.mox.ReplayAll()
+
+        self.assertEquals(("127.0.0.1", 5223, ("sasl:PLAIN", "digest")),
+                          connection.get_connection())
+
+    def test_default_connection(self):
+        """ If the connection section is missing, the server should be looked
+        up by the domain of the JID, using the default port and methods. """
+
+        self.mox.StubOutWithMock(SafeConfigParser, "get")
+
+        for option in ["server", "port", "auth_methods"]:
+            SafeConfigParser.get("connection", option).AndRaise(
+                NoSectionError("connection"))
+
+        self.mox.ReplayAll()
+
+        self.assertEquals((None, connection.DEFAULT_PORT,
+                           connection.DEFAULT_AUTH_METHODS),
+                          connection.get_connection())
+
+
+if "__main__" == __name__:
+    unittest.main()
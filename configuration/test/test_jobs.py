@@ -0,0 +1,167 @@
+#!/usr/bin/env python
+
+#Copyright (C) 2012 Niklas Thorne.
+
+#This file is part of XMPPMote.
+#
+#XMPPMote is free software: you can redistribute it and/or modify
+#it under the terms of the GNU General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+#
+#XMPPMote is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU General Public License for more details.
+#
+#You should have received a copy of the GNU General Public License
+#along with XMPPMote.  If not, see <http://www.gnu.org/licenses/>.
+
+""" This module provides unit tests for the jobs module. """
+
+import sys
+import os
+
+sys.path.append(os.path.abspath("../.."))
+
+import mox
+import unittest
+
+from ConfigParser import SafeConfigParser
+from ConfigParser import NoSectionError
+
+from configuration import jobs
+from configuration.configurationparser import ConfigurationParser
+from bot.jobexecutor import JobExecutor
+from bot.throttle import Throttle
+
+
+class GetJobExecutorTest(mox.MoxTestBase):
+    """ Provides test cases for the get_job_executor function. """
+
+    def __setup_parser(self):
+        """ Parse a mocked configuration file. """
+
+        mock_file = self.mox.CreateMockAnything()
+        mock_file.closed = False
+        mock_file.name = "foobar"
+
+        config = ConfigurationParser()
+        config.parse(mock_file)
+
+    def test_configured_executor(self):
+        """ The executor should be sized as detailed by the jobs section. """
+
+        self.__setup_parser()
+
+        self.mox.StubOutWithMock(SafeConfigParser, "get")
+        self.mox.StubOutWithMock(JobExecutor, "__init__")
+
+        SafeConfigParser.get("jobs", "workers").AndReturn("8")
+        SafeConfigParser.get("jobs", "queue_size").AndReturn("16")
+        JobExecutor.__init__(8, 16)
+
+        self.mox.ReplayAll()
+
+        jobs.get_job_executor()
+
+    def test_default_executor(self):
+        """ If there is no jobs section, the default sizes should be used. """
+
+        self.__setup_parser()
+
+        self.mox.StubOutWithMock(SafeConfigParser, "get")
+        self.mox.StubOutWithMock(JobExecutor, "__init__")
+
+        SafeConfigParser.get("jobs", "workers").AndRaise(
+            NoSectionError("jobs"))
+        SafeConfigParser.get("jobs", "queue_size").AndRaise(
+            NoSectionError("jobs"))
+        JobExecutor.__init__(jobs.DEFAULT_WORKERS, jobs.DEFAULT_QUEUE_SIZE)
+
+        self.mox.ReplayAll()
+
+        jobs.get_job_executor()
+
+
+class GetSendQueueSizeTest(mox.MoxTestBase):
+    """ Provides test cases for the get_send_queue_size function. """
+
+    def __setup_parser(self):
+        """ Parse a mocked configuration file. """
+
+        mock_file = self.mox.CreateMockAnything()
+        mock_file.closed = False
+        mock_file.name = "foobar"
+
+        config = ConfigurationParser()
+        config.parse(mock_file)
+
+    def test_configured_size(self):
+        """ The size should be read from the jobs section. """
+
+        self.__setup_parser()
+
+        self.mox.StubOutWithMock(SafeConfigParser, "get")
+        SafeConfigParser.get("jobs", "send_queue_size").AndReturn("8")
+
+        self.mox.ReplayAll()
+
+        self.assertEquals(8, jobs.get_send_queue_size())
+
+    def test_default_size(self):
+        """ If there is no jobs section, the default size should be used. """
+
+        self.__setup_parser()
+
+        self.mox.StubOutWithMock(SafeConfigParser, "get")
+        SafeConfigParser.get("jobs", "send_queue_size").AndRaise(
+            NoSectionError("jobs"))
+
+        self.mox.ReplayAll()
+
+        self.assertEquals(jobs.DEFAULT_SEND_QUEUE_SIZE,
+                          jobs.get_send_queue_size())
+
+
+class GetThrottleTest(mox.MoxTestBase):
+    """ Provides test cases for the get_throttle function. """
+
+    def test_configured_throttle(self):
+        """ The throttle should be configured as detailed by the throttle
+        section, falling back to the defaults for any missing option. """
+
+        mock_file = self.mox.CreateMockAnything()
+        mock_file.closed = False
+        mock_file.name = "foobar"
+
+        config = ConfigurationParser()
+        config.parse(mock_file)
+
+        self.mox.StubOutWithMock(SafeConfigParser, "get")
+        self.mox.StubOutWithMock(Throttle, "__init__")
+
+        SafeConfigParser.get("throttle", "rate").AndReturn("0.2")
+        SafeConfigParser.get("throttle", "burst").AndReturn("3")
+        SafeConfigParser.get("throttle", "jobs").AndReturn("1")
+        for option in ["global_rate", "global_burst", "global_jobs"]:
+            SafeConfigParser.get("throttle", option).AndRaise(
+                NoSectionError("throttle"))
+
+        limits = []
+        Throttle.__init__(mox.IgnoreArg(), mox.IgnoreArg()).WithSideEffects(
+            lambda requester, overall: limits.extend([requester, overall]))
+
+        self.mox.ReplayAll()
+
+        jobs.get_throttle()
+
+        (requester, overall) = limits
+        self.assertEquals((0.2, 3, 1),
+                          (requester.rate, requester.burst, requester.jobs))
+        self.assertEquals(jobs.DEFAULT_OVERALL_LIMIT,
+                          (overall.rate, overall.burst, overall.jobs))
+
+
+if "__main__" == __name__:
+    unittest.main()
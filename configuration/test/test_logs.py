@@ -0,0 +1,134 @@
+#!/usr/bin/env python
+
+#Copyright (C) 2012 Niklas Thorne.
+
+#This file is part of XMPPMote.
+#
+#XMPPMote is free software: you can redistribute it and/or modify
+#it under the terms of the GNU General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+#
+#XMPPMote is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU General Public License for more details.
+#
+#You should have received a copy of the GNU General Public License
+""" This module provides unit tests for the logs module. """
+
+import sys
+import os
+
+sys.path.append(os.path.abspath("../.."))
+
+import logging
+import mox
+import unittest
+
+from ConfigParser import SafeConfigParser
+from ConfigParser import NoSectionError
+
+from configuration import logs
+from configuration.configurationparser import ConfigurationParser
+from lib import queuehandler
+from lib.queuehandler import QueueHandler
+
+
+class GetLogHandlerTest(mox.MoxTestBase):
+    """ Provides test cases for the get_log_handler function. """
+
+    def setUp(self):
+        super(GetLogHandlerTest, self).setUp()
+
+        mock_file = self.mox.CreateMockAnything()
+        mock_file.closed = False
+        mock_file.name = "foobar"
+
+        config = ConfigurationParser()
+        config.parse(mock_file)
+
+    def test_configured_handler(self):
+        """ The QueueHandler should be configured as detailed by the logging
+        section, and started. """
+
+        target = logging.Handler()
+
+        self.mox.StubOutWithMock(SafeConfigParser, "getboolean")
+        self.mox.StubOutWithMock(SafeConfigParser, "get")
+        self.mox.StubOutWithMock(QueueHandler, "__init__")
+        self.mox.StubOutWithMock(QueueHandler, "start")
+
+        SafeConfigParser.getboolean("logging", "queued").AndReturn(True)
+        SafeConfigParser.get("logging", "overflow").AndReturn("block")
+        SafeConfigParser.get("logging", "queue_size").AndReturn("16")
+        SafeConfigParser.get("logging", "batch_size").AndReturn("4")
+        QueueHandler.__init__(target, 16, queuehandler.BLOCK, 4)
+        QueueHandler.start()
+
+        self.mox.ReplayAll()
+
+        self.assertTrue(isinstance(logs.get_log_handler(target),
+                                   QueueHandler))
+
+    def test_default_handler(self):
+        """ If there is no logging section, records should be queued as
+        detailed by the defaults. """
+
+        target = logging.Handler()
+
+        self.mox.StubOutWithMock(SafeConfigParser, "getboolean")
+        self.mox.StubOutWithMock(SafeConfigParser, "get")
+        self.mox.StubOutWithMock(QueueHandler, "__init__")
+        self.mox.StubOutWithMock(QueueHandler, "start")
+
+        SafeConfigParser.getboolean("logging", "queued").AndRaise(
+            NoSectionError("logging"))
+        for option in ["overflow", "queue_size", "batch_size"]:
+            SafeConfigParser.get("logging", option).AndRaise(
+                NoSectionError("logging"))
+        QueueHandler.__init__(target, logs.DEFAULT_QUEUE_SIZE,
+                              logs.DEFAULT_OVERFLOW, logs.DEFAULT_BATCH_SIZE)
+        QueueHandler.start()
+
+        self.mox.ReplayAll()
+
+        logs.get_log_handler(target)
+
+    def test_unknown_overflow(self):
+        """ Unknown overflow policies should be replaced by the default one. """
+
+        target = logging.Handler()
+
+        self.mox.StubOutWithMock(SafeConfigParser, "getboolean")
+        self.mox.StubOutWithMock(SafeConfigParser, "get")
+        self.mox.StubOutWithMock(QueueHandler, "__init__")
+        self.mox.StubOutWithMock(QueueHandler, "start")
+
+        SafeConfigParser.getboolean("logging", "queued").AndReturn(True)
+        SafeConfigParser.get("logging", "overflow").AndReturn("foo")
+        SafeConfigParser.get("logging", "queue_size").AndReturn("16")
+        SafeConfigParser.get("logging", "batch_size").AndReturn("4")
+        QueueHandler.__init__(target, 16, logs.DEFAULT_OVERFLOW, 4)
+        QueueHandler.start()
+
+        self.mox.ReplayAll()
+
+        logs.get_log_handler(target)
+
+    def test_not_queued(self):
+        """ The target handler itself should be returned unless records are to
+        be queued. """
+
+        target = logging.Handler()
+
+        self.mox.StubOutWithMock(SafeConfigParser, "getboolean")
+        SafeConfigParser.getboolean("logging", "queued").AndReturn(False)
+
+        self.mox.ReplayAll()
+
+        self.assertTrue(target is logs.get_log_handler(target))
+
+
+if "__main__" == __name__:
+    unittest.main()
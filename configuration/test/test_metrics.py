@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+
+#Copyright (C) 2012 Niklas Thorne.
+
+#This file is part of XMPPMote.
+#
+#XMPPMote is free software: you can redistribute it and/or modify
+#it under the terms of the GNU General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+#
+#XMPPMote is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU General Public License for more details.
+#
+#You should have received a copy of the GNU General Public License
+""" This module provides unit tests for the metrics module. """
+
+import sys
+import os
+
+sys.path.append(os.path.abspath("../.."))
+
+import mox
+import unittest
+
+from ConfigParser import SafeConfigParser
+from ConfigParser import NoOptionError
+from ConfigParser import NoSectionError
+
+from configuration import metrics
+from configuration.configurationparser import ConfigurationParser
+from bot.stats import TextfileExporter
+
+
+class GetExporterTest(mox.MoxTestBase):
+    """ Provides test cases for the get_exporter function. """
+
+    def setUp(self):
+        super(GetExporterTest, self).setUp()
+
+        mock_file = self.mox.CreateMockAnything()
+        mock_file.closed = False
+        mock_file.name = "foobar"
+
+        config = ConfigurationParser()
+        config.parse(mock_file)
+
+    def test_configured_exporter(self):
+        """ The exporter should be configured as detailed by the stats section.
+        """
+
+        self.mox.StubOutWithMock(SafeConfigParser, "get")
+        self.mox.StubOutWithMock(TextfileExporter, "__init__")
+
+        SafeConfigParser.get("stats", "textfile").AndReturn("/tmp/foo.prom")
+        SafeConfigParser.get("stats", "interval").AndReturn("5")
+        TextfileExporter.__init__("/tmp/foo.prom", 5)
+
+        self.mox.ReplayAll()
+
+        self.assertTrue(isinstance(metrics.get_exporter(), TextfileExporter))
+
+    def test_default_interval(self):
+        """ If the interval is missing, the default one should be used. """
+
+        self.mox.StubOutWithMock(SafeConfigParser, "get")
+        self.mox.StubOutWithMock(TextfileExporter, "__init__")
+
+        SafeConfigParser.get("stats", "textfile").AndReturn("/tmp/foo.prom")
+        SafeConfigParser.get("stats", "interval").AndRaise(
+            NoOptionError("interval", "stats"))
+        TextfileExporter.__init__("/tmp/foo.prom", metrics.DEFAULT_INTERVAL)
+
+        self.mox.ReplayAll()
+
+        metrics.get_exporter()
+
+    def test_no_exporter(self):
+        """ If no file is configured, no exporter should be constructed. """
+
+        self.mox.StubOutWithMock(SafeConfigParser, "get")
+        SafeConfigParser.get("stats", "textfile").AndRaise(
+            NoSectionError("stats"))
+
+        self.mox.ReplayAll()
+
+        self.assertEquals(None, metrics.get_exporter())
+
+
+if "__main__" == __name__:
+    unittest.main()
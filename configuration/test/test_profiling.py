@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+
+#Copyright (C) 2012 Niklas Thorne.
+
+#This file is part of XMPPMote.
+#
+#XMPPMote is free software: you can redistribute it and/or modify
+#it under the terms of the GNU General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+#
+#XMPPMote is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU General Public License for more details.
+#
+#You should have received a copy of the GNU General Public License
+""" This module provides unit tests for the profiling module. """
+
+import sys
+import os
+
+sys.path.append(os.path.abspath("../.."))
+
+import mox
+import unittest
+
+from ConfigParser import SafeConfigParser
+from ConfigParser import NoSectionError
+
+from configuration import profiling
+from configuration.configurationparser import ConfigurationParser
+from lib.profiler import Profiler
+
+
+class ProfilingTest(mox.MoxTestBase):
+    """ Provides test cases for the get_profiler and get_admins functions. """
+
+    def setUp(self):
+        super(ProfilingTest, self).setUp()
+
+        mock_file = self.mox.CreateMockAnything()
+        mock_file.closed = False
+        mock_file.name = "foobar"
+
+        config = ConfigurationParser()
+        config.parse(mock_file)
+
+    def test_configured_profiler(self):
+        """ The profiler should be configured as detailed by the profiler
+        section. """
+
+        self.mox.StubOutWithMock(SafeConfigParser, "get")
+        self.mox.StubOutWithMock(Profiler, "__init__")
+
+        SafeConfigParser.get("profiler", "rate").AndReturn("50")
+        SafeConfigParser.get("profiler", "output").AndReturn("/tmp/foo")
+        Profiler.__init__(50, "/tmp/foo")
+
+        self.mox.ReplayAll()
+
+        profiling.get_profiler()
+
+    def test_default_profiler(self):
+        """ If there is no profiler section, the defaults should be used. """
+
+        self.mox.StubOutWithMock(SafeConfigParser, "get")
+        self.mox.StubOutWithMock(Profiler, "__init__")
+
+        for option in ["rate", "output"]:
+            SafeConfigParser.get("profiler", option).AndRaise(
+                NoSectionError("profiler"))
+        Profiler.__init__(Profiler.DEFAULT_RATE, Profiler.DEFAULT_PATH)
+
+        self.mox.ReplayAll()
+
+        profiling.get_profiler()
+
+    def test_admins(self):
+        """ The admins should be read as a comma separated list. """
+
+        self.mox.StubOutWithMock(SafeConfigParser, "get")
+
+        SafeConfigParser.get("profiler", "admins").AndReturn(
+            "foo@example.com, Bar@example.com,")
+        SafeConfigParser.get("profiler", "admins").AndRaise(
+            NoSectionError("profiler"))
+
+        self.mox.ReplayAll()
+
+        self.assertEquals(frozenset(["foo@example.com", "bar@example.com"]),
+                          profiling.get_admins())
+        self.assertEquals(frozenset(), profiling.get_admins())
+
+
+if "__main__" == __name__:
+    unittest.main()
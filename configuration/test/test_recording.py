@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+
+#Copyright (C) 2012 Niklas Thorne.
+
+#This file is part of XMPPMote.
+#
+#XMPPMote is free software: you can redistribute it and/or modify
+#it under the terms of the GNU General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+#
+#XMPPMote is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU General Public License for more details.
+#
+#You should have received a copy of the GNU General Public License
+""" This module provides unit tests for the recording module. """
+
+import sys
+import os
+
+sys.path.append(os.path.abspath("../.."))
+
+import mox
+import unittest
+
+from ConfigParser import SafeConfigParser
+from ConfigParser import NoSectionError
+
+from configuration import recording
+from configuration.configurationparser import ConfigurationParser
+from bot.recorder import Recorder
+
+
+class GetRecorderTest(mox.MoxTestBase):
+    """ Provides test cases for the get_recorder function. """
+
+    def setUp(self):
+        super(GetRecorderTest, self).setUp()
+
+        mock_file = self.mox.CreateMockAnything()
+        mock_file.closed = False
+        mock_file.name = "foobar"
+
+        config = ConfigurationParser()
+        config.parse(mock_file)
+
+    def test_configured_recorder(self):
+        """ The recorder should record to the file detailed by the recorder
+        section. """
+
+        self.mox.StubOutWithMock(SafeConfigParser, "get")
+        self.mox.StubOutWithMock(Recorder, "open")
+
+        SafeConfigParser.get("recorder", "file").AndReturn("/tmp/foo.rec")
+        Recorder.open("/tmp/foo.rec")
+
+        self.mox.ReplayAll()
+
+        self.assertTrue(isinstance(recording.get_recorder(), Recorder))
+
+    def test_unwritable_file(self):
+        """ If the file cannot be opened, nothing should be recorded. """
+
+        self.mox.StubOutWithMock(SafeConfigParser, "get")
+        self.mox.StubOutWithMock(Recorder, "open")
+
+        SafeConfigParser.get("recorder", "file").AndReturn("/foo/bar.rec")
+        Recorder.open("/foo/bar.rec").AndRaise(IOError("No such directory"))
+
+        self.mox.ReplayAll()
+
+        self.assertEquals(None, recording.get_recorder())
+
+    def test_no_recorder(self):
+        """ If no file is configured, nothing should be recorded. """
+
+        self.mox.StubOutWithMock(SafeConfigParser, "get")
+        SafeConfigParser.get("recorder", "file").AndRaise(
+            NoSectionError("recorder"))
+
+        self.mox.ReplayAll()
+
+        self.assertEquals(None, recording.get_recorder())
+
+
+if "__main__" == __name__:
+    unittest.main()
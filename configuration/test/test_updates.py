@@ -28,7 +28,6 @@ sys.path.append(os.path.abspath("../.."))
 import mox
 import unittest
 
-import threading
 
 from updates import *
 from ConfigParser import SafeConfigParser
@@ -37,6 +36,7 @@ from ConfigParser import NoOptionError
 from configurationparser import ConfigurationParser
 
 from lib.guf.updatenotifyer import UpdateNotifyer
+from lib.scheduler import Scheduler
 from lib.guf.stableupdater import StableUpdater
 from lib.guf.bleedingedgeupdater import BleedingEdgeUpdater
 
@@ -49,7 +49,7 @@ class GetUpdateHandlerTest(mox.MoxTestBase):
         so. """
 
         mock_file = self.mox.CreateMockAnything()
-        mock_timer = self.mox.CreateMockAnything()
+        mock_job = self.mox.CreateMockAnything()
         mock_file.closed = False
         mock_file.name = "foobar"
 
@@ -57,7 +57,7 @@ class GetUpdateHandlerTest(mox.MoxTestBase):
 
         self.mox.StubOutWithMock(SafeConfigParser, "get")
         self.mox.StubOutWithMock(StableUpdater, "__init__")
-        self.mox.StubOutWithMock(threading, "Timer")
+        self.mox.StubOutWithMock(Scheduler, "schedule")
 
         config = ConfigurationParser()
         config.parse(mock_file)
@@ -67,8 +67,8 @@ class GetUpdateHandlerTest(mox.MoxTestBase):
 
         StableUpdater.__init__(REPO, construct_url_for_version_file())
 
-        threading.Timer(int(interval), mox.IgnoreArg()).AndReturn(mock_timer)
-        mock_timer.start()
+        Scheduler.schedule(int(interval), mox.IgnoreArg(),
+                           True).AndReturn(mock_job)
 
         self.mox.ReplayAll()
 
@@ -82,7 +82,7 @@ class GetUpdateHandlerTest(mox.MoxTestBase):
         if no default interval is given in the configuration. """
 
         mock_file = self.mox.CreateMockAnything()
-        mock_timer = self.mox.CreateMockAnything()
+        mock_job = self.mox.CreateMockAnything()
         mock_file.closed = False
         mock_file.name = "foobar"
 
@@ -90,7 +90,7 @@ class GetUpdateHandlerTest(mox.MoxTestBase):
 
         self.mox.StubOutWithMock(SafeConfigParser, "get")
         self.mox.StubOutWithMock(StableUpdater, "__init__")
-        self.mox.StubOutWithMock(threading, "Timer")
+        self.mox.StubOutWithMock(Scheduler, "schedule")
 
         config = ConfigurationParser()
         config.parse(mock_file)
@@ -101,9 +101,8 @@ class GetUpdateHandlerTest(mox.MoxTestBase):
 
         StableUpdater.__init__(REPO, construct_url_for_version_file())
 
-        threading.Timer(DEFAULT_INTERVAL,
-                        mox.IgnoreArg()).AndReturn(mock_timer)
-        mock_timer.start()
+        Scheduler.schedule(DEFAULT_INTERVAL, mox.IgnoreArg(),
+                           True).AndReturn(mock_job)
 
         self.mox.ReplayAll()
 
@@ -117,7 +116,7 @@ class GetUpdateHandlerTest(mox.MoxTestBase):
         configuration details it. """
 
         mock_file = self.mox.CreateMockAnything()
-        mock_timer = self.mox.CreateMockAnything()
+        mock_job = self.mox.CreateMockAnything()
         mock_file.closed = False
         mock_file.name = "foobar"
 
@@ -125,7 +124,7 @@ class GetUpdateHandlerTest(mox.MoxTestBase):
 
         self.mox.StubOutWithMock(SafeConfigParser, "get")
         self.mox.StubOutWithMock(BleedingEdgeUpdater, "__init__")
-        self.mox.StubOutWithMock(threading, "Timer")
+        self.mox.StubOutWithMock(Scheduler, "schedule")
 
         config = ConfigurationParser()
         config.parse(mock_file)
@@ -135,8 +134,8 @@ class GetUpdateHandlerTest(mox.MoxTestBase):
 
         BleedingEdgeUpdater.__init__(REPO, construct_url_for_head_commit())
 
-        threading.Timer(int(interval), mox.IgnoreArg()).AndReturn(mock_timer)
-        mock_timer.start()
+        Scheduler.schedule(int(interval), mox.IgnoreArg(),
+                           True).AndReturn(mock_job)
 
         self.mox.ReplayAll()
 
@@ -150,7 +149,7 @@ class GetUpdateHandlerTest(mox.MoxTestBase):
         BleedingEdgeUpdater, as for the StableUpdater. """
 
         mock_file = self.mox.CreateMockAnything()
-        mock_timer = self.mox.CreateMockAnything()
+        mock_job = self.mox.CreateMockAnything()
         mock_file.closed = False
         mock_file.name = "foobar"
 
@@ -158,7 +157,7 @@ class GetUpdateHandlerTest(mox.MoxTestBase):
 
         self.mox.StubOutWithMock(SafeConfigParser, "get")
         self.mox.StubOutWithMock(BleedingEdgeUpdater, "__init__")
-        self.mox.StubOutWithMock(threading, "Timer")
+        self.mox.StubOutWithMock(Scheduler, "schedule")
 
         config = ConfigurationParser()
         config.parse(mock_file)
@@ -169,9 +168,8 @@ class GetUpdateHandlerTest(mox.MoxTestBase):
 
         BleedingEdgeUpdater.__init__(REPO, construct_url_for_head_commit())
 
-        threading.Timer(DEFAULT_INTERVAL,
-                        mox.IgnoreArg()).AndReturn(mock_timer)
-        mock_timer.start()
+        Scheduler.schedule(DEFAULT_INTERVAL, mox.IgnoreArg(),
+                           True).AndReturn(mock_job)
 
         self.mox.ReplayAll()
 
@@ -190,7 +188,7 @@ class GetUpdateHandlerTest(mox.MoxTestBase):
 
         self.mox.StubOutWithMock(SafeConfigParser, "get")
         self.mox.StubOutWithMock(StableUpdater, "__init__")
-        self.mox.StubOutWithMock(threading, "Timer")
+        self.mox.StubOutWithMock(Scheduler, "schedule")
 
         config = ConfigurationParser()
         config.parse(mock_file)
@@ -268,7 +266,7 @@ class GetUpdateHandlerTest(mox.MoxTestBase):
         result in the default interval being used. """
 
         mock_file = self.mox.CreateMockAnything()
-        mock_timer = self.mox.CreateMockAnything()
+        mock_job = self.mox.CreateMockAnything()
         mock_file.closed = False
         mock_file.name = "foobar"
 
@@ -276,7 +274,7 @@ class GetUpdateHandlerTest(mox.MoxTestBase):
 
         self.mox.StubOutWithMock(SafeConfigParser, "get")
         self.mox.StubOutWithMock(StableUpdater, "__init__")
-        self.mox.StubOutWithMock(threading, "Timer")
+        self.mox.StubOutWithMock(Scheduler, "schedule")
 
         config = ConfigurationParser()
         config.parse(mock_file)
@@ -286,8 +284,8 @@ class GetUpdateHandlerTest(mox.MoxTestBase):
 
         StableUpdater.__init__(REPO, construct_url_for_version_file())
 
-        threading.Timer(DEFAULT_INTERVAL, mox.IgnoreArg()).AndReturn(mock_timer)
-        mock_timer.start()
+        Scheduler.schedule(DEFAULT_INTERVAL, mox.IgnoreArg(),
+                           True).AndReturn(mock_job)
 
         self.mox.ReplayAll()
 
@@ -0,0 +1,49 @@
+#!/usr/bin/env python
+
+#Copyright (C) 2012 Niklas Thorne.
+
+#This file is part of XMPPMote.
+#
+#XMPPMote is free software: you can redistribute it and/or modify
+#it under the terms of the GNU General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+#
+#XMPPMote is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU General Public License for more details.
+#
+#You should have received a copy of the GNU General Public License
+
+""" This module provides exponential backoff with full jitter.
+
+Each delay is drawn uniformly from zero up to an exponentially growing ceiling,
+so that many clients retrying at once spread their retries out, rather than
+retrying in lockstep. """
+
+import random
+
+
+class Backoff(object):
+    """ This type hands out the delays to wait before each retry. The ceiling
+    starts out at _base_ seconds, and doubles for each retry, up to _cap_
+    seconds. """
+
+    def __init__(self, base, cap):
+        self.__base = float(base)
+        self.__cap = float(cap)
+        self.__attempt = 0
+
+    def next(self):
+        """ Returns the number of seconds to wait before the next retry. """
+
+        ceiling = min(self.__cap, self.__base * 2 ** min(self.__attempt, 32))
+        self.__attempt += 1
+
+        return random.uniform(0, ceiling)
+
+    def reset(self):
+        """ Start over from the base delay, e.g. once a retry has succeeded. """
+
+        self.__attempt = 0
@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+
+#Copyright (C) 2012 Niklas Thorne.
+
+#This file is part of XMPPMote.
+#
+#XMPPMote is free software: you can redistribute it and/or modify
+#it under the terms of the GNU General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+#
+#XMPPMote is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU General Public License for more details.
+#
+#You should have received a copy of the GNU General Public License
+#along with XMPPMote.  If not, see <http://www.gnu.org/licenses/>.
+
+""" This module provides a monotonic clock.
+
+Intervals and deadlines should be measured using monotonic(), since time.time()
+jumps whenever the system clock is adjusted. """
+
+import ctypes
+import ctypes.util
+import os
+import time
+
+
+CLOCK_MONOTONIC = 1
+
+
+class Timespec(ctypes.Structure):
+    """ struct timespec, as used by clock_gettime(2). """
+    _fields_ = [("tv_sec", ctypes.c_long), ("tv_nsec", ctypes.c_long)]
+
+
+def __load_clock_gettime():
+    """ Returns the clock_gettime function of the C library, or None if it is
+    unavailable. """
+
+    for name in (ctypes.util.find_library("rt"), ctypes.util.find_library("c")):
+        if not name:
+            continue
+
+        try:
+            function = getattr(ctypes.CDLL(name, use_errno = True),
+                               "clock_gettime")
+        except (OSError, AttributeError):
+            continue
+
+        function.argtypes = [ctypes.c_int, ctypes.POINTER(Timespec)]
+        return function
+
+    return None
+
+
+__clock_gettime = __load_clock_gettime()
+
+
+def monotonic():
+    """ Returns the value, in fractional seconds, of a clock that never goes
+    backwards. Only the difference between two values is meaningful. """
+
+    if not __clock_gettime:
+        return time.time()
+
+    timespec = Timespec()
+    if 0 != __clock_gettime(CLOCK_MONOTONIC, ctypes.byref(timespec)):
+        errno = ctypes.get_errno()
+        raise OSError(errno, os.strerror(errno))
+
+    return timespec.tv_sec + timespec.tv_nsec * 1e-9
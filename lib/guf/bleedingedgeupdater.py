@@ -29,11 +29,13 @@ sys.path.append(os.path.abspath("../../.."))
 
 
 from updater import Updater
+from updater import URL_TIMEOUT
 
 import git
 import version
 import urllib2
 import json
+import socket
 import logging
 
 class BleedingEdgeUpdater(Updater):
@@ -82,15 +84,16 @@ class BleedingEdgeUpdater(Updater):
         logger = logging.getLogger()
 
         try:
-            response = urllib2.urlopen(self.__remote_url)
+            response = urllib2.urlopen(self.__remote_url,
+                                       timeout = URL_TIMEOUT)
 
             html = response.read()
 
             json_dict = json.loads(html)
 
             result = json_dict["sha"]
-        # raised from urlopen
-        except urllib2.URLError, exc:
+        # raised from urlopen, or upon a timeout
+        except (urllib2.URLError, socket.error), exc:
             logger.info(u"Failed to connect to %s: %s" % (self.__remote_url,
                                                           exc))
         # raised if urlopen returns None
@@ -28,10 +28,12 @@ import os
 sys.path.append(os.path.abspath("../.."))
 
 from updater import Updater
+from updater import URL_TIMEOUT
 
 import urllib2
 import json
 import base64
+import socket
 
 import version
 import re
@@ -66,14 +68,13 @@ class StableUpdater(Updater):
         logger = logging.getLogger()
 
         try:
-            response = urllib2.urlopen(self.__remote_url)
-        except (ValueError, urllib2.URLError), exc:
+            response = urllib2.urlopen(self.__remote_url, timeout = URL_TIMEOUT)
+            html = response.read()
+        except (ValueError, urllib2.URLError, socket.error), exc:
             logger.info(u"Failed to connect to %s: %s" % (self.__remote_url,
                                                           exc))
             return
 
-        html = response.read()
-
         if not html:
             return
 
@@ -28,6 +28,7 @@ import mox
 import unittest
 
 from bleedingedgeupdater import BleedingEdgeUpdater
+from updater import URL_TIMEOUT
 import version
 import git
 import urllib2
@@ -193,7 +194,8 @@ class BleedingEdgeUpdaterTest(mox.MoxTestBase):
         self.mox.StubOutWithMock(urllib2, "urlopen")
         self.mox.StubOutWithMock(json, "loads")
 
-        urllib2.urlopen(self.__remote_url).AndReturn(mock_response)
+        urllib2.urlopen(self.__remote_url,
+                        timeout = URL_TIMEOUT).AndReturn(mock_response)
         mock_response.read().AndReturn(mock_html)
 
         json.loads(mock_html).AndReturn(mock_json_dict)
@@ -214,7 +216,9 @@ class BleedingEdgeUpdaterTest(mox.MoxTestBase):
         self.mox.StubOutWithMock(urllib2, "urlopen")
         self.mox.StubOutWithMock(json, "loads")
 
-        urllib2.urlopen(self.__remote_url).AndRaise(urllib2.URLError("na-ah"))
+        urllib2.urlopen(self.__remote_url,
+                        timeout = URL_TIMEOUT).AndRaise(
+                                urllib2.URLError("na-ah"))
 
         self.mox.ReplayAll()
 
@@ -228,7 +232,8 @@ class BleedingEdgeUpdaterTest(mox.MoxTestBase):
         self.mox.StubOutWithMock(urllib2, "urlopen")
         self.mox.StubOutWithMock(json, "loads")
 
-        urllib2.urlopen(self.__remote_url).AndReturn(None)
+        urllib2.urlopen(self.__remote_url,
+                        timeout = URL_TIMEOUT).AndReturn(None)
 
         self.mox.ReplayAll()
 
@@ -243,7 +248,8 @@ class BleedingEdgeUpdaterTest(mox.MoxTestBase):
 
         self.mox.StubOutWithMock(urllib2, "urlopen")
 
-        urllib2.urlopen(self.__remote_url).AndReturn(mock_response)
+        urllib2.urlopen(self.__remote_url,
+                        timeout = URL_TIMEOUT).AndReturn(mock_response)
 
         mock_response.read().AndReturn(None)
 
@@ -262,7 +268,8 @@ class BleedingEdgeUpdaterTest(mox.MoxTestBase):
 
         self.mox.StubOutWithMock(urllib2, "urlopen")
 
-        urllib2.urlopen(self.__remote_url).AndReturn(mock_response)
+        urllib2.urlopen(self.__remote_url,
+                        timeout = URL_TIMEOUT).AndReturn(mock_response)
 
         mock_response.read().AndReturn(mock_html)
 
@@ -284,7 +291,8 @@ class BleedingEdgeUpdaterTest(mox.MoxTestBase):
         self.mox.StubOutWithMock(urllib2, "urlopen")
         self.mox.StubOutWithMock(json, "loads")
 
-        urllib2.urlopen(self.__remote_url).AndReturn(mock_response)
+        urllib2.urlopen(self.__remote_url,
+                        timeout = URL_TIMEOUT).AndReturn(mock_response)
         mock_response.read().AndReturn(mock_html)
 
         json.loads(mock_html).AndReturn(mock_json_dict)
@@ -35,6 +35,7 @@ import base64
 import version
 
 from stableupdater import StableUpdater
+from updater import URL_TIMEOUT
 
 
 class StableUpdaterTest(mox.MoxTestBase):
@@ -76,7 +77,8 @@ version =
         self.mox.StubOutWithMock(json, "loads")
         self.mox.StubOutWithMock(base64, "b64decode")
 
-        urllib2.urlopen(self.__remote_url).AndReturn(mock_response)
+        urllib2.urlopen(self.__remote_url,
+                        timeout = URL_TIMEOUT).AndReturn(mock_response)
         mock_response.read().AndReturn(mock_html)
 
         json.loads(mock_html).AndReturn(mock_json_dict)
@@ -107,7 +109,8 @@ version =
         self.mox.StubOutWithMock(json, "loads")
         self.mox.StubOutWithMock(base64, "b64decode")
 
-        urllib2.urlopen(self.__remote_url).AndReturn(mock_response)
+        urllib2.urlopen(self.__remote_url,
+                        timeout = URL_TIMEOUT).AndReturn(mock_response)
         mock_response.read().AndReturn(mock_html)
 
         json.loads(mock_html).AndReturn(mock_json_dict)
@@ -132,7 +135,9 @@ version =
 
         self.mox.StubOutWithMock(urllib2, "urlopen")
 
-        urllib2.urlopen(self.__remote_url).AndRaise(urllib2.URLError("Timeout"))
+        urllib2.urlopen(self.__remote_url,
+                        timeout = URL_TIMEOUT).AndRaise(
+                                urllib2.URLError("Timeout"))
 
         self.mox.ReplayAll()
 
@@ -153,7 +158,8 @@ version =
         self.mox.StubOutWithMock(urllib2, "urlopen")
         self.mox.StubOutWithMock(json, "loads")
 
-        urllib2.urlopen(self.__remote_url).AndReturn(mock_response)
+        urllib2.urlopen(self.__remote_url,
+                        timeout = URL_TIMEOUT).AndReturn(mock_response)
         mock_response.read().AndReturn(mock_html)
 
         json.loads(mock_html).AndRaise(ValueError("No JSON object"))
@@ -179,7 +185,8 @@ version =
         self.mox.StubOutWithMock(json, "loads")
         self.mox.StubOutWithMock(base64, "b64decode")
 
-        urllib2.urlopen(self.__remote_url).AndReturn(mock_response)
+        urllib2.urlopen(self.__remote_url,
+                        timeout = URL_TIMEOUT).AndReturn(mock_response)
         mock_response.read().AndReturn(mock_html)
 
         json.loads(mock_html).AndReturn(mock_json_dict)
@@ -208,7 +215,8 @@ version =
         self.mox.StubOutWithMock(json, "loads")
         self.mox.StubOutWithMock(base64, "b64decode")
 
-        urllib2.urlopen(self.__remote_url).AndReturn(mock_response)
+        urllib2.urlopen(self.__remote_url,
+                        timeout = URL_TIMEOUT).AndReturn(mock_response)
         mock_response.read().AndReturn(mock_html)
 
         json.loads(mock_html).AndReturn(mock_json_dict)
@@ -238,7 +246,8 @@ version =
         self.mox.StubOutWithMock(json, "loads")
         self.mox.StubOutWithMock(base64, "b64decode")
 
-        urllib2.urlopen(self.__remote_url).AndReturn(mock_response)
+        urllib2.urlopen(self.__remote_url,
+                        timeout = URL_TIMEOUT).AndReturn(mock_response)
         mock_response.read().AndReturn(mock_html)
 
         json.loads(mock_html).AndReturn(mock_json_dict)
@@ -265,7 +274,8 @@ version =
         self.mox.StubOutWithMock(json, "loads")
         self.mox.StubOutWithMock(base64, "b64decode")
 
-        urllib2.urlopen(self.__remote_url).AndReturn(mock_response)
+        urllib2.urlopen(self.__remote_url,
+                        timeout = URL_TIMEOUT).AndReturn(mock_response)
         mock_response.read().AndReturn("")
 
         self.mox.ReplayAll()
@@ -288,7 +298,8 @@ version =
         self.mox.StubOutWithMock(json, "loads")
         self.mox.StubOutWithMock(base64, "b64decode")
 
-        urllib2.urlopen(self.__remote_url).AndReturn(mock_response)
+        urllib2.urlopen(self.__remote_url,
+                        timeout = URL_TIMEOUT).AndReturn(mock_response)
         mock_response.read().AndReturn(mock_html)
 
         json.loads(mock_html).AndReturn(mock_json_dict)
@@ -311,7 +322,8 @@ version =
 
         self.mox.StubOutWithMock(urllib2, "urlopen")
 
-        urllib2.urlopen(self.__remote_url).AndRaise(
+        urllib2.urlopen(self.__remote_url,
+                        timeout = URL_TIMEOUT).AndRaise(
             ValueError("Unknown url type"))
 
         self.mox.ReplayAll()
@@ -335,7 +347,8 @@ version =
         self.mox.StubOutWithMock(json, "loads")
         self.mox.StubOutWithMock(base64, "b64decode")
 
-        urllib2.urlopen(self.__remote_url).AndReturn(mock_response)
+        urllib2.urlopen(self.__remote_url,
+                        timeout = URL_TIMEOUT).AndReturn(mock_response)
         mock_response.read().AndReturn(mock_html)
 
         json.loads(mock_html).AndReturn(mock_json_dict)
@@ -365,7 +378,8 @@ version =
         self.mox.StubOutWithMock(json, "loads")
         self.mox.StubOutWithMock(base64, "b64decode")
 
-        urllib2.urlopen(self.__remote_url).AndReturn(mock_response)
+        urllib2.urlopen(self.__remote_url,
+                        timeout = URL_TIMEOUT).AndReturn(mock_response)
         mock_response.read().AndReturn(mock_html)
 
         json.loads(mock_html).AndReturn(mock_json_dict)
@@ -374,7 +388,9 @@ version =
             self.__mock_file_with_proper_version)).AndReturn(
                 self.__mock_file_with_proper_version)
 
-        urllib2.urlopen(self.__remote_url).AndRaise(urllib2.URLError("Timeout"))
+        urllib2.urlopen(self.__remote_url,
+                        timeout = URL_TIMEOUT).AndRaise(
+                                urllib2.URLError("Timeout"))
 
         self.mox.ReplayAll()
 
@@ -401,7 +417,8 @@ version =
         self.mox.StubOutWithMock(json, "loads")
         self.mox.StubOutWithMock(base64, "b64decode")
 
-        urllib2.urlopen(self.__remote_url).AndReturn(mock_response)
+        urllib2.urlopen(self.__remote_url,
+                        timeout = URL_TIMEOUT).AndReturn(mock_response)
         mock_response.read().AndReturn(mock_html)
 
         json.loads(mock_html).AndReturn(mock_json_dict)
@@ -32,8 +32,7 @@ from bot.client import Client
 from updatenotifyer import UpdateNotifyer
 from stableupdater import StableUpdater
 from bleedingedgeupdater import BleedingEdgeUpdater
-
-import threading
+from lib.scheduler import Scheduler
 
 class UpdateNotifyerTest(mox.MoxTestBase):
     """ Provides test cases for the UpdateNotifyer type. """
@@ -64,18 +63,17 @@ class UpdateNotifyerTest(mox.MoxTestBase):
         notifyer = UpdateNotifyer(self.__repo, self.__remote_url, True)
 
     def test_start(self):
-        """ Make sure that a timer for the proper interval is started when the
+        """ Make sure that a job for the proper interval is scheduled when the
         UpdateNotifyer.start method is called. """
 
-        mock_timer = self.mox.CreateMockAnything()
+        mock_job = self.mox.CreateMockAnything()
 
         self.mox.StubOutWithMock(StableUpdater, "__init__")
-        self.mox.StubOutWithMock(threading, "Timer")
+        self.mox.StubOutWithMock(Scheduler, "schedule")
 
         StableUpdater.__init__(self.__repo, self.__remote_url)
 
-        threading.Timer(3600, mox.IgnoreArg()).AndReturn(mock_timer)
-        mock_timer.start()
+        Scheduler.schedule(3600, mox.IgnoreArg(), True).AndReturn(mock_job)
 
         self.mox.ReplayAll()
 
@@ -83,20 +81,20 @@ class UpdateNotifyerTest(mox.MoxTestBase):
         notifyer.start()
 
     def test_stop(self):
-        """ Ensure that the timer is cancelled if UpdateNotifyer.stop is called.
+        """ Ensure that the job is cancelled if UpdateNotifyer.stop is called.
         """
 
-        mock_timer = self.mox.CreateMockAnything()
+        mock_job = self.mox.CreateMockAnything()
 
         self.mox.StubOutWithMock(StableUpdater, "__init__")
-        self.mox.StubOutWithMock(threading, "Timer")
+        self.mox.StubOutWithMock(Scheduler, "schedule")
+        self.mox.StubOutWithMock(Scheduler, "cancel")
 
         StableUpdater.__init__(self.__repo, self.__remote_url)
 
-        threading.Timer(3600, mox.IgnoreArg()).AndReturn(mock_timer)
-        mock_timer.start()
+        Scheduler.schedule(3600, mox.IgnoreArg(), True).AndReturn(mock_job)
 
-        mock_timer.cancel()
+        Scheduler.cancel(mock_job)
 
         self.mox.ReplayAll()
 
@@ -108,27 +106,22 @@ class UpdateNotifyerTest(mox.MoxTestBase):
         """ Make sure that we get a status update if the selected updater
         indicates that an update is available. """
 
-        mock_timer = self.mox.CreateMockAnything()
+        mock_job = self.mox.CreateMockAnything()
 
         self.mox.StubOutWithMock(StableUpdater, "__init__")
         self.mox.StubOutWithMock(StableUpdater, "check")
         self.mox.StubOutWithMock(StableUpdater, "get_update_version")
-        self.mox.StubOutWithMock(threading, "Timer")
-        self.mox.StubOutWithMock(threading.Thread, "start")
+        self.mox.StubOutWithMock(Scheduler, "schedule")
         self.mox.StubOutWithMock(Client, "change_status")
 
         StableUpdater.__init__(self.__repo, self.__remote_url)
 
-        threading.Timer(3600, mox.IgnoreArg()).AndReturn(mock_timer)
-        mock_timer.start()
+        Scheduler.schedule(3600, mox.IgnoreArg(), True).AndReturn(mock_job)
 
         StableUpdater.check().AndReturn(True)
         StableUpdater.get_update_version().AndReturn("1.0")
         Client.change_status(mox.IgnoreArg())
 
-        threading.Timer(3600, mox.IgnoreArg()).AndReturn(mock_timer)
-        mock_timer.start()
-
         self.mox.ReplayAll()
 
         notifyer = UpdateNotifyer(self.__repo, self.__remote_url)
@@ -139,24 +132,19 @@ class UpdateNotifyerTest(mox.MoxTestBase):
         """ Make sure that nothing happens (i.e. no status updates) when the
         updater indicates that there are no updates available. """
 
-        mock_timer = self.mox.CreateMockAnything()
+        mock_job = self.mox.CreateMockAnything()
 
         self.mox.StubOutWithMock(StableUpdater, "__init__")
         self.mox.StubOutWithMock(StableUpdater, "check")
-        self.mox.StubOutWithMock(threading, "Timer")
-        self.mox.StubOutWithMock(threading.Thread, "start")
+        self.mox.StubOutWithMock(Scheduler, "schedule")
         self.mox.StubOutWithMock(Client, "change_status")
 
         StableUpdater.__init__(self.__repo, self.__remote_url)
 
-        threading.Timer(3600, mox.IgnoreArg()).AndReturn(mock_timer)
-        mock_timer.start()
+        Scheduler.schedule(3600, mox.IgnoreArg(), True).AndReturn(mock_job)
 
         StableUpdater.check().AndReturn(False)
 
-        threading.Timer(3600, mox.IgnoreArg()).AndReturn(mock_timer)
-        mock_timer.start()
-
         self.mox.ReplayAll()
 
         notifyer = UpdateNotifyer(self.__repo, self.__remote_url)
@@ -168,32 +156,24 @@ class UpdateNotifyerTest(mox.MoxTestBase):
         there has been an update notification, updates found thereafter should
         not be indicated. """
 
-        mock_timer = self.mox.CreateMockAnything()
+        mock_job = self.mox.CreateMockAnything()
 
         self.mox.StubOutWithMock(StableUpdater, "__init__")
         self.mox.StubOutWithMock(StableUpdater, "check")
         self.mox.StubOutWithMock(StableUpdater, "get_update_version")
-        self.mox.StubOutWithMock(threading, "Timer")
-        self.mox.StubOutWithMock(threading.Thread, "start")
+        self.mox.StubOutWithMock(Scheduler, "schedule")
         self.mox.StubOutWithMock(Client, "change_status")
 
         StableUpdater.__init__(self.__repo, self.__remote_url)
 
-        threading.Timer(3600, mox.IgnoreArg()).AndReturn(mock_timer)
-        mock_timer.start()
+        Scheduler.schedule(3600, mox.IgnoreArg(), True).AndReturn(mock_job)
 
         StableUpdater.check().AndReturn(True)
         Client.change_status(mox.IgnoreArg())
 
-        threading.Timer(3600, mox.IgnoreArg()).AndReturn(mock_timer)
-        mock_timer.start()
-
         StableUpdater.check().AndReturn(True)
         StableUpdater.get_update_version().AndReturn("1.0")
 
-        threading.Timer(3600, mox.IgnoreArg()).AndReturn(mock_timer)
-        mock_timer.start()
-
         self.mox.ReplayAll()
 
         notifyer = UpdateNotifyer(self.__repo, self.__remote_url)
@@ -205,44 +185,30 @@ class UpdateNotifyerTest(mox.MoxTestBase):
         """ Make sure that the update indicaiton is reset if an update all of a
         sudden is not available. """
 
-        mock_timer = self.mox.CreateMockAnything()
+        mock_job = self.mox.CreateMockAnything()
 
         self.mox.StubOutWithMock(StableUpdater, "__init__")
         self.mox.StubOutWithMock(StableUpdater, "check")
         self.mox.StubOutWithMock(StableUpdater, "get_update_version")
-        self.mox.StubOutWithMock(threading, "Timer")
-        self.mox.StubOutWithMock(threading.Thread, "start")
+        self.mox.StubOutWithMock(Scheduler, "schedule")
         self.mox.StubOutWithMock(Client, "change_status")
 
         StableUpdater.__init__(self.__repo, self.__remote_url)
 
-        threading.Timer(3600, mox.IgnoreArg()).AndReturn(mock_timer)
-        mock_timer.start()
+        Scheduler.schedule(3600, mox.IgnoreArg(), True).AndReturn(mock_job)
 
         StableUpdater.check().AndReturn(True)
         StableUpdater.get_update_version().AndReturn("1.0")
         Client.change_status(mox.IgnoreArg())
 
-        threading.Timer(3600, mox.IgnoreArg()).AndReturn(mock_timer)
-        mock_timer.start()
-
         StableUpdater.check().AndReturn(True)
         StableUpdater.get_update_version().AndReturn("1.0")
 
-        threading.Timer(3600, mox.IgnoreArg()).AndReturn(mock_timer)
-        mock_timer.start()
-
         StableUpdater.check().AndReturn(False)
 
-        threading.Timer(3600, mox.IgnoreArg()).AndReturn(mock_timer)
-        mock_timer.start()
-
         StableUpdater.check().AndReturn(True)
         Client.change_status(mox.IgnoreArg())
 
-        threading.Timer(3600, mox.IgnoreArg()).AndReturn(mock_timer)
-        mock_timer.start()
-
         self.mox.ReplayAll()
 
         notifyer = UpdateNotifyer(self.__repo, self.__remote_url)
@@ -29,11 +29,10 @@ import os
 sys.path.append(os.path.abspath("../.."))
 
 from bot.client import Client
+from lib.scheduler import Scheduler
 from stableupdater import StableUpdater
 from bleedingedgeupdater import BleedingEdgeUpdater
 
-import threading
-
 class UpdateNotifyer(object):
     """ UpdateNotifyer is responsible for querying the selected updater at the
     desired interval, and if an update is found, the bot status is updated to
@@ -41,7 +40,7 @@ class UpdateNotifyer(object):
 
     def __init__(self, repo, api_url, bleeding_edge = False, interval = 3600):
         self.has_update = False
-        self.__timer = None
+        self.__job = None
 
         if not bleeding_edge:
             self.__updater = StableUpdater(repo, api_url)
@@ -53,16 +52,15 @@ class UpdateNotifyer(object):
     def start(self):
         """ Start the UpdateNotifyer service. """
 
-        self.__timer = threading.Timer(self.__interval, self.timeout)
-        self.__timer.start()
+        self.__job = Scheduler().schedule(self.__interval, self.timeout, True)
 
     def stop(self):
         """ Stop the UpdateNotifyer service. """
 
-        self.__timer.cancel()
+        Scheduler().cancel(self.__job)
 
     def timeout(self):
-        """ Called upon by the Timer when self.__interval has elapsed. """
+        """ Called upon by the Scheduler when self.__interval has elapsed. """
 
         had_update = self.has_update
 
@@ -74,5 +72,3 @@ class UpdateNotifyer(object):
             new_version = self.__updater.get_update_version()
             if new_version:
                 cli.change_status(u"update available: %s" % new_version[:7])
-
-        self.start()
@@ -27,6 +27,9 @@ import logging
 import os
 import urllib2
 
+# the number of seconds to wait for github to respond
+URL_TIMEOUT = 10
+
 class Updater(object):
     """ Updater contains common methods used by the StableUpdater and
     BleedingEdgeUpdater. """
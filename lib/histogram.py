@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+
+#Copyright (C) 2012 Niklas Thorne.
+
+#This file is part of XMPPMote.
+#
+#XMPPMote is free software: you can redistribute it and/or modify
+#it under the terms of the GNU General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+#
+#XMPPMote is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU General Public License for more details.
+#
+#You should have received a copy of the GNU General Public License
+#along with XMPPMote.  If not, see <http://www.gnu.org/licenses/>.
+
+""" This module provides a histogram of fixed size, used for keeping track of
+latencies.
+
+The values are counted in buckets whose bounds grow geometrically, so that
+percentiles are estimated within a fixed relative error, no matter the number of
+values recorded. """
+
+import array
+import math
+
+
+class Histogram(object):
+    """ This type counts values from _lowest_ to _highest_ in buckets whose
+    upper bounds are _growth_ times the previous ones. Values outside that range
+    are counted in the first or last bucket. The histogram is not thread safe.
+    """
+
+    def __init__(self, lowest = 1e-5, highest = 1e4, growth = 1.2):
+        self.__lowest = float(lowest)
+        self.__log_growth = math.log(growth)
+
+        size = int(math.ceil(math.log(highest / self.__lowest) /
+                             self.__log_growth)) + 1
+        self.__counts = array.array("L", [0] * size)
+
+        self.__count = 0
+        self.__total = 0.0
+        self.__max = 0.0
+
+    def record(self, value):
+        """ Count _value_. """
+
+        if value > self.__lowest:
+            index = int(math.ceil(math.log(value / self.__lowest) /
+                                  self.__log_growth))
+            index = min(index, len(self.__counts) - 1)
+        else:
+            index = 0
+
+        self.__counts[index] += 1
+        self.__count += 1
+        self.__total += value
+        self.__max = max(self.__max, value)
+
+    def count(self):
+        """ Returns the number of values counted. """
+
+        return self.__count
+
+    def total(self):
+        """ Returns the sum of the values counted. """
+
+        return self.__total
+
+    def mean(self):
+        """ Returns the mean of the values counted, or 0 if there are none. """
+
+        return self.__count and self.__total / self.__count
+
+    def percentile(self, percent):
+        """ Returns an upper bound of the _percent_ percentile of the values
+        counted, or 0 if there are none. """
+
+        rank = math.ceil(self.__count * percent / 100.0)
+        seen = 0
+
+        for (index, count) in enumerate(self.__counts):
+            seen += count
+            if count and seen >= rank:
+                if index == len(self.__counts) - 1:
+                    break
+
+                bound = self.__lowest * math.exp(index * self.__log_growth)
+                return min(bound, self.__max)
+
+        return self.__max
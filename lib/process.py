@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+
+#Copyright (C) 2012 Niklas Thorne.
+
+#This file is part of XMPPMote.
+#
+#XMPPMote is free software: you can redistribute it and/or modify
+#it under the terms of the GNU General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+#
+#XMPPMote is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU General Public License for more details.
+#
+#You should have received a copy of the GNU General Public License
+#along with XMPPMote.  If not, see <http://www.gnu.org/licenses/>.
+""" This module provides functions for bounding the lifetime of child processes.
+
+Child processes are expected to lead process groups of their own (see
+new_process_group), so that any processes that they in turn start can be
+terminated along with them. """
+
+import errno
+import os
+import signal
+import time
+
+from clock import monotonic
+
+
+# the number of seconds between checks for a process having exited
+POLL_INTERVAL = 0.05
+
+# the number of seconds that a terminated process group is given to exit,
+# before it is killed
+KILL_GRACE = 2.0
+
+
+def new_process_group():
+    """ Make the calling process the leader of a new process group (and
+    session), to be passed as preexec_fn to subprocess.Popen. """
+
+    os.setsid()
+
+
+def wait_until(process, deadline):
+    """ Wait for _process_ (e.g. a subprocess.Popen) to exit, until _deadline_,
+    as given by monotonic(). Returns True if the process has exited, or False
+    if the deadline passed first. A deadline of None waits indefinitely. """
+
+    if None == deadline:
+        process.wait()
+        return True
+
+    while None == process.poll():
+        remaining = deadline - monotonic()
+        if 0 >= remaining:
+            return False
+
+        time.sleep(min(POLL_INTERVAL, remaining))
+
+    return True
+
+
+def kill_group(process, grace):
+    """ Terminate the process group led by _process_, sending SIGTERM, and then
+    SIGKILL should the process still be running after _grace_ seconds. The
+    process is reaped before returning. """
+
+    if signal_group(process, signal.SIGTERM) and \
+       not wait_until(process, monotonic() + grace):
+        signal_group(process, signal.SIGKILL)
+
+    process.wait()
+
+
+def signal_group(process, signum):
+    """ Send _signum_ to the process group led by _process_, returning False if
+    there is no such process group. """
+
+    try:
+        os.killpg(process.pid, signum)
+    except OSError, err:
+        if errno.ESRCH != err.errno:
+            raise
+        return False
+
+    return True
@@ -0,0 +1,165 @@
+#!/usr/bin/env python
+
+#Copyright (C) 2012 Niklas Thorne.
+
+#This file is part of XMPPMote.
+#
+#XMPPMote is free software: you can redistribute it and/or modify
+#it under the terms of the GNU General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+#
+#XMPPMote is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU General Public License for more details.
+#
+#You should have received a copy of the GNU General Public License
+#along with XMPPMote.  If not, see <http://www.gnu.org/licenses/>.
+
+""" This module provides a sampling profiler.
+
+While running, the Profiler samples the stacks of all threads at a fixed rate,
+from a thread of its own, and counts the distinct stacks seen. Once stopped, the
+counts are written in the collapsed stack format, as read by flamegraph.pl. The
+profiler costs nothing while it is not running. """
+
+import os
+import sys
+
+sys.path.append(os.path.abspath('..'))
+from lib import borg
+
+import logging
+import tempfile
+import threading
+
+
+class Profiler(borg.make_borg()):
+    """ This type samples the stacks of all threads _rate_ times per second,
+    writing the collapsed stacks to the file _path_ once stopped. """
+
+    DEFAULT_RATE = 100
+    DEFAULT_PATH = "/tmp/xmppmote.folded"
+
+    # the number of distinct stacks that are counted separately
+    MAX_STACKS = 10000
+
+    # the stack under which the stacks beyond MAX_STACKS are counted
+    OTHER = "(other)"
+
+    def __init__(self, rate = None, path = None):
+        super(Profiler, self).__init__()
+
+        if not hasattr(self, "_Profiler__lock"):
+            # reentrant, since the profiler may be toggled by a signal handler
+            self.__lock = threading.RLock()
+            self.__stopped = None
+            self.__rate = self.DEFAULT_RATE
+            self.__path = self.DEFAULT_PATH
+
+        if None != rate and None != path:
+            self.__rate = rate
+            self.__path = path
+
+    def start(self):
+        """ Start sampling, returning False if already sampling. """
+
+        with self.__lock:
+            if self.is_running():
+                return False
+
+            self.__stopped = threading.Event()
+            thread = threading.Thread(
+                target = self.__sample,
+                args = (self.__stopped, 1.0 / self.__rate, self.__path),
+                name = "Profiler")
+            thread.daemon = True
+            thread.start()
+
+        return True
+
+    def stop(self):
+        """ Stop sampling, returning the path of the file that the profile is
+        written to, or None if not sampling. The file is written by the
+        sampling thread, shortly after this call. """
+
+        with self.__lock:
+            if not self.is_running():
+                return None
+
+            self.__stopped.set()
+            return self.__path
+
+    def toggle(self):
+        """ Start sampling unless already sampling, in which case sampling is
+        stopped. """
+
+        with self.__lock:
+            if not self.stop():
+                self.start()
+
+    def is_running(self):
+        """ Returns True if sampling. """
+
+        return bool(self.__stopped) and not self.__stopped.is_set()
+
+    def __sample(self, stopped, interval, path):
+        """ Sampling thread main function; counts the stacks seen every
+        _interval_ seconds until _stopped_ is set, and then writes them to
+        _path_. """
+
+        logger = logging.getLogger()
+        logger.info(u"profiling %g times per second" % (1.0 / interval))
+
+        own = threading.current_thread().ident
+        counts = {}
+        samples = 0
+
+        while not stopped.wait(interval):
+            names = dict((thread.ident, thread.name.replace(";", ":"))
+                         for thread in threading.enumerate())
+
+            for (ident, frame) in sys._current_frames().items():
+                if ident == own:
+                    continue
+
+                stack = []
+                while frame:
+                    code = frame.f_code
+                    stack.append("%s (%s:%d)" % (code.co_name,
+                                                 os.path.basename(
+                                                     code.co_filename),
+                                                 code.co_firstlineno))
+                    frame = frame.f_back
+                stack.append(names.get(ident, "thread-%d" % ident))
+                del frame
+
+                key = ";".join(reversed(stack))
+                if key not in counts and len(counts) >= self.MAX_STACKS:
+                    key = self.OTHER
+                counts[key] = counts.get(key, 0) + 1
+
+            samples += 1
+
+        # the profile is written to a new file of its own, which then replaces
+        # any file (or symbolic link) at _path_, so that no existing file is
+        # ever written to, and so that a previous profile still being written
+        # does not interfere
+        temporary = None
+        try:
+            (fdesc, temporary) = tempfile.mkstemp(
+                    prefix = os.path.basename(path) + ".",
+                    dir = os.path.dirname(os.path.abspath(path)))
+            with os.fdopen(fdesc, "w") as output:
+                for (stack, count) in sorted(counts.items()):
+                    output.write("%s %d\n" % (stack, count))
+            os.rename(temporary, path)
+        except (IOError, OSError), exc:
+            logger.error(u"writing profile to %s failed: %s" %
+                         (path, repr(exc)))
+            if temporary and os.path.exists(temporary):
+                os.remove(temporary)
+            return
+
+        logger.info(u"profile of %d samples written to %s" % (samples, path))
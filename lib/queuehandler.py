@@ -0,0 +1,183 @@
+#!/usr/bin/env python
+
+#Copyright (C) 2012 Niklas Thorne.
+
+#This file is part of XMPPMote.
+#
+#XMPPMote is free software: you can redistribute it and/or modify
+#it under the terms of the GNU General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+#
+#XMPPMote is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU General Public License for more details.
+#
+#You should have received a copy of the GNU General Public License
+#along with XMPPMote.  If not, see <http://www.gnu.org/licenses/>.
+
+""" This module provides non-blocking logging.
+
+The QueueHandler queues the records that it is given, and a background thread
+passes them on in batches to the handler that actually writes them, so that
+threads logging do not have to wait for slow writes (such as to syslog). """
+
+import collections
+import logging
+import threading
+
+
+# what to do with records given while the queue is full: drop the record given,
+# drop the oldest record queued, or wait for there to be room in the queue
+DROP_NEW = "drop_new"
+DROP_OLD = "drop_old"
+BLOCK = "block"
+
+OVERFLOW_POLICIES = (DROP_NEW, DROP_OLD, BLOCK)
+
+# the number of seconds that closing the handler waits for the queued records to
+# be passed on, so that a stalled target cannot keep the process from exiting
+CLOSE_TIMEOUT = 5.0
+
+
+class QueueHandler(logging.Handler):
+    """ This type queues up to _queue_size_ records for a background thread,
+    which passes up to _batch_size_ of them at a time to the _target_ handler.
+    Records given while the queue is full are handled as detailed by the
+    _overflow_ policy. Until started, records are passed to _target_ at once.
+    """
+
+    def __init__(self, target, queue_size = 1024, overflow = DROP_OLD,
+                 batch_size = 64):
+        logging.Handler.__init__(self)
+
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError("unknown overflow policy: %s" % overflow)
+
+        self.__target = target
+        self.__queue = collections.deque()
+        self.__queue_size = max(1, queue_size)
+        self.__overflow = overflow
+        self.__batch_size = max(1, batch_size)
+        self.__changed = threading.Condition(threading.Lock())
+        self.__thread = None
+        self.__running = False
+
+        self.__dropped = 0
+        self.__reported = 0
+
+    def start(self):
+        """ Start the thread passing the queued records on. """
+
+        with self.__changed:
+            if self.__running:
+                return
+
+            self.__running = True
+            self.__thread = threading.Thread(target = self.__run,
+                                             name = "QueueHandler")
+            self.__thread.daemon = True
+            self.__thread.start()
+
+    def stop(self, timeout = None):
+        """ Stop the thread, once it has passed on the records queued, waiting
+        for at most _timeout_ seconds (if given) for it to do so. """
+
+        with self.__changed:
+            thread = self.__thread
+            self.__running = False
+            self.__changed.notify_all()
+
+        if thread and thread is not threading.current_thread():
+            thread.join(timeout)
+
+    def is_running(self):
+        """ Returns True if the records are passed on by the thread. """
+
+        return self.__running
+
+    def dropped(self):
+        """ Returns the number of records dropped since the queue was full. """
+
+        return self.__dropped
+
+    def depth(self):
+        """ Returns the number of records queued. """
+
+        return len(self.__queue)
+
+    def emit(self, record):
+        """ Queue _record_, as detailed by the overflow policy should the queue
+        be full. """
+
+        if not self.__running or self.__thread is threading.current_thread():
+            self.__target.handle(record)
+            return
+
+        self.prepare(record)
+
+        with self.__changed:
+            if BLOCK == self.__overflow:
+                while self.__running and \
+                      len(self.__queue) >= self.__queue_size:
+                    self.__changed.wait()
+
+            if len(self.__queue) >= self.__queue_size:
+                self.__dropped += 1
+                if DROP_NEW == self.__overflow:
+                    return
+                self.__queue.popleft()
+
+            self.__queue.append(record)
+            self.__changed.notify_all()
+
+    def prepare(self, record):
+        """ Render the message and any exception information of _record_, since
+        its arguments may change before the record is passed on. """
+
+        record.msg = record.getMessage()
+        record.args = None
+
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = logging.Formatter().formatException(
+                    record.exc_info)
+            record.exc_info = None
+
+    def close(self):
+        """ Overridden in order to pass on the records queued, and close the
+        target handler. """
+
+        self.stop(CLOSE_TIMEOUT)
+        self.__target.close()
+        logging.Handler.close(self)
+
+    def __run(self):
+        """ Pass the queued records on, until stopped and the queue is empty.
+        """
+
+        while True:
+            with self.__changed:
+                while self.__running and not self.__queue:
+                    self.__changed.wait()
+
+                batch = [self.__queue.popleft() for _ in
+                         range(min(self.__batch_size, len(self.__queue)))]
+                self.__changed.notify_all()
+
+                dropped = self.__dropped - self.__reported
+                self.__reported = self.__dropped
+
+            if dropped:
+                self.__target.handle(logging.makeLogRecord({
+                    "name": "QueueHandler", "levelno": logging.WARNING,
+                    "levelname": logging.getLevelName(logging.WARNING),
+                    "msg": "%d log records dropped, the queue was full" %
+                           dropped}))
+
+            for record in batch:
+                self.__target.handle(record)
+
+            if not batch and not self.__running:
+                return
@@ -0,0 +1,226 @@
+#!/usr/bin/env python
+
+#Copyright (C) 2012 Niklas Thorne.
+
+#This file is part of XMPPMote.
+#
+#XMPPMote is free software: you can redistribute it and/or modify
+#it under the terms of the GNU General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+#
+#XMPPMote is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU General Public License for more details.
+#
+#You should have received a copy of the GNU General Public License
+#along with XMPPMote.  If not, see <http://www.gnu.org/licenses/>.
+
+
+""" This module provides the Scheduler, which runs periodic jobs.
+
+All jobs are run by a single scheduler thread, which sleeps until the next job
+is due, so the number of threads stays the same no matter how many times the
+jobs are run. Jobs should be short, since they delay any job due after them. """
+
+import os
+import sys
+
+sys.path.append(os.path.abspath('..'))
+from lib import borg
+from lib.clock import monotonic
+
+import errno
+import heapq
+import itertools
+import logging
+import select
+import threading
+import traceback
+
+
+class Job(object):
+    """ This type describes a job registered with the Scheduler. A fixed rate
+    job is due every _interval_ seconds, no matter how long it runs for, while
+    a fixed delay job is due _interval_ seconds after it last finished. A job
+    that is run _once_ is not due again. """
+
+    def __init__(self, function, interval, fixed_rate, due, once = False):
+        self.function = function
+        self.interval = interval
+        self.fixed_rate = fixed_rate
+        self.due = due
+        self.once = once
+        self.cancelled = False
+
+
+class Scheduler(borg.make_borg()):
+    """ This type keeps the registered jobs in a heap ordered by when they are
+    due, and runs them on the scheduler thread. The thread is started once the
+    first job is registered. """
+
+    def __init__(self):
+        super(Scheduler, self).__init__()
+
+        if not hasattr(self, "_Scheduler__lock"):
+            self.__lock = threading.Lock()
+            self.__heap = []
+            self.__sequence = itertools.count()
+            self.__thread = None
+            self.__wakeup = None
+
+    def schedule(self, interval, function, fixed_rate = False, delay = None):
+        """ Register _function_ to be called every _interval_ seconds, the
+        first time after _delay_ seconds (defaults to _interval_). Returns the
+        Job, which may be passed to cancel. """
+
+        if 0 >= interval:
+            raise ValueError("the interval must be positive")
+
+        if None == delay:
+            delay = interval
+
+        return self.__add(Job(function, interval, fixed_rate,
+                              monotonic() + delay))
+
+    def call_later(self, delay, function):
+        """ Register _function_ to be called once, after _delay_ seconds.
+        Returns the Job, which may be passed to cancel. """
+
+        return self.__add(Job(function, delay, False, monotonic() + delay,
+                              once = True))
+
+    def __add(self, job):
+        """ Push _job_ onto the heap, starting the scheduler thread should it
+        not be running. Returns the job. """
+
+        with self.__lock:
+            self.__push(job)
+
+            if not self.__thread:
+                self.__wakeup = os.pipe()
+                self.__thread = threading.Thread(target = self.__run,
+                                                 args = (self.__wakeup[0], ))
+                self.__thread.daemon = True
+                self.__thread.start()
+
+        self.__wake()
+
+        return job
+
+    def cancel(self, job):
+        """ Make sure that _job_ is not run again. A job that is running when
+        cancelled finishes its run. """
+
+        with self.__lock:
+            job.cancelled = True
+
+        self.__wake()
+
+    def next_due(self):
+        """ Returns a tuple of the job that is due next, and the number of
+        seconds until it is due (negative if overdue), or None if there are no
+        jobs. """
+
+        with self.__lock:
+            job = self.__peek()
+            if not job:
+                return None
+
+            return (job, job.due - monotonic())
+
+    def stop(self):
+        """ Cancel all jobs, and stop the scheduler thread once any running job
+        has finished. """
+
+        with self.__lock:
+            for (_, _, job) in self.__heap:
+                job.cancelled = True
+
+            self.__heap = []
+            (thread, self.__thread) = (self.__thread, None)
+            (wakeup, self.__wakeup) = (self.__wakeup, None)
+
+        if thread:
+            os.close(wakeup[1])
+            thread.join()
+
+    def __push(self, job):
+        """ Add _job_ to the heap. The sequence number keeps jobs that are due
+        at the same time in the order that they were added. """
+
+        heapq.heappush(self.__heap, (job.due, next(self.__sequence), job))
+
+    def __peek(self):
+        """ Returns the job that is due next, discarding cancelled jobs. """
+
+        while self.__heap and self.__heap[0][2].cancelled:
+            heapq.heappop(self.__heap)
+
+        return self.__heap and self.__heap[0][2] or None
+
+    def __wake(self):
+        """ Wake the scheduler thread up, so that it sees any changes. """
+
+        with self.__lock:
+            if self.__wakeup:
+                os.write(self.__wakeup[1], "x")
+
+    def __run(self, wakeup):
+        """ Scheduler thread main function; runs each job once it is due, until
+        the scheduler is stopped. """
+
+        while True:
+            with self.__lock:
+                job = self.__peek()
+                timeout = job and max(0, job.due - monotonic())
+
+                if job and 0 == timeout:
+                    heapq.heappop(self.__heap)
+
+            if None == job or 0 < timeout:
+                # sleep until the job is due, or until woken up
+                try:
+                    readable = select.select([wakeup], [], [], timeout)[0]
+                except select.error, err:
+                    if errno.EINTR != err.args[0]:
+                        raise
+                    continue
+
+                if readable and not os.read(wakeup, 512):
+                    # the writing end has been closed by stop
+                    os.close(wakeup)
+                    return
+
+                continue
+
+            self.__call(job)
+
+            with self.__lock:
+                if job.cancelled or job.once:
+                    continue
+
+                if job.fixed_rate:
+                    # skip any runs that were missed while running late
+                    now = monotonic()
+                    while job.due <= now:
+                        job.due += job.interval
+                else:
+                    job.due = monotonic() + job.interval
+
+                self.__push(job)
+
+    @staticmethod
+    def __call(job):
+        """ Run _job_, logging any exception that it raises. """
+
+        try:
+            job.function()
+        except Exception, exc:
+            logger = logging.getLogger()
+            logger.error(u"scheduled job %r raised %s" % (job.function,
+                                                        repr(exc)))
+
+            for line in filter(None, traceback.format_exc().split("\n")):
+                logger.error(line)
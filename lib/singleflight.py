@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+
+#Copyright (C) 2012 Niklas Thorne.
+
+#This file is part of XMPPMote.
+#
+#XMPPMote is free software: you can redistribute it and/or modify
+#it under the terms of the GNU General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+#
+#XMPPMote is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU General Public License for more details.
+#
+#You should have received a copy of the GNU General Public License
+#along with XMPPMote.  If not, see <http://www.gnu.org/licenses/>.
+
+""" This module provides call coalescing.
+
+Threads that call SingleFlight.do with the same key while a call for that key is
+already in flight do not make calls of their own, rather they wait for the call
+in flight and share its result. """
+
+import sys
+import threading
+
+
+class Flight(object):
+    """ This type describes a call in flight. """
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight(object):
+    """ This type coalesces concurrent calls made with equal keys. """
+
+    def __init__(self):
+        self.__lock = threading.Lock()
+        self.__flights = {}
+
+    def do(self, key, function, *args):
+        """ Returns a (result, shared) tuple, where result is the result of
+        calling _function_ with _args_, unless a call is already in flight for
+        _key_, in which case result is the result of that call. Any exception
+        raised by the call is raised to every caller sharing it. shared is True
+        if the result was shared by several callers. """
+
+        with self.__lock:
+            flight = self.__flights.get(key)
+            leader = None == flight
+
+            if leader:
+                flight = Flight()
+                self.__flights[key] = flight
+            else:
+                flight.waiters += 1
+
+        if not leader:
+            flight.done.wait()
+
+            if flight.error:
+                raise flight.error[0], flight.error[1], flight.error[2]
+
+            return (flight.result, True)
+
+        try:
+            flight.result = function(*args)
+        except:
+            flight.error = sys.exc_info()
+            raise
+        finally:
+            with self.__lock:
+                del self.__flights[key]
+
+            flight.done.set()
+
+        return (flight.result, 0 < flight.waiters)
@@ -0,0 +1,495 @@
+#!/usr/bin/env python
+
+#Copyright (C) 2012 Niklas Thorne.
+
+#This file is part of XMPPMote.
+#
+#XMPPMote is free software: you can redistribute it and/or modify
+#it under the terms of the GNU General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+#
+#XMPPMote is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU General Public License for more details.
+#
+#You should have received a copy of the GNU General Public License
+#along with XMPPMote.  If not, see <http://www.gnu.org/licenses/>.
+
+""" This module provides a spawner process, which starts commands on behalf of
+the daemon.
+
+Forking the daemon itself gets slower the more memory and threads the daemon
+has, so the Spawner forks a small helper process at startup, before the daemon
+has grown, and lets that process fork and execute the commands instead. Each
+command writes its output to a pipe created by the daemon, whose writing end is
+passed to the helper process over a Unix socket. The helper process reports the
+pid of each command, and its exit status once it has exited. """
+
+import os
+import sys
+
+sys.path.append(os.path.abspath('..'))
+from lib import borg
+from lib import process
+
+from _multiprocessing import recvfd
+from _multiprocessing import sendfd
+
+import errno
+import fcntl
+import json
+import logging
+import select
+import signal
+import socket
+import struct
+import subprocess
+import threading
+
+
+# the format of the length that precedes each message
+LENGTH_FORMAT = "!I"
+
+# the status reported for commands whose exit status could not be determined
+UNKNOWN_STATUS = 255
+
+
+class SpawnerError(Exception):
+    """ This exception is raised when a command cannot be handed to the spawner
+    process, e.g. since that process has exited. """
+    pass
+
+
+class SpawnedProcess(object):
+    """ This type describes a command started by the spawner process. It
+    provides the parts of the subprocess.Popen interface used by XMPPMote. """
+
+    def __init__(self, pid, stdout):
+        self.pid = pid
+        self.stdout = stdout
+        self.returncode = None
+
+        self.__exited = threading.Event()
+
+    def poll(self):
+        """ Returns the exit status, or None if the command has not exited. """
+
+        return self.returncode
+
+    def wait(self):
+        """ Wait for the command to exit, and return its exit status. """
+
+        self.__exited.wait()
+        return self.returncode
+
+    def communicate(self):
+        """ Read all of the output of the command, and wait for it to exit.
+        Returns a tuple of the output, and None (in place of stderr). """
+
+        output = self.stdout.read()
+        self.stdout.close()
+        self.wait()
+
+        return (output, None)
+
+    def set_returncode(self, returncode):
+        """ Called by the Spawner once the command has exited. """
+
+        self.returncode = returncode
+        self.__exited.set()
+
+
+class Spawner(borg.make_borg()):
+    """ This type starts, and communicates with, the spawner process. """
+
+    def __init__(self):
+        super(Spawner, self).__init__()
+
+        if not hasattr(self, "_Spawner__lock"):
+            self.__lock = threading.Lock()
+            self.__send_lock = threading.Lock()
+            self.__sock = None
+            self.__pid = None
+
+    def start(self):
+        """ Fork the spawner process. This should be done as early as possible,
+        before the daemon has started any threads. """
+
+        (sock, helper_sock) = socket.socketpair(socket.AF_UNIX,
+                                                socket.SOCK_STREAM)
+
+        pid = os.fork()
+        if 0 == pid:
+            status = 0
+            try:
+                sock.close()
+                serve(helper_sock)
+            except:
+                status = 1
+            finally:
+                os._exit(status)
+
+        helper_sock.close()
+
+        # the requests and processes of each spawner process are kept apart,
+        # so that the reader of a stopped one cannot touch those of the next
+        requests = {}
+        processes = {}
+
+        with self.__lock:
+            self.__sock = sock
+            self.__pid = pid
+            self.__next_id = 0
+            self.__requests = requests
+
+        reader = threading.Thread(target = self.__read,
+                                  args = (sock, requests, processes))
+        reader.daemon = True
+        reader.start()
+
+    def stop(self):
+        """ Make the spawner process exit, and reap it. Commands that are
+        running are left to run. """
+
+        with self.__lock:
+            (sock, pid) = (self.__sock, self.__pid)
+            self.__sock = self.__pid = None
+
+        if sock:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except socket.error:
+                pass
+            sock.close()
+
+        if pid:
+            os.waitpid(pid, 0)
+
+    def is_running(self):
+        """ Returns True if commands may be handed to the spawner process. """
+
+        return None != self.__sock
+
+    def spawn(self, args):
+        """ Start the command described by the list _args_, in a process group
+        of its own, and return a SpawnedProcess from whose stdout the output of
+        the command may be read. OSError is raised if the command could not be
+        executed, and SpawnerError if it could not be handed to the spawner
+        process. """
+
+        event = threading.Event()
+        response = {}
+
+        with self.__lock:
+            if not self.__sock:
+                raise SpawnerError("the spawner process is not running")
+
+            sock = self.__sock
+            requests = self.__requests
+            request_id = self.__next_id
+            self.__next_id += 1
+            requests[request_id] = (event, response)
+
+        (readfd, writefd) = os.pipe()
+        try:
+            with self.__send_lock:
+                send_message(sock, {"id": request_id, "args": list(args)})
+                sendfd(sock.fileno(), writefd)
+        except (socket.error, OSError), err:
+            with self.__lock:
+                requests.pop(request_id, None)
+            os.close(readfd)
+            raise SpawnerError("could not hand command to spawner: %s" % err)
+        finally:
+            os.close(writefd)
+
+        event.wait()
+
+        if "errno" in response:
+            os.close(readfd)
+            raise OSError(response["errno"], os.strerror(response["errno"]))
+
+        if "process" not in response:
+            os.close(readfd)
+            raise SpawnerError("the spawner process has exited")
+
+        spawned = response["process"]
+        spawned.stdout = os.fdopen(readfd, "rb")
+
+        return spawned
+
+    def __read(self, sock, requests, processes):
+        """ Read responses from the spawner process, until it exits, handling
+        the pending _requests_ and running _processes_ of that process. """
+
+        while True:
+            try:
+                message = receive_message(sock)
+            except (socket.error, ValueError):
+                message = None
+
+            if None == message:
+                break
+
+            with self.__lock:
+                if "id" in message:
+                    self.__handle_spawned(message, requests, processes)
+                else:
+                    spawned = processes.pop(message["pid"], None)
+                    if spawned:
+                        spawned.set_returncode(message["status"])
+
+        # the spawner process has exited, or is being stopped
+        with self.__lock:
+            if self.__sock == sock:
+                logger = logging.getLogger()
+                logger.error(u"the spawner process has exited unexpectedly")
+                self.__sock = None
+
+            pending = requests.values()
+            running = processes.values()
+            requests.clear()
+            processes.clear()
+
+        for (event, _) in pending:
+            event.set()
+
+        for spawned in running:
+            spawned.set_returncode(UNKNOWN_STATUS)
+
+    @staticmethod
+    def __handle_spawned(message, requests, processes):
+        """ Handle the response of the spawner process to a spawn request in
+        _requests_, adding the spawned process to _processes_. """
+
+        (event, response) = requests.pop(message["id"])
+
+        if "errno" in message:
+            response["errno"] = message["errno"]
+        else:
+            spawned = SpawnedProcess(message["pid"], None)
+            processes[spawned.pid] = spawned
+            response["process"] = spawned
+
+        event.set()
+
+
+def popen(args):
+    """ Start the command described by the list _args_, in a process group of
+    its own, using the Spawner if it is running, and subprocess.Popen if not.
+    Returns an object with the parts of the subprocess.Popen interface used by
+    XMPPMote, i.e. pid, stdout, returncode, poll, wait and communicate. """
+
+    if isinstance(args, basestring):
+        args = [args]
+
+    spawner = Spawner()
+    if spawner.is_running():
+        try:
+            return spawner.spawn(args)
+        except SpawnerError, err:
+            logger = logging.getLogger()
+            logger.error(u"%s, starting command directly" % err)
+
+    return subprocess.Popen(args, stdout = subprocess.PIPE,
+                            preexec_fn = process.new_process_group)
+
+
+def send_message(sock, message):
+    """ Send the JSON encoded _message_ over _sock_, preceded by its length. """
+
+    data = json.dumps(message)
+    sock.sendall(struct.pack(LENGTH_FORMAT, len(data)) + data)
+
+
+def receive_message(sock):
+    """ Receive a message sent by send_message over _sock_, or return None if
+    the socket has been closed. """
+
+    header = __receive_exactly(sock, struct.calcsize(LENGTH_FORMAT))
+    if None == header:
+        return None
+
+    data = __receive_exactly(sock, struct.unpack(LENGTH_FORMAT, header)[0])
+    if None == data:
+        return None
+
+    return json.loads(data)
+
+
+def __receive_exactly(sock, size):
+    """ Receive exactly _size_ bytes from _sock_, or return None if the socket
+    is closed before then. Never reading more than asked for keeps the byte
+    that carries a passed file descriptor in the socket. """
+
+    data = ""
+    while len(data) < size:
+        try:
+            chunk = sock.recv(size - len(data))
+        except socket.error, err:
+            if errno.EINTR == err.args[0]:
+                continue
+            raise
+
+        if not chunk:
+            return None
+
+        data += chunk
+
+    return data
+
+
+def serve(sock):
+    """ The main loop of the spawner process, handling the spawn requests
+    received over _sock_, and reporting exited commands. """
+
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    # let go of anything inherited from the daemon, once and for all, so that
+    # the commands only need to be rid of the few descriptors opened below
+    os.closerange(3, sock.fileno())
+    os.closerange(sock.fileno() + 1, subprocess.MAXFD)
+
+    # SIGCHLD wakes select up, by writing to the wakeup pipe
+    (wakeup, wakeup_write) = os.pipe()
+    for fdesc in (wakeup, wakeup_write):
+        fcntl.fcntl(fdesc, fcntl.F_SETFL,
+                    fcntl.fcntl(fdesc, fcntl.F_GETFL) | os.O_NONBLOCK)
+
+    for fdesc in (sock.fileno(), wakeup, wakeup_write):
+        __set_cloexec(fdesc)
+    signal.set_wakeup_fd(wakeup_write)
+    signal.signal(signal.SIGCHLD, lambda signum, frame: None)
+    signal.siginterrupt(signal.SIGCHLD, False)
+
+    while True:
+        try:
+            readable = select.select([sock, wakeup], [], [])[0]
+        except select.error, err:
+            if errno.EINTR != err.args[0]:
+                raise
+            continue
+
+        if wakeup in readable:
+            try:
+                while os.read(wakeup, 512):
+                    pass
+            except OSError, err:
+                if errno.EAGAIN != err.errno:
+                    raise
+
+            __reap(sock)
+
+        if sock in readable:
+            request = receive_message(sock)
+            if None == request:
+                return
+
+            __spawn(sock, request, recvfd(sock.fileno()))
+
+
+def __spawn(sock, request, stdout):
+    """ Fork and execute the command of _request_, with _stdout_ as its
+    standard output, and report its pid (or the reason that it could not be
+    executed) over _sock_. """
+
+    (errpipe, errpipe_write) = os.pipe()
+    __set_cloexec(errpipe)
+    __set_cloexec(errpipe_write)
+
+    pid = os.fork()
+    if 0 == pid:
+        try:
+            os.setsid()
+
+            devnull = os.open(os.devnull, os.O_RDONLY)
+            os.dup2(devnull, 0)
+            os.dup2(stdout, 1)
+            for fdesc in set([devnull, stdout]) - set([0, 1, 2]):
+                os.close(fdesc)
+
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+
+            os.execvp(request["args"][0], request["args"])
+        except OSError, err:
+            os.write(errpipe_write, str(err.errno))
+        except:
+            os.write(errpipe_write, str(errno.EINVAL))
+        finally:
+            os._exit(127)
+
+    os.close(stdout)
+    os.close(errpipe_write)
+
+    # the pipe is closed once the command has been executed
+    data = ""
+    while True:
+        try:
+            chunk = os.read(errpipe, 64)
+        except OSError, err:
+            if errno.EINTR == err.errno:
+                continue
+            raise
+
+        if not chunk:
+            break
+        data += chunk
+
+    os.close(errpipe)
+
+    if data:
+        __wait_for(pid)
+        send_message(sock, {"id": request["id"], "errno": int(data)})
+    else:
+        send_message(sock, {"id": request["id"], "pid": pid})
+
+
+def __set_cloexec(fdesc):
+    """ Make _fdesc_ be closed when a command is executed. """
+
+    fcntl.fcntl(fdesc, fcntl.F_SETFD,
+                fcntl.fcntl(fdesc, fcntl.F_GETFD) | fcntl.FD_CLOEXEC)
+
+
+def __wait_for(pid):
+    """ Reap the command with the given _pid_, returning its exit status. """
+
+    while True:
+        try:
+            return __returncode(os.waitpid(pid, 0)[1])
+        except OSError, err:
+            if errno.EINTR != err.errno:
+                raise
+
+
+def __reap(sock):
+    """ Reap any exited command, and report its exit status over _sock_. """
+
+    while True:
+        try:
+            (pid, status) = os.waitpid(-1, os.WNOHANG)
+        except OSError, err:
+            if errno.EINTR == err.errno:
+                continue
+            if errno.ECHILD == err.errno:
+                return
+            raise
+
+        if 0 == pid:
+            return
+
+        send_message(sock, {"pid": pid, "status": __returncode(status)})
+
+
+def __returncode(status):
+    """ Returns the exit status _status_ in the form of Popen.returncode, i.e.
+    negated signal numbers for commands killed by signals. """
+
+    if os.WIFSIGNALED(status):
+        return -os.WTERMSIG(status)
+
+    return os.WEXITSTATUS(status)
@@ -0,0 +1,66 @@
+#!/usr/bin/env python
+
+#Copyright (C) 2012 Niklas Thorne.
+
+#This file is part of XMPPMote.
+#
+#XMPPMote is free software: you can redistribute it and/or modify
+#it under the terms of the GNU General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+#
+#XMPPMote is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU General Public License for more details.
+#
+#You should have received a copy of the GNU General Public License
+#along with XMPPMote.  If not, see <http://www.gnu.org/licenses/>.
+""" This module tests the backoff module. """
+""" This module tests the backoff module. """
+
+import sys
+import os
+
+sys.path.append(os.path.abspath(".."))
+
+import mox
+import random
+import unittest
+
+from backoff import Backoff
+
+
+class BackoffTest(mox.MoxTestBase):
+    """ Provides test cases for the Backoff type. """
+
+    def test_next(self):
+        """ The ceiling should double for each retry, up to the cap, and start
+        over once reset. """
+
+        self.mox.StubOutWithMock(random, "uniform")
+
+        for ceiling in [1.0, 2.0, 4.0, 8.0, 10.0, 10.0, 1.0]:
+            random.uniform(0, ceiling).AndReturn(ceiling / 2)
+
+        self.mox.ReplayAll()
+
+        backoff = Backoff(1, 10)
+        self.assertEquals([0.5, 1.0, 2.0, 4.0, 5.0, 5.0],
+                          [backoff.next() for _ in range(6)])
+
+        backoff.reset()
+        self.assertEquals(0.5, backoff.next())
+
+    def test_jitter(self):
+        """ The delays should be spread out between zero and the ceiling. """
+
+        backoff = Backoff(8, 8)
+        delays = [backoff.next() for _ in range(100)]
+
+        self.assertTrue(all(0 <= delay <= 8 for delay in delays))
+        self.assertTrue(1 < len(set(delays)))
+
+
+if "__main__" == __name__:
+    unittest.main()
@@ -0,0 +1,52 @@
+#!/usr/bin/env python
+
+#Copyright (C) 2012 Niklas Thorne.
+
+#This file is part of XMPPMote.
+#
+#XMPPMote is free software: you can redistribute it and/or modify
+#it under the terms of the GNU General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+#
+#XMPPMote is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU General Public License for more details.
+#
+#You should have received a copy of the GNU General Public License
+#along with XMPPMote.  If not, see <http://www.gnu.org/licenses/>.
+
+""" This module tests the clock module. """
+
+import sys
+import os
+
+sys.path.append(os.path.abspath(".."))
+
+import mox
+import unittest
+import time
+
+from clock import monotonic
+
+
+class MonotonicTest(mox.MoxTestBase):
+    """ Provides test cases for the monotonic function. """
+
+    def test_monotonic(self):
+        """ The clock should advance along with the wall clock, but should not
+        be affected by changes to the wall clock. """
+
+        self.mox.StubOutWithMock(time, "time")
+        self.mox.ReplayAll()
+
+        start = monotonic()
+        time.sleep(0.01)
+        elapsed = monotonic() - start
+
+        self.assertTrue(0.01 <= elapsed < 1, elapsed)
+
+
+if "__main__" == __name__:
+    unittest.main()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+
+#Copyright (C) 2012 Niklas Thorne.
+
+#This file is part of XMPPMote.
+#
+#XMPPMote is free software: you can redistribute it and/or modify
+#it under the terms of the GNU General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+#
+#XMPPMote is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU General Public License for more details.
+#
+#You should have received a copy of the GNU General Public License
+#along with XMPPMote.  If not, see <http://www.gnu.org/licenses/>.
+""" This module tests the histogram module. """
+""" This module tests the histogram module. """
+
+import sys
+import os
+
+sys.path.append(os.path.abspath(".."))
+
+import unittest
+
+from histogram import Histogram
+
+
+class HistogramTest(unittest.TestCase):
+    """ Provides test cases for the Histogram type. """
+
+    def test_empty(self):
+        """ An empty histogram should report zeroes. """
+
+        histogram = Histogram()
+
+        self.assertEquals(0, histogram.count())
+        self.assertEquals(0, histogram.total())
+        self.assertEquals(0, histogram.mean())
+        self.assertEquals(0, histogram.percentile(99))
+
+    def test_percentile(self):
+        """ Percentiles should be estimated within the growth factor of the
+        buckets, and never exceed the largest value counted. """
+
+        histogram = Histogram(growth = 1.1)
+        for value in range(1, 1001):
+            histogram.record(value / 1000.0)
+
+        self.assertEquals(1000, histogram.count())
+        self.assertAlmostEquals(500.5, histogram.total())
+        self.assertAlmostEquals(0.5005, histogram.mean())
+
+        for percent in (50, 95, 99):
+            estimate = histogram.percentile(percent)
+            self.assertTrue(percent / 100.0 <= estimate <=
+                            percent / 100.0 * 1.1, (percent, estimate))
+
+        self.assertEquals(1.0, histogram.percentile(100))
+
+    def test_out_of_range(self):
+        """ Values beyond the range should be counted in the outermost
+        buckets. """
+
+        histogram = Histogram(1e-3, 1.0)
+        histogram.record(0)
+        histogram.record(1e6)
+
+        self.assertEquals(2, histogram.count())
+        self.assertTrue(histogram.percentile(50) <= 1e-3)
+        self.assertEquals(1e6, histogram.percentile(100))
+
+
+if "__main__" == __name__:
+    unittest.main()
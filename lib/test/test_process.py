@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+
+#Copyright (C) 2012 Niklas Thorne.
+
+#This file is part of XMPPMote.
+#
+#XMPPMote is free software: you can redistribute it and/or modify
+#it under the terms of the GNU General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+#
+#XMPPMote is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU General Public License for more details.
+#
+#You should have received a copy of the GNU General Public License
+#along with XMPPMote.  If not, see <http://www.gnu.org/licenses/>.
+""" This module tests the process module. """
+
+import sys
+import os
+
+sys.path.append(os.path.abspath(".."))
+
+import mox
+import unittest
+import signal
+import subprocess
+
+import process
+from clock import monotonic
+
+
+class ProcessTest(mox.MoxTestBase):
+    """ Provides test cases for the process module. """
+
+    def __start(self, script):
+        """ Start a shell running _script_ in a process group of its own. """
+
+        return subprocess.Popen(["sh", "-c", script],
+                                preexec_fn=process.new_process_group)
+
+    def test_wait_until(self):
+        """ Waiting should stop at the deadline, or once the process has
+        exited. """
+
+        subp = self.__start("sleep 10")
+
+        self.assertFalse(process.wait_until(subp, monotonic() + 0.1))
+        self.assertEquals(None, subp.returncode)
+
+        process.kill_group(subp, 1)
+        self.assertEquals(-signal.SIGTERM, subp.returncode)
+
+        subp = self.__start("exit 3")
+        self.assertTrue(process.wait_until(subp, monotonic() + 10))
+        self.assertEquals(3, subp.returncode)
+
+    def test_kill_group(self):
+        """ The process group should be killed, resorting to SIGKILL if
+        SIGTERM is ignored. """
+
+        subp = self.__start("trap '' TERM; sleep 10 & wait")
+
+        # give the shell time to ignore SIGTERM
+        process.wait_until(subp, monotonic() + 0.2)
+
+        start = monotonic()
+        process.kill_group(subp, 0.2)
+
+        self.assertEquals(-signal.SIGKILL, subp.returncode)
+        self.assertTrue(monotonic() - start < 5)
+
+
+if "__main__" == __name__:
+    unittest.main()
@@ -0,0 +1,141 @@
+#!/usr/bin/env python
+
+#Copyright (C) 2012 Niklas Thorne.
+
+#This file is part of XMPPMote.
+#
+#XMPPMote is free software: you can redistribute it and/or modify
+#it under the terms of the GNU General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+#
+#XMPPMote is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU General Public License for more details.
+#
+#You should have received a copy of the GNU General Public License
+#along with XMPPMote.  If not, see <http://www.gnu.org/licenses/>.
+
+""" This module tests the profiler module. """
+
+import sys
+import os
+
+sys.path.append(os.path.abspath(".."))
+sys.path.append(os.path.abspath("../.."))
+
+import mox
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+from lib.profiler import Profiler
+
+
+def spin(stopped):
+    """ Keep busy until _stopped_ is set. """
+
+    while not stopped.is_set():
+        time.sleep(0.001)
+
+
+class ProfilerTest(mox.MoxTestBase):
+    """ Provides test cases for the Profiler type. """
+
+    def setUp(self):
+        super(ProfilerTest, self).setUp()
+
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "profile.folded")
+
+        Profiler(1000, self.path)
+
+    def tearDown(self):
+        Profiler().stop()
+        Profiler(Profiler.DEFAULT_RATE, Profiler.DEFAULT_PATH)
+        shutil.rmtree(self.directory)
+        super(ProfilerTest, self).tearDown()
+
+    def __wait_for_profile(self):
+        """ Returns the lines of the profile, once written. """
+
+        for _ in range(500):
+            if os.path.exists(self.path):
+                return open(self.path).read().splitlines()
+            time.sleep(0.01)
+
+        self.fail("no profile written")
+
+    def test_profile(self):
+        """ The stacks of the running threads should be written in the
+        collapsed stack format once stopped. """
+
+        stopped = threading.Event()
+        spinner = threading.Thread(target = spin, args = (stopped, ),
+                                   name = "spinner")
+        spinner.start()
+
+        try:
+            self.assertTrue(Profiler().start())
+            self.assertFalse(Profiler().start())
+            self.assertTrue(Profiler().is_running())
+
+            time.sleep(0.1)
+
+            self.assertEquals(self.path, Profiler().stop())
+            self.assertEquals(None, Profiler().stop())
+        finally:
+            stopped.set()
+            spinner.join()
+
+        lines = self.__wait_for_profile()
+        spinning = [line for line in lines if line.startswith("spinner;")]
+
+        self.assertTrue(spinning, lines)
+        for line in spinning:
+            (stack, count) = line.rsplit(" ", 1)
+            self.assertTrue(0 < int(count))
+            self.assertTrue("spin (test_profiler.py:" in stack, stack)
+
+        self.assertFalse([line for line in lines
+                          if line.startswith("Profiler;")])
+
+    def test_toggle(self):
+        """ Toggling should start the profiler when stopped, and stop it when
+        started. """
+
+        Profiler().toggle()
+        self.assertTrue(Profiler().is_running())
+
+        Profiler().toggle()
+        self.assertFalse(Profiler().is_running())
+
+        self.__wait_for_profile()
+
+    def test_symlink_replaced(self):
+        """ A symbolic link at the path of the profile should be replaced by
+        the profile, rather than followed. """
+
+        target = os.path.join(self.directory, "target")
+        open(target, "w").close()
+        os.symlink(target, self.path)
+
+        Profiler().start()
+        Profiler().stop()
+
+        for _ in range(500):
+            if not os.path.islink(self.path):
+                break
+            time.sleep(0.01)
+
+        self.assertFalse(os.path.islink(self.path))
+        self.assertEquals("", open(target).read())
+        self.assertEquals(["profile.folded", "target"],
+                          sorted(os.listdir(self.directory)))
+
+
+if "__main__" == __name__:
+    unittest.main()
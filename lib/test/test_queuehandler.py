@@ -0,0 +1,190 @@
+#!/usr/bin/env python
+
+#Copyright (C) 2012 Niklas Thorne.
+
+#This file is part of XMPPMote.
+#
+#XMPPMote is free software: you can redistribute it and/or modify
+#it under the terms of the GNU General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+#
+#XMPPMote is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU General Public License for more details.
+#
+#You should have received a copy of the GNU General Public License
+#along with XMPPMote.  If not, see <http://www.gnu.org/licenses/>.
+
+""" This module tests the queuehandler module. """
+
+import sys
+import os
+
+sys.path.append(os.path.abspath(".."))
+sys.path.append(os.path.abspath("../.."))
+
+import logging
+import mox
+import threading
+import unittest
+
+from lib import queuehandler
+from lib.queuehandler import QueueHandler
+
+
+class RecordingHandler(logging.Handler):
+    """ Keeps the messages of the records handled, waiting for _gate_ (if
+    given) before handling each one. """
+
+    def __init__(self, gate = None):
+        logging.Handler.__init__(self)
+        self.messages = []
+        self.gate = gate
+
+    def emit(self, record):
+        if self.gate:
+            self.gate.wait()
+        self.messages.append(self.format(record))
+
+
+def make_record(msg, *args):
+    """ Returns an INFO record with _msg_ and _args_. """
+
+    return logging.LogRecord("test", logging.INFO, __file__, 0, msg, args,
+                             None)
+
+
+class QueueHandlerTest(mox.MoxTestBase):
+    """ Provides test cases for the QueueHandler type. """
+
+    def test_unstarted(self):
+        """ Records should be passed on at once until the handler is started.
+        """
+
+        target = RecordingHandler()
+        handler = QueueHandler(target)
+
+        handler.handle(make_record("foo %d", 1))
+
+        self.assertEquals(["foo 1"], target.messages)
+
+    def test_queued(self):
+        """ Records should be passed on in order by the thread, rendered as
+        they were when given. """
+
+        target = RecordingHandler()
+        handler = QueueHandler(target, batch_size = 2)
+        handler.start()
+
+        args = [1]
+        handler.handle(make_record("foo %s", args))
+        args.append(2)
+        for number in range(5):
+            handler.handle(make_record("bar %d", number))
+
+        handler.stop()
+
+        self.assertEquals(["foo [1]"] + ["bar %d" % number
+                                         for number in range(5)],
+                          target.messages)
+        self.assertEquals(0, handler.dropped())
+
+    def test_exception(self):
+        """ The exception information of records should be rendered when they
+        are given. """
+
+        target = RecordingHandler()
+        handler = QueueHandler(target)
+        handler.start()
+
+        try:
+            raise ValueError("baz")
+        except ValueError:
+            record = make_record("foo")
+            record.exc_info = sys.exc_info()
+            handler.handle(record)
+
+        handler.stop()
+
+        self.assertEquals(None, record.exc_info)
+        self.assertTrue(target.messages[0].startswith("foo\nTraceback"))
+        self.assertTrue(target.messages[0].endswith("ValueError: baz"))
+
+    def __overflow(self, overflow):
+        """ Give a handler with a queue of two records, and the _overflow_
+        policy, five records while its target is stalled. Returns the messages
+        passed on. """
+
+        gate = threading.Event()
+        target = RecordingHandler(gate)
+        handler = QueueHandler(target, 2, overflow, 1)
+        handler.start()
+
+        # the thread is stalled passing this one on
+        handler.handle(make_record("0"))
+        while handler.depth():
+            pass
+
+        for number in range(1, 5):
+            handler.handle(make_record(str(number)))
+
+        self.assertEquals(2, handler.depth())
+        self.assertEquals(2, handler.dropped())
+
+        gate.set()
+        handler.stop()
+
+        return target.messages
+
+    def test_drop_new(self):
+        """ Records given while the queue is full should be dropped, and the
+        number of them reported. """
+
+        self.assertEquals(["0", "2 log records dropped, the queue was full",
+                           "1", "2"], self.__overflow(queuehandler.DROP_NEW))
+
+    def test_drop_old(self):
+        """ The oldest records queued should be dropped to make room for the
+        records given while the queue is full. """
+
+        self.assertEquals(["0", "2 log records dropped, the queue was full",
+                           "3", "4"], self.__overflow(queuehandler.DROP_OLD))
+
+    def test_block(self):
+        """ Threads giving records while the queue is full should wait for
+        there to be room in the queue. """
+
+        gate = threading.Event()
+        target = RecordingHandler(gate)
+        handler = QueueHandler(target, 1, queuehandler.BLOCK, 1)
+        handler.start()
+
+        handler.handle(make_record("0"))
+        while handler.depth():
+            pass
+        handler.handle(make_record("1"))
+
+        thread = threading.Thread(target = handler.handle,
+                                  args = (make_record("2"), ))
+        thread.start()
+        thread.join(0.05)
+        self.assertTrue(thread.is_alive())
+
+        gate.set()
+        thread.join()
+        handler.stop()
+
+        self.assertEquals(["0", "1", "2"], target.messages)
+        self.assertEquals(0, handler.dropped())
+
+    def test_unknown_overflow(self):
+        """ ValueError should be raised for unknown overflow policies. """
+
+        self.assertRaises(ValueError, QueueHandler, RecordingHandler(), 1,
+                          "foo")
+
+
+if "__main__" == __name__:
+    unittest.main()
@@ -0,0 +1,152 @@
+#!/usr/bin/env python
+
+#Copyright (C) 2012 Niklas Thorne.
+
+#This file is part of XMPPMote.
+#
+#XMPPMote is free software: you can redistribute it and/or modify
+#it under the terms of the GNU General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+#
+#XMPPMote is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU General Public License for more details.
+#
+#You should have received a copy of the GNU General Public License
+#along with XMPPMote.  If not, see <http://www.gnu.org/licenses/>.
+
+""" This module tests the scheduler module. """
+
+import sys
+import os
+
+sys.path.append(os.path.abspath(".."))
+sys.path.append(os.path.abspath("../.."))
+
+import mox
+import unittest
+import logging
+import threading
+import time
+
+from lib.scheduler import Scheduler
+
+
+class SchedulerTest(mox.MoxTestBase):
+    """ Provides test cases for the Scheduler type. """
+
+    def tearDown(self):
+        Scheduler().stop()
+        super(SchedulerTest, self).tearDown()
+
+    def test_runs_jobs_on_one_thread(self):
+        """ Jobs should be run repeatedly, all of them on the same thread, and
+        the number of threads should not grow with the number of runs. """
+
+        threads = []
+        done = threading.Event()
+
+        def job():
+            threads.append(threading.current_thread())
+            if 10 <= len(threads):
+                done.set()
+
+        scheduler = Scheduler()
+        scheduler.schedule(0.01, job)
+        count = threading.active_count()
+        scheduler.schedule(0.01, job, True)
+
+        self.assertTrue(done.wait(5))
+        self.assertEqual(1, len(set(threads)))
+        self.assertNotEqual(threading.current_thread(), threads[0])
+        self.assertEqual(count, threading.active_count())
+
+    def test_cancel(self):
+        """ A cancelled job should not be run. """
+
+        ran = threading.Event()
+
+        scheduler = Scheduler()
+        job = scheduler.schedule(0.05, ran.set)
+        scheduler.cancel(job)
+
+        self.assertFalse(ran.wait(0.2))
+        self.assertEqual(None, scheduler.next_due())
+
+    def test_call_later(self):
+        """ A job registered by call_later should be run once. """
+
+        runs = []
+        ran = threading.Event()
+
+        def job():
+            runs.append(job)
+            ran.set()
+
+        scheduler = Scheduler()
+        scheduler.call_later(0.01, job)
+
+        self.assertTrue(ran.wait(5))
+        time.sleep(0.05)
+        self.assertEqual(1, len(runs))
+        self.assertEqual(None, scheduler.next_due())
+
+    def test_next_due(self):
+        """ The job that is due first should be reported, no matter the order
+        in which the jobs were scheduled. """
+
+        scheduler = Scheduler()
+        scheduler.schedule(60, lambda: None)
+        job = scheduler.schedule(60, lambda: None, delay = 30)
+
+        (due, seconds) = scheduler.next_due()
+        self.assertEqual(job, due)
+        self.assertTrue(0 < seconds <= 30)
+
+    def test_fixed_rate_skips_missed_runs(self):
+        """ A fixed rate job that runs for longer than its interval should be
+        run again at its next due time, rather than catching up on the runs
+        that it missed. """
+
+        runs = []
+
+        def job():
+            runs.append(job)
+            time.sleep(0.25)
+
+        scheduler = Scheduler()
+        scheduler.schedule(0.1, job, True, 0)
+        time.sleep(0.4)
+        scheduler.stop()
+
+        self.assertTrue(2 >= len(runs))
+
+    def test_failing_job(self):
+        """ A job that raises should be run again. """
+
+        runs = []
+        done = threading.Event()
+
+        def job():
+            runs.append(job)
+            if 2 <= len(runs):
+                done.set()
+            raise RuntimeError("failed")
+
+        logging.disable(logging.ERROR)
+        try:
+            Scheduler().schedule(0.01, job)
+            self.assertTrue(done.wait(5))
+        finally:
+            logging.disable(logging.NOTSET)
+
+    def test_bad_interval(self):
+        """ An interval that is not positive should raise a ValueError. """
+
+        self.assertRaises(ValueError, Scheduler().schedule, 0, lambda: None)
+
+
+if "__main__" == __name__:
+    unittest.main()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python
+
+#Copyright (C) 2012 Niklas Thorne.
+
+#This file is part of XMPPMote.
+#
+#XMPPMote is free software: you can redistribute it and/or modify
+#it under the terms of the GNU General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+#
+#XMPPMote is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU General Public License for more details.
+#
+#You should have received a copy of the GNU General Public License
+#along with XMPPMote.  If not, see <http://www.gnu.org/licenses/>.
+
+""" This module tests the singleflight module. """
+
+import sys
+import os
+
+sys.path.append(os.path.abspath(".."))
+
+import mox
+import unittest
+import threading
+import time
+
+from singleflight import SingleFlight
+
+
+class SingleFlightTest(mox.MoxTestBase):
+    """ Provides test cases for the SingleFlight type. """
+
+    def __join_flight(self, flight, key, function, results):
+        """ Start a thread calling flight.do, appending the outcome to
+        _results_. """
+
+        def call():
+            try:
+                results.append(flight.do(key, function))
+            except Exception as ex:
+                results.append(ex)
+
+        thread = threading.Thread(target = call)
+        thread.start()
+        return thread
+
+    def __wait_for_waiters(self, flight, key, waiters):
+        """ Wait until _waiters_ callers wait for the call in flight. """
+
+        flights = flight._SingleFlight__flights
+        for _ in range(500):
+            if key in flights and waiters == flights[key].waiters:
+                return
+            time.sleep(0.01)
+
+        self.fail("callers did not join the call in flight")
+
+    def test_calls_are_coalesced(self):
+        """ Concurrent calls with the same key should share the result of a
+        single call. """
+
+        flight = SingleFlight()
+        release = threading.Event()
+        calls = []
+
+        def function():
+            calls.append(None)
+            release.wait()
+            return "result"
+
+        results = []
+        threads = [self.__join_flight(flight, "key", function, results)]
+        self.__wait_for_waiters(flight, "key", 0)
+
+        threads.extend([self.__join_flight(flight, "key", function, results)
+                        for _ in range(3)])
+        self.__wait_for_waiters(flight, "key", 3)
+
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertEquals(1, len(calls))
+        self.assertEquals([("result", True)] * 4, results)
+
+        # once completed, a new call is made
+        self.assertEquals(("result", False), flight.do("key", function))
+        self.assertEquals(2, len(calls))
+
+    def test_errors_are_shared(self):
+        """ An exception raised by the call should be raised to every caller
+        sharing it. """
+
+        flight = SingleFlight()
+        release = threading.Event()
+
+        def function():
+            release.wait()
+            raise ValueError("failed")
+
+        results = []
+        threads = [self.__join_flight(flight, "key", function, results)]
+        self.__wait_for_waiters(flight, "key", 0)
+
+        threads.append(self.__join_flight(flight, "key", function, results))
+        self.__wait_for_waiters(flight, "key", 1)
+
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertEquals(2, len(results))
+        for result in results:
+            self.assertTrue(isinstance(result, ValueError))
+
+
+if "__main__" == __name__:
+    unittest.main()
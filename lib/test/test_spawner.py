@@ -0,0 +1,139 @@
+#!/usr/bin/env python
+
+#Copyright (C) 2012 Niklas Thorne.
+
+#This file is part of XMPPMote.
+#
+#XMPPMote is free software: you can redistribute it and/or modify
+#it under the terms of the GNU General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+#
+#XMPPMote is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU General Public License for more details.
+#
+#You should have received a copy of the GNU General Public License
+#along with XMPPMote.  If not, see <http://www.gnu.org/licenses/>.
+
+
+""" This module tests the spawner module. """
+
+import sys
+import os
+
+sys.path.append(os.path.abspath(".."))
+sys.path.append(os.path.abspath("../.."))
+
+import mox
+import unittest
+import errno
+import signal
+import subprocess
+import threading
+
+from lib import process
+from lib import spawner
+from lib.clock import monotonic
+from lib.spawner import Spawner
+
+
+class SpawnerTest(mox.MoxTestBase):
+    """ Provides test cases for the Spawner type. """
+
+    def setUp(self):
+        super(SpawnerTest, self).setUp()
+        Spawner().start()
+
+    def tearDown(self):
+        Spawner().stop()
+        super(SpawnerTest, self).tearDown()
+
+    def test_spawn(self):
+        """ The output and exit status of a spawned command should reach the
+        daemon. """
+
+        subp = spawner.popen(["sh", "-c", "echo foo; exit 3"])
+
+        self.assertTrue(isinstance(subp, spawner.SpawnedProcess))
+        self.assertEquals(("foo\n", None), subp.communicate())
+        self.assertEquals(3, subp.returncode)
+
+    def test_concurrent_spawns(self):
+        """ Commands should be told apart when several are running. """
+
+        processes = [Spawner().spawn(["echo", str(number)])
+                     for number in range(10)]
+
+        for (number, subp) in enumerate(processes):
+            self.assertEquals("%d\n" % number, subp.stdout.read())
+            subp.stdout.close()
+            self.assertEquals(0, subp.wait())
+
+    def test_spawn_nonexisting_command(self):
+        """ OSError should be raised for commands that cannot be executed, as
+        by subprocess.Popen. """
+
+        try:
+            Spawner().spawn(["/nonexisting/command"])
+            self.fail("OSError not raised")
+        except OSError, err:
+            self.assertEquals(errno.ENOENT, err.errno)
+
+    def test_restart(self):
+        """ The reader of a stopped spawner process should not affect the
+        commands of the one started next, however late it finishes. """
+
+        release = threading.Event()
+        receive = spawner.receive_message
+        daemon = os.getpid()
+
+        def receive_message(sock):
+            message = receive(sock)
+            if None == message and os.getpid() == daemon:
+                release.wait(5)
+            return message
+
+        Spawner().stop()
+        self.mox.stubs.Set(spawner, "receive_message", receive_message)
+
+        # the reader of this spawner process is held up once it is stopped
+        Spawner().start()
+        Spawner().stop()
+
+        Spawner().start()
+        subp = Spawner().spawn(["sleep", "0.2"])
+        release.set()
+
+        subp.stdout.close()
+        self.assertEquals(0, subp.wait())
+
+    def test_kill_group(self):
+        """ Spawned commands should lead process groups of their own. """
+
+        subp = Spawner().spawn(["sleep", "10"])
+
+        self.assertEquals(subp.pid, os.getpgid(subp.pid))
+        self.assertFalse(process.wait_until(subp, monotonic() + 0.1))
+
+        process.kill_group(subp, 1)
+        subp.stdout.close()
+        self.assertEquals(-signal.SIGTERM, subp.returncode)
+
+    def test_popen_fallback(self):
+        """ Commands should be started directly when the spawner is not
+        running. """
+
+        Spawner().stop()
+        self.assertFalse(Spawner().is_running())
+
+        subp = spawner.popen("true")
+
+        self.assertTrue(isinstance(subp, subprocess.Popen))
+        subp.communicate()
+        self.assertEquals(0, subp.returncode)
+
+
+if "__main__" == __name__:
+    unittest.main()
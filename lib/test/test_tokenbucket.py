@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+
+#Copyright (C) 2012 Niklas Thorne.
+
+#This file is part of XMPPMote.
+#
+#XMPPMote is free software: you can redistribute it and/or modify
+#it under the terms of the GNU General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+#
+#XMPPMote is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU General Public License for more details.
+#
+#You should have received a copy of the GNU General Public License
+#along with XMPPMote.  If not, see <http://www.gnu.org/licenses/>.
+""" This module tests the tokenbucket module. """
+
+import sys
+import os
+
+sys.path.append(os.path.abspath(".."))
+
+import mox
+import unittest
+
+import tokenbucket
+from tokenbucket import TokenBucket
+
+
+class TokenBucketTest(mox.MoxTestBase):
+    """ Provides test cases for the TokenBucket type. """
+
+    def test_consume(self):
+        """ A full burst should be allowed at once, after which the bucket
+        should be refilled at the given rate, up to the burst size. """
+
+        self.mox.StubOutWithMock(tokenbucket, "monotonic")
+
+        tokenbucket.monotonic().AndReturn(10)
+        for now in [10, 10, 10, 10.4, 10.5, 20]:
+            tokenbucket.monotonic().AndReturn(now)
+        tokenbucket.monotonic().AndReturn(20)
+
+        self.mox.ReplayAll()
+
+        bucket = TokenBucket(2, 2)
+        self.assertTrue(bucket.consume())
+        self.assertTrue(bucket.consume())
+        self.assertFalse(bucket.consume())
+        self.assertFalse(bucket.consume())
+        self.assertTrue(bucket.consume())
+        self.assertTrue(bucket.consume(2))
+        self.assertFalse(bucket.is_full())
+
+    def test_refund(self):
+        """ Refunded tokens should be taken again, up to the burst size. """
+
+        self.mox.StubOutWithMock(tokenbucket, "monotonic")
+
+        for _ in range(5):
+            tokenbucket.monotonic().AndReturn(10)
+
+        self.mox.ReplayAll()
+
+        bucket = TokenBucket(1, 2)
+        self.assertTrue(bucket.consume(2))
+        bucket.refund()
+        self.assertTrue(bucket.consume())
+        bucket.refund(5)
+        self.assertTrue(bucket.consume(2))
+        self.assertFalse(bucket.consume())
+
+
+if "__main__" == __name__:
+    unittest.main()
@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+
+#Copyright (C) 2012 Niklas Thorne.
+
+#This file is part of XMPPMote.
+#
+#XMPPMote is free software: you can redistribute it and/or modify
+#it under the terms of the GNU General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+#
+#XMPPMote is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU General Public License for more details.
+#
+#You should have received a copy of the GNU General Public License
+#along with XMPPMote.  If not, see <http://www.gnu.org/licenses/>.
+
+""" This module provides a token bucket, used for rate limiting. """
+
+from clock import monotonic
+
+
+class TokenBucket(object):
+    """ This type holds up to _burst_ tokens, and is refilled with _rate_
+    tokens per second. An event is allowed if there is a token to take for it.
+    The bucket is not thread safe. """
+
+    def __init__(self, rate, burst):
+        self.__rate = float(rate)
+        self.__burst = float(max(1, burst))
+
+        self.__tokens = self.__burst
+        self.__filled = monotonic()
+
+    def consume(self, tokens = 1):
+        """ Take _tokens_ tokens from the bucket, returning True if there were
+        enough tokens to take, or False (taking none) otherwise. """
+
+        now = monotonic()
+
+        self.__tokens = min(self.__burst, self.__tokens +
+                            (now - self.__filled) * self.__rate)
+        self.__filled = now
+
+        if self.__tokens < tokens:
+            return False
+
+        self.__tokens -= tokens
+        return True
+
+    def refund(self, tokens = 1):
+        """ Put back _tokens_ tokens taken by consume, e.g. should the event
+        not be allowed after all, for some other reason. """
+
+        self.__tokens = min(self.__burst, self.__tokens + tokens)
+
+    def is_full(self):
+        """ Returns True if the bucket would be full, were it refilled. """
+
+        return self.__tokens + (monotonic() - self.__filled) * self.__rate \
+               >= self.__burst
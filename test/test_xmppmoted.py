@@ -26,13 +26,22 @@ sys.path.append(os.path.abspath(".."))
 
 from bot.client import Client
 from bot.statusprovider import StatusProvider
+from bot.supervisor import Supervisor
 from ConfigParser import SafeConfigParser
 from configuration.configurationparser import ConfigurationParser
+from configuration import connection
 from configuration import credentials
+from configuration import jobs
+from configuration import logs
+from configuration import metrics
+from configuration import profiling
+from configuration import recording
 from configuration import updates
 from lib.daemon import Daemon
+from lib.spawner import Spawner
 from pyxmpp.all import JID
 import __builtin__
+import signal
 import mox
 import unittest
 import xmppmoted
@@ -90,12 +99,13 @@ class XMPPMoteTest(mox.MoxTestBase):
         verify proper connection procedure. """
 
         mock_update_handler = self.mox.CreateMockAnything()
+        mock_executor = self.mox.CreateMockAnything()
+        mock_exporter = self.mox.CreateMockAnything()
 
         self.mox.StubOutWithMock(StatusProvider, "__init__")
         self.mox.StubOutWithMock(StatusProvider, "start")
         self.mox.StubOutWithMock(Client, "__init__")
-        self.mox.StubOutWithMock(Client, "connect")
-        self.mox.StubOutWithMock(Client, "loop")
+        self.mox.StubOutWithMock(Supervisor, "run")
         self.mox.StubOutWithMock(Client, "disconnect")
 
         self.mox.StubOutWithMock(Daemon, "start")
@@ -107,6 +117,17 @@ class XMPPMoteTest(mox.MoxTestBase):
         self.mox.StubOutWithMock(credentials, "get_credentials")
 
         self.mox.StubOutWithMock(updates, "get_update_handler")
+        self.mox.StubOutWithMock(jobs, "get_job_executor")
+        self.mox.StubOutWithMock(jobs, "get_throttle")
+        self.mox.StubOutWithMock(jobs, "get_send_queue_size")
+        self.mox.StubOutWithMock(logs, "get_log_handler")
+        self.mox.StubOutWithMock(metrics, "get_exporter")
+        self.mox.StubOutWithMock(profiling, "get_profiler")
+        self.mox.StubOutWithMock(recording, "get_recorder")
+        self.mox.StubOutWithMock(connection, "get_connection")
+        self.mox.StubOutWithMock(signal, "signal")
+        self.mox.StubOutWithMock(signal, "siginterrupt")
+        self.mox.StubOutWithMock(Spawner, "start")
 
         xmppmoted.XMPPMoteDaemon._XMPPMoteDaemon__parse_config_file()
         xmppmoted.XMPPMoteDaemon._XMPPMoteDaemon__get_pidfile().AndReturn(None)
@@ -121,10 +142,30 @@ class XMPPMoteTest(mox.MoxTestBase):
         updates.get_update_handler().AndReturn(mock_update_handler)
         mock_update_handler.start()
 
-        Client.__init__(JID(self.__usr), self.__pwd)
+        metrics.get_exporter().AndReturn(mock_exporter)
+        mock_exporter.start()
 
-        Client.connect()
-        Client.loop(1)
+        profiling.get_profiler()
+        signal.signal(signal.SIGUSR2, mox.IgnoreArg())
+        signal.siginterrupt(signal.SIGUSR2, False)
+
+        recording.get_recorder()
+
+        Spawner.start()
+
+        logs.get_log_handler(mox.IgnoreArg()).WithSideEffects(
+            lambda target: target)
+
+        jobs.get_send_queue_size().AndReturn(32)
+        connection.get_connection().AndReturn(("server", 5223, ("sasl:PLAIN",)))
+        Client.__init__(JID(self.__usr), self.__pwd, 32, "server", 5223,
+                        ("sasl:PLAIN",))
+
+        jobs.get_job_executor().AndReturn(mock_executor)
+        mock_executor.start()
+        jobs.get_throttle()
+
+        Supervisor.run(mox.IgnoreArg())
         Client.disconnect()
         self.mox.ReplayAll()
 
@@ -163,6 +204,7 @@ class XMPPMoteTest(mox.MoxTestBase):
         self.mox.StubOutWithMock(xmppmoted.XMPPMoteDaemon, "start")
         self.mox.StubOutWithMock(xmppmoted.XMPPMoteDaemon, "stop")
         self.mox.StubOutWithMock(xmppmoted.XMPPMoteDaemon, "restart")
+        self.mox.StubOutWithMock(xmppmoted.XMPPMoteDaemon, "foreground")
 
         xmppmoted.XMPPMoteDaemon.__init__()
         xmppmoted.XMPPMoteDaemon.start()
@@ -173,6 +215,9 @@ class XMPPMoteTest(mox.MoxTestBase):
         xmppmoted.XMPPMoteDaemon.__init__()
         xmppmoted.XMPPMoteDaemon.restart()
 
+        xmppmoted.XMPPMoteDaemon.__init__()
+        xmppmoted.XMPPMoteDaemon.foreground()
+
         self.mox.ReplayAll()
 
         arguments = [self.__app, "start"] 
@@ -193,6 +238,12 @@ class XMPPMoteTest(mox.MoxTestBase):
         except Exception:
             self.fail("Unknown exception raised")
 
+        arguments = [self.__app, "run"]
+        try:
+            xmppmoted.parse_arguments(arguments)
+        except Exception:
+            self.fail("Unknown exception raised")
+
     def test_getting_pidfile(self):
         """ Make sure that we read the pidfile option properly. """
 
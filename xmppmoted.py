@@ -24,18 +24,31 @@ protocol.  """
 
 
 from bot.client import Client
+from bot.recorder import Recorder
+from bot.jobexecutor import JobExecutor
 from bot.statusprovider import StatusProvider
+from bot.supervisor import Supervisor
 from ConfigParser import NoOptionError
 from ConfigParser import NoSectionError
 from configuration.configurationparser import ConfigurationParser
+from configuration import connection
 from configuration import credentials
+from configuration import jobs
+from configuration import logs
+from configuration import metrics
+from configuration import profiling
+from configuration import recording
 from configuration import updates
 from lib.daemon import Daemon
+from lib.profiler import Profiler
+from lib.scheduler import Scheduler
+from lib.spawner import Spawner
 from pyxmpp.all import JID
 import codecs
 import locale
 import logging
 import logging.handlers
+import signal
 import sys
 import traceback
 
@@ -60,6 +73,13 @@ class XMPPMoteDaemon(Daemon):
         self.__usr, self.__pwd = credentials.get_credentials()
         Daemon.start(self)
 
+    def foreground(self):
+        """ Run the daemon without detaching from the terminal, e.g. for local
+        load tests. """
+
+        self.__usr, self.__pwd = credentials.get_credentials()
+        self.run()
+
     def stop(self):
         """ This method overrides Daemon.stop in order to disconnect the session
         when stopping the daemon. """
@@ -74,11 +94,24 @@ class XMPPMoteDaemon(Daemon):
         connecting the XMPP client, and entering the application message loop.
         """
 
+        client = None
         try:
+            # fork the spawner while the daemon is still small, and before the
+            # logging thread is started, as only the forking thread survives
+            # in the child
+            Spawner().start()
+
             self.__setup_logging()
 
-            client = Client(JID(self.__usr), self.__pwd)
-            client.connect()
+            (server, port, auth_methods) = connection.get_connection()
+            client = Client(JID(self.__usr), self.__pwd,
+                            jobs.get_send_queue_size(), server, port,
+                            auth_methods)
+
+            executor = jobs.get_job_executor()
+            executor.start()
+
+            jobs.get_throttle()
 
             provider = StatusProvider()
             provider.start()
@@ -87,7 +120,20 @@ class XMPPMoteDaemon(Daemon):
             if update_handler:
                 update_handler.start()
 
-            client.loop(1)
+            exporter = metrics.get_exporter()
+            if exporter:
+                exporter.start()
+
+            recording.get_recorder()
+
+            # SIGUSR2 starts and stops the sampling profiler
+            profiler = profiling.get_profiler()
+            signal.signal(signal.SIGUSR2,
+                          lambda signum, frame: profiler.toggle())
+            signal.siginterrupt(signal.SIGUSR2, False)
+
+            # connect, and keep reconnecting until disconnected on purpose
+            Supervisor().run(client)
         except Exception, exc:
             logger = logging.getLogger()
             logger.critical(u"encountered exception %s. terminating XMPPMote." %
@@ -96,7 +142,13 @@ class XMPPMoteDaemon(Daemon):
             for line in filter(None, traceback.format_exc().split("\n")):
                 logger.critical(line)
 
-        client.disconnect()
+        if client:
+            client.disconnect()
+        Profiler().stop()
+        Recorder().close()
+        Scheduler().stop()
+        JobExecutor().stop()
+        Spawner().stop()
 
     @staticmethod
     def __parse_config_file():
@@ -127,7 +179,9 @@ class XMPPMoteDaemon(Daemon):
     @staticmethod
     def __setup_logging():
         """ Set logging format and log level in order to get nicely written
-        log statements from both PyXMPP and XMPPMote. """
+        log statements from both PyXMPP and XMPPMote. Unless configured not to,
+        the records are written to syslog by a thread of their own, so that
+        logging does not wait for syslog. """
 
         logging.basicConfig(format = '%(asctime)-15s %(message)s')
 
@@ -143,7 +197,7 @@ class XMPPMoteDaemon(Daemon):
         formatter = logging.Formatter('%(asctime)-15s XMPPMote: %(message)s')
         syslog_handler.setFormatter(formatter)
 
-        logger.addHandler(syslog_handler)
+        logger.addHandler(logs.get_log_handler(syslog_handler))
 
         logging.info(u"redirecting logs to syslog..")
 
@@ -165,8 +219,8 @@ def set_encoding():
 def display_usage(appname):
     """ Display the usage screen. """
 
-    print u"Usage: %s -h | --help | start | stop | restart" % (appname)
-    print u"Connect the XMPPMote bot."
+    print u"Usage: %s -h | --help | start | stop | restart | run" % (appname)
+    print u"Connect the XMPPMote bot (run keeps it in the foreground)."
 
 
 def parse_arguments(args):
@@ -188,6 +242,9 @@ def parse_arguments(args):
         elif "restart" == args[1]:
             daemon = XMPPMoteDaemon()
             daemon.restart()
+        elif "run" == args[1]:
+            daemon = XMPPMoteDaemon()
+            daemon.foreground()
     else:
         print u"Error: unknown argument"
         print